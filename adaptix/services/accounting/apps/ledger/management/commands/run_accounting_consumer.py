@@ -113,7 +113,11 @@ class Command(BaseCommand):
     def process_payroll(self, data):
         company_uuid = data['company_uuid']
         net_pay = Decimal(str(data['net_pay']))
-        payslip_id = data['payslip_id']
+        # One payslip, or a whole payroll run finalized at once
+        if data.get('payroll_run_id'):
+            reference = f"PAYRUN-{data['payroll_run_id'][:8]}"
+        else:
+            reference = f"PAYAP-{data['payslip_id'][:8]}"
         period = f"{data['period_start']} to {data['period_end']}"
         
         logger.info(f"Processing Payroll Journal for: {net_pay}")
@@ -127,7 +131,7 @@ class Command(BaseCommand):
             company_uuid=company_uuid,
             voucher_type='payment',
             date=timezone.now().date(),
-            reference=f"PAYAP-{payslip_id[:8]}",
+            reference=reference,
             description=f"Payroll Automation: {period}",
             total_debit=net_pay,
             total_credit=net_pay,
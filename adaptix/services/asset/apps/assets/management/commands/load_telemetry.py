@@ -0,0 +1,122 @@
+import io
+import uuid
+from datetime import date
+from decimal import Decimal
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+from adaptix_core.loadgen import JSONPoster, run_load
+from apps.assets.models import Asset, AssetCategory, AssetTelemetry
+
+SIMULATED = 'Simulated Load'
+
+class Command(BaseCommand):
+    help = 'Generates telemetry load for benchmarking ingestion and reports throughput and p50/p99 latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--devices', type=int, default=100, help='Simulated assets sending telemetry (created if needed)')
+        parser.add_argument('--rate', type=float, default=1000, help='Target readings/sec, 0 for as fast as possible')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds to run')
+        parser.add_argument('--total', type=int, help='Stop after this many readings')
+        parser.add_argument('--batch-size', type=int, default=500, help='Readings per write (always 1 with --mode api)')
+        parser.add_argument('--concurrency', type=int, default=4, help='Parallel writers')
+        parser.add_argument('--anomaly-rate', type=float, default=0.01, help='Share of readings with an overheating/vibration spike')
+        parser.add_argument('--mode', choices=['copy', 'bulk', 'api'], default='copy',
+                            help='copy: COPY FROM STDIN, bulk: bulk_create, api: POST each reading to --url')
+        parser.add_argument('--url', default='http://localhost:8000/api/asset/telemetry/', help='Telemetry endpoint for --mode api')
+        parser.add_argument('--token', help='Bearer token for --mode api')
+        parser.add_argument('--company', type=uuid.UUID, required=True,
+                            help='company_uuid of the load-test tenant; only its simulated assets receive readings')
+        parser.add_argument('--seed', type=int, help='Random seed')
+
+    def handle(self, *args, **options):
+        if options['devices'] < 1 or options['batch_size'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--devices, --batch-size and --concurrency must be positive")
+        asset_ids = self.devices(options['devices'], options['company'])
+        rng = np.random.default_rng(options['seed'])
+        anomaly_rate = options['anomaly_rate']
+
+        def make_batch(n):
+            # Normal temp ~50C, vibration ~0.3, power 100-800W; spikes as in simulate_iot
+            temperature = rng.normal(50, 5, n)
+            vibration = np.abs(rng.normal(0.3, 0.1, n))
+            anomaly = rng.random(n) < anomaly_rate
+            temperature[anomaly] += rng.uniform(30, 50, anomaly.sum())
+            vibration[anomaly] += rng.uniform(1.0, 2.0, anomaly.sum())
+            return {
+                "asset": [asset_ids[i] for i in rng.integers(0, len(asset_ids), n)],
+                "temperature": temperature.round(2).tolist(),
+                "vibration": vibration.round(2).tolist(),
+                "power_usage": rng.uniform(100, 800, n).round(2).tolist(),
+                "timestamp": timezone.now(),
+            }
+
+        mode = options['mode']
+        batch_size = 1 if mode == 'api' else options['batch_size']
+        send = {'copy': self.copy, 'bulk': self.bulk, 'api': self.poster(options)}[mode]
+        self.stdout.write(
+            f"Sending telemetry for {len(asset_ids)} assets via {mode}: rate {options['rate'] or 'unlimited'}/s, "
+            f"batches of {batch_size}, {options['concurrency']} writers, {anomaly_rate:.1%} anomalies"
+        )
+        report = run_load(send, make_batch, rate=options['rate'], batch_size=batch_size,
+                          duration=options['duration'], total=options['total'], concurrency=options['concurrency'],
+                          on_worker_exit=connections.close_all)
+        self.stdout.write(self.style.SUCCESS(str(report)))
+
+    def devices(self, count, company_uuid):
+        """
+        Ids of `count` simulated assets of the company, creating the missing
+        ones. Real assets are never used, so their history stays clean.
+        """
+        category, _ = AssetCategory.objects.get_or_create(
+            company_uuid=company_uuid, name=SIMULATED, defaults={'depreciation_rate': Decimal('0')}
+        )
+        asset_ids = [str(pk) for pk in Asset.objects.filter(
+            company_uuid=company_uuid, category=category, status='active'
+        ).values_list('id', flat=True)[:count]]
+        missing = count - len(asset_ids)
+        if missing > 0:
+            created = Asset.objects.bulk_create([Asset(
+                company_uuid=company_uuid, category=category, name=f"Simulated asset {i}",
+                code=f"SIM-{uuid.uuid4().hex[:8]}", purchase_date=date.today(), purchase_cost=Decimal('0'),
+                current_value=Decimal('0'), status='active',
+            ) for i in range(missing)])
+            asset_ids += [str(asset.id) for asset in created]
+            self.stdout.write(f"Created {missing} simulated assets for company {company_uuid}")
+        return asset_ids
+
+    def copy(self, batch):
+        buffer = io.StringIO()
+        timestamp = batch["timestamp"].isoformat()
+        for asset_id, temperature, vibration, power in zip(
+            batch["asset"], batch["temperature"], batch["vibration"], batch["power_usage"]
+        ):
+            buffer.write(f"{uuid.uuid4()}\t{asset_id}\t{timestamp}\t{timestamp}\t{temperature}\t{vibration}\t{power}\t0.5\n")
+        buffer.seek(0)
+        table = connection.ops.quote_name(AssetTelemetry._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {table} (id, asset_id, timestamp, ingested_at, temperature, vibration, power_usage, usage_hours) FROM STDIN",
+                buffer
+            )
+
+    def bulk(self, batch):
+        AssetTelemetry.objects.bulk_create([
+            AssetTelemetry(asset_id=asset_id, timestamp=batch["timestamp"], temperature=temperature,
+                           vibration=vibration, power_usage=power, usage_hours=0.5)
+            for asset_id, temperature, vibration, power in zip(
+                batch["asset"], batch["temperature"], batch["vibration"], batch["power_usage"]
+            )
+        ])
+
+    def poster(self, options):
+        post = JSONPoster(options['url'], options['token'])
+
+        def send(batch):
+            for i, asset_id in enumerate(batch["asset"]):
+                post({
+                    "asset": asset_id, "timestamp": batch["timestamp"].isoformat(), "temperature": batch["temperature"][i],
+                    "vibration": batch["vibration"][i], "power_usage": batch["power_usage"][i], "usage_hours": 0.5,
+                })
+        return send
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from apps.assets.depreciation import IN_SERVICE, run_depreciation
+from apps.assets.models import Asset
+
+
+class Command(BaseCommand):
+    help = "Runs the month's depreciation for every company's assets in service (or one company's with --company)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Only this company_uuid')
+        parser.add_argument('--date', help='Run date (YYYY-MM-DD), default today; one run per month')
+
+    def handle(self, *args, **options):
+        run_date = None
+        if options['date']:
+            run_date = parse_date(options['date'])
+            if run_date is None:
+                raise CommandError("--date must be YYYY-MM-DD")
+        if options['company']:
+            companies = [options['company']]
+        else:
+            companies = Asset.objects.filter(status__in=IN_SERVICE).values_list('company_uuid', flat=True).distinct()
+
+        for company_uuid in companies:
+            run = run_depreciation(company_uuid, run_date)
+            self.stdout.write(
+                f"{company_uuid}: {len(run.schedules)} asset(s) depreciated, {len(run.events)} journal event(s)"
+            )
@@ -0,0 +1,98 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0003_asset_location_type_asset_wing_uuid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetTelemetryHour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(db_index=True)),
+                ('temperature_count', models.PositiveIntegerField(default=0)),
+                ('temperature_min', models.FloatField(null=True)),
+                ('temperature_max', models.FloatField(null=True)),
+                ('temperature_mean', models.FloatField(null=True)),
+                ('temperature_stddev', models.FloatField(null=True)),
+                ('vibration_count', models.PositiveIntegerField(default=0)),
+                ('vibration_min', models.FloatField(null=True)),
+                ('vibration_max', models.FloatField(null=True)),
+                ('vibration_mean', models.FloatField(null=True)),
+                ('vibration_stddev', models.FloatField(null=True)),
+                ('power_usage_count', models.PositiveIntegerField(default=0)),
+                ('power_usage_min', models.FloatField(null=True)),
+                ('power_usage_max', models.FloatField(null=True)),
+                ('power_usage_mean', models.FloatField(null=True)),
+                ('power_usage_stddev', models.FloatField(null=True)),
+                ('usage_hours_count', models.PositiveIntegerField(default=0)),
+                ('usage_hours_min', models.FloatField(null=True)),
+                ('usage_hours_max', models.FloatField(null=True)),
+                ('usage_hours_mean', models.FloatField(null=True)),
+                ('usage_hours_stddev', models.FloatField(null=True)),
+            ],
+            options={
+                'ordering': ['-bucket'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AssetTelemetryMinute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(db_index=True)),
+                ('temperature_count', models.PositiveIntegerField(default=0)),
+                ('temperature_min', models.FloatField(null=True)),
+                ('temperature_max', models.FloatField(null=True)),
+                ('temperature_mean', models.FloatField(null=True)),
+                ('temperature_stddev', models.FloatField(null=True)),
+                ('vibration_count', models.PositiveIntegerField(default=0)),
+                ('vibration_min', models.FloatField(null=True)),
+                ('vibration_max', models.FloatField(null=True)),
+                ('vibration_mean', models.FloatField(null=True)),
+                ('vibration_stddev', models.FloatField(null=True)),
+                ('power_usage_count', models.PositiveIntegerField(default=0)),
+                ('power_usage_min', models.FloatField(null=True)),
+                ('power_usage_max', models.FloatField(null=True)),
+                ('power_usage_mean', models.FloatField(null=True)),
+                ('power_usage_stddev', models.FloatField(null=True)),
+                ('usage_hours_count', models.PositiveIntegerField(default=0)),
+                ('usage_hours_min', models.FloatField(null=True)),
+                ('usage_hours_max', models.FloatField(null=True)),
+                ('usage_hours_mean', models.FloatField(null=True)),
+                ('usage_hours_stddev', models.FloatField(null=True)),
+            ],
+            options={
+                'ordering': ['-bucket'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='assettelemetry',
+            index=models.Index(fields=['asset', 'timestamp'], name='assets_asse_asset_i_420300_idx'),
+        ),
+        migrations.AddField(
+            model_name='assettelemetryminute',
+            name='asset',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='telemetry_minutes', to='assets.asset'),
+        ),
+        migrations.AddField(
+            model_name='assettelemetryhour',
+            name='asset',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='telemetry_hours', to='assets.asset'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='assettelemetryminute',
+            unique_together={('asset', 'bucket')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='assettelemetryhour',
+            unique_together={('asset', 'bucket')},
+        ),
+    ]
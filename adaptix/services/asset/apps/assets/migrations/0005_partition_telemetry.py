@@ -0,0 +1,20 @@
+from django.db import migrations
+from adaptix_core.timeseries import partition_by_day
+
+
+def partition_telemetry(apps, schema_editor):
+    table = apps.get_model('assets', 'AssetTelemetry')._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        partition_by_day(cursor, table, 'timestamp')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0004_telemetry_rollups'),
+    ]
+
+    operations = [
+        # Reversing leaves the table partitioned; Django sees the same columns either way
+        migrations.RunPython(partition_telemetry, migrations.RunPython.noop),
+    ]
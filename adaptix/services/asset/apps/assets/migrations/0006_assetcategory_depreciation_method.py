@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0005_partition_telemetry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assetcategory',
+            name='depreciation_method',
+            field=models.CharField(choices=[('straight_line', 'Straight Line'), ('declining_balance', 'Declining Balance')], default='straight_line', max_length=20),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+# Rows stored before this migration get the epoch so that the next health
+# analysis does not read the whole history again; new rows, including those
+# written by COPY without the column, default to now().
+ADD_INGESTED_AT = """
+    ALTER TABLE assets_assettelemetry ADD COLUMN ingested_at timestamptz NOT NULL DEFAULT '1970-01-01T00:00:00Z';
+    ALTER TABLE assets_assettelemetry ALTER COLUMN ingested_at SET DEFAULT now();
+    CREATE INDEX assets_assettelemetry_ingested_at_idx ON assets_assettelemetry (ingested_at);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0007_track_telemetry_changes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(ADD_INGESTED_AT, "ALTER TABLE assets_assettelemetry DROP COLUMN ingested_at"),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name='assettelemetry',
+                    name='ingested_at',
+                    field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False),
+                ),
+            ],
+        ),
+    ]
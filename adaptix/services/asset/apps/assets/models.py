@@ -7,9 +7,15 @@ class AssetCategory(models.Model):
     """
     Groups assets: 'Laptops', 'Vehicles', 'Furniture'.
     """
+    DEPRECIATION_METHODS = (
+        ('straight_line', 'Straight Line'),
+        ('declining_balance', 'Declining Balance'),
+    )
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     company_uuid = models.UUIDField(db_index=True)
     name = models.CharField(max_length=100)
+    depreciation_method = models.CharField(max_length=20, choices=DEPRECIATION_METHODS, default='straight_line')
     depreciation_rate = models.DecimalField(max_digits=5, decimal_places=2, help_text="Annual depreciation %")
     useful_life_years = models.PositiveIntegerField(default=5)
     
@@ -103,6 +109,9 @@ class AssetTelemetry(models.Model):
     asset = models.ForeignKey(Asset, on_delete=models.CASCADE, related_name='telemetry')
     
     timestamp = models.DateTimeField(default=timezone.now, db_index=True)
+    # When the row was stored, whatever the device reported: late or backfilled
+    # readings still come after the analysis watermark in this order
+    ingested_at = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
     
     temperature = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True, help_text="Celsius")
     vibration = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True, help_text="G-force/mm/s")
@@ -115,10 +124,60 @@ class AssetTelemetry(models.Model):
     class Meta:
         ordering = ['-timestamp']
         verbose_name_plural = "Asset Telemetry"
+        indexes = [
+            models.Index(fields=['asset', 'timestamp']),
+        ]
 
     def __str__(self):
         return f"Telemetry for {self.asset} at {self.timestamp}"
 
+class AssetTelemetryRollup(models.Model):
+    """
+    Per-asset summary of the telemetry in one time bucket, kept up to date by
+    `manage.py maintain_telemetry` (see apps.assets.telemetry).
+    """
+    bucket = models.DateTimeField(db_index=True)
+
+    temperature_count = models.PositiveIntegerField(default=0)
+    temperature_min = models.FloatField(null=True)
+    temperature_max = models.FloatField(null=True)
+    temperature_mean = models.FloatField(null=True)
+    temperature_stddev = models.FloatField(null=True)
+
+    vibration_count = models.PositiveIntegerField(default=0)
+    vibration_min = models.FloatField(null=True)
+    vibration_max = models.FloatField(null=True)
+    vibration_mean = models.FloatField(null=True)
+    vibration_stddev = models.FloatField(null=True)
+
+    power_usage_count = models.PositiveIntegerField(default=0)
+    power_usage_min = models.FloatField(null=True)
+    power_usage_max = models.FloatField(null=True)
+    power_usage_mean = models.FloatField(null=True)
+    power_usage_stddev = models.FloatField(null=True)
+
+    usage_hours_count = models.PositiveIntegerField(default=0)
+    usage_hours_min = models.FloatField(null=True)
+    usage_hours_max = models.FloatField(null=True)
+    usage_hours_mean = models.FloatField(null=True)
+    usage_hours_stddev = models.FloatField(null=True)
+
+    class Meta:
+        abstract = True
+        ordering = ['-bucket']
+
+class AssetTelemetryMinute(AssetTelemetryRollup):
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE, related_name='telemetry_minutes')
+
+    class Meta(AssetTelemetryRollup.Meta):
+        unique_together = ('asset', 'bucket')
+
+class AssetTelemetryHour(AssetTelemetryRollup):
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE, related_name='telemetry_hours')
+
+    class Meta(AssetTelemetryRollup.Meta):
+        unique_together = ('asset', 'bucket')
+
 class AssetMaintenanceTask(models.Model):
     """
     Tracks maintenance for assets. Can be scheduled or AI-triggered.
@@ -6,6 +6,21 @@ class AssetTelemetrySerializer(serializers.ModelSerializer):
         model = AssetTelemetry
         fields = '__all__'
 
+class AssetTelemetryRollupSerializer(serializers.BaseSerializer):
+    """
+    One rollup bucket, shaped like a telemetry reading (the bucket's mean per
+    metric) plus the full statistics under "stats".
+    """
+    def to_representation(self, instance):
+        from .telemetry import METRICS
+        data = {"timestamp": instance.bucket}
+        stats = {}
+        for metric in METRICS:
+            stats[metric] = {stat: getattr(instance, f"{metric}_{stat}") for stat in ('count', 'min', 'max', 'mean', 'stddev')}
+            data[metric] = stats[metric]['mean']
+        data["stats"] = stats
+        return data
+
 class AssetMaintenanceTaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = AssetMaintenanceTask
@@ -0,0 +1,11 @@
+"""
+Telemetry storage for assets: AssetTelemetry is partitioned by day and rolled
+up into AssetTelemetryMinute / AssetTelemetryHour (see adaptix_core.timeseries).
+"""
+from adaptix_core.timeseries import TelemetryStore
+from .models import AssetTelemetry, AssetTelemetryHour, AssetTelemetryMinute
+
+METRICS = ['temperature', 'vibration', 'power_usage', 'usage_hours']
+
+store = TelemetryStore(AssetTelemetry, 'asset', METRICS,
+                       minute_model=AssetTelemetryMinute, hour_model=AssetTelemetryHour)
@@ -51,3 +51,65 @@ class TestAssetLogic:
         
         macbook.refresh_from_db()
         assert macbook.current_value == Decimal("160000.00")
+
+
+@pytest.mark.django_db
+class TestDepreciationRun:
+    def test_month_end_run_depreciates_all_assets_once(self, api_client, mocker, django_capture_on_commit_callbacks):
+        publish = mocker.patch('apps.assets.depreciation.publish_events')
+        company_uuid, wing = uuid.uuid4(), uuid.uuid4()
+        laptops = AssetCategory.objects.create(
+            company_uuid=company_uuid, name="Laptops", depreciation_rate=Decimal("20.00"), useful_life_years=5
+        )
+        vehicles = AssetCategory.objects.create(
+            company_uuid=company_uuid, name="Vehicles", depreciation_method="declining_balance",
+            depreciation_rate=Decimal("25.00"), useful_life_years=8
+        )
+
+        def asset(category, cost, value=None, status="active", wing_uuid=None):
+            return Asset.objects.create(
+                company_uuid=company_uuid, category=category, name=f"{category.name} {cost}", code=f"T-{uuid.uuid4().hex[:6]}",
+                purchase_date=date(2025, 1, 1), purchase_cost=Decimal(cost),
+                current_value=Decimal(value if value is not None else cost), status=status, wing_uuid=wing_uuid
+            )
+
+        laptop = asset(laptops, "1000.00")
+        nearly_done = asset(laptops, "1000.00", value="10.00")
+        branch_laptop = asset(laptops, "2000.00", wing_uuid=wing)
+        van = asset(vehicles, "48000.00", value="36000.00")
+        asset(laptops, "5000.00", status="draft")
+        asset(laptops, "1000.00", value="0.00")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post("/api/asset/assets/run-depreciation/",
+                                       {"company_uuid": str(company_uuid), "date": "2026-01-31"}, format="json")
+        assert response.status_code == 200
+        assert (response.data["depreciated"], response.data["amount"], response.data["journal_events"]) == (
+            4, Decimal("810.00"), 3
+        )
+
+        values = {a.id: a.current_value for a in Asset.objects.filter(company_uuid=company_uuid)}
+        assert values[laptop.id] == Decimal("983.33")  # 1000 / 5 years / 12
+        assert values[nearly_done.id] == Decimal("0.00")  # Capped at what is left
+        assert values[branch_laptop.id] == Decimal("1966.67")
+        assert values[van.id] == Decimal("35250.00")  # 25% a year of 36000
+
+        [events] = publish.call_args.args
+        assert sorted((e["asset_name"], e["amount"], e["wing_uuid"]) for e in events) == [
+            ("Laptops (2 assets)", "26.67", None),
+            ("Laptops 2000.00", "33.33", str(wing)),
+            ("Vehicles 48000.00", "750.00", None),
+        ]
+        schedule_ids = {str(pk) for pk in DepreciationSchedule.objects.values_list('id', flat=True)}
+        assert {e["schedule_id"] for e in events} <= schedule_ids
+
+        # Same month again: nothing left to do
+        again = api_client.post("/api/asset/assets/run-depreciation/",
+                                {"company_uuid": str(company_uuid), "date": "2026-01-05"}, format="json")
+        assert again.data["depreciated"] == 0
+        assert DepreciationSchedule.objects.filter(asset__company_uuid=company_uuid).count() == 4
+
+        # The single asset endpoint runs the current month through the same engine
+        single = api_client.post(f"/api/asset/assets/{laptop.id}/calculate-depreciation/")
+        assert (single.status_code, single.data["opening_value"], single.data["amount"]) == (200, "983.33", "16.67")
+        assert api_client.post(f"/api/asset/assets/{laptop.id}/calculate-depreciation/").status_code == 400
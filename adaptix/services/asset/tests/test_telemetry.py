@@ -0,0 +1,128 @@
+import io
+import pytest
+import statistics
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.utils import timezone
+from adaptix_core.timeseries import is_partitioned, list_partitions, partition_by_day, track_changes
+from apps.assets.models import Asset, AssetCategory, AssetTelemetry, AssetTelemetryHour, AssetTelemetryMinute
+from apps.assets.telemetry import store
+
+
+@pytest.fixture
+def asset():
+    company_uuid = uuid.uuid4()
+    category = AssetCategory.objects.create(company_uuid=company_uuid, name="Pumps", depreciation_rate=Decimal("10.00"))
+    return Asset.objects.create(
+        company_uuid=company_uuid, category=category, name="Coolant Pump", purchase_date=date(2025, 1, 1),
+        purchase_cost=Decimal("1000.00"), current_value=Decimal("1000.00"), status="active"
+    )
+
+
+def record(asset, at, temperature, vibration=None):
+    return AssetTelemetry(asset=asset, timestamp=at, temperature=temperature, vibration=vibration)
+
+
+@pytest.mark.django_db
+class TestTelemetryRollups:
+    def test_minute_and_hour_rollups_match_the_raw_readings(self, asset):
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=2)
+        first = [40, 42, 47]
+        second = [50, 61]
+        AssetTelemetry.objects.bulk_create(
+            [record(asset, hour + timedelta(seconds=10 * i), t, vibration=0.2) for i, t in enumerate(first)]
+            + [record(asset, hour + timedelta(minutes=5, seconds=10 * i), t) for i, t in enumerate(second)]
+        )
+
+        assert store.refresh() == {"minute": 2, "hour": 1}
+        minute = AssetTelemetryMinute.objects.get(asset=asset, bucket=hour)
+        assert (minute.temperature_count, minute.temperature_min, minute.temperature_max) == (3, 40, 47)
+        assert minute.temperature_stddev == pytest.approx(statistics.stdev(first))
+        assert (minute.vibration_count, minute.vibration_stddev) == (3, 0)
+        assert minute.power_usage_count == 0 and minute.power_usage_mean is None
+
+        hourly = AssetTelemetryHour.objects.get(asset=asset, bucket=hour)
+        assert hourly.temperature_count == 5
+        assert hourly.temperature_mean == pytest.approx(statistics.mean(first + second))
+        assert hourly.temperature_stddev == pytest.approx(statistics.stdev(first + second))
+        assert hourly.vibration_count == 3
+
+        # A late reading inside the lateness margin is picked up by the next refresh
+        AssetTelemetry.objects.create(asset=asset, timestamp=hour + timedelta(minutes=5, seconds=40), temperature=70)
+        store.refresh()
+        assert AssetTelemetryHour.objects.get(asset=asset, bucket=hour).temperature_max == 70
+
+    def test_backfill_older_than_the_lateness_margin_reaches_the_rollups(self, asset):
+        with connection.cursor() as cursor:
+            partition_by_day(cursor, AssetTelemetry._meta.db_table, 'timestamp')
+            track_changes(cursor, AssetTelemetry._meta.db_table, 'timestamp')
+        now = timezone.now()
+        AssetTelemetry.objects.create(asset=asset, timestamp=now - timedelta(minutes=1), temperature=50)
+        store.refresh()
+
+        # A device flushing its buffer: readings from two days back, well past TELEMETRY_LATE_SECONDS
+        backfill = now.replace(minute=30, second=0, microsecond=0) - timedelta(days=2)
+        AssetTelemetry.objects.bulk_create([record(asset, backfill + timedelta(seconds=s), 60 + s) for s in (0, 20)])
+        AssetTelemetry.objects.create(asset=asset, timestamp=backfill + timedelta(minutes=40), temperature=90)
+        store.refresh()
+
+        assert AssetTelemetryMinute.objects.get(asset=asset, bucket=backfill).temperature_count == 2
+        hourly = AssetTelemetryHour.objects.get(asset=asset, bucket=backfill.replace(minute=0))
+        assert (hourly.temperature_count, hourly.temperature_max) == (2, 80)
+        assert AssetTelemetryHour.objects.get(asset=asset, bucket=backfill.replace(minute=0) + timedelta(hours=1)).temperature_max == 90
+        # The change log is consumed
+        assert store.refresh()["minute"] <= 1
+
+    def test_daily_partitions_are_created_and_expired(self, asset, settings):
+        settings.TELEMETRY_RAW_RETENTION_DAYS = 30
+        settings.TELEMETRY_PARTITIONS_AHEAD = 2
+        now = timezone.now()
+        AssetTelemetry.objects.bulk_create([record(asset, now - timedelta(days=days), 50) for days in (0, 10, 40)])
+        with connection.cursor() as cursor:
+            partition_by_day(cursor, AssetTelemetry._meta.db_table, 'timestamp')
+            assert is_partitioned(cursor, AssetTelemetry._meta.db_table)
+            days = list_partitions(cursor, AssetTelemetry._meta.db_table)
+        assert min(days) == (now - timedelta(days=40)).date() and max(days) == now.date() + timedelta(days=2)
+        assert AssetTelemetry.objects.count() == 3
+
+        result = store.maintain(now + timedelta(days=1))
+        assert len(result["created"]) == 1
+        assert len(result["expired"]["partitions"]) == 11  # 40 to 30 days back
+        assert AssetTelemetry.objects.count() == 2
+        # Rows outside every partition land in the default partition and still read back
+        AssetTelemetry.objects.create(asset=asset, timestamp=now + timedelta(days=30), temperature=1)
+        assert AssetTelemetry.objects.filter(temperature=1).exists()
+
+    def test_health_metrics_reads_the_rollups(self, api_client, asset):
+        AssetTelemetry.objects.create(asset=asset, timestamp=timezone.now() - timedelta(minutes=2), temperature=81)
+        store.refresh()
+
+        response = api_client.get(f"/api/asset/assets/{asset.id}/health-metrics/")
+        assert response.status_code == 200
+        latest = response.data["telemetry_history"][0]
+        assert latest["temperature"] == 81 and latest["stats"]["temperature"]["count"] == 1
+        assert api_client.get(f"/api/asset/assets/{asset.id}/health-metrics/", {"resolution": "day"}).status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_load_generator_copies_readings_and_reports_latency(asset):
+    company = uuid.uuid4()
+    out = io.StringIO()
+    call_command("load_telemetry", devices=5, total=1200, rate=0, batch_size=500, mode="copy",
+                 anomaly_rate=0.5, seed=1, company=str(company), stdout=out)
+    assert "Sent 1200 readings" in out.getvalue()
+    assert "p50" in out.getvalue() and "p99" in out.getvalue()
+    assert AssetTelemetry.objects.filter(asset__company_uuid=company).count() == 1200
+    assert Asset.objects.filter(company_uuid=company, status="active").count() == 5
+    # Real assets never receive load-test readings
+    assert not AssetTelemetry.objects.filter(asset=asset).exists()
+    assert AssetTelemetry.objects.filter(temperature__gt=75).count() > 400
+
+
+@pytest.mark.django_db
+def test_load_generator_requires_a_company():
+    with pytest.raises(CommandError, match="--company"):
+        call_command("load_telemetry", total=10, rate=0)
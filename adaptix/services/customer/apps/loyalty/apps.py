@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class LoyaltyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.loyalty'
+
+    def ready(self):
+        import apps.loyalty.signals
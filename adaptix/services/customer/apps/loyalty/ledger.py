@@ -0,0 +1,213 @@
+"""
+Loyalty ledger: every balance change is one LoyaltyTransaction row plus one
+conditional UPDATE of the account.
+
+- Balances move with `UPDATE ... SET balance = balance + x WHERE balance + x >= 0`,
+  so concurrent redemptions can never lose an update or overdraw an account.
+- Idempotency comes from the unique (transaction_type, reference_id)
+  constraint: a replayed order or checkout simply fails to insert.
+- The active program of a company is cached; program saves invalidate it.
+"""
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from apps.profiles.models import Customer
+from .models import LoyaltyAccount, LoyaltyProgram, LoyaltyTransaction
+
+PROGRAM_CACHE_SECONDS = getattr(settings, 'LOYALTY_PROGRAM_CACHE_SECONDS', 300)
+_NO_PROGRAM = 0  # cached "this company has no active program"
+
+
+class InsufficientPoints(Exception):
+    pass
+
+
+def program_cache_key(company_uuid, audience='customer'):
+    return f"loyalty:program:{company_uuid}:{audience}"
+
+
+def get_active_program(company_uuid, audience='customer'):
+    """Active program of the company, served from cache after the first lookup."""
+    if not company_uuid:
+        return None
+    key = program_cache_key(company_uuid, audience)
+    program = cache.get(key)
+    if program is None:
+        program = LoyaltyProgram.objects.filter(
+            company_uuid=company_uuid, is_active=True, target_audience=audience
+        ).order_by('id').first() or _NO_PROGRAM
+        cache.set(key, program, PROGRAM_CACHE_SECONDS)
+    return program or None
+
+
+def invalidate_program_cache(company_uuid):
+    cache.delete_many([program_cache_key(company_uuid, audience) for audience, _ in LoyaltyProgram.AUDIENCE_CHOICES])
+
+
+def get_account(customer, program=None):
+    account, _ = LoyaltyAccount.objects.get_or_create(customer=customer, defaults={'program': program})
+    return account
+
+
+def post_points(account, points, transaction_type, reference_id=None, description='', created_by='system'):
+    """
+    Applies one balance change. Returns (balance, applied); applied is False when
+    the reference was already posted. Raises InsufficientPoints if the change
+    would take the balance below zero.
+    """
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                LoyaltyTransaction.objects.create(
+                    account=account,
+                    transaction_type=transaction_type,
+                    points=points,
+                    description=description,
+                    reference_id=reference_id or None,
+                    created_by=created_by
+                )
+        except IntegrityError:
+            if not reference_id:
+                raise
+            return current_balance(account.id), False
+
+        updates = {'balance': F('balance') + points, 'updated_at': timezone.now()}
+        if points > 0 and transaction_type == 'earn':
+            updates['lifetime_points'] = F('lifetime_points') + points
+        changed = LoyaltyAccount.objects.filter(id=account.id, balance__gte=-points).update(**updates)
+        if not changed:
+            raise InsufficientPoints(f"Account {account.id} cannot cover {abs(points)} points")
+
+        balance = current_balance(account.id)
+        if account.customer_id:
+            sync_customer(account.customer_id, balance)
+    return balance, True
+
+
+def current_balance(account_id):
+    return LoyaltyAccount.objects.filter(id=account_id).values_list('balance', flat=True).get()
+
+
+def sync_customer(customer_id, balance):
+    """Mirrors the balance onto the legacy Customer fields without loading or re-saving the customer."""
+    Customer.all_objects.filter(id=customer_id).update(
+        loyalty_points=Decimal(balance),
+        tier=Customer.tier_for_points(balance)
+    )
+
+
+def earn_points(grand_total, program):
+    return int(float(grand_total) * float(program.earn_rate))
+
+
+def earn_for_sales(sales):
+    """
+    Batch earn for closed sales in one transaction, whatever their number:
+    one lookup per company program (cached), one for customers, one for
+    accounts, one INSERT ... ON CONFLICT DO NOTHING for the ledger and one
+    UPDATE for all touched accounts.
+
+    sales: [{"customer_uuid", "grand_total", "order_id", "order_number", "company_uuid"}]
+    Returns {"awarded": n, "duplicates": n, "skipped": n}.
+    """
+    stats = {"awarded": 0, "duplicates": 0, "skipped": 0}
+    lines = []
+    for sale in sales:
+        program = get_active_program(sale.get('company_uuid'))
+        points = earn_points(sale['grand_total'], program) if program and sale.get('grand_total') else 0
+        if not _is_uuid(sale.get('customer_uuid')) or not sale.get('order_id') or points <= 0:
+            stats["skipped"] += 1
+            continue
+        lines.append((sale, program, points))
+    if not lines:
+        return stats
+
+    with transaction.atomic():
+        customer_ids = set(
+            str(pk) for pk in Customer.all_objects.filter(
+                id__in={str(sale['customer_uuid']) for sale, _, _ in lines}
+            ).values_list('id', flat=True)
+        )
+        known = [line for line in lines if str(line[0]['customer_uuid']) in customer_ids]
+        stats["skipped"] += len(lines) - len(known)
+        if not known:
+            return stats
+
+        programs = {}
+        for sale, program, _ in known:
+            programs.setdefault(str(sale['customer_uuid']), program)
+        LoyaltyAccount.objects.bulk_create(
+            [LoyaltyAccount(customer_id=cid, program=program) for cid, program in programs.items()],
+            ignore_conflicts=True
+        )
+        accounts = dict(
+            (str(customer_id), account_id) for customer_id, account_id in
+            LoyaltyAccount.objects.filter(customer_id__in=list(programs)).values_list('customer_id', 'id')
+        )
+        # Link the program on accounts created before the company had one
+        by_program = {}
+        for customer_id, program in programs.items():
+            by_program.setdefault(program.id, []).append(customer_id)
+        for program_id, customer_ids in by_program.items():
+            LoyaltyAccount.objects.filter(customer_id__in=customer_ids, program__isnull=True).update(program_id=program_id)
+
+        rows = [(
+            accounts[str(sale['customer_uuid'])], points, str(sale['order_id']),
+            f"Points earned from Order {sale.get('order_number') or sale['order_id']}",
+        ) for sale, _, points in known]
+        inserted = _insert_earn_rows(rows)
+        stats["duplicates"] += len(rows) - len(inserted)
+        stats["awarded"] += len(inserted)
+
+        totals = {}
+        for account_id, points in inserted:
+            totals[account_id] = totals.get(account_id, 0) + points
+        for customer_id, balance in _credit_accounts(totals):
+            if customer_id:
+                sync_customer(customer_id, balance)
+    return stats
+
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(str(value))
+        return True
+    except ValueError:
+        return False
+
+
+def _insert_earn_rows(rows):
+    """Returns [(account_id, points)] for the rows that were new."""
+    table = connection.ops.quote_name(LoyaltyTransaction._meta.db_table)
+    now = timezone.now()
+    values = ", ".join(["(%s, 'earn', %s, %s, %s, %s, 'system')"] * len(rows))
+    params = [p for account_id, points, ref, desc in rows for p in (account_id, points, desc, ref, now)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (account_id, transaction_type, points, description, reference_id, created_at, created_by) "
+            f"VALUES {values} ON CONFLICT DO NOTHING RETURNING account_id, points",
+            params
+        )
+        return cursor.fetchall()
+
+
+def _credit_accounts(totals):
+    """One UPDATE for every account; returns [(customer_id, new balance)]."""
+    if not totals:
+        return []
+    table = connection.ops.quote_name(LoyaltyAccount._meta.db_table)
+    values = ", ".join(["(%s::bigint, %s::integer)"] * len(totals))
+    params = [p for account_id, points in totals.items() for p in (account_id, points)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} AS a SET balance = a.balance + v.points, "
+            f"lifetime_points = a.lifetime_points + v.points, updated_at = %s "
+            f"FROM (VALUES {values}) AS v (id, points) WHERE a.id = v.id "
+            f"RETURNING a.customer_id, a.balance",
+            [timezone.now()] + params
+        )
+        return cursor.fetchall()
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:22
+
+from django.db import migrations, models
+
+# The old adjust path could leave balances below zero. Book the shortfall back
+# as an adjustment so the ledger still sums to the balance, then clamp to zero.
+CLAMP_NEGATIVE_BALANCES = """
+    INSERT INTO loyalty_loyaltytransaction (account_id, transaction_type, points, description, created_at, created_by)
+    SELECT id, 'adjust', -balance, 'Negative balance cleared before the non-negative constraint', now(), 'migration'
+    FROM loyalty_loyaltyaccount WHERE balance < 0;
+    UPDATE loyalty_loyaltyaccount SET balance = 0 WHERE balance < 0;
+    SET CONSTRAINTS ALL IMMEDIATE;
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loyalty', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CLAMP_NEGATIVE_BALANCES, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='loyaltyaccount',
+            constraint=models.CheckConstraint(check=models.Q(('balance__gte', 0)), name='loyalty_balance_non_negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='loyaltytransaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('reference_id__isnull', False), models.Q(('reference_id', ''), _negated=True)), fields=('transaction_type', 'reference_id'), name='unique_loyalty_reference'),
+        ),
+    ]
@@ -39,6 +39,11 @@ class LoyaltyAccount(models.Model):
     
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.CheckConstraint(check=models.Q(balance__gte=0), name='loyalty_balance_non_negative'),
+        ]
+
     def __str__(self):
         owner = self.customer if self.customer else f"Emp:{self.employee_uuid}"
         return f"{owner} - {self.balance} pts"
@@ -60,5 +65,15 @@ class LoyaltyTransaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.CharField(max_length=100, blank=True)
 
+    class Meta:
+        constraints = [
+            # Idempotency: an order/checkout can be earned or redeemed only once
+            models.UniqueConstraint(
+                fields=['transaction_type', 'reference_id'],
+                name='unique_loyalty_reference',
+                condition=models.Q(reference_id__isnull=False) & ~models.Q(reference_id='')
+            ),
+        ]
+
     def __str__(self):
         return f"{self.transaction_type.upper()} {self.points} - {self.account}"
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .ledger import invalidate_program_cache
+from .models import LoyaltyProgram
+
+
+@receiver(post_save, sender=LoyaltyProgram)
+@receiver(post_delete, sender=LoyaltyProgram)
+def drop_cached_program(sender, instance, **kwargs):
+    """Toggling or editing a program takes effect on the next sale"""
+    invalidate_program_cache(instance.company_uuid)
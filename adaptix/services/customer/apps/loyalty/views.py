@@ -1,7 +1,7 @@
 from rest_framework import viewsets, status, decorators
 from rest_framework.response import Response
-from django.db import transaction
 from .models import LoyaltyAccount, LoyaltyTransaction, LoyaltyProgram
+from .ledger import InsufficientPoints, post_points
 from .serializers import LoyaltyAccountSerializer, LoyaltyTransactionSerializer, LoyaltyProgramSerializer
 from adaptix_core.permissions import HasPermission
 
@@ -34,21 +34,17 @@ class LoyaltyAccountViewSet(viewsets.ReadOnlyModelViewSet):
         if points == 0:
             return Response({"error": "Points cannot be zero"}, status=400)
             
-        with transaction.atomic():
-            tx_type = 'earn' if points > 0 else 'adjust'
-            LoyaltyTransaction.objects.create(
-                account=account,
-                transaction_type=tx_type,
-                points=points,
+        tx_type = 'earn' if points > 0 else 'adjust'
+        try:
+            post_points(
+                account, points, tx_type,
+                reference_id=request.data.get('reference_id'),
                 description=reason,
                 created_by=getattr(request, 'user_id', 'admin')
             )
-            account.balance += points
-            if points > 0:
-                account.lifetime_points += points
-            account.save()
-            
-            # TODO: Trigger Tier Check logic here
+        except InsufficientPoints:
+            return Response({"error": "Insufficient points"}, status=400)
+        account.refresh_from_db()
             
         return Response(LoyaltyAccountSerializer(account).data)
 
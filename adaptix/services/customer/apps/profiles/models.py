@@ -103,19 +103,21 @@ class Customer(SoftDeleteModel):
             )
         ] 
 
-    def calculate_tier(self):
-        """Update tier based on points"""
-        points = float(self.loyalty_points)
-        old_tier = self.tier
-        
+    @classmethod
+    def tier_for_points(cls, points):
+        points = float(points)
         if points >= 2000:
-            self.tier = self.Tier.ELITE
+            return cls.Tier.ELITE
         elif points >= 1000:
-            self.tier = self.Tier.PLATINUM
+            return cls.Tier.PLATINUM
         elif points >= 500:
-            self.tier = self.Tier.GOLD
-        else:
-            self.tier = self.Tier.SILVER
+            return cls.Tier.GOLD
+        return cls.Tier.SILVER
+
+    def calculate_tier(self):
+        """Update tier based on points"""
+        old_tier = self.tier
+        self.tier = self.tier_for_points(self.loyalty_points)
             
         if old_tier != self.tier:
             self.save(update_fields=['tier'])
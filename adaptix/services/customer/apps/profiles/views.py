@@ -53,65 +53,34 @@ class CustomerViewSet(viewsets.ModelViewSet):
         points = Decimal(str(request.data.get('points', 0)))
 
         # Integrate with new Loyalty App
-        from apps.loyalty.models import LoyaltyAccount, LoyaltyTransaction
-        from django.db import transaction
-
-        with transaction.atomic():
-            # Get or create account
-            account, _ = LoyaltyAccount.objects.get_or_create(customer=customer)
-            
-            points_int = int(points) # Account uses Integer
-            
+        from apps.loyalty.ledger import InsufficientPoints, get_account, post_points
+
+        points_int = int(points) # Account uses Integer
+        if action_type not in ('add', 'deduct'):
+            return Response(
+                {'error': 'Invalid action. Use "add" or "deduct"'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if points_int <= 0:
+            return Response({'error': 'Points must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+
+        account = get_account(customer)
+        created_by = str(request.user.id if request.user.is_authenticated else 'system')
+        # POS sends the checkout/order id so a retried request is applied once
+        reference_id = request.data.get('reference_id')
+        try:
             if action_type == 'add':
-                # Update Account
-                account.balance += points_int
-                account.lifetime_points += points_int
-                account.save()
-                
-                # Log Transaction
-                LoyaltyTransaction.objects.create(
-                    account=account,
-                    transaction_type='earn',
-                    points=points_int,
-                    description='Manual Adjustment / POS Earn',
-                    created_by=str(request.user.id if request.user.is_authenticated else 'system')
-                )
-                
-                # Update Legacy Customer Field (Sync)
-                customer.loyalty_points = Decimal(account.balance)
-                
-            elif action_type == 'deduct':
-                if account.balance < points_int:
-                     return Response(
-                        {'error': 'Insufficient points'}, 
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                account.balance -= points_int
-                account.save()
-                
-                LoyaltyTransaction.objects.create(
-                    account=account,
-                    transaction_type='redeem',
-                    points=-points_int,
-                    description='Manual Adjustment / POS Redeem',
-                    created_by=str(request.user.id if request.user.is_authenticated else 'system')
-                )
-                
-                customer.loyalty_points = Decimal(account.balance)
-
+                post_points(account, points_int, 'earn', reference_id, 'Manual Adjustment / POS Earn', created_by)
             else:
-                 return Response(
-                    {'error': 'Invalid action. Use "add" or "deduct"'}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            customer.calculate_tier()
-            customer.save()
-            
-            # Update Account Tier based on Customer Tier (or vice versa? Logic is mixed now)
-            # Ideally Account should drive Tier. But Customer.calculate_tier() drives Customer.tier.
-            # Let's simple sync for now.
-        
+                post_points(account, -points_int, 'redeem', reference_id, 'Manual Adjustment / POS Redeem', created_by)
+        except InsufficientPoints:
+            return Response(
+                {'error': 'Insufficient points'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Balance and tier were written by the ledger
+        customer.refresh_from_db(fields=['loyalty_points', 'tier'])
         return Response(self.get_serializer(customer).data)
 
     @action(detail=True, methods=['post'], url_path='send-verification')
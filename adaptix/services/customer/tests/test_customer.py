@@ -96,3 +96,109 @@ class TestCustomerLogic:
         c6 = Customer.objects.create(name="A6", phone="333", company_uuid=company_a)
         c6.delete() # Soft delete
         Customer.objects.create(name="A7", phone="333", company_uuid=company_a)
+
+
+@pytest.mark.django_db
+class TestLoyaltyLedger:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def make_customer(self, company_uuid, phone):
+        return Customer.objects.create(company_uuid=company_uuid, name=f"Customer {phone}", phone=phone)
+
+    def test_redeem_is_conditional_and_idempotent(self):
+        from apps.loyalty.ledger import InsufficientPoints, get_account, post_points
+        from apps.loyalty.models import LoyaltyTransaction
+        customer = self.make_customer(uuid.uuid4(), "100")
+        account = get_account(customer)
+
+        assert post_points(account, 600, 'earn', reference_id="order-1") == (600, True)
+        assert post_points(account, 600, 'earn', reference_id="order-1") == (600, False)
+        assert post_points(account, -400, 'redeem', reference_id="checkout-1") == (200, True)
+        with pytest.raises(InsufficientPoints):
+            post_points(account, -300, 'redeem', reference_id="checkout-2")
+
+        account.refresh_from_db()
+        customer.refresh_from_db()
+        assert (account.balance, account.lifetime_points) == (200, 600)
+        assert customer.loyalty_points == Decimal("200") and customer.tier == Customer.Tier.SILVER
+        assert LoyaltyTransaction.objects.filter(account=account).count() == 2
+
+    def test_batch_earn_dedupes_and_uses_cached_program(self, django_assert_max_num_queries):
+        from apps.loyalty.ledger import earn_for_sales
+        from apps.loyalty.models import LoyaltyAccount, LoyaltyProgram
+        company = uuid.uuid4()
+        LoyaltyProgram.objects.create(company_uuid=company, earn_rate=Decimal("1.00"))
+        first, second = self.make_customer(company, "200"), self.make_customer(company, "201")
+        sales = [
+            {"customer_uuid": str(first.id), "grand_total": "300", "order_id": "o-1", "company_uuid": str(company)},
+            {"customer_uuid": str(first.id), "grand_total": "250", "order_id": "o-2", "company_uuid": str(company)},
+            {"customer_uuid": str(second.id), "grand_total": "50", "order_id": "o-3", "company_uuid": str(company)},
+            {"customer_uuid": str(second.id), "grand_total": "50", "order_id": "o-3", "company_uuid": str(company)},
+            {"customer_uuid": "not-a-uuid", "grand_total": "50", "order_id": "o-4", "company_uuid": str(company)},
+        ]
+
+        assert earn_for_sales(sales) == {"awarded": 3, "duplicates": 1, "skipped": 1}
+        # Replay: every reference is already in the ledger, program comes from cache
+        with django_assert_max_num_queries(8):
+            assert earn_for_sales(sales[:4]) == {"awarded": 0, "duplicates": 4, "skipped": 0}
+
+        balances = dict(LoyaltyAccount.objects.values_list('customer_id', 'balance'))
+        assert balances == {first.id: 550, second.id: 50}
+        first.refresh_from_db()
+        assert first.tier == Customer.Tier.GOLD
+
+    def test_consumer_rejects_sales_that_keep_failing(self, mocker):
+        from apps.loyalty.management.commands.run_loyalty_consumer import Command
+
+        def earn(sales):
+            if any(sale["order_id"] == "o-bad" for sale in sales):
+                raise ValueError("bad sale")
+            return {"awarded": len(sales), "duplicates": 0, "skipped": 0}
+
+        earn_for_sales = mocker.patch(
+            'apps.loyalty.management.commands.run_loyalty_consumer.earn_for_sales', side_effect=earn
+        )
+        cmd = Command(stdout=mocker.Mock(), stderr=mocker.Mock())
+        messages = [mocker.Mock() for _ in range(3)]
+        cmd.pending = [
+            ({"event": "pos.sale.closed", "order_id": order_id}, message)
+            for order_id, message in zip(["o-1", "o-bad", "o-2"], messages)
+        ]
+
+        cmd.flush()
+
+        assert earn_for_sales.call_count == 4
+        assert cmd.pending == []
+        messages[0].ack.assert_called_once_with()
+        messages[2].ack.assert_called_once_with()
+        messages[1].ack.assert_not_called()
+        messages[1].reject.assert_called_once_with(requeue=False)
+
+    def test_consumer_rejects_unparseable_messages(self, mocker):
+        from apps.loyalty.management.commands.run_loyalty_consumer import Command
+
+        cmd = Command(stdout=mocker.Mock(), stderr=mocker.Mock())
+        cmd.pending = []
+        message = mocker.Mock()
+
+        cmd.process_message("not json", message)
+
+        assert cmd.pending == []
+        message.ack.assert_not_called()
+        message.reject.assert_called_once_with(requeue=False)
+
+    def test_program_toggle_invalidates_cache(self):
+        from apps.loyalty.ledger import get_active_program
+        from apps.loyalty.models import LoyaltyProgram
+        company = uuid.uuid4()
+        assert get_active_program(company) is None
+
+        program = LoyaltyProgram.objects.create(company_uuid=company)
+        assert get_active_program(company).id == program.id
+
+        program.is_active = False
+        program.save()
+        assert get_active_program(company) is None
@@ -1,7 +1,13 @@
 from django.contrib import admin
-from .models import Attendance
+from .models import Attendance, AttendancePunch
 
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = ('employee', 'date', 'check_in', 'check_out', 'status')
     list_filter = ('date', 'status')
+
+@admin.register(AttendancePunch)
+class AttendancePunchAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'punched_at', 'device_id', 'log_id', 'punch_status')
+    list_filter = ('device_id',)
+    raw_id_fields = ('employee',)
@@ -0,0 +1,217 @@
+"""
+Bulk ingestion of biometric device punches (ZKTeco / Hikvision push).
+
+A device that reconnects pushes its whole buffer at once, so the work is done
+per batch rather than per punch:
+
+1. parse the device timestamps and sort the punches by them
+2. resolve every employee code with one query
+3. store the raw punches with INSERT ... ON CONFLICT DO NOTHING; punches whose
+   (device_id, log_id) was already stored are counted as duplicates and dropped
+4. fold the new punches into first-in / last-out per employee per day in memory
+5. merge them with the existing Attendance rows (one locking read) and upsert
+   all days with INSERT ... ON CONFLICT (employee_id, date) DO UPDATE; a day
+   already marked leave, absent or half day keeps that status
+
+Naive device timestamps are read in ATTENDANCE_DEVICE_TIMEZONE; check_in and
+check_out keep the wall-clock time of that zone, like manual entries do.
+"""
+import zoneinfo
+from datetime import datetime
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from apps.employees.models import Employee
+from .models import Attendance, AttendancePunch
+
+DEVICE_TIMEZONE = getattr(settings, 'ATTENDANCE_DEVICE_TIMEZONE', settings.TIME_ZONE)
+PUNCH_INSERT_CHUNK = 5000
+UPSERT_FIELDS = [
+    'check_in', 'check_out', 'status', 'method', 'device_id',
+    'late_minutes', 'early_out_minutes', 'is_flexible',
+]
+# Set by hand or by the leave workflow; punches only fill in the times
+KEPT_STATUSES = ('leave', 'absent', 'half_day')
+
+
+def parse_timestamp(value, tz):
+    """'2024-12-10 09:00:00', ISO 8601 with or without offset, or epoch seconds."""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=zoneinfo.ZoneInfo('UTC'))
+    parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    if timezone.is_naive(parsed):
+        parsed = parsed.replace(tzinfo=tz)
+    return parsed
+
+
+def parse_punches(logs, tz):
+    """Returns (punches sorted by time, errors). A punch is a dict with a tz-aware 'at'."""
+    punches, errors = [], []
+    for log in logs:
+        if not isinstance(log, dict):
+            errors.append(f"Invalid log entry: {log!r}")
+            continue
+        code, device_id, raw_ts = log.get('user_id'), log.get('device_id') or '', log.get('timestamp')
+        if not code or raw_ts in (None, ''):
+            errors.append(f"Log without user_id or timestamp: {log!r}")
+            continue
+        try:
+            at = parse_timestamp(raw_ts, tz)
+        except (TypeError, ValueError, OverflowError):
+            errors.append(f"Invalid timestamp {raw_ts!r} for {code}")
+            continue
+        # Devices without a log id are deduplicated on what they sent
+        log_id = log.get('log_id') or log.get('uid') or f"{code}@{at.isoformat()}"
+        punches.append({
+            "code": str(code), "device_id": str(device_id), "log_id": str(log_id),
+            "at": at, "status": str(log.get('status') or ''),
+        })
+    punches.sort(key=lambda p: p["at"])
+    return punches, errors
+
+
+def resolve_employees(codes, company_uuid=None):
+    """{employee_code: Employee} with shifts, in one query. Codes shared by several companies are left out."""
+    queryset = Employee.objects.filter(employee_code__in=list(codes)).select_related('current_shift')
+    if company_uuid:
+        queryset = queryset.filter(company_uuid=company_uuid)
+    employees, ambiguous = {}, set()
+    for employee in queryset:
+        if employee.employee_code in employees:
+            ambiguous.add(employee.employee_code)
+        employees[employee.employee_code] = employee
+    for code in ambiguous:
+        del employees[code]
+    return employees, ambiguous
+
+
+def fold_days(punches, employees, tz):
+    """{(employee_id, date): [first punch, last punch]} in local wall-clock time; punches are sorted."""
+    days = {}
+    for punch in punches:
+        local = punch["at"].astimezone(tz)
+        key = (employees[punch["code"]].id, local.date())
+        entry = (local.time().replace(microsecond=0), punch["device_id"])
+        if key in days:
+            days[key][1] = entry
+        else:
+            days[key] = [entry, entry]
+    return days
+
+
+def merge_day(attendance, first, last):
+    """Widens an Attendance to cover [first, last]; returns True if it changed."""
+    (first_time, first_device), (last_time, _) = first, last
+    changed = False
+    # Every time seen so far bounds the day, including a check-in that is no longer the first
+    out = max(t for t in (attendance.check_in, attendance.check_out, last_time) if t is not None)
+    if attendance.check_in is None or first_time < attendance.check_in:
+        attendance.check_in = first_time
+        attendance.device_id = first_device
+        changed = True
+    if out > attendance.check_in and out != attendance.check_out:
+        attendance.check_out = out
+        changed = True
+    if changed:
+        attendance.method = 'biometric'
+    return changed
+
+
+def store_punches(punches, employees):
+    """Inserts the raw punches; returns the subset that was not stored before."""
+    table = connection.ops.quote_name(AttendancePunch._meta.db_table)
+    now = timezone.now()
+    new_keys = set()
+    with connection.cursor() as cursor:
+        for start in range(0, len(punches), PUNCH_INSERT_CHUNK):
+            chunk = punches[start:start + PUNCH_INSERT_CHUNK]
+            values = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(chunk))
+            params = [
+                v for p in chunk
+                for v in (p["device_id"], p["log_id"], employees[p["code"]].id, p["at"], p["status"], now)
+            ]
+            cursor.execute(
+                f"INSERT INTO {table} (device_id, log_id, employee_id, punched_at, punch_status, created_at) "
+                f"VALUES {values} ON CONFLICT DO NOTHING RETURNING device_id, log_id",
+                params
+            )
+            new_keys.update(cursor.fetchall())
+    # A buffer can repeat a log id within itself: keep its first occurrence only
+    fresh, seen = [], set()
+    for p in punches:
+        key = (p["device_id"], p["log_id"])
+        if key in new_keys and key not in seen:
+            seen.add(key)
+            fresh.append(p)
+    return fresh
+
+
+def ingest_punches(logs, company_uuid=None, tz_name=DEVICE_TIMEZONE):
+    """
+    logs: [{"device_id", "user_id", "timestamp", "status", "log_id"?}]
+    Returns {"received", "synced", "duplicates", "days", "errors"}; synced counts new punches applied.
+    """
+    tz = zoneinfo.ZoneInfo(tz_name)
+    punches, errors = parse_punches(logs, tz)
+    employees, ambiguous = resolve_employees({p["code"] for p in punches}, company_uuid)
+    for code in sorted({p["code"] for p in punches} - set(employees)):
+        errors.append(f"Employee {code} {'is ambiguous' if code in ambiguous else 'not found'}")
+    known = [p for p in punches if p["code"] in employees]
+    stats = {"received": len(logs), "synced": 0, "duplicates": 0, "days": 0, "errors": errors}
+    if not known:
+        return stats
+
+    with transaction.atomic():
+        fresh = store_punches(known, employees)
+        stats["synced"] = len(fresh)
+        stats["duplicates"] = len(known) - len(fresh)
+        days = fold_days(fresh, employees, tz)
+        if not days:
+            return stats
+
+        existing = {
+            (a.employee_id, a.date): a
+            for a in Attendance.objects.select_for_update().filter(
+                employee_id__in={employee_id for employee_id, _ in days},
+                date__range=(min(d for _, d in days), max(d for _, d in days)),
+            )
+        }
+        by_id = {e.id: e for e in employees.values()}
+        rows = []
+        for (employee_id, date), (first, last) in days.items():
+            attendance = existing.get((employee_id, date)) or Attendance(employee_id=employee_id, date=date, status='present')
+            if not merge_day(attendance, first, last):
+                continue
+            attendance.employee = by_id[employee_id]
+            kept = attendance.status if attendance.status in KEPT_STATUSES else None
+            attendance.calculate_status()
+            attendance.status = kept or attendance.status
+            rows.append(attendance)
+
+        upsert_days(rows)
+        stats["days"] = len(rows)
+    return stats
+
+
+def upsert_days(rows):
+    """INSERT ... ON CONFLICT (employee_id, date) DO UPDATE, in chunks; bulk_create spends longer compiling than Postgres does writing."""
+    table = connection.ops.quote_name(Attendance._meta.db_table)
+    columns = ['id', 'employee_id', 'date', 'notes', 'created_at'] + UPSERT_FIELDS
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in UPSERT_FIELDS if c != 'status')
+    # Also covers a row inserted after the locking read
+    kept = ", ".join(["%s"] * len(KEPT_STATUSES))
+    updates += f", status = CASE WHEN {table}.status IN ({kept}) THEN {table}.status ELSE EXCLUDED.status END"
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), PUNCH_INSERT_CHUNK):
+            chunk = rows[start:start + PUNCH_INSERT_CHUNK]
+            values = ", ".join([f"({', '.join(['%s'] * len(columns))})"] * len(chunk))
+            params = [
+                v for a in chunk
+                for v in (a.id, a.employee_id, a.date, a.notes, a.created_at or now, *(getattr(a, f) for f in UPSERT_FIELDS))
+            ]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {values} "
+                f"ON CONFLICT (employee_id, date) DO UPDATE SET {updates}",
+                params + list(KEPT_STATUSES)
+            )
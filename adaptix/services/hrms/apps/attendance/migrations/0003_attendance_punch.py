@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0006_employee_attributes_attributeset_and_more'),
+        ('attendance', '0002_remove_attendance_device_data_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendancePunch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_id', models.CharField(max_length=100)),
+                ('log_id', models.CharField(max_length=100)),
+                ('punched_at', models.DateTimeField()),
+                ('punch_status', models.CharField(blank=True, max_length=30)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='punches', to='employees.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['employee', 'punched_at'], name='attendance__employe_ab5738_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='attendancepunch',
+            constraint=models.UniqueConstraint(fields=('device_id', 'log_id'), name='uniq_attendance_punch_device_log'),
+        ),
+    ]
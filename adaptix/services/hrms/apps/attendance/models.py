@@ -86,3 +86,24 @@ class Attendance(models.Model):
 
     def __str__(self):
         return f"{self.employee} - {self.date} ({self.status})"
+
+
+class AttendancePunch(models.Model):
+    """Raw device log. (device_id, log_id) is unique, so re-pushed buffers are ignored."""
+    device_id = models.CharField(max_length=100)
+    log_id = models.CharField(max_length=100)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='punches')
+    punched_at = models.DateTimeField()
+    punch_status = models.CharField(max_length=30, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['device_id', 'log_id'], name='uniq_attendance_punch_device_log'),
+        ]
+        indexes = [
+            models.Index(fields=['employee', 'punched_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} @ {self.punched_at} ({self.device_id})"
@@ -0,0 +1,28 @@
+import json
+from django.core.management.base import BaseCommand
+from apps.leaves.models import LeavePolicy
+from apps.leaves.services import EntitlementEngine
+
+class Command(BaseCommand):
+    help = 'Generates missing leave allocations for one or all companies, several companies in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', action='append', dest='companies',
+                            help='Company UUID; repeat for several. Defaults to every company with an active policy')
+        parser.add_argument('--year', type=int)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be created without writing')
+
+    def handle(self, *args, **options):
+        companies = options['companies'] or list(
+            LeavePolicy.objects.filter(is_active=True).values_list('company_uuid', flat=True).distinct()
+        )
+        reports = EntitlementEngine.run_entitlement_for_companies(
+            companies, year=options['year'], dry_run=options['dry_run'], workers=options['workers']
+        )
+        for report in reports:
+            self.stdout.write(json.dumps(report))
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(r['created'] for r in reports)} allocation(s) {'to create' if options['dry_run'] else 'created'} "
+            f"across {len(reports)} compan{'y' if len(reports) == 1 else 'ies'}"
+        ))
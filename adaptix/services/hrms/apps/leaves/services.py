@@ -1,4 +1,6 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection
 from django.utils import timezone
 from .models import LeavePolicy, LeaveAllocation, LeaveType
 from apps.employees.models import Employee
@@ -6,58 +8,126 @@ from decimal import Decimal
 
 logger = logging.getLogger(__name__)
 
+BULK_BATCH_SIZE = 5000
+
 class EntitlementEngine:
     """
     Core engine to calculate and generate leave allocations based on policies.
     """
     
     @staticmethod
-    def calculate_tenure_months(joining_date):
+    def calculate_tenure_months(joining_date, today=None):
         if not joining_date:
             return 0
-        today = timezone.now().date()
+        today = today or timezone.now().date()
         return (today.year - joining_date.year) * 12 + today.month - joining_date.month
 
     @staticmethod
-    def run_entitlement_for_company(company_uuid):
+    def run_entitlement_for_company(company_uuid, year=None, dry_run=False):
         """
         Runs the entitlement calculation for all employees in a company.
+
+        Set-based: one query each for policies, employees and the allocations
+        already present for the year; eligibility is evaluated in memory and the
+        missing allocations are written with chunked INSERT ... SELECT FROM
+        unnest(). When several policies grant the same leave type, the oldest
+        eligible policy wins.
+
+        Returns a diff report: {"company_uuid", "year", "dry_run", "employees",
+        "created", "existing", "ineligible", "by_leave_type": {code: {...}}}.
         """
-        policies = LeavePolicy.objects.filter(company_uuid=company_uuid, is_active=True)
-        employees = Employee.objects.filter(company_uuid=company_uuid, is_active=True)
-        
-        allocations_created = 0
-        current_year = timezone.now().year
-        
-        for employee in employees:
-            tenure_months = EntitlementEngine.calculate_tenure_months(employee.joining_date)
-            
+        year = year or timezone.now().year
+        policies = list(
+            LeavePolicy.objects.filter(company_uuid=company_uuid, is_active=True)
+            .select_related('leave_type').order_by('created_at', 'id')
+        )
+        employees = list(
+            Employee.objects.filter(company_uuid=company_uuid, is_active=True)
+            .values_list('id', 'joining_date', 'gender')
+        )
+        existing = set(
+            LeaveAllocation.objects.filter(employee__company_uuid=company_uuid, year=year)
+            .values_list('employee_id', 'leave_type_id')
+        )
+
+        report = {
+            "company_uuid": str(company_uuid),
+            "year": year,
+            "dry_run": dry_run,
+            "employees": len(employees),
+            "created": 0,
+            "existing": 0,
+            "ineligible": 0,
+            "by_leave_type": {},
+        }
+        notes = {policy.id: f"Auto-generated by Policy: {policy.name}" for policy in policies}
+        to_create = []
+        granted = set()
+        today = timezone.now().date()
+        for employee_id, joining_date, gender in employees:
+            tenure_months = EntitlementEngine.calculate_tenure_months(joining_date, today)
             for policy in policies:
-                # 1. Check Tenure Requirement
-                if tenure_months < policy.tenure_months_required:
+                key = (employee_id, policy.leave_type_id)
+                line = report["by_leave_type"].setdefault(
+                    policy.leave_type.code, {"created": 0, "existing": 0, "ineligible": 0}
+                )
+                if key in granted:
                     continue
-                
-                # 2. Check Gender Requirement
-                if policy.gender_requirement != 'ALL' and employee.gender != policy.gender_requirement:
+                if tenure_months < policy.tenure_months_required or (
+                    policy.gender_requirement != 'ALL' and gender != policy.gender_requirement
+                ):
+                    line["ineligible"] += 1
+                    report["ineligible"] += 1
                     continue
-                    
-                # 3. Check for existing allocation for this year
-                existing = LeaveAllocation.objects.filter(
-                    employee=employee,
-                    leave_type=policy.leave_type,
-                    year=current_year
-                ).exists()
-                
-                if not existing:
-                    LeaveAllocation.objects.create(
-                        company_uuid=company_uuid,
-                        employee=employee,
-                        leave_type=policy.leave_type,
-                        year=current_year,
-                        total_allocated=policy.allocation_days,
-                        status='DRAFT',
-                        notes=f"Auto-generated by Policy: {policy.name}"
-                    )
-                    allocations_created += 1
-                    
-        return allocations_created
+                granted.add(key)
+                if key in existing:
+                    line["existing"] += 1
+                    report["existing"] += 1
+                    continue
+                line["created"] += 1
+                report["created"] += 1
+                to_create.append((employee_id, policy.leave_type_id, policy.allocation_days, notes[policy.id]))
+
+        if to_create and not dry_run:
+            inserted = EntitlementEngine.insert_allocations(company_uuid, year, to_create)
+            # Rows a concurrent run inserted first count as existing
+            report["existing"] += report["created"] - inserted
+            report["created"] = inserted
+        logger.info(
+            f"Entitlement {company_uuid}/{year}: {report['created']} created, "
+            f"{report['existing']} existing, {report['ineligible']} ineligible{' (dry run)' if dry_run else ''}"
+        )
+        return report
+
+    @staticmethod
+    def insert_allocations(company_uuid, year, rows):
+        """
+        rows: [(employee_id, leave_type_id, total_allocated, notes)]
+        INSERT ... SELECT FROM unnest(...) ON CONFLICT DO NOTHING in chunks; returns how many were new.
+        """
+        table = connection.ops.quote_name(LeaveAllocation._meta.db_table)
+        inserted = 0
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), BULK_BATCH_SIZE):
+                employee_ids, leave_type_ids, days, notes = zip(*rows[start:start + BULK_BATCH_SIZE])
+                cursor.execute(
+                    f"INSERT INTO {table} (id, company_uuid, employee_id, leave_type_id, year, total_allocated, used, status, notes) "
+                    f"SELECT gen_random_uuid(), %s, v.employee_id, v.leave_type_id, %s, v.days, 0, 'DRAFT', v.notes "
+                    f"FROM unnest(%s::uuid[], %s::uuid[], %s::numeric[], %s::text[]) AS v (employee_id, leave_type_id, days, notes) "
+                    f"ON CONFLICT DO NOTHING",
+                    [company_uuid, year, [str(e) for e in employee_ids], [str(t) for t in leave_type_ids], list(days), list(notes)]
+                )
+                inserted += cursor.rowcount
+        return inserted
+
+    @staticmethod
+    def run_entitlement_for_companies(company_uuids, year=None, dry_run=False, workers=4):
+        """Runs companies side by side, each in its own thread and database connection."""
+        def run(company_uuid):
+            try:
+                return EntitlementEngine.run_entitlement_for_company(company_uuid, year=year, dry_run=dry_run)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            return list(pool.map(run, company_uuids))
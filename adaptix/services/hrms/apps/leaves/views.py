@@ -22,8 +22,15 @@ class LeaveAllocationViewSet(viewsets.ModelViewSet):
         if not company_uuid:
             return Response({"error": "company_uuid is required"}, status=400)
         
-        count = EntitlementEngine.run_entitlement_for_company(company_uuid)
-        return Response({"status": "success", "allocations_created": count})
+        year = request.data.get('year')
+        try:
+            year = int(year) if year else None
+        except (TypeError, ValueError):
+            return Response({"error": "year must be a number"}, status=400)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+
+        report = EntitlementEngine.run_entitlement_for_company(company_uuid, year=year, dry_run=dry_run)
+        return Response({"status": "success", "allocations_created": 0 if dry_run else report["created"], "report": report})
     
     @action(detail=False, methods=['post'], url_path='bulk-approve')
     def bulk_approve(self, request):
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SalaryComponent, SalaryStructure, EmployeeSalary, Payslip, PayslipLineItem
+from .models import SalaryComponent, SalaryStructure, EmployeeSalary, PayrollRun, Payslip, PayslipLineItem
 
 class PayslipLineItemInline(admin.TabularInline):
     model = PayslipLineItem
@@ -7,7 +7,7 @@ class PayslipLineItemInline(admin.TabularInline):
 
 @admin.register(SalaryComponent)
 class SalaryComponentAdmin(admin.ModelAdmin):
-    list_display = ('name', 'type', 'is_taxable', 'company_uuid')
+    list_display = ('name', 'type', 'calculation_type', 'value', 'prorate', 'company_uuid')
 
 @admin.register(SalaryStructure)
 class SalaryStructureAdmin(admin.ModelAdmin):
@@ -17,6 +17,11 @@ class SalaryStructureAdmin(admin.ModelAdmin):
 class EmployeeSalaryAdmin(admin.ModelAdmin):
     list_display = ('employee', 'structure', 'base_amount')
 
+@admin.register(PayrollRun)
+class PayrollRunAdmin(admin.ModelAdmin):
+    list_display = ('company_uuid', 'period_start', 'period_end', 'status', 'payslips_created', 'total_net')
+    list_filter = ('status',)
+
 @admin.register(Payslip)
 class PayslipAdmin(admin.ModelAdmin):
     list_display = ('employee', 'start_date', 'net_pay', 'status')
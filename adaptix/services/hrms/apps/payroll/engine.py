@@ -0,0 +1,327 @@
+"""
+Payroll run engine: generates the payslips of a whole company for a period.
+
+Employees with a salary configuration are split into chunks of
+PAYROLL_CHUNK_SIZE and the chunks run side by side on PAYROLL_WORKERS threads,
+each in its own transaction and database connection. A chunk costs a fixed
+number of queries whatever its size:
+
+1. salary configs (base amount, structure) of the chunk
+2. attendance counts per employee for the period (one GROUP BY)
+3. approved unpaid leave overlapping the period
+4. one INSERT for the payslips, one for their line items
+
+Structure components are loaded once per run. Computation works a chunk at a
+time, component by component over all of its employees:
+
+    amount = base_amount * value / 100   (percent)   or   value   (fixed)
+    amount *= payable_days / period_days  when the component prorates
+
+where payable_days = period days - absent days - unpaid leave days. Employees
+that already have a payslip starting on period_start are skipped, so a failed
+or interrupted run can simply be run again.
+
+Finalizing a run marks its payslips finalized with one UPDATE and publishes a
+single accounting event for the whole run.
+"""
+import logging
+import threading
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from apps.attendance.models import Attendance
+from apps.leaves.models import LeaveApplication
+from .models import EmployeeSalary, PayrollRun, Payslip, PayslipLineItem, SalaryStructure
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = getattr(settings, 'PAYROLL_CHUNK_SIZE', 2000)
+WORKERS = getattr(settings, 'PAYROLL_WORKERS', 4)
+CENT = Decimal('0.01')
+
+
+def money(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def load_structure_components(company_uuid):
+    """{structure_id: [(component_id, type, calculation_type, value, prorate)]} in one query."""
+    through = SalaryStructure.components.through
+    components = defaultdict(list)
+    rows = through.objects.filter(salarystructure__company_uuid=company_uuid).order_by(
+        'salarycomponent__type', 'salarycomponent__name'
+    ).values_list(
+        'salarystructure_id', 'salarycomponent_id', 'salarycomponent__type',
+        'salarycomponent__calculation_type', 'salarycomponent__value', 'salarycomponent__prorate'
+    )
+    for structure_id, *component in rows:
+        components[structure_id].append(tuple(component))
+    return dict(components)
+
+
+def payroll_employee_ids(company_uuid, period_start):
+    """Active employees with a salary config and no payslip for the period yet; also returns how many were skipped."""
+    eligible = EmployeeSalary.objects.filter(
+        employee__company_uuid=company_uuid, employee__is_active=True
+    ).values_list('employee_id', flat=True)
+    done = set(Payslip.objects.filter(
+        company_uuid=company_uuid, start_date=period_start
+    ).values_list('employee_id', flat=True))
+    employee_ids = [employee_id for employee_id in eligible.order_by('employee_id') if employee_id not in done]
+    return employee_ids, len(done)
+
+
+def load_inputs(employee_ids, period_start, period_end):
+    """
+    Returns {employee_id: {"base", "structure_id", "present_days", "absent_days", "unpaid_leave_days"}}
+    for one chunk, in three queries.
+    """
+    inputs = {
+        employee_id: {
+            "base": base, "structure_id": structure_id,
+            "present_days": 0.0, "absent_days": 0.0, "unpaid_leave_days": 0.0,
+        }
+        for employee_id, base, structure_id in EmployeeSalary.objects.filter(
+            employee_id__in=employee_ids
+        ).values_list('employee_id', 'base_amount', 'structure_id')
+    }
+
+    attendance = Attendance.objects.filter(
+        employee_id__in=employee_ids, date__range=(period_start, period_end)
+    ).values('employee_id').annotate(
+        present=Count('id', filter=Q(status__in=['present', 'late'])),
+        half=Count('id', filter=Q(status='half_day')),
+        absent=Count('id', filter=Q(status='absent')),
+    )
+    for row in attendance:
+        entry = inputs.get(row['employee_id'])
+        if entry is not None:
+            entry["present_days"] = row['present'] + row['half'] * 0.5
+            entry["absent_days"] = row['absent'] + row['half'] * 0.5
+
+    leaves = LeaveApplication.objects.filter(
+        employee_id__in=employee_ids, status='approved', leave_type__is_paid=False,
+        start_date__lte=period_end, end_date__gte=period_start,
+    ).values_list('employee_id', 'start_date', 'end_date')
+    for employee_id, start, end in leaves:
+        entry = inputs.get(employee_id)
+        if entry is not None:
+            entry["unpaid_leave_days"] += (min(end, period_end) - max(start, period_start)).days + 1
+    return inputs
+
+
+def compute_payslips(inputs, components, period_start, period_end):
+    """
+    Pure computation for one chunk.
+    Returns {employee_id: {"lines": [(component_id, amount)], "total_earnings", "total_deductions",
+    "net_pay", "present_days", "absent_days", "unpaid_leave_days"}}.
+    """
+    period_days = (period_end - period_start).days + 1
+    factors = {
+        employee_id: Decimal(max(0.0, period_days - entry["absent_days"] - entry["unpaid_leave_days"])) / period_days
+        for employee_id, entry in inputs.items()
+    }
+    slips = {
+        employee_id: {
+            "lines": [], "total_earnings": Decimal('0'), "total_deductions": Decimal('0'),
+            "present_days": entry["present_days"], "absent_days": entry["absent_days"],
+            "unpaid_leave_days": entry["unpaid_leave_days"],
+        }
+        for employee_id, entry in inputs.items()
+    }
+
+    # Component by component over every employee on that structure
+    by_structure = defaultdict(list)
+    for employee_id, entry in inputs.items():
+        by_structure[entry["structure_id"]].append(employee_id)
+    for structure_id, employee_ids in by_structure.items():
+        for component_id, component_type, calculation_type, value, prorate in components.get(structure_id, []):
+            total_key = "total_earnings" if component_type == 'earning' else "total_deductions"
+            for employee_id in employee_ids:
+                amount = inputs[employee_id]["base"] * value / 100 if calculation_type == 'percent' else value
+                if prorate:
+                    amount *= factors[employee_id]
+                amount = money(amount)
+                slip = slips[employee_id]
+                slip["lines"].append((component_id, amount))
+                slip[total_key] += amount
+
+    for slip in slips.values():
+        slip["net_pay"] = slip["total_earnings"] - slip["total_deductions"]
+    return slips
+
+
+def write_payslips(run, slips):
+    """
+    Two statements per chunk: INSERT ... SELECT FROM unnest() of the payslips,
+    then of their lines. Column arrays keep both the SQL and the parameter
+    count fixed, which bulk_create spends longer building than Postgres does
+    writing at this volume.
+    """
+    payslip_table = connection.ops.quote_name(Payslip._meta.db_table)
+    line_table = connection.ops.quote_name(PayslipLineItem._meta.db_table)
+    slip_ids, employee_ids, earnings, deductions, net, present, absent, unpaid = ([] for _ in range(8))
+    line_slips, line_components, line_amounts = [], [], []
+    for employee_id, slip in slips.items():
+        slip_id = str(uuid.uuid4())
+        slip_ids.append(slip_id)
+        employee_ids.append(str(employee_id))
+        earnings.append(slip["total_earnings"])
+        deductions.append(slip["total_deductions"])
+        net.append(slip["net_pay"])
+        present.append(slip["present_days"])
+        absent.append(slip["absent_days"])
+        unpaid.append(slip["unpaid_leave_days"])
+        for component_id, amount in slip["lines"]:
+            line_slips.append(slip_id)
+            line_components.append(str(component_id))
+            line_amounts.append(amount)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {payslip_table} (id, company_uuid, employee_id, payroll_run_id, start_date, end_date, "
+            f"total_earnings, total_deductions, net_pay, present_days, absent_days, unpaid_leave_days, status, created_at) "
+            f"SELECT v.id, %s, v.employee_id, %s, %s, %s, v.earnings, v.deductions, v.net, v.present, v.absent, v.unpaid, "
+            f"'draft', %s FROM unnest(%s::uuid[], %s::uuid[], %s::numeric[], %s::numeric[], %s::numeric[], "
+            f"%s::float8[], %s::float8[], %s::float8[]) AS v (id, employee_id, earnings, deductions, net, present, absent, unpaid)",
+            [run.company_uuid, run.id, run.period_start, run.period_end, timezone.now(),
+             slip_ids, employee_ids, earnings, deductions, net, present, absent, unpaid]
+        )
+        if line_slips:
+            cursor.execute(
+                f"INSERT INTO {line_table} (id, payslip_id, component_id, amount) "
+                f"SELECT gen_random_uuid(), v.payslip_id, v.component_id, v.amount "
+                f"FROM unnest(%s::uuid[], %s::uuid[], %s::numeric[]) AS v (payslip_id, component_id, amount)",
+                [line_slips, line_components, line_amounts]
+            )
+
+
+def process_chunk(run, components, employee_ids):
+    """Computes and writes one chunk atomically; returns its totals."""
+    inputs = load_inputs(employee_ids, run.period_start, run.period_end)
+    slips = compute_payslips(inputs, components, run.period_start, run.period_end)
+    with transaction.atomic():
+        write_payslips(run, slips)
+    return {
+        "payslips": len(slips),
+        "total_earnings": sum((s["total_earnings"] for s in slips.values()), Decimal('0')),
+        "total_deductions": sum((s["total_deductions"] for s in slips.values()), Decimal('0')),
+        "total_net": sum((s["net_pay"] for s in slips.values()), Decimal('0')),
+    }
+
+
+def execute_run(run, chunk_size=CHUNK_SIZE, workers=WORKERS):
+    """Generates the payslips of a draft (or failed) run; returns the run."""
+    run.status = 'processing'
+    run.error = ''
+    run.save(update_fields=['status', 'error'])
+
+    components = load_structure_components(run.company_uuid)
+    employee_ids, skipped = payroll_employee_ids(run.company_uuid, run.period_start)
+    chunks = [employee_ids[i:i + chunk_size] for i in range(0, len(employee_ids), chunk_size)]
+
+    def work(chunk, threaded):
+        try:
+            return process_chunk(run, components, chunk), None
+        except Exception as e:
+            logger.error(f"Payroll run {run.id}: chunk of {len(chunk)} failed: {e}")
+            return None, str(e)
+        finally:
+            if threaded:
+                connection.close()
+
+    if workers > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(lambda chunk: work(chunk, True), chunks))
+    else:
+        # Single worker: stay on the caller's connection (and transaction)
+        outcomes = [work(chunk, False) for chunk in chunks]
+
+    totals = {"payslips": 0, "total_earnings": Decimal('0'), "total_deductions": Decimal('0'), "total_net": Decimal('0')}
+    errors = [error for _, error in outcomes if error]
+    for result, _ in outcomes:
+        for key in totals:
+            totals[key] += result[key] if result else 0
+
+    # Totals cover every payslip of the run, including those from an earlier attempt
+    run.refresh_from_db()
+    run.employees_total = len(employee_ids) + skipped
+    run.payslips_created += totals["payslips"]
+    run.skipped = skipped
+    run.total_earnings += totals["total_earnings"]
+    run.total_deductions += totals["total_deductions"]
+    run.total_net += totals["total_net"]
+    run.status = 'failed' if errors else 'completed'
+    run.error = "\n".join(errors[:10])
+    run.completed_at = timezone.now()
+    run.save()
+    logger.info(
+        f"Payroll run {run.id}: {totals['payslips']} payslip(s) in {len(chunks)} chunk(s), "
+        f"{skipped} skipped, {len(errors)} failed chunk(s)"
+    )
+    return run
+
+
+def _execute_run_worker(run_id):
+    try:
+        execute_run(PayrollRun.objects.get(pk=run_id))
+    except Exception as e:
+        logger.error(f"Payroll run {run_id} failed: {e}")
+        PayrollRun.objects.filter(pk=run_id).update(status='failed', error=str(e), completed_at=timezone.now())
+    finally:
+        connection.close()
+
+
+def execute_run_background(run):
+    """Fire and forget execute_run(); the worker starts once the run row is committed."""
+    t = threading.Thread(target=_execute_run_worker, args=(run.id,), daemon=True)
+    transaction.on_commit(t.start)
+    return t
+
+
+def run_payroll(company_uuid, period_start, period_end, chunk_size=CHUNK_SIZE, workers=WORKERS):
+    run = PayrollRun.objects.create(company_uuid=company_uuid, period_start=period_start, period_end=period_end)
+    return execute_run(run, chunk_size=chunk_size, workers=workers)
+
+
+def finalize_run(run):
+    """Marks the run's draft payslips finalized and publishes one accounting event for all of them."""
+    from utils.messaging import publish_event
+
+    with transaction.atomic():
+        run = PayrollRun.objects.select_for_update().get(pk=run.pk)
+        if run.status != 'completed':
+            raise ValueError(f"Only completed runs can be finalized (run is {run.status})")
+        finalized = Payslip.objects.filter(payroll_run=run, status='draft').update(status='finalized')
+        run.status = 'finalized'
+        run.finalized_at = timezone.now()
+        run.save(update_fields=['status', 'finalized_at'])
+
+    components = PayslipLineItem.objects.filter(payslip__payroll_run=run).values(
+        'component_id', 'component__name', 'component__type'
+    ).annotate(amount=Sum('amount')).order_by('component__type', 'component__name')
+    payload = {
+        # Like the per-payslip event, but keyed on the run; the accounting consumer books one journal for it
+        "type": "payroll_finalized",
+        "payroll_run_id": str(run.id),
+        "company_uuid": str(run.company_uuid),
+        "net_pay": float(run.total_net),
+        "total_earnings": float(run.total_earnings),
+        "total_deductions": float(run.total_deductions),
+        "payslip_count": run.payslips_created,
+        "period_start": str(run.period_start),
+        "period_end": str(run.period_end),
+        "components": [
+            {"component_id": str(c['component_id']), "name": c['component__name'],
+             "type": c['component__type'], "amount": float(c['amount'])}
+            for c in components
+        ],
+    }
+    publish_event(exchange="events", routing_key="hrms.payroll.finalized", payload=payload)
+    return run, finalized
+
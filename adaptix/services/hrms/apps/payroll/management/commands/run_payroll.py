@@ -0,0 +1,28 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from apps.payroll.engine import CHUNK_SIZE, WORKERS, finalize_run, run_payroll
+
+class Command(BaseCommand):
+    help = 'Generates the payslips of a company for a period in parallel chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('company_uuid')
+        parser.add_argument('period_start', type=date.fromisoformat)
+        parser.add_argument('period_end', type=date.fromisoformat)
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--workers', type=int, default=WORKERS)
+        parser.add_argument('--finalize', action='store_true', help='Finalize and publish the run when it completes')
+
+    def handle(self, *args, **options):
+        run = run_payroll(
+            options['company_uuid'], options['period_start'], options['period_end'],
+            chunk_size=options['chunk_size'], workers=options['workers']
+        )
+        self.stdout.write(
+            f"Run {run.id}: {run.status}, {run.payslips_created} payslip(s), {run.skipped} skipped, net {run.total_net}"
+        )
+        if run.status == 'failed':
+            raise CommandError(run.error)
+        if options['finalize']:
+            run, finalized = finalize_run(run)
+            self.stdout.write(self.style.SUCCESS(f"Finalized {finalized} payslip(s)"))
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('company_uuid', models.UUIDField(db_index=True)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed'), ('finalized', 'Finalized')], default='draft', max_length=20)),
+                ('employees_total', models.PositiveIntegerField(default=0)),
+                ('payslips_created', models.PositiveIntegerField(default=0)),
+                ('skipped', models.PositiveIntegerField(default=0, help_text='Employees that already had a payslip for the period')),
+                ('total_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('total_deductions', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('total_net', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('finalized_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='salarycomponent',
+            name='calculation_type',
+            field=models.CharField(choices=[('percent', 'Percent of Base Amount'), ('fixed', 'Fixed Amount')], default='percent', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='salarycomponent',
+            name='prorate',
+            field=models.BooleanField(default=True, help_text='Scale by payable days (absences and unpaid leave reduce it)'),
+        ),
+        migrations.AddField(
+            model_name='salarycomponent',
+            name='value',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Percent of base (e.g. 40) or fixed amount', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='payslip',
+            name='payroll_run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payslips', to='payroll.payrollrun'),
+        ),
+    ]
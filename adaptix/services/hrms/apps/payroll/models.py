@@ -18,7 +18,14 @@ class SalaryComponent(models.Model):
     type = models.CharField(max_length=20, choices=COMPONENT_TYPES)
     is_taxable = models.BooleanField(default=True)
     
-    # Configuration for auto-calculation (e.g., % of Basic) - simplified for now
+    # Configuration for auto-calculation
+    CALCULATION_TYPES = (
+        ('percent', 'Percent of Base Amount'),
+        ('fixed', 'Fixed Amount'),
+    )
+    calculation_type = models.CharField(max_length=20, choices=CALCULATION_TYPES, default='percent')
+    value = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Percent of base (e.g. 40) or fixed amount")
+    prorate = models.BooleanField(default=True, help_text="Scale by payable days (absences and unpaid leave reduce it)")
     
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -61,6 +68,39 @@ class EmployeeSalary(models.Model):
     def __str__(self):
         return f"{self.employee} - {self.base_amount}"
 
+class PayrollRun(models.Model):
+    """
+    One batch generation of payslips for a company and period.
+    """
+    STATUS_CHOICES = (
+        ('draft', 'Draft'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('finalized', 'Finalized'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company_uuid = models.UUIDField(db_index=True)
+    period_start = models.DateField()
+    period_end = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
+
+    employees_total = models.PositiveIntegerField(default=0)
+    payslips_created = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0, help_text="Employees that already had a payslip for the period")
+    total_earnings = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    total_deductions = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    total_net = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    finalized_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Payroll {self.period_start} - {self.period_end} ({self.status})"
+
 class Payslip(models.Model):
     """
     The monthly generated salary record.
@@ -74,6 +114,7 @@ class Payslip(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     company_uuid = models.UUIDField(db_index=True)
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='payslips')
+    payroll_run = models.ForeignKey(PayrollRun, on_delete=models.SET_NULL, null=True, blank=True, related_name='payslips')
     
     start_date = models.DateField()
     end_date = models.DateField()
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import SalaryComponent, SalaryStructure, EmployeeSalary, Payslip, PayslipLineItem
+from .models import SalaryComponent, SalaryStructure, EmployeeSalary, PayrollRun, Payslip, PayslipLineItem
 
 class SalaryComponentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -38,3 +38,17 @@ class PayslipSerializer(serializers.ModelSerializer):
         model = Payslip
         fields = '__all__'
         read_only_fields = ['net_pay', 'total_earnings', 'total_deductions', 'status']
+
+class PayrollRunSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PayrollRun
+        fields = '__all__'
+        read_only_fields = [
+            'status', 'employees_total', 'payslips_created', 'skipped', 'total_earnings',
+            'total_deductions', 'total_net', 'error', 'completed_at', 'finalized_at',
+        ]
+
+    def validate(self, attrs):
+        if attrs['period_end'] < attrs['period_start']:
+            raise serializers.ValidationError({"period_end": "Must not be before period_start"})
+        return attrs
@@ -4,6 +4,7 @@ from .views import (
     SalaryComponentViewSet, 
     SalaryStructureViewSet, 
     EmployeeSalaryViewSet, 
+    PayrollRunViewSet,
     PayslipViewSet
 )
 
@@ -11,6 +12,7 @@ router = DefaultRouter()
 router.register(r'components', SalaryComponentViewSet)
 router.register(r'structures', SalaryStructureViewSet)
 router.register(r'assignments', EmployeeSalaryViewSet)
+router.register(r'runs', PayrollRunViewSet)
 router.register(r'payslips', PayslipViewSet)
 
 urlpatterns = [
@@ -1,11 +1,13 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import SalaryComponent, SalaryStructure, EmployeeSalary, Payslip
+from .engine import execute_run, execute_run_background, finalize_run
+from .models import SalaryComponent, SalaryStructure, EmployeeSalary, PayrollRun, Payslip
 from .serializers import (
     SalaryComponentSerializer, 
     SalaryStructureSerializer, 
     EmployeeSalarySerializer, 
+    PayrollRunSerializer,
     PayslipSerializer
 )
 
@@ -21,6 +23,40 @@ class EmployeeSalaryViewSet(viewsets.ModelViewSet):
     queryset = EmployeeSalary.objects.all()
     serializer_class = EmployeeSalarySerializer
 
+class PayrollRunViewSet(viewsets.ModelViewSet):
+    """
+    POST creates a run and generates its payslips in the background; pass
+    "wait": true to generate them within the request instead.
+    """
+    queryset = PayrollRun.objects.all().order_by('-created_at')
+    serializer_class = PayrollRunSerializer
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+
+    def perform_create(self, serializer):
+        run = serializer.save()
+        if str(self.request.data.get('wait', '')).lower() in ('1', 'true', 'yes'):
+            execute_run(run)
+        else:
+            execute_run_background(run)
+
+    @action(detail=True, methods=['post'])
+    def retry(self, request, pk=None):
+        """Generates the payslips still missing after a failed run."""
+        run = self.get_object()
+        if run.status != 'failed':
+            return Response({"error": "Only failed runs can be retried"}, status=status.HTTP_400_BAD_REQUEST)
+        execute_run_background(run)
+        return Response(self.get_serializer(run).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        """Finalizes every payslip of the run and books it with one accounting event."""
+        try:
+            run, finalized = finalize_run(self.get_object())
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({**self.get_serializer(run).data, "payslips_finalized": finalized})
+
 class PayslipViewSet(viewsets.ModelViewSet):
     queryset = Payslip.objects.all()
     serializer_class = PayslipSerializer
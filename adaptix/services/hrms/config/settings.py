@@ -91,6 +91,13 @@ TIME_ZONE = 'UTC'
 USE_I18N = True
 USE_TZ = True
 
+# Biometric devices send local wall-clock timestamps without an offset
+ATTENDANCE_DEVICE_TIMEZONE = os.environ.get("ATTENDANCE_DEVICE_TIMEZONE", TIME_ZONE)
+
+# Payroll runs: employees per chunk and chunks processed in parallel
+PAYROLL_CHUNK_SIZE = int(os.environ.get("PAYROLL_CHUNK_SIZE", 2000))
+PAYROLL_WORKERS = int(os.environ.get("PAYROLL_WORKERS", 4))
+
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
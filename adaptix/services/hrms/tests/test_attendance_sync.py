@@ -0,0 +1,79 @@
+import uuid
+from datetime import date, time
+import pytest
+from apps.attendance.ingest import ingest_punches
+from apps.attendance.models import Attendance, AttendancePunch
+from apps.employees.models import Employee
+from apps.shifts.models import Shift
+
+
+@pytest.fixture
+def employee(company_uuid):
+    shift = Shift.objects.create(
+        company_uuid=company_uuid, name="Day", code="DAY",
+        start_time=time(9, 0), end_time=time(17, 0), grace_time_in=15
+    )
+    return Employee.objects.create(
+        company_uuid=company_uuid, employee_code="EMP001", first_name="Ada", last_name="Punch",
+        email=f"{uuid.uuid4().hex}@example.com", current_shift=shift
+    )
+
+
+def punch(log_id, timestamp, user_id="EMP001", device_id="ZK001"):
+    return {"device_id": device_id, "user_id": user_id, "timestamp": timestamp, "log_id": log_id}
+
+
+@pytest.mark.django_db
+class TestDeviceSync:
+    def test_first_in_last_out_from_device_time(self, employee):
+        stats = ingest_punches([
+            punch("3", "2024-12-10 17:05:00"),
+            punch("1", "2024-12-10 09:40:00"),
+            punch("2", "2024-12-10 12:30:00"),
+            punch("4", "2024-12-11 08:55:00"),
+        ])
+        assert stats["synced"] == 4
+        assert stats["days"] == 2
+
+        day = Attendance.objects.get(employee=employee, date="2024-12-10")
+        assert (day.check_in, day.check_out) == (time(9, 40), time(17, 5))
+        assert day.method == "biometric"
+        assert (day.status, day.late_minutes) == ("late", 40)
+        assert Attendance.objects.get(employee=employee, date="2024-12-11").check_out is None
+
+    def test_repushed_buffer_is_deduplicated(self, employee):
+        logs = [punch("1", "2024-12-10 09:00:00"), punch("2", "2024-12-10 18:00:00")]
+        ingest_punches(logs)
+        stats = ingest_punches(logs + [punch("2", "2024-12-10 18:00:00"), punch("3", "2024-12-10 19:00:00")])
+
+        assert (stats["synced"], stats["duplicates"]) == (1, 3)
+        assert AttendancePunch.objects.filter(employee=employee).count() == 3
+        day = Attendance.objects.get(employee=employee, date="2024-12-10")
+        assert (day.check_in, day.check_out) == (time(9, 0), time(19, 0))
+
+    def test_later_sync_widens_existing_day(self, employee):
+        Attendance.objects.create(employee=employee, date=date(2024, 12, 10), check_in=time(10, 0))
+        ingest_punches([punch("9", "2024-12-10T08:59:00Z")])
+
+        day = Attendance.objects.get(employee=employee, date="2024-12-10")
+        assert (day.check_in, day.check_out, day.status) == (time(8, 59), time(10, 0), "present")
+
+    def test_punches_keep_leave_and_absent_days(self, employee):
+        Attendance.objects.create(employee=employee, date=date(2024, 12, 10), status="leave")
+        Attendance.objects.create(employee=employee, date=date(2024, 12, 11), status="absent")
+        ingest_punches([punch("1", "2024-12-10 09:40:00"), punch("2", "2024-12-11 09:00:00")])
+
+        leave = Attendance.objects.get(employee=employee, date="2024-12-10")
+        assert (leave.check_in, leave.status, leave.late_minutes) == (time(9, 40), "leave", 40)
+        assert Attendance.objects.get(employee=employee, date="2024-12-11").status == "absent"
+
+    def test_unknown_employee_and_bad_timestamp_are_reported(self, employee, api_client):
+        response = api_client.post("/api/hrms/attendance/sync/", [
+            punch("1", "2024-12-10 09:00:00"),
+            punch("2", "2024-12-10 09:00:00", user_id="GHOST"),
+            punch("3", "yesterday"),
+        ], format="json")
+
+        assert response.status_code == 200
+        assert response.data["synced"] == 1
+        assert len(response.data["errors"]) == 2
@@ -0,0 +1,64 @@
+import uuid
+from datetime import date
+from decimal import Decimal
+import pytest
+from apps.employees.models import Employee
+from apps.leaves.models import LeaveAllocation, LeavePolicy, LeaveType
+from apps.leaves.services import EntitlementEngine
+
+
+def make_employee(company_uuid, code, gender='MALE', joining_date=date(2020, 1, 1)):
+    return Employee.objects.create(
+        company_uuid=company_uuid, employee_code=code, first_name=code, last_name="Test",
+        email=f"{uuid.uuid4().hex}@example.com", gender=gender, joining_date=joining_date
+    )
+
+
+@pytest.fixture
+def policies(company_uuid):
+    annual = LeaveType.objects.create(company_uuid=company_uuid, name="Annual", code="AL")
+    maternity = LeaveType.objects.create(company_uuid=company_uuid, name="Maternity", code="ML")
+    return [
+        LeavePolicy.objects.create(company_uuid=company_uuid, name="Annual", leave_type=annual,
+                                   allocation_days=Decimal("14"), tenure_months_required=12),
+        LeavePolicy.objects.create(company_uuid=company_uuid, name="Maternity", leave_type=maternity,
+                                   allocation_days=Decimal("90"), gender_requirement='FEMALE'),
+    ]
+
+
+@pytest.mark.django_db
+class TestEntitlementEngine:
+    def test_creates_missing_allocations_and_reports_diff(self, company_uuid, policies):
+        veteran = make_employee(company_uuid, "E1", gender='FEMALE')
+        make_employee(company_uuid, "E2")
+        make_employee(company_uuid, "E3", joining_date=date.today())
+        LeaveAllocation.objects.create(company_uuid=company_uuid, employee=veteran,
+                                       leave_type=policies[0].leave_type, total_allocated=10)
+
+        report = EntitlementEngine.run_entitlement_for_company(company_uuid)
+
+        assert (report["created"], report["existing"], report["ineligible"]) == (2, 1, 3)
+        assert report["by_leave_type"]["AL"] == {"created": 1, "existing": 1, "ineligible": 1}
+        assert report["by_leave_type"]["ML"] == {"created": 1, "existing": 0, "ineligible": 2}
+        assert LeaveAllocation.objects.filter(company_uuid=company_uuid).count() == 3
+        assert LeaveAllocation.objects.get(employee=veteran, leave_type=policies[0].leave_type).total_allocated == 10
+
+        again = EntitlementEngine.run_entitlement_for_company(company_uuid)
+        assert (again["created"], again["existing"]) == (0, 3)
+
+    def test_dry_run_writes_nothing(self, company_uuid, policies):
+        make_employee(company_uuid, "E1", gender='FEMALE')
+
+        report = EntitlementEngine.run_entitlement_for_company(company_uuid, year=2031, dry_run=True)
+
+        assert report["created"] == 2
+        assert not LeaveAllocation.objects.exists()
+
+    def test_oldest_policy_wins_for_a_leave_type(self, company_uuid, policies):
+        LeavePolicy.objects.create(company_uuid=company_uuid, name="Annual (senior)",
+                                   leave_type=policies[0].leave_type, allocation_days=Decimal("20"))
+        employee = make_employee(company_uuid, "E1")
+
+        EntitlementEngine.run_entitlement_for_company(company_uuid)
+
+        assert LeaveAllocation.objects.get(employee=employee).total_allocated == Decimal("14")
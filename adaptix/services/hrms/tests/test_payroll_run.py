@@ -0,0 +1,111 @@
+import uuid
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+import pytest
+from apps.attendance.models import Attendance
+from apps.employees.models import Employee
+from apps.leaves.models import LeaveApplication, LeaveType
+from apps.payroll.engine import execute_run_background, finalize_run, run_payroll
+from apps.payroll.models import EmployeeSalary, Payslip, PayslipLineItem, SalaryComponent, SalaryStructure
+
+JUNE = (date(2025, 6, 1), date(2025, 6, 30))
+
+
+@pytest.fixture
+def structure(company_uuid):
+    structure = SalaryStructure.objects.create(company_uuid=company_uuid, name="Grade A")
+    structure.components.set([
+        SalaryComponent.objects.create(company_uuid=company_uuid, name="Basic", type='earning', value=Decimal("60")),
+        SalaryComponent.objects.create(company_uuid=company_uuid, name="HRA", type='earning', value=Decimal("40")),
+        SalaryComponent.objects.create(company_uuid=company_uuid, name="Prof Tax", type='deduction',
+                                       calculation_type='fixed', value=Decimal("200"), prorate=False),
+    ])
+    return structure
+
+
+def make_staff(company_uuid, structure, code, base):
+    employee = Employee.objects.create(
+        company_uuid=company_uuid, employee_code=code, first_name=code, last_name="Test",
+        email=f"{uuid.uuid4().hex}@example.com", current_shift=None
+    )
+    EmployeeSalary.objects.create(company_uuid=company_uuid, employee=employee, structure=structure, base_amount=base)
+    return employee
+
+
+@pytest.mark.django_db
+class TestPayrollRun:
+    def test_generates_prorated_payslips(self, company_uuid, structure):
+        full = make_staff(company_uuid, structure, "E1", Decimal("30000"))
+        partial = make_staff(company_uuid, structure, "E2", Decimal("30000"))
+        Attendance.objects.bulk_create([
+            Attendance(employee=partial, date=date(2025, 6, d), status='absent') for d in (2, 3)
+        ])
+        unpaid = LeaveType.objects.create(company_uuid=company_uuid, name="Unpaid", code="LWP", is_paid=False)
+        LeaveApplication.objects.create(company_uuid=company_uuid, employee=partial, leave_type=unpaid,
+                                        start_date=date(2025, 5, 30), end_date=date(2025, 6, 2), status='approved')
+
+        run = run_payroll(company_uuid, *JUNE, chunk_size=1, workers=1)
+
+        assert (run.status, run.payslips_created) == ('completed', 2)
+        slip = Payslip.objects.get(employee=full)
+        assert (slip.total_earnings, slip.total_deductions, slip.net_pay) == (Decimal("30000"), Decimal("200"), Decimal("29800"))
+        slip = Payslip.objects.get(employee=partial)
+        # 2 absent + 2 unpaid leave days inside June: 26/30 payable
+        assert (slip.absent_days, slip.unpaid_leave_days) == (2, 2)
+        assert slip.total_earnings == Decimal("26000.00")
+        assert PayslipLineItem.objects.filter(payslip__payroll_run=run).count() == 6
+        assert run.total_net == Decimal("29800") + Decimal("25800.00")
+
+    def test_rerun_skips_existing_payslips(self, company_uuid, structure):
+        make_staff(company_uuid, structure, "E1", Decimal("1000"))
+        run_payroll(company_uuid, *JUNE, workers=1)
+        make_staff(company_uuid, structure, "E2", Decimal("1000"))
+
+        run = run_payroll(company_uuid, *JUNE, workers=1)
+
+        assert (run.payslips_created, run.skipped, run.employees_total) == (1, 1, 2)
+        assert Payslip.objects.filter(company_uuid=company_uuid).count() == 2
+
+    def test_finalize_publishes_one_event_for_the_run(self, company_uuid, structure):
+        for i in range(3):
+            make_staff(company_uuid, structure, f"E{i}", Decimal("1000"))
+        run = run_payroll(company_uuid, *JUNE, workers=1)
+
+        with patch('utils.messaging.publish_event') as publish:
+            run, finalized = finalize_run(run)
+
+        assert (run.status, finalized) == ('finalized', 3)
+        assert publish.call_count == 1
+        payload = publish.call_args.kwargs['payload']
+        assert payload['type'] == 'payroll_finalized'
+        assert payload['payroll_run_id'] == str(run.id) and 'payslip_id' not in payload
+        assert payload['net_pay'] == float(Decimal("2400"))
+        assert {c['name']: c['amount'] for c in payload['components']} == {"Basic": 1800.0, "HRA": 1200.0, "Prof Tax": 600.0}
+        with pytest.raises(ValueError):
+            finalize_run(run)
+
+    def test_create_run_api(self, company_uuid, structure, api_client):
+        make_staff(company_uuid, structure, "E1", Decimal("1000"))
+        response = api_client.post("/api/hrms/payroll/runs/", {
+            "company_uuid": company_uuid, "period_start": "2025-06-01", "period_end": "2025-06-30", "wait": True,
+        }, format="json")
+
+        assert response.status_code == 201
+        assert Payslip.objects.filter(company_uuid=company_uuid).count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_background_run_starts_after_commit(company_uuid, structure):
+    from django.db import transaction
+    from apps.payroll.models import PayrollRun
+    make_staff(company_uuid, structure, "E1", Decimal("1000"))
+
+    with transaction.atomic():
+        run = PayrollRun.objects.create(company_uuid=company_uuid, period_start=JUNE[0], period_end=JUNE[1])
+        worker = execute_run_background(run)
+        assert not worker.is_alive()
+    worker.join(timeout=30)
+
+    run.refresh_from_db()
+    assert (run.status, run.payslips_created) == ('completed', 1)
@@ -1,10 +1,43 @@
+import time
+from datetime import datetime, time as day_time, timedelta
+from django.conf import settings
+from django.core.cache import cache
 from django.db import connection
-from datetime import date
+from django.db.models import Sum
+from django.utils import timezone
+from apps.forecasts.models import SalesHistory
+
+
+def answer_key(intent, company_uuid, ttl, now=None):
+    """Cache key of an intent's answer for the company in the current ttl-second bucket."""
+    bucket = int((time.time() if now is None else now) // ttl)
+    return f"assistant:{intent}:{company_uuid}:{bucket}"
+
 
 class NLPEngine:
     def __init__(self, company_uuid):
         self.company_uuid = company_uuid
 
+    def answer(self, intent):
+        """
+        The intent's answer, computed at most once per company and time
+        bucket (settings.ASSISTANT_CACHE_TTL) however many users ask.
+        """
+        ttl = settings.ASSISTANT_CACHE_TTL[intent]
+        key = answer_key(intent, self.company_uuid, ttl)
+        response = cache.get(key)
+        if response is None:
+            response = getattr(self, f"_get_{intent}")()
+            # Failed lookups are not cached, the next message tries again
+            if "debug" not in response:
+                cache.set(key, response, ttl)
+        return response
+
+    def warm(self):
+        """Pre-computes every cached intent for the current buckets."""
+        for intent in settings.ASSISTANT_CACHE_TTL:
+            self.answer(intent)
+
     def process_message(self, message):
         """
         Process the user message and return a structured response.
@@ -19,47 +52,44 @@ class NLPEngine:
 
         # Intent: Top Products
         if 'top' in message and ('product' in message or 'selling' in message):
-            return self._get_top_products()
+            return self.answer('top_products')
 
         # Intent: Attendance / Staff
         if 'staff' in message or 'attendance' in message or 'late' in message or 'absent' in message:
-            return self._get_staff_insights(message)
+            return self.answer('staff_insights')
 
         # Intent: Sales Summary/Revenue
         if 'sales' in message or 'revenue' in message:
-            return self._get_sales_summary(message)
+            return self.answer('sales_summary')
 
         # Intent: Low Stock
         if 'stock' in message or 'inventory' in message or 'low' in message:
-            return self._get_low_stock()
+            return self.answer('low_stock')
 
         return {
             "reply": "I didn't quite understand that. Try asking:\n- 'Show top selling products'\n- 'Is anyone late today?'\n- 'What are today's sales?'\n- 'Show me low stock items'"
         }
 
     def _get_top_products(self):
-        """Query for top 5 selling products by quantity."""
-        with connection.cursor() as cursor:
-            sql = """
-                SELECT oi.product_name, SUM(oi.quantity) as total_qty
-                FROM pos.sales_order o
-                JOIN pos.sales_orderitem oi ON o.id = oi.order_id
-                WHERE o.company_uuid = %s AND o.status = 'completed'
-                GROUP BY oi.product_name
-                ORDER BY total_qty DESC
-                LIMIT 5
-            """
-            try:
-                cursor.execute(sql, [self.company_uuid])
-                rows = cursor.fetchall()
-                if not rows: return {"reply": "No sales data found yet."}
-                
-                reply = "Your top 5 selling products are:\n" + "\n".join([f"{i+1}. {r[0]} ({int(r[1])} units)" for i, r in enumerate(rows)])
-                return {"reply": reply, "data": rows}
-            except Exception as e:
-                return {"reply": "Error fetching top products.", "debug": str(e)}
+        """
+        Top 5 selling products by quantity, from the daily SalesHistory
+        aggregates (forecasts.sync_sales_history) rather than the POS order lines.
+        """
+        try:
+            rows = list(
+                SalesHistory.objects.filter(company_uuid=self.company_uuid)
+                .values_list('product_name')
+                .annotate(total_qty=Sum('quantity_sold'))
+                .order_by('-total_qty')[:5]
+            )
+            if not rows: return {"reply": "No sales data found yet."}
+
+            reply = "Your top 5 selling products are:\n" + "\n".join([f"{i+1}. {r[0]} ({int(r[1])} units)" for i, r in enumerate(rows)])
+            return {"reply": reply, "data": rows}
+        except Exception as e:
+            return {"reply": "Error fetching top products.", "debug": str(e)}
 
-    def _get_staff_insights(self, message):
+    def _get_staff_insights(self):
         """Query for late or absent staff today."""
         with connection.cursor() as cursor:
             # Table names based on app_model naming: hrms.employees_employee, hrms.attendance_attendance
@@ -80,12 +110,13 @@ class NLPEngine:
             except Exception as e:
                 return {"reply": "I couldn't access the attendance records.", "debug": str(e)}
 
-    def _get_sales_summary(self, message):
+    def _get_sales_summary(self):
         """
         Query the POS schema for sales data.
         """
         # Determine timeframe (default to today)
-        query_date = date.today()
+        query_date = timezone.localdate()
+        day_start = timezone.make_aware(datetime.combine(query_date, day_time.min))
         # TODO: Add logic for 'yesterday', 'this week' parsing
         
         with connection.cursor() as cursor:
@@ -103,11 +134,11 @@ class NLPEngine:
                 FROM pos.sales_order 
                 WHERE company_uuid = %s 
                 AND status = 'completed'
-                AND created_at::date = %s
+                AND created_at >= %s AND created_at < %s
             """
             
             try:
-                cursor.execute(sql, [self.company_uuid, query_date])
+                cursor.execute(sql, [self.company_uuid, day_start, day_start + timedelta(days=1)])
                 row = cursor.fetchone()
                 count = row[0]
                 total = row[1]
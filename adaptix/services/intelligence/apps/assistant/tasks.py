@@ -0,0 +1,25 @@
+from datetime import timedelta
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+from apps.forecasts.models import SalesHistory
+from .nlp_engine import NLPEngine
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name="assistant.warm_answers")
+def warm_answers():
+    """
+    Pre-computes the cached assistant answers of every company with sales in
+    the last ASSISTANT_ACTIVE_DAYS, so chat messages are served from the cache.
+    """
+    since = timezone.localdate() - timedelta(days=settings.ASSISTANT_ACTIVE_DAYS)
+    companies = SalesHistory.objects.filter(date__gte=since).values_list('company_uuid', flat=True).distinct()
+    warmed = 0
+    for company_uuid in companies:
+        NLPEngine(str(company_uuid)).warm()
+        warmed += 1
+    logger.info(f"Warmed assistant answers for {warmed} companies")
+    return f"Warmed assistant answers for {warmed} companies."
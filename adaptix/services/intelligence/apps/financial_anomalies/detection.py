@@ -0,0 +1,89 @@
+"""
+Journal entry detectors, on DataFrames of one company's entries with the
+columns of ENTRY_COLUMNS (one row per entry, amount as float).
+
+Every detector returns the flagged rows with the FinancialAnomaly fields
+(anomaly_type, severity, risk_score, reasoning) added, so a run can stack
+them and write all findings of a company at once.
+"""
+import pickle
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+
+ENTRY_COLUMNS = ['entry_id', 'date', 'reference', 'amount', 'description', 'account_name']
+
+MIN_FIT_ENTRIES = 5
+CONTAMINATION = 0.03  # Expect ~3% outliers
+HIGH_SEVERITY_FACTOR = 5
+ROUND_NUMBER_MIN = 1000
+VAGUE_DESCRIPTION_LENGTH = 10
+
+
+def fit_model(amounts):
+    """IsolationForest over a company's amounts, or None with too little history."""
+    if len(amounts) < MIN_FIT_ENTRIES:
+        return None
+    model = IsolationForest(contamination=CONTAMINATION, random_state=42)
+    return model.fit(np.asarray(amounts, dtype=float).reshape(-1, 1))
+
+
+def dump_model(model):
+    return pickle.dumps(model) if model is not None else b''
+
+
+def load_model(data):
+    return pickle.loads(bytes(data)) if data else None
+
+
+def statistical_outliers(df, model, mean_amount):
+    X = df[['amount']].to_numpy()
+    flagged = df[model.predict(X) == -1].copy()
+    if flagged.empty:
+        return flagged
+    score = -model.decision_function(flagged[['amount']].to_numpy())  # Higher score = more anomalous
+    flagged['anomaly_type'] = 'statistical_outlier'
+    flagged['severity'] = np.where(flagged['amount'] > mean_amount * HIGH_SEVERITY_FACTOR, 'high', 'medium')
+    flagged['risk_score'] = np.minimum(1.0, score + 0.5)
+    flagged['reasoning'] = [
+        f"Transaction amount {amount} is statistically significant compared to other {account} entries."
+        for amount, account in zip(flagged['amount'], flagged['account_name'])
+    ]
+    return flagged
+
+
+def round_numbers(df):
+    # Many fraudulent entries use "clean" round numbers like 5000, 10000, etc.
+    flagged = df[
+        (df['amount'] >= ROUND_NUMBER_MIN)
+        & (df['amount'] % 100 == 0)
+        & (df['description'].fillna('').str.len() < VAGUE_DESCRIPTION_LENGTH)
+    ].copy()
+    flagged['anomaly_type'] = 'round_number'
+    flagged['severity'] = 'low'
+    flagged['risk_score'] = 0.3
+    flagged['reasoning'] = [f"High value round number ({amount}) with vague description." for amount in flagged['amount']]
+    return flagged
+
+
+def entry_keys(df):
+    """uint64 hash of each entry's (amount in cents, date): equal keys are duplicate candidates."""
+    keys = pd.DataFrame({
+        'cents': np.rint(df['amount'].to_numpy() * 100).astype(np.int64),
+        'date': pd.to_datetime(df['date']).to_numpy(),
+    })
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+def duplicates(df):
+    """Entries sharing amount and date with another entry of df."""
+    keys = entry_keys(df)
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    flagged = df[counts[inverse] > 1].copy()
+    flagged['anomaly_type'] = 'duplicate_entry'
+    flagged['severity'] = 'medium'
+    flagged['risk_score'] = 0.6
+    flagged['reasoning'] = [
+        f"Detected another transaction with the same amount {amount} on the same day." for amount in flagged['amount']
+    ]
+    return flagged
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:07
+
+from django.db import migrations, models
+
+
+def remove_duplicate_anomalies(apps, schema_editor):
+    # Keep one anomaly per (entry, type), preferring the reviewed one, so the unique constraint can be added
+    FinancialAnomaly = apps.get_model('financial_anomalies', 'FinancialAnomaly')
+    seen = set()
+    stale = []
+    for pk, entry_id, anomaly_type in FinancialAnomaly.objects.order_by(
+        '-is_resolved', 'created_at'
+    ).values_list('id', 'journal_entry_id', 'anomaly_type'):
+        if (entry_id, anomaly_type) in seen:
+            stale.append(pk)
+        seen.add((entry_id, anomaly_type))
+    FinancialAnomaly.objects.filter(id__in=stale).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial_anomalies', '0003_financialanomaly_is_fraud'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinancialDetectorState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_uuid', models.UUIDField(unique=True)),
+                ('watermark', models.DateTimeField(blank=True, null=True)),
+                ('model', models.BinaryField(default=bytes)),
+                ('mean_amount', models.FloatField(default=0.0)),
+                ('sample_size', models.IntegerField(default=0)),
+                ('fitted_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(remove_duplicate_anomalies, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='financialanomaly',
+            constraint=models.UniqueConstraint(fields=('journal_entry_id', 'anomaly_type'), name='financial_anomaly_per_entry'),
+        ),
+    ]
@@ -47,6 +47,26 @@ class FinancialAnomaly(models.Model):
     class Meta:
         verbose_name_plural = "Financial Anomalies"
         ordering = ['-risk_score', '-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['journal_entry_id', 'anomaly_type'], name='financial_anomaly_per_entry'),
+        ]
 
     def __str__(self):
         return f"{self.anomaly_type} - {self.amount} ({self.severity})"
+
+
+class FinancialDetectorState(models.Model):
+    """
+    Per-company detector state: the fitted outlier model and the watermark
+    (journal entry created_at) up to which entries have been scored.
+    """
+    company_uuid = models.UUIDField(unique=True)
+    watermark = models.DateTimeField(null=True, blank=True)
+    model = models.BinaryField(default=bytes)
+    mean_amount = models.FloatField(default=0.0)
+    sample_size = models.IntegerField(default=0)
+    fitted_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.company_uuid} @ {self.watermark}"
@@ -1,115 +1,186 @@
-import pandas as pd
+import uuid
+from datetime import timedelta
 import numpy as np
-from sklearn.ensemble import IsolationForest
-from celery import shared_task
-from django.db import connection
+import pandas as pd
+from celery import group, shared_task
+from django.db import connection, transaction
 from django.utils import timezone
-from .models import FinancialAnomaly
+from .detection import (
+    ENTRY_COLUMNS, duplicates, dump_model, entry_keys, fit_model, load_model, round_numbers, statistical_outliers,
+)
+from .models import FinancialAnomaly, FinancialDetectorState
 import logging
 
 logger = logging.getLogger(__name__)
 
+# First run of a company scores this far back; the outlier model is fitted on the same window
+HISTORY_WINDOW = timedelta(days=30)
+# Fitted models are reused until they are this old
+REFIT_INTERVAL = timedelta(hours=24)
+# Entries younger than this are left for the next run, so rows still being committed are not skipped
+WATERMARK_LAG = timedelta(seconds=60)
+# Rows per round trip of the server-side cursors
+FETCH_SIZE = 5000
+
+# One row per journal entry with a debit line; category and description come from its largest debit
+ENTRY_QUERY = """
+    SELECT DISTINCT ON (e.id) e.id, e.date, e.reference, e.total_debit, i.description, a.name
+    FROM accounting.ledger_journalentry e
+    JOIN accounting.ledger_journalitem i ON i.entry_id = e.id AND i.debit > 0
+    JOIN accounting.ledger_chartofaccount a ON i.account_id = a.id
+    WHERE e.company_uuid = %s
+"""
+
+
+def _stream(query, params):
+    """Yields the rows of query in lists of up to FETCH_SIZE, through a server-side cursor."""
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(query, params)
+        while rows := cursor.fetchmany(FETCH_SIZE):
+            yield rows
+
+
+def _frame(rows):
+    df = pd.DataFrame.from_records(rows, columns=ENTRY_COLUMNS)
+    df['amount'] = df['amount'].astype(float)
+    return df
+
+
+def stream_entries(company_uuid, since, until):
+    """DataFrames of the company's entries created in (since, until]."""
+    query = ENTRY_QUERY + " AND e.created_at > %s AND e.created_at <= %s ORDER BY e.id, i.debit DESC"
+    for rows in _stream(query, [str(company_uuid), since, until]):
+        yield _frame(rows)
+
+
+def stream_entries_on(company_uuid, dates, until):
+    """DataFrames of the company's entries dated on any of dates, created up to until."""
+    query = ENTRY_QUERY + " AND e.date = ANY(%s) AND e.created_at <= %s ORDER BY e.id, i.debit DESC"
+    for rows in _stream(query, [str(company_uuid), sorted(dates), until]):
+        yield _frame(rows)
+
+
+def fetch_amounts(company_uuid, since, until):
+    """Debit totals of the company's entries created in (since, until], for fitting."""
+    chunks = [np.array(rows, dtype=float).ravel() for rows in _stream(
+        "SELECT e.total_debit FROM accounting.ledger_journalentry e "
+        "WHERE e.company_uuid = %s AND e.created_at > %s AND e.created_at <= %s AND e.total_debit > 0",
+        [str(company_uuid), since, until],
+    )]
+    return np.concatenate(chunks) if chunks else np.empty(0)
+
+
+def fetch_active_companies(since):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT DISTINCT company_uuid FROM accounting.ledger_journalentry WHERE created_at > %s", [since])
+        return [str(row[0]) for row in cursor.fetchall()]
+
+
+def find_duplicates(company_uuid, new_keys, dates, until):
+    """Entries sharing amount and date with another entry, where at least one of them is new."""
+    candidates = []
+    for df in stream_entries_on(company_uuid, dates, until):
+        # Only entries colliding with a new one can matter; drop the rest before holding on to the chunk
+        candidates.append(df[np.isin(entry_keys(df), new_keys)])
+    if not candidates:
+        return pd.DataFrame(columns=ENTRY_COLUMNS)
+    return duplicates(pd.concat(candidates, ignore_index=True))
+
+
+def upsert_anomalies(company_uuid, findings):
+    """
+    One INSERT for all findings of a company. An entry already flagged for
+    the same type keeps its existing anomaly (and any review on it).
+    Returns the number of new anomalies.
+    """
+    if findings.empty:
+        return 0
+    table = connection.ops.quote_name(FinancialAnomaly._meta.db_table)
+    now = timezone.now()
+    values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, false, false, '', %s, %s)"] * len(findings))
+    params = []
+    for row in findings.itertuples(index=False):
+        params += [
+            uuid.uuid4(), company_uuid, row.entry_id, row.date, row.reference or '', round(row.amount, 2),
+            (row.account_name or '')[:100], row.anomaly_type, row.severity, float(row.risk_score), row.reasoning,
+            now, now,
+        ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (id, company_uuid, journal_entry_id, journal_date, journal_reference, amount, "
+            f"category, anomaly_type, severity, risk_score, reasoning, is_resolved, is_fraud, resolution_note, "
+            f"created_at, updated_at) VALUES {values} "
+            f"ON CONFLICT (journal_entry_id, anomaly_type) DO NOTHING",
+            params
+        )
+        return cursor.rowcount
+
+
+@shared_task(name="financial_anomalies.analyze_company")
+def analyze_company_financials(company_uuid):
+    """
+    Scores one company's journal entries created since its watermark. The
+    IsolationForest is fitted on the trailing HISTORY_WINDOW and cached on
+    the company's FinancialDetectorState until REFIT_INTERVAL has passed.
+    Entries are streamed through server-side cursors, duplicates are found
+    by hashing (amount, date), and all findings go out in one upsert.
+    """
+    now = timezone.now()
+    until = now - WATERMARK_LAG
+
+    with transaction.atomic():
+        FinancialDetectorState.objects.get_or_create(company_uuid=company_uuid)
+        state = FinancialDetectorState.objects.select_for_update().get(company_uuid=company_uuid)
+        since = state.watermark or until - HISTORY_WINDOW
+        if since >= until:
+            return "No new entries"
+
+        if state.fitted_at is None or now - state.fitted_at >= REFIT_INTERVAL:
+            amounts = fetch_amounts(company_uuid, until - HISTORY_WINDOW, until)
+            state.model = dump_model(fit_model(amounts))
+            state.mean_amount = float(amounts.mean()) if len(amounts) else 0.0
+            state.sample_size = len(amounts)
+            state.fitted_at = now
+        model = load_model(state.model)
+
+        findings, keys, dates, scored = [], [], set(), 0
+        for df in stream_entries(company_uuid, since, until):
+            scored += len(df)
+            if model is not None:
+                findings.append(statistical_outliers(df, model, state.mean_amount))
+            findings.append(round_numbers(df))
+            keys.append(entry_keys(df))
+            dates.update(df['date'])
+        if scored:
+            findings.append(find_duplicates(company_uuid, np.concatenate(keys), dates, until))
+            created = upsert_anomalies(company_uuid, pd.concat(findings, ignore_index=True))
+        else:
+            created = 0
+
+        state.watermark = until
+        state.save()
+
+    logger.info(f"Scored {scored} journal entries of company {company_uuid}, {created} new anomalies")
+    return f"Scored {scored} entries. Detected {created} new anomalies."
+
+
 @shared_task
-def analyze_financial_anomalies():
+def analyze_financial_anomalies(company_uuid=None):
     """
     Scans accounting journals for statistical outliers and suspicious patterns.
+    Every company with recent entries is analyzed in its own task, so the
+    work spreads over the worker pool and no single run holds all tenants.
     """
-    # 1. Fetch recent journal items from accounting service via Direct DB Access (Schema sharing)
-    # Join with ChartOfAccount to get group types
-    query = """
-        SELECT e.id as entry_id, e.date, e.reference, e.total_debit as amount, e.company_uuid,
-               i.description, a.name as account_name, g.group_type
-        FROM accounting.ledger_journalentry e
-        JOIN accounting.ledger_journalitem i ON e.id = i.entry_id
-        JOIN accounting.ledger_chartofaccount a ON i.account_id = a.id
-        JOIN accounting.ledger_accountgroup g ON a.group_id = g.id
-        WHERE e.date > NOW() - INTERVAL '30 days'
-        AND i.debit > 0
-    """
-    
+    if company_uuid:
+        return analyze_company_financials(str(company_uuid))
+
     try:
-        df = pd.read_sql(query, connection)
+        companies = fetch_active_companies(timezone.now() - HISTORY_WINDOW)
     except Exception as e:
         logger.error(f"Failed to fetch finance data: {e}")
         return f"Error: {e}"
 
-    if df.empty:
+    if not companies:
         return "No data to analyze."
-
-    anomalies_count = 0
-    df['amount'] = df['amount'].astype(float)
-
-    # --- DETECTION 1: Statistical Outliers (Isolation Forest) ---
-    # We group by company to detect relative outliers
-    for company_uuid, company_df in df.groupby('company_uuid'):
-        if len(company_df) < 5: continue # Need minimum data for IF
-        
-        X = company_df[['amount']].values
-        clf = IsolationForest(contamination=0.03, random_state=42) # Expect ~3% outliers
-        company_df['is_outlier'] = clf.fit_predict(X)
-        company_df['anomaly_score'] = -clf.decision_function(X) # Higher score = more anomalous
-
-        outliers = company_df[company_df['is_outlier'] == -1]
-        
-        for _, row in outliers.iterrows():
-            FinancialAnomaly.objects.get_or_create(
-                journal_entry_id=row['entry_id'],
-                anomaly_type='statistical_outlier',
-                defaults={
-                    'company_uuid': company_uuid,
-                    'journal_date': row['date'],
-                    'journal_reference': row['reference'] or '',
-                    'amount': row['amount'],
-                    'category': row['account_name'],
-                    'severity': 'high' if row['amount'] > company_df['amount'].mean() * 5 else 'medium',
-                    'risk_score': min(1.0, row['anomaly_score'] + 0.5),
-                    'reasoning': f"Transaction amount {row['amount']} is statistically significant compared to other {row['account_name']} entries."
-                }
-            )
-            anomalies_count += 1
-
-    # --- DETECTION 2: Round Number Flag (Suspicious High Value) ---
-    # Many fraudulent entries use "clean" round numbers like 5000, 10000, etc.
-    round_numbers = df[
-        (df['amount'] >= 1000) & 
-        (df['amount'] % 100 == 0) & 
-        (df['description'].str.len() < 10) # Short descriptions + round numbers are suspicious
-    ]
-    
-    for _, row in round_numbers.iterrows():
-        FinancialAnomaly.objects.get_or_create(
-            journal_entry_id=row['entry_id'],
-            anomaly_type='round_number',
-            defaults={
-                'company_uuid': row['company_uuid'],
-                'journal_date': row['date'],
-                'journal_reference': row['reference'] or '',
-                'amount': row['amount'],
-                'category': row['account_name'],
-                'severity': 'low',
-                'risk_score': 0.3,
-                'reasoning': f"High value round number ({row['amount']}) with vague description."
-            }
-        )
-        anomalies_count += 1
-
-    # --- DETECTION 3: Potential Duplicates ---
-    duplicates = df[df.duplicated(subset=['amount', 'date', 'company_uuid'], keep=False)]
-    for _, row in duplicates.iterrows():
-        FinancialAnomaly.objects.get_or_create(
-            journal_entry_id=row['entry_id'],
-            anomaly_type='duplicate_entry',
-            defaults={
-                'company_uuid': row['company_uuid'],
-                'journal_date': row['date'],
-                'journal_reference': row['reference'] or '',
-                'amount': row['amount'],
-                'category': row['account_name'],
-                'severity': 'medium',
-                'risk_score': 0.6,
-                'reasoning': f"Detected another transaction with the same amount {row['amount']} on the same day."
-            }
-        )
-        anomalies_count += 1
-
-    return f"Analysis complete. Detected/Updated {anomalies_count} anomalies."
+    group(analyze_company_financials.s(company) for company in companies).apply_async()
+    return f"Dispatched analysis for {len(companies)} companies."
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forecasts', '0003_forecast_saleshistory_delete_salesforecast_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='saleshistory',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='saleshistory',
+            index=models.Index(fields=['company_uuid', 'updated_at'], name='forecasts_s_company_d3b121_idx'),
+        ),
+    ]
@@ -16,11 +16,13 @@ class SalesHistory(SoftDeleteModel):
     revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     
     company_uuid = models.UUIDField(db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ('product_uuid', 'date', 'company_uuid')
         indexes = [
             models.Index(fields=['company_uuid', 'date']),
+            models.Index(fields=['company_uuid', 'updated_at']),
         ]
 
     def __str__(self):
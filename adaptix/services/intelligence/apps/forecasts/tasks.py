@@ -1,5 +1,6 @@
 from celery import shared_task
 from django.db import connection
+from django.utils import timezone
 from .models import SalesHistory
 from datetime import date, timedelta
 import logging
@@ -7,57 +8,59 @@ import logging
 logger = logging.getLogger(__name__)
 
 @shared_task(name="forecasts.sync_sales_history")
-def sync_sales_history(company_uuid=None):
+def sync_sales_history(company_uuid=None, days=30):
     """
-    Summarizes POS orders into daily SalesHistory.
+    Summarizes POS orders into daily SalesHistory, with one INSERT ... SELECT
+    ... ON CONFLICT. Only rows whose figures changed are written (and get a
+    new updated_at), so the frequent scheduled sync of the last couple of
+    days stays cheap and the sales trend refresh only re-reads real changes.
     """
     logger.info(f"Syncing sales history. Company: {company_uuid}")
-    
-    # We sync for the last 30 days to ensure any retroactive updates are captured
-    sync_start_date = date.today() - timedelta(days=30)
-    
-    query = """
-        SELECT 
-            oi.product_uuid, 
-            oi.product_name,
+
+    # Re-reads `days` days so retroactive updates (refunds, late closes) are captured
+    sync_start_date = date.today() - timedelta(days=days)
+    table = connection.ops.quote_name(SalesHistory._meta.db_table)
+    company_filter = ""
+    params = [timezone.now(), sync_start_date]
+    if company_uuid:
+        company_filter = "AND o.company_uuid = %s"
+        params.append(str(company_uuid))
+
+    query = f"""
+        INSERT INTO {table} AS h
+            (product_uuid, product_name, company_uuid, date, quantity_sold, revenue, updated_at, is_deleted, deleted_at)
+        SELECT
+            oi.product_uuid,
+            max(oi.product_name),
             o.company_uuid,
-            o.created_at::date as sale_date,
-            SUM(oi.quantity) as total_qty,
-            SUM(oi.subtotal) as total_revenue
+            o.created_at::date AS sale_date,
+            SUM(oi.quantity),
+            SUM(oi.subtotal),
+            %s, false, NULL
         FROM pos.sales_order o
         JOIN pos.sales_orderitem oi ON o.id = oi.order_id
-        WHERE o.status = 'completed' 
+        WHERE o.status = 'completed'
         AND o.created_at >= %s
+        {company_filter}
+        GROUP BY oi.product_uuid, o.company_uuid, sale_date
+        ON CONFLICT (product_uuid, date, company_uuid) DO UPDATE SET
+            product_name = EXCLUDED.product_name,
+            quantity_sold = EXCLUDED.quantity_sold,
+            revenue = EXCLUDED.revenue,
+            updated_at = EXCLUDED.updated_at,
+            is_deleted = false,
+            deleted_at = NULL
+        WHERE (h.product_name, h.quantity_sold, h.revenue, h.deleted_at)
+            IS DISTINCT FROM (EXCLUDED.product_name, EXCLUDED.quantity_sold, EXCLUDED.revenue, NULL)
     """
-    params = [sync_start_date]
-    
-    if company_uuid:
-        query += " AND o.company_uuid = %s"
-        params.append(str(company_uuid))
-        
-    query += " GROUP BY oi.product_uuid, oi.product_name, o.company_uuid, sale_date"
-    
+
     try:
         with connection.cursor() as cursor:
             cursor.execute(query, params)
-            rows = cursor.fetchall()
-            
-            for row in rows:
-                prod_id, prod_name, comp_id, sale_date, qty, revenue = row
-                
-                SalesHistory.objects.update_or_create(
-                    product_uuid=prod_id,
-                    date=sale_date,
-                    company_uuid=comp_id,
-                    defaults={
-                        'product_name': prod_name,
-                        'quantity_sold': qty,
-                        'revenue': revenue
-                    }
-                )
-        
-        logger.info(f"Successfully synced {len(rows)} sales history records.")
-        return f"Synced {len(rows)} records"
+            synced = cursor.rowcount
+
+        logger.info(f"Successfully synced {synced} sales history records.")
+        return f"Synced {synced} records"
     except Exception as e:
         logger.error(f"Sync failed: {str(e)}")
         return f"Error: {str(e)}"
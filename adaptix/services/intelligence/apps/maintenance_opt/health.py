@@ -0,0 +1,174 @@
+"""
+Incremental asset health statistics.
+
+HealthState keeps, per asset and metric, a Welford mean/variance (count,
+mean, M2), an EWMA and EW variance (kept as the EWMA of the squares) and
+the running maximum, in NumPy arrays whose row i
+belongs to asset_ids[i]. update() folds a batch of new readings into it
+with grouped array operations (Chan's parallel merge for the variance),
+so a run costs O(new readings), whatever the history or number of assets.
+
+    state = HealthState.from_bytes(record.state)
+    batch = state.update(asset_ids, values)   # values: (readings, len(METRICS)), NaN = missing
+    findings = detect(state, batch)
+"""
+import io
+import numpy as np
+
+METRICS = ('temperature', 'vibration')
+EWMA_ALPHA = 0.1
+
+# Detection rules (risk points): temperature spike in the new readings,
+# unstable vibration (EW standard deviation, so it holds across runs that
+# bring one or two readings each), and a metric's recent level (EWMA)
+# drifting from its baseline
+TEMP_LIMIT = 80.0
+VIBRATION_STD_LIMIT = 0.5
+DRIFT_Z = 3.0
+DRIFT_MIN_COUNT = 30
+RISK_TEMP, RISK_VIBRATION, RISK_DRIFT = 40, 50, 30
+
+
+class HealthState:
+    ARRAYS = ('count', 'mean', 'm2', 'ewma', 'ewsq', 'peak')
+
+    def __init__(self, asset_ids=(), **arrays):
+        self.asset_ids = [str(a) for a in asset_ids]
+        self.index = {asset_id: i for i, asset_id in enumerate(self.asset_ids)}
+        shape = (len(self.asset_ids), len(METRICS))
+        self.count = arrays.get('count', np.zeros(shape))
+        self.mean = arrays.get('mean', np.zeros(shape))
+        self.m2 = arrays.get('m2', np.zeros(shape))
+        self.ewma = arrays.get('ewma', np.full(shape, np.nan))
+        # States saved before ewsq existed start with an EW variance of 0
+        self.ewsq = arrays.get('ewsq', self.ewma ** 2)
+        self.peak = arrays.get('peak', np.full(shape, -np.inf))
+
+    @classmethod
+    def from_bytes(cls, data):
+        if not data:
+            return cls()
+        with np.load(io.BytesIO(bytes(data))) as stored:
+            return cls(stored['asset_ids'].tolist(), **{name: stored[name] for name in cls.ARRAYS if name in stored})
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, asset_ids=np.array(self.asset_ids, dtype=str),
+                            **{name: getattr(self, name) for name in self.ARRAYS})
+        return buffer.getvalue()
+
+    def rows(self, asset_ids):
+        """Row of each asset, adding rows for assets not seen before."""
+        new = [a for a in dict.fromkeys(str(a) for a in asset_ids) if a not in self.index]
+        if new:
+            for asset_id in new:
+                self.index[asset_id] = len(self.asset_ids)
+                self.asset_ids.append(asset_id)
+            extra = (len(new), len(METRICS))
+            self.count = np.vstack([self.count, np.zeros(extra)])
+            self.mean = np.vstack([self.mean, np.zeros(extra)])
+            self.m2 = np.vstack([self.m2, np.zeros(extra)])
+            self.ewma = np.vstack([self.ewma, np.full(extra, np.nan)])
+            self.ewsq = np.vstack([self.ewsq, np.full(extra, np.nan)])
+            self.peak = np.vstack([self.peak, np.full(extra, -np.inf)])
+        return np.array([self.index[str(a)] for a in asset_ids], dtype=int)
+
+    def std(self, rows=slice(None)):
+        count = self.count[rows]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(count > 1, np.sqrt(self.m2[rows] / (count - 1)), np.nan)
+
+    def ew_std(self, rows=slice(None)):
+        """Exponentially weighted standard deviation, the spread around the EWMA."""
+        with np.errstate(invalid='ignore'):
+            return np.where(self.count[rows] > 1, np.sqrt(np.maximum(self.ewsq[rows] - self.ewma[rows] ** 2, 0)), np.nan)
+
+    def update(self, asset_ids, values):
+        """
+        Folds readings in (asset_ids[i] with values[i], oldest first). Returns
+        the batch's own statistics for the assets it touched:
+        {"rows", "count", "max"}, each metric in a column.
+        """
+        values = np.asarray(values, dtype=float).reshape(len(asset_ids), len(METRICS))
+        touched, group = np.unique(self.rows(asset_ids), return_inverse=True)
+        groups = len(touched)
+        batch = {
+            "rows": touched,
+            "count": np.zeros((groups, len(METRICS))),
+            "max": np.full((groups, len(METRICS)), np.nan),
+        }
+        for j in range(len(METRICS)):
+            valid = ~np.isnan(values[:, j])
+            if not valid.any():
+                continue
+            x, g = values[valid, j], group[valid]
+            n_b = np.bincount(g, minlength=groups).astype(float)
+            has = n_b > 0
+            mean_b = np.divide(np.bincount(g, weights=x, minlength=groups), n_b, out=np.zeros(groups), where=has)
+            m2_b = np.bincount(g, weights=(x - mean_b[g]) ** 2, minlength=groups)
+            max_b = np.full(groups, -np.inf)
+            np.maximum.at(max_b, g, x)
+
+            # Welford / Chan merge of the batch into the running statistics
+            n_a, mean_a, m2_a = self.count[touched, j], self.mean[touched, j], self.m2[touched, j]
+            total = n_a + n_b
+            delta = mean_b - mean_a
+            share = np.divide(n_b, total, out=np.zeros(groups), where=total > 0)
+            self.mean[touched, j] = np.where(has, mean_a + delta * share, mean_a)
+            self.m2[touched, j] = np.where(has, m2_a + m2_b + delta ** 2 * n_a * share, m2_a)
+            self.count[touched, j] = total
+            self.peak[touched, j] = np.maximum(self.peak[touched, j], max_b)
+
+            # EWMA over the batch in order: reading r of an asset's n weighs alpha * (1 - alpha) ** (n - 1 - r)
+            order = np.argsort(g, kind='stable')
+            starts = np.cumsum(n_b) - n_b
+            rank = np.arange(len(g)) - starts[g[order]]
+            weights = EWMA_ALPHA * (1 - EWMA_ALPHA) ** (n_b[g[order]] - 1 - rank)
+            recent = np.bincount(g[order], weights=weights * x[order], minlength=groups)
+            recent_sq = np.bincount(g[order], weights=weights * x[order] ** 2, minlength=groups)
+            first = np.full(groups, np.nan)
+            first[has] = x[order][starts[has].astype(int)]
+            previous = self.ewma[touched, j]
+            previous_sq = np.where(np.isnan(previous), first ** 2, self.ewsq[touched, j])
+            previous = np.where(np.isnan(previous), first, previous)
+            decay = (1 - EWMA_ALPHA) ** n_b
+            self.ewma[touched, j] = np.where(has, previous * decay + recent, self.ewma[touched, j])
+            self.ewsq[touched, j] = np.where(has, previous_sq * decay + recent_sq, self.ewsq[touched, j])
+
+            batch["count"][:, j] = n_b
+            batch["max"][:, j] = np.where(has, max_b, np.nan)
+        return batch
+
+
+def detect(state, batch):
+    """[{"asset_id", "risk_score", "anomaly_type", "reasons"}] for the touched assets with any risk."""
+    rows = batch["rows"]
+    temp, vib = METRICS.index('temperature'), METRICS.index('vibration')
+    with np.errstate(invalid='ignore'):
+        hot = batch["max"][:, temp] > TEMP_LIMIT
+        vibration_std = state.ew_std(rows)[:, vib]
+        unstable = vibration_std > VIBRATION_STD_LIMIT
+        z = np.abs(state.ewma[rows] - state.mean[rows]) / state.std(rows)
+        drifting = (state.count[rows] >= DRIFT_MIN_COUNT) & (z > DRIFT_Z)
+    risk = RISK_TEMP * hot + RISK_VIBRATION * unstable + RISK_DRIFT * drifting.any(axis=1)
+
+    findings = []
+    for i in np.flatnonzero(risk > 0).tolist():
+        reasons, types = [], []
+        if hot[i]:
+            reasons.append(f"Critical temperature spike detected: {batch['max'][i, temp]:.1f}C")
+            types.append("Overheating")
+        if unstable[i]:
+            reasons.append(f"Abnormal vibration pattern (StdDev: {vibration_std[i]:.2f})")
+            types.append("Mechanical Instability")
+        for j in np.flatnonzero(drifting[i]).tolist():
+            reasons.append(f"{METRICS[j].capitalize()} drifting from baseline "
+                           f"(recent {state.ewma[rows[i], j]:.2f} vs mean {state.mean[rows[i], j]:.2f}, z={z[i, j]:.1f})")
+            types.append("Drift")
+        findings.append({
+            "asset_id": state.asset_ids[rows[i]],
+            "risk_score": int(min(risk[i], 100)),
+            "anomaly_type": types[0] if len(types) == 1 else "Multiple Anomalies",
+            "reasons": reasons,
+        })
+    return findings
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:04
+
+from django.db import migrations, models
+
+
+def resolve_duplicate_open_anomalies(apps, schema_editor):
+    # Keep the latest open anomaly per asset so the unique constraint can be added
+    MaintenanceAnomaly = apps.get_model('maintenance_opt', 'MaintenanceAnomaly')
+    seen = set()
+    stale = []
+    for pk, company_uuid, asset_id in MaintenanceAnomaly.objects.filter(is_resolved=False).order_by(
+        '-analysis_date'
+    ).values_list('id', 'company_uuid', 'asset_id'):
+        if (company_uuid, asset_id) in seen:
+            stale.append(pk)
+        seen.add((company_uuid, asset_id))
+    MaintenanceAnomaly.objects.filter(id__in=stale).update(is_resolved=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance_opt', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetHealthState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=64, unique=True)),
+                ('watermark', models.DateTimeField(blank=True, null=True)),
+                ('state', models.BinaryField(default=bytes)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(resolve_duplicate_open_anomalies, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='maintenanceanomaly',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_resolved', False)), fields=('company_uuid', 'asset_id'), name='maintenance_anomaly_open_per_asset'),
+        ),
+    ]
@@ -26,6 +26,26 @@ class MaintenanceAnomaly(models.Model):
     class Meta:
         ordering = ['-analysis_date']
         verbose_name_plural = "Maintenance Anomalies"
+        constraints = [
+            # One open anomaly per asset; analyze_asset_health upserts into it
+            models.UniqueConstraint(fields=['company_uuid', 'asset_id'], condition=models.Q(is_resolved=False),
+                                    name='maintenance_anomaly_open_per_asset'),
+        ]
 
     def __str__(self):
         return f"Anomaly for {self.asset_id} - Score: {self.risk_score}"
+
+
+class AssetHealthState(models.Model):
+    """
+    Incremental state of analyze_asset_health for one scope (a company, or
+    'all'): the running per-asset statistics (see health.HealthState, stored
+    as compressed NumPy arrays) and the telemetry watermark they cover.
+    """
+    scope = models.CharField(max_length=64, unique=True)
+    watermark = models.DateTimeField(null=True, blank=True)
+    state = models.BinaryField(default=bytes)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Asset health state ({self.scope}) up to {self.watermark}"
@@ -1,104 +1,145 @@
-import pandas as pd
+import uuid
+from datetime import timedelta
+from functools import partial
 import numpy as np
 from celery import shared_task
-from django.db import connection
-from apps.maintenance_opt.models import MaintenanceAnomaly
-from datetime import datetime, timedelta
+from django.db import connection, transaction
+from django.utils import timezone
+from apps.maintenance_opt.health import METRICS, HealthState, detect
+from apps.maintenance_opt.models import AssetHealthState, MaintenanceAnomaly
 import logging
 from adaptix_core.messaging import publish_event
 
 logger = logging.getLogger(__name__)
 
+# First run of a scope starts this far back
+INITIAL_WINDOW = timedelta(hours=24)
+# The watermark follows ingested_at (when the row was stored), not the device
+# timestamp, so buffered or backfilled readings are analysed however old they
+# are. Rows stored more recently than this are left for the next run, so
+# transactions still in flight are not skipped.
+WATERMARK_LAG = timedelta(seconds=30)
+MAINTENANCE_RISK = 40
+
+
+def fetch_new_telemetry(since, until, company_uuid=None):
+    """
+    Asset ids and (readings, len(METRICS)) values of the telemetry stored in
+    (since, until], oldest reading first.
+    """
+    query = f"SELECT t.asset_id, {', '.join(f't.{m}' for m in METRICS)} FROM asset.assets_assettelemetry t"
+    params = [since, until]
+    if company_uuid:
+        query += " JOIN asset.assets_asset a ON t.asset_id = a.id"
+    # The ingested_at index keeps this proportional to the new rows
+    query += " WHERE t.ingested_at > %s AND t.ingested_at <= %s"
+    if company_uuid:
+        query += " AND a.company_uuid = %s"
+        params.append(str(company_uuid))
+    query += " ORDER BY t.timestamp"
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+    if not rows:
+        return [], np.empty((0, len(METRICS)))
+    return [str(row[0]) for row in rows], np.array([row[1:] for row in rows], dtype=float)
+
+
+def fetch_assets(asset_ids):
+    """{asset_id: (company_uuid, name)} for the given assets."""
+    if not asset_ids:
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT id, company_uuid, name FROM asset.assets_asset WHERE id = ANY(%s::uuid[])",
+                       [list(asset_ids)])
+        return {str(pk): (str(company), name) for pk, company, name in cursor.fetchall()}
+
+
+def upsert_anomalies(findings, assets):
+    """
+    One INSERT ... ON CONFLICT for every finding: the asset's open anomaly is
+    updated, or created if it has none. Returns {asset_id: anomaly id}.
+    """
+    rows = [f for f in findings if f["asset_id"] in assets]
+    if not rows:
+        return {}
+    now = timezone.now()
+    table = connection.ops.quote_name(MaintenanceAnomaly._meta.db_table)
+    values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, false)"] * len(rows))
+    params = []
+    for finding in rows:
+        params += [
+            uuid.uuid4(), assets[finding["asset_id"]][0], finding["asset_id"], now, finding["risk_score"],
+            finding["risk_score"] / 100.0, finding["anomaly_type"], " | ".join(finding["reasons"]),
+        ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (id, company_uuid, asset_id, analysis_date, risk_score, failure_probability, "
+            f"anomaly_type, reasoning, is_resolved) VALUES {values} "
+            f"ON CONFLICT (company_uuid, asset_id) WHERE NOT is_resolved DO UPDATE SET "
+            f"risk_score = EXCLUDED.risk_score, failure_probability = EXCLUDED.failure_probability, "
+            f"anomaly_type = EXCLUDED.anomaly_type, reasoning = EXCLUDED.reasoning "
+            f"RETURNING asset_id, id",
+            params
+        )
+        return {str(asset_id): pk for asset_id, pk in cursor.fetchall()}
+
+
+def publish_maintenance_requests(requests):
+    publish_event("events", "intelligence.maintenance.requested", {
+        "event": "intelligence.maintenance.requested",
+        "count": len(requests),
+        "requests": requests,
+    })
+    logger.info(f"Published {len(requests)} maintenance request(s)")
+
+
 @shared_task(name="maintenance_opt.analyze_asset_health")
 def analyze_asset_health(company_uuid=None):
     """
     Analyzes Asset Telemetry to detect anomalies and predict maintenance needs.
+    Incremental: only telemetry stored since the scope's watermark is read and
+    folded into the per-asset running statistics (see health.py); anomalies
+    are upserted in bulk and all maintenance requests of the run go out as one
+    `intelligence.maintenance.requested` event with a "requests" list.
     """
     logger.info(f"Starting asset health analysis. Company: {company_uuid}")
-    
-    # 1. Fetch recent telemetry from asset schema
-    # Joining with assets to get metadata
-    query = """
-        SELECT t.asset_id, t.temperature, t.vibration, t.power_usage, t.usage_hours, t.timestamp,
-               a.company_uuid, a.name as asset_name
-        FROM asset.assets_assettelemetry t
-        JOIN asset.assets_asset a ON t.asset_id = a.id
-        WHERE t.timestamp > NOW() - INTERVAL '24 hours'
-    """
-    
-    if company_uuid:
-        query += " AND a.company_uuid = %s"
-        df = pd.read_sql(query, connection, params=[str(company_uuid)])
-    else:
-        df = pd.read_sql(query, connection)
-
-    if df.empty:
-        logger.warning("No telemetry data found for analysis.")
-        return "No telemetry data"
-
-    # 2. Group by asset for analysis
-    results = []
-    for asset_id, group in df.groupby('asset_id'):
-        comp_id = group['company_uuid'].iloc[0]
-        asset_name = group['asset_name'].iloc[0]
-        
-        # Simple AI/Heuristic Logic:
-        # A) Temperature Anomaly: Temp > 80C
-        # B) Vibration Anomaly: Std Dev of vibration > 0.5 (indicates instability)
-        # C) Usage Pattern: RUL prediction based on trend
-        
-        max_temp = group['temperature'].max()
-        avg_vib = group['vibration'].mean()
-        std_vib = group['vibration'].std()
-        
-        risk_score = 0
-        reasons = []
-        anomaly_type = ""
-
-        if max_temp > 80:
-            risk_score += 40
-            reasons.append(f"Critical temperature spike detected: {max_temp:.1f}C")
-            anomaly_type = "Overheating"
-            
-        if std_vib > 0.5:
-            risk_score += 50
-            reasons.append(f"Abnormal vibration pattern (StdDev: {std_vib:.2f})")
-            anomaly_type = "Mechanical Instability" if not anomaly_type else "Multiple Anomalies"
-
-        if risk_score > 0:
-            # Save anomaly findings
-            reason_text = " | ".join(reasons)
-            anomaly, created = MaintenanceAnomaly.objects.update_or_create(
-                company_uuid=comp_id,
-                asset_id=asset_id,
-                is_resolved=False,
-                defaults={
-                    'risk_score': min(risk_score, 100),
-                    'failure_probability': float(risk_score / 100.0),
-                    'anomaly_type': anomaly_type,
-                    'reasoning': reason_text
-                }
-            )
-            
-            # 3. Publish Maintenance Requested event if risk is high
-            if risk_score >= 40:
-                event_payload = {
-                    "event": "intelligence.maintenance.requested",
-                    "asset_id": str(asset_id),
-                    "asset_name": asset_name,
-                    "company_uuid": str(comp_id),
-                    "risk_score": risk_score,
-                    "anomaly_type": anomaly_type,
-                    "reasoning": reason_text,
-                    "suggested_priority": "high" if risk_score >= 80 else "medium",
-                    "suggestion_id": str(anomaly.id)
-                }
-                try:
-                    publish_event("events", "intelligence.maintenance.requested", event_payload)
-                    logger.info(f"Published maintenance request for {asset_name}")
-                except Exception as e:
-                    logger.error(f"Failed to publish event: {e}")
-
-        results.append({"asset": asset_name, "risk": risk_score})
-
-    return f"Analyzed {len(results)} assets. Found {len([r for r in results if r['risk'] > 0])} anomalies."
+    scope = str(company_uuid) if company_uuid else 'all'
+    until = timezone.now() - WATERMARK_LAG
+
+    with transaction.atomic():
+        AssetHealthState.objects.get_or_create(scope=scope)
+        record = AssetHealthState.objects.select_for_update().get(scope=scope)
+        since = record.watermark or until - INITIAL_WINDOW
+        if since >= until:
+            return "No new telemetry"
+        asset_ids, values = fetch_new_telemetry(since, until, company_uuid)
+        record.watermark = until
+        if not asset_ids:
+            record.save(update_fields=['watermark', 'updated_at'])
+            logger.info("No new telemetry since the last analysis.")
+            return "No new telemetry"
+
+        state = HealthState.from_bytes(record.state)
+        batch = state.update(asset_ids, values)
+        findings = detect(state, batch)
+        assets = fetch_assets([f["asset_id"] for f in findings])
+        anomaly_ids = upsert_anomalies(findings, assets)
+        record.state = state.to_bytes()
+        record.save()
+
+        requests = [{
+            "asset_id": f["asset_id"],
+            "asset_name": assets[f["asset_id"]][1],
+            "company_uuid": assets[f["asset_id"]][0],
+            "risk_score": f["risk_score"],
+            "anomaly_type": f["anomaly_type"],
+            "reasoning": " | ".join(f["reasons"]),
+            "suggested_priority": "high" if f["risk_score"] >= 80 else "medium",
+            "suggestion_id": str(anomaly_ids[f["asset_id"]]),
+        } for f in findings if f["risk_score"] >= MAINTENANCE_RISK and f["asset_id"] in anomaly_ids]
+        if requests:
+            transaction.on_commit(partial(publish_maintenance_requests, requests))
+
+    return (f"Analyzed {len(batch['rows'])} assets from {len(asset_ids)} new readings. "
+            f"Found {len(findings)} anomalies.")
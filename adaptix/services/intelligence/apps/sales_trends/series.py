@@ -0,0 +1,110 @@
+"""
+Per-company daily revenue series for the sales trend widget.
+
+The last WINDOW_DAYS of SalesHistory are kept in the cache as a DataFrame
+(one row per day, one column per product). A refresh only reads the rows
+updated since the previous one and splices them in, so a dashboard load
+costs a cache read plus, at most every SALES_TRENDS_REFRESH_SECONDS, a
+small indexed query.
+"""
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from apps.forecasts.models import SalesHistory
+
+# Two 30-day periods for the growth rate and the movers
+PERIOD_DAYS = 30
+WINDOW_DAYS = 2 * PERIOD_DAYS
+SPARKLINE_DAYS = 7
+TOP_MOVERS = 3
+# Re-read rows updated this long before the watermark, so rows committed late are not missed
+UPDATE_OVERLAP = timedelta(seconds=60)
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _rows(company_uuid, since_date, updated_after=None):
+    # all_objects: a soft-deleted row must replace its old value with zero
+    queryset = SalesHistory.all_objects.filter(company_uuid=company_uuid, date__gte=since_date)
+    if updated_after is not None:
+        queryset = queryset.filter(updated_at__gt=updated_after)
+    return pd.DataFrame.from_records(
+        queryset.values_list('date', 'product_uuid', 'product_name', 'revenue', 'deleted_at'),
+        columns=['date', 'product', 'name', 'revenue', 'deleted_at'],
+    )
+
+
+def _pivot(rows):
+    if rows.empty:
+        return pd.DataFrame(dtype=float)
+    revenue = rows['revenue'].astype(float).where(rows['deleted_at'].isna(), 0.0)
+    return pd.DataFrame({
+        'date': pd.to_datetime(rows['date']), 'product': rows['product'].astype(str), 'revenue': revenue,
+    }).pivot_table(index='date', columns='product', values='revenue', aggfunc='sum')
+
+
+def load_series(company_uuid, today=None):
+    """(daily revenue DataFrame indexed by the last WINDOW_DAYS days, {product: name})."""
+    today = today or timezone.localdate()
+    start = today - timedelta(days=WINDOW_DAYS - 1)
+    key = f"sales_trends:{company_uuid}"
+    now = timezone.now()
+    entry = cache.get(key)
+
+    if entry is None:
+        rows = _rows(company_uuid, start)
+        entry = {'frame': _pivot(rows), 'names': {}, 'watermark': now, 'checked_at': now}
+    elif now - entry['checked_at'] >= timedelta(seconds=settings.SALES_TRENDS_REFRESH_SECONDS):
+        rows = _rows(company_uuid, start, entry['watermark'] - UPDATE_OVERLAP)
+        if not rows.empty:
+            entry['frame'] = _pivot(rows).combine_first(entry['frame'])
+        entry['watermark'] = entry['checked_at'] = now
+    else:
+        rows = None
+
+    if rows is not None:
+        if not rows.empty:
+            entry['names'].update(zip(rows['product'].astype(str), rows['name']))
+        # Whole window, oldest days dropped, missing days as zero sales
+        entry['frame'] = entry['frame'].reindex(pd.date_range(start, today), fill_value=0.0).fillna(0.0)
+        cache.set(key, entry, CACHE_TIMEOUT)
+    return entry['frame'], entry['names']
+
+
+def trends(frame, names):
+    """The widget payload for a series from load_series()."""
+    daily = frame.sum(axis=1).to_numpy()
+    current, previous = daily[-PERIOD_DAYS:].sum(), daily[:-PERIOD_DAYS].sum()
+    growth_rate = (current - previous) / previous * 100 if previous > 0 else 0
+
+    by_product = frame.to_numpy()
+    product_current = by_product[-PERIOD_DAYS:].sum(axis=0)
+    product_previous = by_product[:-PERIOD_DAYS].sum(axis=0)
+    # Products new this period have no change to rank
+    sold_before = product_previous > 0
+    change = np.zeros(len(frame.columns))
+    change[sold_before] = (product_current[sold_before] - product_previous[sold_before]) / product_previous[sold_before] * 100
+    order = np.flatnonzero(sold_before)[np.argsort(-change[sold_before], kind='stable')][:TOP_MOVERS]
+
+    return {
+        "status": "success",
+        "summary": {
+            "total_sales_30d": int(current),
+            "growth_rate": round(float(growth_rate), 1),
+            "trend_direction": "up" if growth_rate > 0 else "down",
+        },
+        "sparkline": [
+            {"date": day.strftime('%a'), "sales": int(sales)}  # Mon, Tue...
+            for day, sales in zip(frame.index[-SPARKLINE_DAYS:], daily[-SPARKLINE_DAYS:])
+        ],
+        "top_movers": [
+            {
+                "name": names.get(frame.columns[i], ''),
+                "change": int(round(change[i])),
+                "trend": "up" if change[i] > 0 else "down",
+            }
+            for i in order.tolist()
+        ],
+    }
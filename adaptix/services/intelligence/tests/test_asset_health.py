@@ -0,0 +1,105 @@
+import pytest
+import uuid
+from datetime import timedelta
+import numpy as np
+from django.db import connection
+from django.utils import timezone
+from apps.maintenance_opt import tasks
+from apps.maintenance_opt.health import EWMA_ALPHA, HealthState, detect
+from apps.maintenance_opt.models import AssetHealthState, MaintenanceAnomaly
+
+
+def test_batched_updates_match_full_history_statistics():
+    rng = np.random.default_rng(3)
+    assets = rng.choice(["a", "b", "c"], size=300).tolist()
+    values = rng.normal(50, 5, size=(300, 2))
+    values[rng.random(300) < 0.1, 1] = np.nan
+
+    state = HealthState()
+    for start in range(0, 300, 70):
+        state = HealthState.from_bytes(state.to_bytes())
+        state.update(assets[start:start + 70], values[start:start + 70])
+
+    for asset in ("a", "b", "c"):
+        row = state.index[asset]
+        for j in range(2):
+            x = values[[i for i, a in enumerate(assets) if a == asset], j]
+            x = x[~np.isnan(x)]
+            ewma, ewvar = x[0], 0.0
+            for value in x[1:]:
+                diff = value - ewma
+                ewma += EWMA_ALPHA * diff
+                ewvar = (1 - EWMA_ALPHA) * (ewvar + EWMA_ALPHA * diff ** 2)
+            assert state.count[row, j] == len(x)
+            assert state.mean[row, j] == pytest.approx(x.mean())
+            assert state.std(row)[j] == pytest.approx(x.std(ddof=1))
+            assert state.peak[row, j] == x.max()
+            assert state.ewma[row, j] == pytest.approx(ewma)
+            assert state.ew_std(row)[j] == pytest.approx(np.sqrt(ewvar))
+
+
+def test_unstable_vibration_is_caught_one_reading_per_run():
+    state = HealthState()
+    findings = []
+    for vibration in [0.2, 0.3, 0.2, 2.4, 0.1, 2.6]:
+        findings = detect(state, state.update(["shaky"], [[50, vibration]]))
+    assert [f["anomaly_type"] for f in findings] == ["Mechanical Instability"]
+
+
+@pytest.mark.django_db
+def test_only_new_telemetry_is_analysed_and_requests_are_batched(mocker, django_capture_on_commit_callbacks):
+    company = str(uuid.uuid4())
+    hot, shaky, calm = (str(uuid.uuid4()) for _ in range(3))
+    batches = [
+        ([hot, shaky, shaky, calm], [[95, 0.2], [50, 0.1], [50, 2.5], [45, 0.2]]),
+        ([hot], [[99, 0.2]]),
+    ]
+    fetch = mocker.patch.object(tasks, "fetch_new_telemetry", side_effect=[
+        (ids, np.array(values, dtype=float)) for ids, values in batches
+    ])
+    mocker.patch.object(tasks, "fetch_assets", side_effect=lambda ids: {a: (company, f"Asset {a[:4]}") for a in ids})
+    publish = mocker.patch.object(tasks, "publish_event")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert tasks.analyze_asset_health(company) == "Analyzed 3 assets from 4 new readings. Found 2 anomalies."
+    [(_, routing_key, payload)] = [c.args for c in publish.call_args_list]
+    assert routing_key == "intelligence.maintenance.requested"
+    assert {r["asset_id"]: r["anomaly_type"] for r in payload["requests"]} == {hot: "Overheating", shaky: "Mechanical Instability"}
+
+    first_watermark = AssetHealthState.objects.get(scope=company).watermark
+    with django_capture_on_commit_callbacks(execute=True):
+        tasks.analyze_asset_health(company)
+    # The second run starts where the first stopped and updates the open anomaly in place
+    assert fetch.call_args_list[1].args[0] == first_watermark
+    assert MaintenanceAnomaly.objects.filter(asset_id=hot, is_resolved=False).count() == 1
+    assert "99.0C" in MaintenanceAnomaly.objects.get(asset_id=hot).reasoning
+    assert publish.call_count == 2
+
+
+@pytest.mark.django_db
+def test_late_readings_behind_the_watermark_are_analysed(mocker):
+    company, pump = uuid.uuid4(), uuid.uuid4()
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE SCHEMA IF NOT EXISTS asset")
+        cursor.execute("CREATE TABLE asset.assets_asset (id uuid, company_uuid uuid, name text)")
+        cursor.execute("CREATE TABLE asset.assets_assettelemetry (asset_id uuid, timestamp timestamptz, "
+                       "ingested_at timestamptz, temperature numeric, vibration numeric, power_usage numeric, "
+                       "usage_hours numeric)")
+        cursor.execute("INSERT INTO asset.assets_asset VALUES (%s, %s, 'Pump')", [pump, company])
+        cursor.execute("INSERT INTO asset.assets_assettelemetry VALUES (%s, %s, %s, 50, 0.2, 300, 1)",
+                       [pump, now - timedelta(minutes=5), now - timedelta(minutes=5)])
+    mocker.patch.object(tasks, "publish_event")
+
+    tasks.analyze_asset_health(company)
+    watermark = AssetHealthState.objects.get(scope=str(company)).watermark
+    assert watermark > now - timedelta(minutes=5)
+
+    # A device flushes a buffered reading taken well before the watermark
+    with connection.cursor() as cursor:
+        cursor.execute("INSERT INTO asset.assets_assettelemetry VALUES (%s, %s, %s, 99, 0.2, 300, 1)",
+                       [pump, now - timedelta(hours=2), watermark + timedelta(seconds=1)])
+    mocker.patch.object(tasks.timezone, "now", return_value=now + timedelta(minutes=1))
+
+    assert tasks.analyze_asset_health(company) == "Analyzed 1 assets from 1 new readings. Found 1 anomalies."
+    assert "99.0C" in MaintenanceAnomaly.objects.get(asset_id=pump).reasoning
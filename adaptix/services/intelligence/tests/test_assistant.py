@@ -0,0 +1,55 @@
+import pytest
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.utils import timezone
+from apps.assistant.nlp_engine import NLPEngine
+from apps.assistant.tasks import warm_answers
+from apps.forecasts.models import SalesHistory
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def sold(company_uuid, name, quantity, days_ago=0):
+    SalesHistory.objects.create(
+        company_uuid=company_uuid, product_uuid=uuid.uuid5(uuid.NAMESPACE_OID, name), product_name=name,
+        date=timezone.localdate() - timedelta(days=days_ago), quantity_sold=Decimal(quantity),
+    )
+
+
+@pytest.mark.django_db
+def test_top_products_come_from_daily_aggregates_and_are_cached(django_assert_num_queries):
+    company = str(uuid.uuid4())
+    sold(company, "Tea", 5, days_ago=2)
+    sold(company, "Tea", 7)
+    sold(company, "Rice", 10)
+    sold(str(uuid.uuid4()), "Sugar", 100)
+
+    engine = NLPEngine(company)
+    assert engine.process_message("Show top selling products")["reply"] == (
+        "Your top 5 selling products are:\n1. Tea (12 units)\n2. Rice (10 units)"
+    )
+    with django_assert_num_queries(0):
+        NLPEngine(company).process_message("top products please")
+
+
+@pytest.mark.django_db
+def test_active_companies_are_prewarmed(mocker):
+    active, dormant = str(uuid.uuid4()), str(uuid.uuid4())
+    sold(active, "Tea", 1)
+    sold(dormant, "Tea", 1, days_ago=60)
+    lookups = {
+        intent: mocker.patch.object(NLPEngine, f"_get_{intent}", return_value={"reply": intent})
+        for intent in ("sales_summary", "staff_insights", "low_stock")
+    }
+    lookups["low_stock"].return_value = {"reply": "snag", "debug": "no such table"}
+
+    assert warm_answers() == "Warmed assistant answers for 1 companies."
+    assert NLPEngine(active).process_message("What are today's sales?") == {"reply": "sales_summary"}
+    assert NLPEngine(active).process_message("Is anyone late today?") == {"reply": "staff_insights"}
+    NLPEngine(active).process_message("Show me low stock items")
+    assert [lookup.call_count for lookup in lookups.values()] == [1, 1, 2]  # Failures are not cached
@@ -0,0 +1,53 @@
+import pytest
+import uuid
+from datetime import date
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+from apps.financial_anomalies import tasks
+from apps.financial_anomalies.detection import ENTRY_COLUMNS, duplicates
+from apps.financial_anomalies.models import FinancialAnomaly, FinancialDetectorState
+
+
+def entries(*rows):
+    return pd.DataFrame(
+        [(uuid.uuid4(), day, f"JV-{i}", float(amount), description, "Office Expenses")
+         for i, (day, amount, description) in enumerate(rows)],
+        columns=ENTRY_COLUMNS,
+    )
+
+
+def test_duplicates_match_amount_and_day():
+    df = entries(
+        (date(2026, 3, 1), 120.50, "paper"),
+        (date(2026, 3, 1), 120.50, "paper again"),
+        (date(2026, 3, 2), 120.50, "next day"),
+        (date(2026, 3, 1), 120.51, "one cent more"),
+    )
+    assert duplicates(df)["reference"].tolist() == ["JV-0", "JV-1"]
+
+
+@pytest.mark.django_db
+def test_only_new_entries_are_scored_with_the_cached_model(mocker):
+    company = str(uuid.uuid4())
+    day = date(2026, 3, 1)
+    history = np.random.default_rng(1).normal(200, 20, size=500).round(2)
+    first = entries((day, 210.25, "stationery"), (day, 90000, "x"), (day, 180.10, "taxi"))
+    second = entries((day, 180.10, "taxi twice"), (day, 205.75, "lunch"))
+
+    fetch_amounts = mocker.patch.object(tasks, "fetch_amounts", return_value=history)
+    stream = mocker.patch.object(tasks, "stream_entries", side_effect=[iter([first]), iter([second])])
+    mocker.patch.object(tasks, "stream_entries_on", side_effect=[iter([first]), iter([first, second])])
+
+    assert tasks.analyze_financial_anomalies(company) == "Scored 3 entries. Detected 2 new anomalies."
+    flagged = {(a.journal_reference, a.anomaly_type, a.severity) for a in FinancialAnomaly.objects.all()}
+    assert flagged == {("JV-1", "statistical_outlier", "high"), ("JV-1", "round_number", "low")}
+
+    watermark = FinancialDetectorState.objects.get(company_uuid=company).watermark
+    assert tasks.analyze_company_financials(company) == "Scored 2 entries. Detected 2 new anomalies."
+    # The second run starts at the first one's watermark and reuses its fitted model
+    assert stream.call_args_list[1].args[1] == watermark
+    assert fetch_amounts.call_count == 1
+    assert list(FinancialAnomaly.objects.filter(anomaly_type="duplicate_entry").values_list("amount", flat=True)) == [
+        Decimal("180.10"), Decimal("180.10")
+    ]
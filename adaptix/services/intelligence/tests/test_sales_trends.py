@@ -0,0 +1,87 @@
+import pytest
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+from apps.forecasts.models import SalesHistory
+from apps.sales_trends.views import SalesTrendView
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def get_trends(company_uuid):
+    request = APIRequestFactory().get("/api/intelligence/sales-trends/")
+    request.company_uuid = company_uuid
+    return SalesTrendView.as_view()(request)
+
+
+def sold(company_uuid, name, revenue, days_ago):
+    return SalesHistory.objects.create(
+        company_uuid=company_uuid, product_uuid=uuid.uuid5(uuid.NAMESPACE_OID, name), product_name=name,
+        date=timezone.localdate() - timedelta(days=days_ago), revenue=Decimal(revenue),
+    )
+
+
+@pytest.mark.django_db
+def test_trends_are_computed_from_sales_history_and_refreshed_incrementally(settings):
+    settings.SALES_TRENDS_REFRESH_SECONDS = 0
+    company = str(uuid.uuid4())
+    sold(company, "Latte", 100, days_ago=40)
+    sold(company, "Latte", 150, days_ago=1)
+    sold(company, "Muffin", 200, days_ago=45)
+    sold(company, "Muffin", 50, days_ago=0)
+    sold(company, "Bagel", 80, days_ago=3)  # New this month, no change to rank
+    sold(company, "Latte", 999, days_ago=61)  # Outside the window
+    sold(str(uuid.uuid4()), "Latte", 5000, days_ago=0)
+
+    data = get_trends(company).data
+    assert data["summary"] == {"total_sales_30d": 280, "growth_rate": -6.7, "trend_direction": "down"}
+    assert [day["sales"] for day in data["sparkline"]] == [0, 0, 0, 80, 0, 150, 50]
+    assert data["top_movers"] == [
+        {"name": "Latte", "change": 50, "trend": "up"},
+        {"name": "Muffin", "change": -75, "trend": "down"},
+    ]
+
+    # Later updates (including a soft delete) are spliced into the cached series
+    sold(company, "Latte", 120, days_ago=0)
+    SalesHistory.objects.get(product_name="Muffin", date=timezone.localdate()).delete()
+    data = get_trends(company).data
+    assert data["summary"]["total_sales_30d"] == 350
+    assert data["sparkline"][-1]["sales"] == 120
+
+
+@pytest.mark.django_db
+def test_trends_need_a_company():
+    assert get_trends(None).status_code == 400
+
+
+@pytest.mark.django_db
+def test_sync_upserts_only_changed_days():
+    from django.db import connection
+    from apps.forecasts.tasks import sync_sales_history
+    company, latte = uuid.uuid4(), uuid.uuid4()
+    today = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE SCHEMA IF NOT EXISTS pos")
+        cursor.execute("CREATE TABLE pos.sales_order (id int, company_uuid uuid, status text, created_at timestamptz)")
+        cursor.execute("CREATE TABLE pos.sales_orderitem (order_id int, product_uuid uuid, product_name text, "
+                       "quantity numeric, subtotal numeric)")
+        cursor.execute("INSERT INTO pos.sales_order VALUES (1, %s, 'completed', %s), (2, %s, 'completed', %s), "
+                       "(3, %s, 'cancelled', %s)", [company, today, company, today - timedelta(days=1), company, today])
+        cursor.execute("INSERT INTO pos.sales_orderitem VALUES (1, %s, 'Latte', 2, 9), (2, %s, 'Latte', 1, 4.5), "
+                       "(3, %s, 'Latte', 5, 20)", [latte, latte, latte])
+
+    assert sync_sales_history(days=2) == "Synced 2 records"
+    assert sync_sales_history(days=2) == "Synced 0 records"
+    SalesHistory.objects.get(date=today.date()).delete()
+    with connection.cursor() as cursor:
+        cursor.execute("UPDATE pos.sales_orderitem SET subtotal = 10 WHERE order_id = 1")
+    assert sync_sales_history(str(company), days=2) == "Synced 1 records"
+
+    revenue = dict(SalesHistory.objects.filter(company_uuid=company).values_list('date', 'revenue'))
+    assert revenue == {today.date(): Decimal("10"), today.date() - timedelta(days=1): Decimal("4.5")}
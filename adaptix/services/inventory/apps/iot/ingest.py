@@ -0,0 +1,292 @@
+"""
+Batch ingestion of IoT readings (shelf scales, thermometers).
+
+Shelf scales report every few seconds per shelf, so readings are handled per
+batch rather than per row:
+
+1. devices are resolved from an in-process cache keyed by device_id
+   (IOT_DEVICE_CACHE_SECONDS); saving a device or a shelf invalidates it
+2. each reading is authenticated with its device's api_key
+3. all readings are stored with one multi-row INSERT
+4. scale readings collapse to the latest one per shelf, and Stock is updated
+   once per batch with one UPDATE
+5. thermometer readings are checked against IOT_TEMP_MIN/IOT_TEMP_MAX in one
+   NumPy pass; a device raises at most one alert per IOT_ALERT_COOLDOWN_SECONDS
+
+Notifications are sent once the batch's transaction commits.
+
+    result = ingest_readings([{"device_id": "SCALE-01", "api_key": "...", "value": 12.5}])
+"""
+import hmac
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from functools import partial
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+from apps.stocks.models import Stock
+from apps.utils.notifications import NotificationService
+
+DEVICE_CACHE_SECONDS = getattr(settings, 'IOT_DEVICE_CACHE_SECONDS', 60)
+TEMP_MIN = getattr(settings, 'IOT_TEMP_MIN', 2.0)
+TEMP_MAX = getattr(settings, 'IOT_TEMP_MAX', 25.0)
+ALERT_COOLDOWN_SECONDS = getattr(settings, 'IOT_ALERT_COOLDOWN_SECONDS', 300)
+INSERT_CHUNK = 5000
+MAX_BATCH_SIZE = getattr(settings, 'IOT_MAX_BATCH_SIZE', 10000)
+
+DeviceInfo = namedtuple('DeviceInfo', [
+    'id', 'device_id', 'company_uuid', 'name', 'type', 'api_key', 'is_active', 'tare_weight',
+    'warehouse_id', 'warehouse_name', 'shelf_id', 'product_uuid',
+])
+Reading = namedtuple('Reading', ['device', 'value', 'unit', 'timestamp', 'metadata'])
+
+
+class DeviceCache:
+    """
+    device_id -> (expires_at, DeviceInfo). Only known devices are cached: the
+    batch endpoint is unauthenticated, so caching misses would let made-up ids
+    grow the cache without bound.
+    """
+
+    def __init__(self, ttl=DEVICE_CACHE_SECONDS):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, device_ids):
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            for device_id in device_ids:
+                entry = self._entries.get(device_id)
+                if entry is not None and entry[0] > now:
+                    found[device_id] = entry[1]
+                else:
+                    missing.append(device_id)
+        if missing:
+            loaded = load_devices(missing)
+            expires_at = now + self.ttl
+            with self._lock:
+                for device_id in missing:
+                    found[device_id] = loaded.get(device_id)
+                    if found[device_id] is None:
+                        self._entries.pop(device_id, None)
+                    else:
+                        self._entries[device_id] = (expires_at, found[device_id])
+        return found
+
+    def invalidate(self, device_id):
+        with self._lock:
+            self._entries.pop(device_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def load_devices(device_ids):
+    from .models import IoTDevice
+
+    rows = IoTDevice.objects.filter(device_id__in=list(device_ids)).values_list(
+        'id', 'device_id', 'company_uuid', 'name', 'type', 'api_key', 'is_active', 'tare_weight',
+        'warehouse_id', 'warehouse__name', 'shelf_id', 'shelf__product_uuid',
+    )
+    return {row[1]: DeviceInfo(*row) for row in rows}
+
+
+device_cache = DeviceCache()
+
+
+def _decimal(value):
+    try:
+        parsed = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+    return parsed if parsed.is_finite() else None
+
+
+def _timestamp(value, now):
+    if value in (None, ''):
+        return now
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+def authenticate(readings, api_key=None, cache=device_cache):
+    """
+    readings: [{"device_id", "api_key"?, "value", "unit"?, "timestamp"?, "metadata"?}]; a
+    reading without its own api_key uses the batch's. Returns (accepted Readings, rejected).
+    """
+    now = timezone.now()
+    items = [r if isinstance(r, dict) else {} for r in readings]
+    devices = cache.get_many({str(r.get('device_id')) for r in items if r.get('device_id')})
+    accepted, rejected = [], []
+    for index, item in enumerate(items):
+        device = devices.get(str(item.get('device_id'))) if item.get('device_id') else None
+        key = item.get('api_key') or api_key
+        if device is None or not device.is_active:
+            error = "Unknown or inactive device"
+        elif not device.api_key or not key or not hmac.compare_digest(str(device.api_key), str(key)):
+            error = "Invalid api_key"
+        elif (value := _decimal(item.get('value'))) is None:
+            error = "Invalid value"
+        else:
+            try:
+                timestamp = _timestamp(item.get('timestamp'), now)
+            except (TypeError, ValueError, OverflowError, OSError):
+                rejected.append({"index": index, "device_id": item.get('device_id'), "error": "Invalid timestamp"})
+                continue
+            metadata = item.get('metadata') if isinstance(item.get('metadata'), dict) else {}
+            accepted.append(Reading(device, value, str(item.get('unit') or 'unit')[:20], timestamp, metadata))
+            continue
+        rejected.append({"index": index, "device_id": item.get('device_id'), "error": error})
+    return accepted, rejected
+
+
+def ingest_readings(readings, api_key=None, cache=device_cache):
+    """
+    Authenticates, stores and applies a batch of readings.
+    Returns {"accepted", "rejected": [{"index", "device_id", "error"}], "stock_updates", "alerts"}.
+    """
+    accepted, rejected = authenticate(readings, api_key, cache)
+    result = {"accepted": len(accepted), "rejected": rejected, "stock_updates": 0, "alerts": 0}
+    if not accepted:
+        return result
+    with transaction.atomic():
+        insert_readings(accepted)
+        result.update(apply_readings(accepted))
+    return result
+
+
+def insert_readings(readings):
+    from .models import IoTReading
+
+    table = connection.ops.quote_name(IoTReading._meta.db_table)
+    encoder = DjangoJSONEncoder()
+    with connection.cursor() as cursor:
+        for start in range(0, len(readings), INSERT_CHUNK):
+            chunk = readings[start:start + INSERT_CHUNK]
+            values = ", ".join(["(%s, %s, %s, %s, %s)"] * len(chunk))
+            params = [
+                v for r in chunk
+                for v in (r.device.id, r.timestamp, r.value, r.unit, encoder.encode(r.metadata))
+            ]
+            cursor.execute(
+                f"INSERT INTO {table} (device_id, timestamp, value, unit, metadata) VALUES {values}",
+                params
+            )
+
+
+def send_notifications(notifications):
+    notify = NotificationService()
+    for event_type, data, company_uuid in notifications:
+        notify.send_notification(event_type=event_type, data=data, rooms=[str(company_uuid)])
+
+
+def apply_readings(readings):
+    """Stock and alert side effects of stored readings: {"stock_updates", "alerts"}."""
+    return {
+        "stock_updates": update_shelf_stock(readings),
+        "alerts": check_temperatures(readings),
+    }
+
+
+def latest_per_shelf(readings):
+    """{(company_uuid, warehouse_id, product_uuid): net quantity} from the newest scale reading of each shelf."""
+    latest = {}
+    for reading in readings:
+        device = reading.device
+        if device.type != 'scale' or not device.shelf_id or not device.product_uuid:
+            continue
+        current = latest.get(device.shelf_id)
+        if current is None or reading.timestamp >= current.timestamp:
+            latest[device.shelf_id] = reading
+    quantities = {}
+    for reading in latest.values():
+        device = reading.device
+        # No unit weight is known yet: 1 kg counts as 1 unit
+        net_weight = max(reading.value - Decimal(device.tare_weight), Decimal(0))
+        quantities[(device.company_uuid, device.warehouse_id, device.product_uuid)] = net_weight
+    return quantities
+
+
+def update_shelf_stock(readings):
+    """One read and one UPDATE for all shelves of the batch; returns the number of stock rows changed."""
+    quantities = latest_per_shelf(readings)
+    if not quantities:
+        return 0
+    stocks = {}
+    for stock in Stock.objects.select_related('warehouse').filter(
+        company_uuid__in={key[0] for key in quantities},
+        warehouse_id__in={key[1] for key in quantities},
+        product_uuid__in={key[2] for key in quantities},
+    ).order_by('id'):
+        stocks.setdefault((stock.company_uuid, stock.warehouse_id, stock.product_uuid), stock)
+
+    changed = [(stocks[key], quantity) for key, quantity in quantities.items()
+               if key in stocks and stocks[key].quantity != quantity]
+    if not changed:
+        return 0
+    table = connection.ops.quote_name(Stock._meta.db_table)
+    values = ", ".join(["(%s::uuid, %s::numeric)"] * len(changed))
+    params = [p for stock, quantity in changed for p in (stock.id, quantity)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} AS s SET quantity = v.quantity, updated_at = %s "
+            f"FROM (VALUES {values}) AS v (id, quantity) WHERE s.id = v.id",
+            [timezone.now()] + params
+        )
+
+    # Low-stock alert only when a shelf drops to its reorder level, not on every weighing below it
+    dropped = [(stock, quantity) for stock, quantity in changed
+               if quantity <= stock.reorder_level < stock.quantity]
+    if dropped:
+        transaction.on_commit(partial(send_notifications, [
+            ("stock.low", {
+                "product_uuid": str(stock.product_uuid),
+                "quantity": float(quantity),
+                "warehouse": stock.warehouse.name
+            }, stock.company_uuid) for stock, quantity in dropped
+        ]))
+    return len(changed)
+
+
+def check_temperatures(readings, low=TEMP_MIN, high=TEMP_MAX):
+    """
+    Thresholds in one vectorized pass; per device only the most extreme reading
+    of the batch can alert, and only once per ALERT_COOLDOWN_SECONDS.
+    Returns the number of alerts, which are sent once the transaction commits.
+    """
+    thermometers = [r for r in readings if r.device.type == 'thermometer']
+    if not thermometers:
+        return 0
+    values = np.array([float(r.value) for r in thermometers])
+    excess = np.maximum(values - high, low - values)
+    worst = {}
+    for i in np.flatnonzero(excess > 0).tolist():
+        device_id = thermometers[i].device.id
+        if device_id not in worst or excess[i] > excess[worst[device_id]]:
+            worst[device_id] = i
+
+    alerts = []
+    for device_id, i in worst.items():
+        reading = thermometers[i]
+        if not cache.add(f"iot:temp_alert:{device_id}", 1, ALERT_COOLDOWN_SECONDS):
+            continue
+        alerts.append(("iot.temp_alert", {
+            "device": reading.device.name,
+            "location": reading.device.warehouse_name,
+            "value": float(reading.value),
+            "unit": reading.unit
+        }, reading.device.company_uuid))
+    if alerts:
+        transaction.on_commit(partial(send_notifications, alerts))
+    return len(alerts)
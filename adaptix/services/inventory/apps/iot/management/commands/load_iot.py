@@ -0,0 +1,116 @@
+import io
+import uuid
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+from adaptix_core.loadgen import JSONPoster, run_load
+from apps.iot.ingest import TEMP_MAX, TEMP_MIN, ingest_readings
+from apps.iot.models import IoTDevice, IoTReading
+from apps.stocks.models import Warehouse
+
+SIMULATED = 'Simulated Load'
+
+class Command(BaseCommand):
+    help = 'Generates IoT reading load for benchmarking ingestion and reports throughput and p50/p99 latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--devices', type=int, default=100, help='Simulated thermometers sending readings (created if needed)')
+        parser.add_argument('--rate', type=float, default=1000, help='Target readings/sec, 0 for as fast as possible')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds to run')
+        parser.add_argument('--total', type=int, help='Stop after this many readings')
+        parser.add_argument('--batch-size', type=int, default=500, help='Readings per write')
+        parser.add_argument('--concurrency', type=int, default=4, help='Parallel writers')
+        parser.add_argument('--anomaly-rate', type=float, default=0.01, help='Share of readings outside the temperature range')
+        parser.add_argument('--mode', choices=['ingest', 'api', 'copy', 'bulk'], default='ingest',
+                            help='ingest: ingest_readings() in process, api: POST batches to --url, '
+                                 'copy: COPY FROM STDIN, bulk: bulk_create (copy and bulk skip the alert/stock work)')
+        parser.add_argument('--url', default='http://localhost:8000/api/inventory/iot/readings/batch/',
+                            help='Batch ingestion endpoint for --mode api')
+        parser.add_argument('--token', help='Bearer token for --mode api')
+        parser.add_argument('--company', type=uuid.UUID, required=True,
+                            help='company_uuid of the load-test tenant; only its simulated thermometers send readings')
+        parser.add_argument('--seed', type=int, help='Random seed')
+
+    def handle(self, *args, **options):
+        if options['devices'] < 1 or options['batch_size'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--devices, --batch-size and --concurrency must be positive")
+        devices = self.devices(options['devices'], options['company'])
+        rng = np.random.default_rng(options['seed'])
+        anomaly_rate = options['anomaly_rate']
+        middle, spread = (TEMP_MIN + TEMP_MAX) / 2, (TEMP_MAX - TEMP_MIN) / 6
+
+        def make_batch(n):
+            # Within the allowed range, except the injected anomalies, half too cold and half too hot
+            value = rng.normal(middle, spread, n).clip(TEMP_MIN, TEMP_MAX)
+            anomaly = rng.random(n) < anomaly_rate
+            value[anomaly] = np.where(rng.random(anomaly.sum()) < 0.5, TEMP_MIN - 5, TEMP_MAX + 5) + rng.normal(0, 1, anomaly.sum())
+            return {
+                "devices": [devices[i] for i in rng.integers(0, len(devices), n)],
+                "value": value.round(2).tolist(),
+                "timestamp": timezone.now(),
+            }
+
+        mode = options['mode']
+        send = {'ingest': self.ingest, 'api': self.poster(options), 'copy': self.copy, 'bulk': self.bulk}[mode]
+        self.stdout.write(
+            f"Sending readings for {len(devices)} devices via {mode}: rate {options['rate'] or 'unlimited'}/s, "
+            f"batches of {options['batch_size']}, {options['concurrency']} writers, {anomaly_rate:.1%} anomalies"
+        )
+        report = run_load(send, make_batch, rate=options['rate'], batch_size=options['batch_size'],
+                          duration=options['duration'], total=options['total'], concurrency=options['concurrency'],
+                          on_worker_exit=connections.close_all)
+        self.stdout.write(self.style.SUCCESS(str(report)))
+
+    def devices(self, count, company_uuid):
+        """
+        [(pk, device_id, api_key)] of `count` simulated thermometers of the
+        company, creating the missing ones. Real devices are never used, so no
+        real warehouse gets load-test readings or alerts.
+        """
+        warehouse = Warehouse.objects.filter(company_uuid=company_uuid, name=SIMULATED).first()
+        if warehouse is None:
+            warehouse = Warehouse.objects.create(company_uuid=company_uuid, name=SIMULATED)
+        devices = list(IoTDevice.objects.filter(
+            company_uuid=company_uuid, warehouse=warehouse, type='thermometer', is_active=True
+        ).exclude(api_key__isnull=True).exclude(api_key='').values_list('id', 'device_id', 'api_key')[:count])
+        missing = count - len(devices)
+        if missing > 0:
+            created = IoTDevice.objects.bulk_create([IoTDevice(
+                company_uuid=company_uuid, device_id=f"sim-{uuid.uuid4().hex[:12]}", name=f"Simulated thermometer {i}",
+                type='thermometer', warehouse=warehouse, api_key=uuid.uuid4().hex,
+            ) for i in range(missing)])
+            devices += [(device.id, device.device_id, device.api_key) for device in created]
+            self.stdout.write(f"Created {missing} simulated thermometers for company {company_uuid}")
+        return devices
+
+    def readings(self, batch):
+        timestamp = batch["timestamp"].isoformat()
+        return [
+            {"device_id": device_id, "api_key": api_key, "value": value, "unit": "C", "timestamp": timestamp}
+            for (_, device_id, api_key), value in zip(batch["devices"], batch["value"])
+        ]
+
+    def ingest(self, batch):
+        result = ingest_readings(self.readings(batch))
+        if result["rejected"]:
+            raise CommandError(f"{len(result['rejected'])} readings rejected, first: {result['rejected'][0]}")
+
+    def poster(self, options):
+        post = JSONPoster(options['url'], options['token'])
+        return lambda batch: post({"readings": self.readings(batch)})
+
+    def copy(self, batch):
+        buffer = io.StringIO()
+        timestamp = batch["timestamp"].isoformat()
+        for (pk, _, _), value in zip(batch["devices"], batch["value"]):
+            buffer.write(f"{pk}\t{timestamp}\t{value}\tC\t{{}}\n")
+        buffer.seek(0)
+        table = connection.ops.quote_name(IoTReading._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {table} (device_id, timestamp, value, unit, metadata) FROM STDIN", buffer)
+
+    def bulk(self, batch):
+        IoTReading.objects.bulk_create([
+            IoTReading(device_id=pk, value=value, unit='C') for (pk, _, _), value in zip(batch["devices"], batch["value"])
+        ])
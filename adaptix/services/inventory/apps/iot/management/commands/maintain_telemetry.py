@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from apps.iot.telemetry import store
+
+
+class Command(BaseCommand):
+    help = 'Creates upcoming IoT reading partitions, refreshes the minute/hour rollups and applies retention'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running every --interval seconds')
+        parser.add_argument('--interval', type=float, default=60, help='Seconds between runs with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                result = store.maintain()
+                self.stdout.write(
+                    f"IoT readings: {len(result['created'])} partition(s) created, "
+                    f"{result['refreshed']['minute']} minute / {result['refreshed']['hour']} hour bucket(s) refreshed, "
+                    f"{len(result['expired']['partitions'])} partition(s) dropped"
+                )
+            except Exception as e:
+                if not options['loop']:
+                    raise
+                self.stderr.write(f"IoT reading maintenance failed: {e}")
+                close_old_connections()
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
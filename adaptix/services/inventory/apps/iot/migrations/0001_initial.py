@@ -0,0 +1,70 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('stocks', '0003_receipt_line'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Shelf',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('company_uuid', models.UUIDField(db_index=True, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('code', models.CharField(max_length=50)),
+                ('product_uuid', models.UUIDField(blank=True, db_index=True, null=True)),
+                ('max_weight_capacity', models.DecimalField(decimal_places=3, default=100.0, max_digits=10)),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shelves', to='stocks.warehouse')),
+            ],
+            options={
+                'unique_together': {('company_uuid', 'warehouse', 'code')},
+            },
+        ),
+        migrations.CreateModel(
+            name='IoTDevice',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('company_uuid', models.UUIDField(db_index=True, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('device_id', models.CharField(help_text='Hardware Serial/MAC', max_length=100, unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('type', models.CharField(choices=[('scale', 'Smart Scale'), ('thermometer', 'Thermometer'), ('camera', 'Camera')], max_length=20)),
+                ('api_key', models.CharField(blank=True, max_length=100, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('tare_weight', models.DecimalField(decimal_places=3, default=0.0, max_digits=10)),
+                ('shelf', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='devices', to='iot.shelf')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='iot_devices', to='stocks.warehouse')),
+            ],
+            options={
+                'unique_together': {('company_uuid', 'device_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='IoTReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+                ('value', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('unit', models.CharField(default='unit', max_length=20)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='readings', to='iot.iotdevice')),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['device', 'timestamp'], name='iot_iotread_device__c7ec2d_idx')],
+            },
+        ),
+    ]
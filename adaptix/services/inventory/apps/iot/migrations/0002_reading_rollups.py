@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iot', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IoTReadingMinute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(db_index=True)),
+                ('value_count', models.PositiveIntegerField(default=0)),
+                ('value_min', models.FloatField(null=True)),
+                ('value_max', models.FloatField(null=True)),
+                ('value_mean', models.FloatField(null=True)),
+                ('value_stddev', models.FloatField(null=True)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reading_minutes', to='iot.iotdevice')),
+            ],
+            options={
+                'ordering': ['-bucket'],
+                'abstract': False,
+                'unique_together': {('device', 'bucket')},
+            },
+        ),
+        migrations.CreateModel(
+            name='IoTReadingHour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(db_index=True)),
+                ('value_count', models.PositiveIntegerField(default=0)),
+                ('value_min', models.FloatField(null=True)),
+                ('value_max', models.FloatField(null=True)),
+                ('value_mean', models.FloatField(null=True)),
+                ('value_stddev', models.FloatField(null=True)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reading_hours', to='iot.iotdevice')),
+            ],
+            options={
+                'ordering': ['-bucket'],
+                'abstract': False,
+                'unique_together': {('device', 'bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+from adaptix_core.timeseries import track_changes
+
+
+def track_reading_changes(apps, schema_editor):
+    table = apps.get_model('iot', 'IoTReading')._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        track_changes(cursor, table, 'timestamp')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iot', '0003_partition_readings'),
+    ]
+
+    operations = [
+        # Reversing leaves the trigger in place; it only feeds the rollup refresh
+        migrations.RunPython(track_reading_changes, migrations.RunPython.noop),
+    ]
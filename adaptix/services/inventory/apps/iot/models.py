@@ -1,10 +1,8 @@
 from django.db import models
 from apps.utils.models import SoftDeleteModel
-from apps.stocks.models import Warehouse, Stock
-from django.db.models.signals import post_save
+from apps.stocks.models import Warehouse
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from apps.utils.notifications import NotificationService
-from decimal import Decimal
 
 class Shelf(SoftDeleteModel):
     """
@@ -78,72 +76,49 @@ class IoTReading(models.Model): # High volume, maybe no SoftDelete? keeping it s
     def __str__(self):
         return f"{self.device.name}: {self.value} {self.unit} at {self.timestamp}"
 
+class IoTReadingRollup(models.Model):
+    """
+    Per-device summary of the readings in one time bucket, kept up to date by
+    `manage.py maintain_telemetry` (see apps.iot.telemetry).
+    """
+    bucket = models.DateTimeField(db_index=True)
+    value_count = models.PositiveIntegerField(default=0)
+    value_min = models.FloatField(null=True)
+    value_max = models.FloatField(null=True)
+    value_mean = models.FloatField(null=True)
+    value_stddev = models.FloatField(null=True)
+
+    class Meta:
+        abstract = True
+        ordering = ['-bucket']
+
+class IoTReadingMinute(IoTReadingRollup):
+    device = models.ForeignKey(IoTDevice, on_delete=models.CASCADE, related_name='reading_minutes')
+
+    class Meta(IoTReadingRollup.Meta):
+        unique_together = ('device', 'bucket')
+
+class IoTReadingHour(IoTReadingRollup):
+    device = models.ForeignKey(IoTDevice, on_delete=models.CASCADE, related_name='reading_hours')
+
+    class Meta(IoTReadingRollup.Meta):
+        unique_together = ('device', 'bucket')
+
 
 # ==========================================================
 # LOGIC / SIGNALS
 # ==========================================================
+# Readings are processed per batch in apps.iot.ingest; the device map it
+# caches is dropped whenever a device or its shelf changes.
 
-@receiver(post_save, sender=IoTReading)
-def process_iot_reading(sender, instance, created, **kwargs):
-    if not created:
-        return
+@receiver([post_save, post_delete], sender=IoTDevice)
+def invalidate_device(sender, instance, **kwargs):
+    from .ingest import device_cache
+    device_cache.invalidate(instance.device_id)
 
-    device = instance.device
-    
-    # 1. SMART SCALE LOGIC
-    if device.type == 'scale' and device.shelf and device.shelf.product_uuid:
-        # Calculate Net Weight
-        gross_weight = instance.value
-        net_weight = gross_weight - Decimal(device.tare_weight)
-        
-        if net_weight < 0: 
-            net_weight = Decimal(0)
-
-        # We need the "Product Unit Weight" to calculate quantity.
-        # Ideally this comes from Product Service. 
-        # For this prototype, we will assume a fixed unit weight or look it up from a cache or metadata.
-        # Let's assume it's stored in Shelf metadata or we default to 1 (if liquid/bulk).
-        
-        # fallback: assume 1kg = 1 unit for now if not specified
-        unit_weight = Decimal('1.0') 
-        
-        calculated_qty = net_weight / unit_weight
-        
-        # Update Stock
-        # Find the Stock record for this Warehouse + Product
-        stock_qs = Stock.objects.filter(
-            company_uuid=device.company_uuid,
-            warehouse=device.warehouse,
-            product_uuid=device.shelf.product_uuid
-        )
-        
-        if stock_qs.exists():
-            stock = stock_qs.first()
-            # Update quantity to match physical reality
-            # Note: This overrides manual entries. In a real system you'd want a reconciliation flow.
-            # Here we trust the machine.
-            stock.quantity = calculated_qty
-            stock.save(update_fields=['quantity'])
-            
-            # Log the adjustment? (Ideally yes, create StockTransaction)
-            # Skipping StockTransaction for brevity, but this is where it would go.
-
-    # 2. THERMOMETER LOGIC
-    elif device.type == 'thermometer':
-        # Simple threshold check
-        MAX_TEMP = 25.0
-        MIN_TEMP = 2.0
-        
-        if instance.value > MAX_TEMP or instance.value < MIN_TEMP:
-            # Trigger Alert
-            notify = NotificationService()
-            notify.send_notification(
-                event_type="iot.temp_alert",
-                data={
-                    "device": device.name,
-                    "location": device.warehouse.name,
-                    "value": float(instance.value),
-                    "unit": instance.unit
-                },
-                rooms=[str(device.company_uuid)]
-            )
+
+@receiver([post_save, post_delete], sender=Shelf)
+def invalidate_shelf_devices(sender, instance, **kwargs):
+    from .ingest import device_cache
+    for device_id in instance.devices.values_list('device_id', flat=True):
+        device_cache.invalidate(device_id)
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import IoTDevice, IoTReading, Shelf
+from .models import IoTDevice, IoTReading, IoTReadingMinute, Shelf
 
 class ShelfSerializer(serializers.ModelSerializer):
     class Meta:
@@ -24,3 +24,8 @@ class IoTReadingSerializer(serializers.ModelSerializer):
         # Check happens in permission classes usually, or we trust the API key.
         # For this internal microservice, we assume auth handled by Gateway/Middleware.
         return super().create(validated_data)
+
+class IoTReadingRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = IoTReadingMinute
+        fields = ('bucket', 'value_count', 'value_min', 'value_max', 'value_mean', 'value_stddev')
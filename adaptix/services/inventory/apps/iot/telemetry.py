@@ -0,0 +1,8 @@
+"""
+Reading storage for IoT devices: IoTReading is partitioned by day and rolled
+up into IoTReadingMinute / IoTReadingHour (see adaptix_core.timeseries).
+"""
+from adaptix_core.timeseries import TelemetryStore
+from .models import IoTReading, IoTReadingHour, IoTReadingMinute
+
+store = TelemetryStore(IoTReading, 'device', ['value'], minute_model=IoTReadingMinute, hour_model=IoTReadingHour)
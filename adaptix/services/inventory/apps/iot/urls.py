@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ShelfViewSet, IoTDeviceViewSet, IoTReadingListCreateView
+from .views import ShelfViewSet, IoTDeviceViewSet, IoTReadingListCreateView, IoTReadingBatchView
 
 router = DefaultRouter()
 router.register(r'shelves', ShelfViewSet)
@@ -9,4 +9,5 @@ router.register(r'devices', IoTDeviceViewSet)
 urlpatterns = [
     path('', include(router.urls)),
     path('readings/', IoTReadingListCreateView.as_view(), name='iot-readings'),
+    path('readings/batch/', IoTReadingBatchView.as_view(), name='iot-readings-batch'),
 ]
@@ -1,7 +1,17 @@
+from datetime import timedelta
+from django.utils import timezone
 from rest_framework import viewsets, generics, status
+from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from .ingest import MAX_BATCH_SIZE, Reading, apply_readings, device_cache, ingest_readings
 from .models import IoTDevice, Shelf, IoTReading
-from .serializers import IoTDeviceSerializer, ShelfSerializer, IoTReadingSerializer
+from .serializers import IoTDeviceSerializer, ShelfSerializer, IoTReadingSerializer, IoTReadingRollupSerializer
+from .telemetry import store as reading_store
+
+# Default and largest window (hours) per rollup resolution
+METRIC_WINDOWS = {'minute': (1, 24), 'hour': (24, 24 * 90)}
 
 class ShelfViewSet(viewsets.ModelViewSet):
     queryset = Shelf.objects.all()
@@ -23,6 +33,27 @@ class IoTDeviceViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(company_uuid=self.request.company_uuid)
 
+    @action(detail=True, methods=['get'])
+    def metrics(self, request, pk=None):
+        """Rolled-up readings, newest first: ?resolution=minute (last hour) or hour (last 24 hours); ?hours= widens the window."""
+        device = self.get_object()
+        resolution = request.query_params.get('resolution', 'minute')
+        if resolution not in METRIC_WINDOWS:
+            return Response({"error": "resolution must be minute or hour"}, status=status.HTTP_400_BAD_REQUEST)
+        default_hours, max_hours = METRIC_WINDOWS[resolution]
+        try:
+            hours = float(request.query_params.get('hours', default_hours))
+        except ValueError:
+            hours = 0
+        if not 0 < hours <= max_hours:
+            return Response({"error": f"hours must be between 0 and {max_hours}"}, status=status.HTTP_400_BAD_REQUEST)
+        rows = reading_store.series(resolution, timezone.now() - timedelta(hours=hours), device=device)
+        return Response({
+            "device_id": device.device_id,
+            "resolution": resolution,
+            "buckets": IoTReadingRollupSerializer(rows, many=True).data,
+        })
+
 class IoTReadingListCreateView(generics.ListCreateAPIView):
     queryset = IoTReading.objects.all()
     serializer_class = IoTReadingSerializer
@@ -30,3 +61,32 @@ class IoTReadingListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         # Return readings for devices belonging to this company
         return self.queryset.filter(device__company_uuid=self.request.company_uuid)
+
+    def perform_create(self, serializer):
+        reading = serializer.save()
+        device = device_cache.get_many([reading.device.device_id])[reading.device.device_id]
+        if device is not None:
+            apply_readings([Reading(device, reading.value, reading.unit, reading.timestamp, reading.metadata)])
+
+class IoTReadingBatchView(APIView):
+    """
+    Device-facing bulk ingestion; devices authenticate with their api_key, not a JWT.
+    Body: {"api_key"?: "...", "readings": [{"device_id", "value", "api_key"?, "unit"?, "timestamp"?, "metadata"?}]}
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        data = request.data if isinstance(request.data, dict) else {"readings": request.data}
+        readings = data.get("readings")
+        if not isinstance(readings, list) or not readings:
+            return Response({"error": "readings must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(readings) > MAX_BATCH_SIZE:
+            return Response({"error": f"At most {MAX_BATCH_SIZE} readings per batch"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        result = ingest_readings(readings, api_key=data.get("api_key"))
+        if not result["accepted"]:
+            return Response(result, status=status.HTTP_401_UNAUTHORIZED if all(
+                r["error"] in ("Unknown or inactive device", "Invalid api_key") for r in result["rejected"]
+            ) else status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_202_ACCEPTED if result["rejected"] else status.HTTP_201_CREATED)
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0002_stocktransfer_stocktransferitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='warehouse',
+            name='branch_uuid',
+            field=models.UUIDField(blank=True, db_index=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ReceiptLine',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('company_uuid', models.UUIDField(db_index=True, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('receipt_uuid', models.UUIDField(db_index=True)),
+                ('quantity', models.DecimalField(decimal_places=3, max_digits=20)),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipt_lines', to='stocks.stock')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='stocks.stocktransaction')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
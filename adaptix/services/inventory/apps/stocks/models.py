@@ -165,6 +165,20 @@ class StockTransferItem(SoftDeleteModel):
     def __str__(self):
         return f"{self.product_uuid} x {self.quantity}"
 
+class ReceiptLine(SoftDeleteModel):
+    """
+    A purchase goods receipt line applied to stock. The id is the purchase
+    service's line id, so a line that is delivered again conflicts on the
+    primary key and is never applied twice.
+    """
+    receipt_uuid = models.UUIDField(db_index=True)
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='receipt_lines')
+    transaction = models.ForeignKey(StockTransaction, on_delete=models.SET_NULL, null=True, blank=True)
+    quantity = models.DecimalField(max_digits=20, decimal_places=3)
+
+    def __str__(self):
+        return f"Receipt {self.receipt_uuid}: {self.quantity} -> {self.stock_id}"
+
 # Signals
 from django.db.models.signals import post_save
 from django.dispatch import receiver
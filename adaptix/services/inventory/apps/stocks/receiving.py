@@ -0,0 +1,233 @@
+"""
+Goods receipts from purchase orders, applied as one batch.
+
+The purchase service sends every line of a receipt in one
+purchase.receipt.requested message (or one POST to stocks/receive/):
+
+    {"receipt_id", "company_uuid", "warehouse_id", "reference",
+     "lines": [{"line_id", "product_uuid", "variant_uuid"?, "quantity", "unit_cost"?}]}
+
+and the whole receipt is applied in one transaction, whatever its size:
+
+1. lock the warehouse's stock rows of the receipt's products (creating the
+   missing ones)
+2. claim the lines with INSERT ... ON CONFLICT (id) DO NOTHING on ReceiptLine;
+   a line id that was claimed before is a redelivery and is not applied again
+3. raise quantity and the weighted average cost of every stock with one UPDATE
+4. write the stock transactions with one multi-row INSERT
+
+Every line gets its own result (applied / duplicate / failed), so a bad line
+never blocks the rest of the receipt.
+"""
+import uuid
+from decimal import Decimal, InvalidOperation
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import ReceiptLine, Stock, StockTransaction, Warehouse
+
+INSERT_CHUNK = 2000
+
+
+def _uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _decimal(value, default=None):
+    if value in (None, ''):
+        return default
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def parse_lines(lines):
+    """
+    Returns (valid lines, {line_id: error}, line ids in the order received);
+    each valid line is a dict of typed values.
+    """
+    valid, errors, seen, keys = [], {}, set(), []
+    for line in lines:
+        line = line if isinstance(line, dict) else {}
+        line_id = _uuid(line.get('line_id'))
+        key = str(line_id) if line_id else str(line.get('line_id'))
+        keys.append(key)
+        product_uuid = _uuid(line.get('product_uuid'))
+        variant_uuid = _uuid(line.get('variant_uuid')) if line.get('variant_uuid') else None
+        quantity = _decimal(line.get('quantity'))
+        unit_cost = _decimal(line.get('unit_cost'), Decimal('0'))
+        if line_id is None:
+            errors[key] = "Invalid line_id"
+        elif line_id in seen:
+            errors[key] = "Line repeated in receipt"
+        elif product_uuid is None or (line.get('variant_uuid') and variant_uuid is None):
+            errors[key] = "Invalid product_uuid or variant_uuid"
+        elif quantity is None or quantity <= 0:
+            errors[key] = "Quantity must be positive"
+        elif unit_cost is None or unit_cost < 0:
+            errors[key] = "Invalid unit_cost"
+        else:
+            valid.append({
+                "line_id": line_id, "product_uuid": product_uuid, "variant_uuid": variant_uuid,
+                "quantity": quantity, "unit_cost": unit_cost,
+            })
+        if line_id is not None:
+            seen.add(line_id)
+    return valid, errors, list(dict.fromkeys(keys))
+
+
+def receive_goods(payload, created_by='system-purchase'):
+    """
+    Applies a goods receipt. Returns the stock.receipt.processed payload:
+    {"event", "receipt_id", "company_uuid", "lines": [{"line_id", "status", "balance_after", "error"}]},
+    with one result per line in the order received.
+    """
+    company_uuid = payload.get('company_uuid')
+    receipt_id = payload.get('receipt_id')
+    valid, errors, order = parse_lines(payload.get('lines') or [])
+    results = {line_id: {"line_id": line_id, "status": "failed", "balance_after": None, "error": error}
+               for line_id, error in errors.items()}
+
+    def report():
+        return {
+            "event": "stock.receipt.processed",
+            "receipt_id": str(receipt_id) if receipt_id else None,
+            "company_uuid": str(company_uuid) if company_uuid else None,
+            "lines": [results[line_id] for line_id in order if line_id in results],
+        }
+
+    def fail_all(error):
+        for line in valid:
+            results[str(line["line_id"])] = {"line_id": str(line["line_id"]), "status": "failed", "balance_after": None, "error": error}
+        return report()
+
+    if not _uuid(company_uuid) or not _uuid(receipt_id):
+        return fail_all("Missing company_uuid or receipt_id")
+    if not valid:
+        return report()
+
+    with transaction.atomic():
+        warehouse = Warehouse.objects.filter(id=_uuid(payload.get('warehouse_id')), company_uuid=company_uuid).first()
+        if warehouse is None:
+            return fail_all("Warehouse not found")
+
+        stocks = lock_stocks(company_uuid, warehouse, {(line["product_uuid"], line["variant_uuid"]) for line in valid})
+        for line in valid:
+            line["stock"] = stocks[(line["product_uuid"], line["variant_uuid"])]
+            line["transaction_id"] = uuid.uuid4()
+        claimed = claim_lines(company_uuid, receipt_id, valid)
+
+        fresh = [line for line in valid if line["line_id"] in claimed]
+        duplicates = [line for line in valid if line["line_id"] not in claimed]
+        if duplicates:
+            previous = dict(ReceiptLine.all_objects.filter(
+                id__in=[line["line_id"] for line in duplicates]
+            ).values_list('id', 'transaction__balance_after'))
+            for line in duplicates:
+                balance = previous.get(line["line_id"])
+                results[str(line["line_id"])] = {
+                    "line_id": str(line["line_id"]), "status": "duplicate",
+                    "balance_after": str(balance) if balance is not None else None, "error": None,
+                }
+
+        if fresh:
+            running = {}
+            for line in fresh:
+                stock = line["stock"]
+                running[stock.id] = running.get(stock.id, stock.quantity) + line["quantity"]
+                line["balance_after"] = running[stock.id]
+                results[str(line["line_id"])] = {
+                    "line_id": str(line["line_id"]), "status": "applied",
+                    "balance_after": str(line["balance_after"]), "error": None,
+                }
+            raise_stock(fresh)
+            insert_transactions(company_uuid, fresh, payload.get('reference'), receipt_id, created_by)
+    return report()
+
+
+def lock_stocks(company_uuid, warehouse, keys):
+    """{(product_uuid, variant_uuid): Stock}, locked in id order; missing stock rows are created first."""
+    products = {product for product, _ in keys}
+
+    def locked():
+        return {
+            (s.product_uuid, s.product_variant_uuid): s
+            for s in Stock.all_objects.select_for_update().filter(
+                company_uuid=company_uuid, warehouse=warehouse, product_uuid__in=products
+            ).order_by('id')
+        }
+
+    stocks = locked()
+    missing = [key for key in keys if key not in stocks]
+    if missing:
+        Stock.objects.bulk_create([
+            Stock(company_uuid=company_uuid, warehouse=warehouse, product_uuid=product, product_variant_uuid=variant, quantity=0)
+            for product, variant in missing
+        ])
+        stocks = locked()
+    return stocks
+
+
+def claim_lines(company_uuid, receipt_id, lines):
+    """Returns the ids of the lines that were not received before."""
+    table = connection.ops.quote_name(ReceiptLine._meta.db_table)
+    now = timezone.now()
+    claimed = set()
+    with connection.cursor() as cursor:
+        for start in range(0, len(lines), INSERT_CHUNK):
+            chunk = lines[start:start + INSERT_CHUNK]
+            values = ", ".join(["(%s, %s, %s, %s, false, %s, %s, %s, %s)"] * len(chunk))
+            params = [
+                v for line in chunk
+                for v in (line["line_id"], company_uuid, now, now, receipt_id, line["stock"].id, line["transaction_id"], line["quantity"])
+            ]
+            cursor.execute(
+                f"INSERT INTO {table} (id, company_uuid, created_at, updated_at, is_deleted, receipt_uuid, stock_id, transaction_id, quantity) "
+                f"VALUES {values} ON CONFLICT (id) DO NOTHING RETURNING id",
+                params
+            )
+            claimed.update(row[0] for row in cursor.fetchall())
+    return claimed
+
+
+def raise_stock(lines):
+    """One UPDATE for every stock: quantity += received, avg_cost moves to the weighted average."""
+    totals = {}
+    for line in lines:
+        quantity, value = totals.get(line["stock"].id, (Decimal('0'), Decimal('0')))
+        totals[line["stock"].id] = (quantity + line["quantity"], value + line["quantity"] * line["unit_cost"])
+    table = connection.ops.quote_name(Stock._meta.db_table)
+    values = ", ".join(["(%s::uuid, %s::numeric, %s::numeric)"] * len(totals))
+    params = [p for stock_id, (quantity, value) in totals.items() for p in (stock_id, quantity, value)]
+    with connection.cursor() as cursor:
+        # Stock that went negative contributes no value to the average
+        cursor.execute(
+            f"UPDATE {table} AS s SET quantity = s.quantity + v.quantity, "
+            f"avg_cost = ROUND((GREATEST(s.quantity, 0) * s.avg_cost + v.value) / (GREATEST(s.quantity, 0) + v.quantity), 2), "
+            f"is_deleted = false, updated_at = %s "
+            f"FROM (VALUES {values}) AS v (id, quantity, value) WHERE s.id = v.id",
+            [timezone.now()] + params
+        )
+
+
+def insert_transactions(company_uuid, lines, reference, receipt_id, created_by):
+    table = connection.ops.quote_name(StockTransaction._meta.db_table)
+    now = timezone.now()
+    notes = f"Goods receipt {receipt_id}"
+    with connection.cursor() as cursor:
+        for start in range(0, len(lines), INSERT_CHUNK):
+            chunk = lines[start:start + INSERT_CHUNK]
+            values = ", ".join(["(%s, %s, %s, %s, false, %s, 'in', %s, %s, %s, %s, %s)"] * len(chunk))
+            params = [
+                v for line in chunk
+                for v in (line["transaction_id"], company_uuid, now, now, line["stock"].id,
+                          line["quantity"], line["balance_after"], reference or None, notes, created_by)
+            ]
+            cursor.execute(
+                f"INSERT INTO {table} (id, company_uuid, created_at, updated_at, is_deleted, stock_id, type, "
+                f"quantity_change, balance_after, reference_no, notes, created_by) VALUES {values}",
+                params
+            )
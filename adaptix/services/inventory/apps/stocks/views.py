@@ -93,12 +93,36 @@ class StockViewSet(viewsets.ReadOnlyModelViewSet):
         
         return Response(StockSerializer(stock).data)
 
+    @action(detail=False, methods=['post'])
+    def receive(self, request):
+        """
+        Apply a whole goods receipt in one call (same payload as the
+        purchase.receipt.requested event). Replaying a receipt is safe: lines
+        already received are reported as duplicates.
+        Payload: { "receipt_id", "warehouse_id", "reference", "lines": [{"line_id", "product_uuid", "quantity", "unit_cost"}] }
+        """
+        from .receiving import receive_goods
+
+        company_uuid = getattr(request, "company_uuid", None)
+        if not company_uuid:
+             return Response({"detail": "Company context missing"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(request.data.get('lines'), list):
+             return Response({"detail": "lines must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+
+        created_by = request.user_claims.get('user_id', 'api') if hasattr(request, 'user_claims') else 'api'
+        result = receive_goods(dict(request.data, company_uuid=company_uuid), created_by=created_by)
+        return Response(result)
+
     @action(detail=False, methods=['post'])
     def bulk_check(self, request):
         """
         Check stock for multiple products.
-        Payload: { "product_uuids": ["uuid1", "uuid2"] }
+        Payload: { "product_uuids": ["uuid1", "uuid2"], "include_in_transit": false }
+        Returns { "uuid": qty }, or { "uuid": {"on_hand": qty, "in_transit": qty} }
+        when include_in_transit is set (shipped but not yet received transfers).
         """
+        from django.db.models import Sum
+
         uuids = request.data.get('product_uuids', [])
         company_uuid = getattr(request, "company_uuid", None)
         
@@ -106,17 +130,27 @@ class StockViewSet(viewsets.ReadOnlyModelViewSet):
              return Response({"detail": "Company context missing"}, status=status.HTTP_400_BAD_REQUEST)
 
         # Aggregate stock per product across all warehouses
-        # Or just return list of stock records
-        stocks = Stock.objects.filter(company_uuid=company_uuid, product_uuid__in=uuids)
-        
-        # Group by product
-        results = {}
-        for s in stocks:
-            p_uuid = str(s.product_uuid)
-            if p_uuid not in results:
-                results[p_uuid] = 0
-            results[p_uuid] += float(s.quantity)
-            
+        on_hand = {
+            str(row['product_uuid']): float(row['total'] or 0)
+            for row in Stock.objects.filter(company_uuid=company_uuid, product_uuid__in=uuids)
+            .values('product_uuid').annotate(total=Sum('quantity'))
+        }
+        if not request.data.get('include_in_transit'):
+            return Response(on_hand)
+
+        in_transit = {
+            str(row['product_uuid']): float(row['total'] or 0)
+            for row in StockTransferItem.objects.filter(
+                company_uuid=company_uuid,
+                product_uuid__in=uuids,
+                transfer__status='SHIPPED',
+                transfer__is_deleted=False
+            ).values('product_uuid').annotate(total=Sum('quantity'))
+        }
+        results = {
+            p_uuid: {"on_hand": on_hand.get(p_uuid, 0.0), "in_transit": in_transit.get(p_uuid, 0.0)}
+            for p_uuid in set(on_hand) | set(in_transit)
+        }
         return Response(results)
 
 class TransactionViewSet(viewsets.ModelViewSet):
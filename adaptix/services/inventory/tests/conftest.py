@@ -26,6 +26,6 @@ def mock_settings(settings):
 def mock_permissions(mocker):
     try:
         # Mocking specific service permission class
-        mocker.patch('apps.utils.permissions.HasPermission.has_permission', return_value=True)
+        mocker.patch('adaptix_core.permissions.HasPermission.has_permission', return_value=True)
     except ImportError:
         pass
@@ -0,0 +1,141 @@
+import io
+import pytest
+import uuid
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from rest_framework.test import APIRequestFactory
+from apps.iot.models import IoTDevice, IoTReading, Shelf
+from apps.iot.telemetry import store
+from apps.iot.views import IoTDeviceViewSet
+from apps.stocks.models import Stock, Warehouse
+
+
+@pytest.fixture
+def notify(mocker):
+    cache.clear()
+    return mocker.patch('apps.utils.notifications.NotificationService.send_notification')
+
+
+@pytest.fixture
+def warehouse(company_uuid):
+    return Warehouse.objects.create(company_uuid=company_uuid, name="Cold Store")
+
+
+def make_device(warehouse, type, shelf=None, **kwargs):
+    return IoTDevice.objects.create(
+        company_uuid=warehouse.company_uuid, device_id=f"{type}-{uuid.uuid4().hex[:8]}", name=f"{type} sensor",
+        type=type, warehouse=warehouse, shelf=shelf, api_key=uuid.uuid4().hex, **kwargs
+    )
+
+
+def post_batch(api_client, payload):
+    return api_client.post("/api/inventory/iot/readings/batch/", payload, format="json")
+
+
+@pytest.mark.django_db
+class TestIoTBatchIngest:
+    def test_latest_reading_per_shelf_sets_stock_once(self, api_client, warehouse, notify, django_capture_on_commit_callbacks):
+        product = uuid.uuid4()
+        shelf = Shelf.objects.create(company_uuid=warehouse.company_uuid, warehouse=warehouse, code="A-01", product_uuid=product)
+        stock = Stock.objects.create(company_uuid=warehouse.company_uuid, warehouse=warehouse, product_uuid=product,
+                                     quantity=Decimal("40"), reorder_level=Decimal("10"))
+        scale = make_device(warehouse, "scale", shelf=shelf, tare_weight=Decimal("0.5"))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = post_batch(api_client, {"api_key": scale.api_key, "readings": [
+                {"device_id": scale.device_id, "value": 20.5, "timestamp": "2026-01-01T10:00:02Z"},
+                {"device_id": scale.device_id, "value": 8.5, "timestamp": "2026-01-01T10:00:03Z"},
+                {"device_id": scale.device_id, "value": 30.5, "timestamp": "2026-01-01T10:00:01Z"},
+                {"device_id": scale.device_id, "value": 1, "api_key": "wrong"},
+            ]})
+
+        assert response.status_code == 202
+        assert response.data["accepted"] == 3
+        assert response.data["stock_updates"] == 1
+        assert response.data["rejected"] == [{"index": 3, "device_id": scale.device_id, "error": "Invalid api_key"}]
+        assert IoTReading.objects.filter(device=scale).count() == 3
+        stock.refresh_from_db()
+        assert stock.quantity == Decimal("8")
+        # Crossed the reorder level once: one low-stock alert
+        assert [c.kwargs["event_type"] for c in notify.call_args_list] == ["stock.low"]
+
+    def test_temperature_alerts_are_deduplicated(self, api_client, warehouse, notify, django_capture_on_commit_callbacks):
+        freezer = make_device(warehouse, "thermometer")
+        fridge = make_device(warehouse, "thermometer")
+        readings = [
+            {"device_id": freezer.device_id, "api_key": freezer.api_key, "value": v, "unit": "C"} for v in (26, 31, 20)
+        ] + [{"device_id": fridge.device_id, "api_key": fridge.api_key, "value": 4, "unit": "C"}]
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            response = post_batch(api_client, {"readings": readings})
+        assert response.status_code == 201
+        assert response.data["alerts"] == 1
+        # Sent only once the readings are committed
+        notify.assert_not_called()
+        for callback in callbacks:
+            callback()
+        assert notify.call_args.kwargs["data"]["value"] == 31.0
+
+        # Still inside the cooldown window
+        with django_capture_on_commit_callbacks(execute=True):
+            assert post_batch(api_client, {"readings": readings}).data["alerts"] == 0
+        assert notify.call_count == 1
+
+    def test_unknown_or_deactivated_devices_are_refused(self, api_client, warehouse, notify):
+        scale = make_device(warehouse, "scale")
+        reading = {"device_id": scale.device_id, "api_key": scale.api_key, "value": 1}
+        assert post_batch(api_client, {"readings": [reading]}).status_code == 201
+
+        scale.is_active = False
+        scale.save()
+        response = post_batch(api_client, {"readings": [reading, dict(reading, device_id="nope")]})
+        assert response.status_code == 401
+        assert post_batch(api_client, {"readings": []}).status_code == 400
+
+    def test_unknown_device_ids_are_not_cached(self, warehouse):
+        from apps.iot.ingest import DeviceCache
+
+        scale = make_device(warehouse, "scale")
+        device_cache = DeviceCache()
+        found = device_cache.get_many([scale.device_id, "made-up-1", "made-up-2"])
+
+        assert found[scale.device_id].id == scale.id
+        assert found["made-up-1"] is None
+        assert set(device_cache._entries) == {scale.device_id}
+
+    def test_device_metrics_come_from_the_rollups(self, api_client, warehouse, notify):
+        thermometer = make_device(warehouse, "thermometer")
+        post_batch(api_client, {"api_key": thermometer.api_key, "readings": [
+            {"device_id": thermometer.device_id, "value": v} for v in (4, 6, 8)
+        ]})
+        store.refresh()
+
+        request = APIRequestFactory().get("/", {"resolution": "hour"})
+        request.company_uuid = warehouse.company_uuid
+        response = IoTDeviceViewSet.as_view({"get": "metrics"})(request, pk=thermometer.pk)
+        assert response.status_code == 200
+        [bucket] = response.data["buckets"]
+        assert (bucket["value_count"], bucket["value_min"], bucket["value_max"], bucket["value_mean"]) == (3, 4, 8, 6)
+        assert bucket["value_stddev"] == pytest.approx(2)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_load_generator_runs_through_ingestion(warehouse, notify):
+    real = make_device(warehouse, "thermometer")
+    company = uuid.uuid4()
+    out = io.StringIO()
+    call_command("load_iot", devices=10, total=1000, rate=0, batch_size=250, mode="ingest", anomaly_rate=0,
+                 company=str(company), stdout=out)
+    assert "Sent 1000 readings" in out.getvalue()
+    assert IoTReading.objects.filter(device__company_uuid=company).count() == 1000
+    assert IoTDevice.objects.filter(company_uuid=company, type="thermometer").count() == 10
+    # Real devices never send load-test readings
+    assert not IoTReading.objects.filter(device=real).exists()
+    assert notify.call_count == 0
+
+
+@pytest.mark.django_db
+def test_load_generator_requires_a_company():
+    with pytest.raises(CommandError, match="--company"):
+        call_command("load_iot", total=10, rate=0)
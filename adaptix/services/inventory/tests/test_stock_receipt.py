@@ -0,0 +1,72 @@
+import pytest
+import uuid
+from decimal import Decimal
+from apps.stocks.models import Warehouse, Stock, StockTransaction
+from apps.stocks.receiving import receive_goods
+
+
+@pytest.fixture
+def warehouse(company_uuid):
+    return Warehouse.objects.create(company_uuid=company_uuid, name="Receiving Dock")
+
+
+def receipt(company_uuid, warehouse, lines):
+    return {
+        "receipt_id": str(uuid.uuid4()),
+        "company_uuid": company_uuid,
+        "warehouse_id": str(warehouse.id),
+        "reference": "PO-1001",
+        "lines": lines,
+    }
+
+
+def line(product_uuid, quantity, unit_cost="10.00"):
+    return {"line_id": str(uuid.uuid4()), "product_uuid": str(product_uuid), "quantity": str(quantity), "unit_cost": unit_cost}
+
+
+@pytest.mark.django_db
+class TestGoodsReceipt:
+    def test_receipt_is_applied_once(self, company_uuid, warehouse):
+        existing, new = uuid.uuid4(), uuid.uuid4()
+        stock = Stock.objects.create(
+            company_uuid=company_uuid, warehouse=warehouse, product_uuid=existing,
+            quantity=Decimal("10"), avg_cost=Decimal("4.00")
+        )
+        payload = receipt(company_uuid, warehouse, [
+            line(existing, 10, "6.00"), line(new, 5), line(existing, 5, "6.00"),
+        ])
+
+        result = receive_goods(payload)
+        assert [r["status"] for r in result["lines"]] == ["applied"] * 3
+        assert [Decimal(r["balance_after"]) for r in result["lines"]] == [Decimal("20"), Decimal("5"), Decimal("25")]
+
+        stock.refresh_from_db()
+        assert stock.quantity == Decimal("25")
+        assert stock.avg_cost == Decimal("5.20")
+        assert Stock.objects.get(warehouse=warehouse, product_uuid=new).quantity == Decimal("5")
+        assert StockTransaction.objects.filter(type="in", reference_no="PO-1001").count() == 3
+
+        # A redelivered message changes nothing
+        replay = receive_goods(payload)
+        assert [r["status"] for r in replay["lines"]] == ["duplicate"] * 3
+        assert replay["lines"][2]["balance_after"] == "25.000"
+        stock.refresh_from_db()
+        assert stock.quantity == Decimal("25")
+        assert StockTransaction.objects.filter(type="in").count() == 3
+
+    def test_bad_line_does_not_block_the_rest(self, company_uuid, warehouse):
+        product = uuid.uuid4()
+        payload = receipt(company_uuid, warehouse, [line(product, 3), line("not-a-uuid", 1), line(product, 0)])
+
+        result = receive_goods(payload)
+        assert [r["status"] for r in result["lines"]] == ["applied", "failed", "failed"]
+        assert Stock.objects.get(product_uuid=product).quantity == Decimal("3")
+
+    def test_unknown_warehouse_fails_every_line(self, company_uuid, warehouse):
+        payload = receipt(company_uuid, warehouse, [line(uuid.uuid4(), 1), line(uuid.uuid4(), 2)])
+        payload["warehouse_id"] = str(uuid.uuid4())
+
+        result = receive_goods(payload)
+        assert {r["status"] for r in result["lines"]} == {"failed"}
+        assert result["lines"][0]["error"] == "Warehouse not found"
+        assert not Stock.objects.exists()
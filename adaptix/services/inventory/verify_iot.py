@@ -11,7 +11,7 @@ django.setup()
 
 from apps.iot.models import IoTDevice, Shelf, IoTReading
 from apps.stocks.models import Warehouse, Stock
-from apps.iot.serializers import IoTReadingSerializer
+from apps.iot.ingest import ingest_readings
 import uuid
 
 def run_test():
@@ -57,7 +57,8 @@ def run_test():
         warehouse=warehouse,
         shelf=shelf,
         company_uuid=company_uuid,
-        tare_weight=0.5 # 0.5kg tray weight
+        tare_weight=0.5, # 0.5kg tray weight
+        api_key="scale-key"
     )
     print(f"✅ Registered Device: {scale}")
 
@@ -65,11 +66,7 @@ def run_test():
     # Assumed unit weight = 1.0kg. So Qty should be 10.
     
     print("📡 Simulating Weight Reading: 10.5 kg...")
-    reading = IoTReading.objects.create(
-        device=scale,
-        value=Decimal("10.5"),
-        unit="kg"
-    )
+    ingest_readings([{"device_id": "SCALE-001", "api_key": "scale-key", "value": "10.5", "unit": "kg"}])
     
     # Refresh Stock
     stock.refresh_from_db()
@@ -87,18 +84,15 @@ def run_test():
         name="Freezer Sensor",
         type="thermometer",
         warehouse=warehouse,
-        company_uuid=company_uuid
+        company_uuid=company_uuid,
+        api_key="thermo-key"
     )
     
     print("📡 Simulating High Temp Reading: 30.0 C...")
     
     # We need to mock NotificationService to avoid errors and verify call
     with patch('apps.utils.notifications.NotificationService.send_notification') as mock_notify:
-        IoTReading.objects.create(
-            device=thermometer,
-            value=Decimal("30.0"),
-            unit="C"
-        )
+        ingest_readings([{"device_id": "THERMO-001", "api_key": "thermo-key", "value": "30.0", "unit": "C"}])
         
         if mock_notify.called:
             print("✅ SUCCESS: Temperature Alert Triggered!")
@@ -1,3 +1,4 @@
+import uuid
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -30,6 +31,45 @@ class RiderShipmentViewSet(viewsets.ReadOnlyModelViewSet):
             status__in=['SHIPPED', 'DELIVERED']
         ).order_by('route__start_time')
 
+    @action(detail=False, methods=['get'], url_path='nearby')
+    def nearby(self, request):
+        """
+        Nearest open stops around the rider, nearest first.
+        Query: lat, lng, radius_km (default 5), limit (default 20), driver_uuid,
+        scope=assigned (the rider's route stops, default) or open (the company's
+        unassigned shipments).
+        """
+        from ..geo import nearest_stops, parse_point
+
+        point = parse_point([request.query_params.get('lat'), request.query_params.get('lng')])
+        if point is None:
+            return Response({"detail": "Valid lat and lng are required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            radius_km = min(float(request.query_params.get('radius_km', 5)), 100.0)
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            return Response({"detail": "Invalid radius_km or limit"}, status=status.HTTP_400_BAD_REQUEST)
+        if radius_km <= 0 or limit <= 0:
+            return Response({"detail": "radius_km and limit must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.query_params.get('scope') == 'open':
+            company_uuid = getattr(request, 'company_uuid', None)
+            if not company_uuid:
+                return Response({"detail": "Company context missing"}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = Shipment.objects.filter(company_uuid=company_uuid, route__isnull=True, status__in=['PENDING', 'PACKED'])
+        else:
+            try:
+                driver_uuid = uuid.UUID(request.query_params.get('driver_uuid', ''))
+            except ValueError:
+                return Response({"detail": "Valid driver_uuid is required"}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = Shipment.objects.filter(route__driver_uuid=driver_uuid, status__in=Shipment.OPEN_STATUSES)
+
+        stops = nearest_stops(queryset, *point, radius_km=radius_km, limit=limit)
+        data = ShipmentSerializer(stops, many=True).data
+        for row, stop in zip(data, stops):
+            row['distance_km'] = round(stop.distance_km, 3)
+        return Response(data)
+
     @action(detail=True, methods=['post'], url_path='complete-delivery')
     def complete_delivery(self, request, pk=None):
         shipment = self.get_object()
@@ -0,0 +1,133 @@
+"""
+Geohash helpers for proximity lookups on Postgres without PostGIS.
+
+A geohash is a string whose prefixes are ever smaller grid cells, so "stops
+near a point" becomes "stops whose geohash starts with the point's cell or one
+of its 8 neighbours": a handful of prefix scans on an indexed column. The exact
+distance is then only computed for the rows in those cells.
+"""
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9  # ~5 m cells; stored on every stop, shorter prefixes are its parent cells
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def encode(lat, lng, precision=GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit, even = [], 0, 0, True
+    while len(chars) < precision:
+        target, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (target[0] + target[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            target[0] = mid
+        else:
+            bits <<= 1
+            target[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(BASE32[bits])
+            bits, bit = 0, 0
+    return ''.join(chars)
+
+
+def bounds(geohash):
+    """((min_lat, max_lat), (min_lng, max_lng)) of a cell."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        index = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            target = lng_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if (index >> shift) & 1:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+    return tuple(lat_range), tuple(lng_range)
+
+
+def neighbours(geohash):
+    """The cell and its 8 neighbours (fewer at the poles)."""
+    (min_lat, max_lat), (min_lng, max_lng) = bounds(geohash)
+    height, width = max_lat - min_lat, max_lng - min_lng
+    lat, lng = (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+    cells = []
+    for d_lat in (-1, 0, 1):
+        n_lat = lat + d_lat * height
+        if not -90 < n_lat < 90:
+            continue
+        for d_lng in (-1, 0, 1):
+            n_lng = (lng + d_lng * width + 180) % 360 - 180
+            cells.append(encode(n_lat, n_lng, len(geohash)))
+    return list(dict.fromkeys(cells))
+
+
+def precision_for_radius(radius_km, lat=0.0):
+    """
+    Longest prefix whose 3x3 block of cells still covers radius_km around a
+    point at this latitude; cells get narrower in km towards the poles.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        (min_lat, max_lat), (min_lng, max_lng) = bounds(encode(lat, 0.0, precision))
+        height_km = (max_lat - min_lat) * KM_PER_DEGREE
+        edge = min(abs(lat) + (max_lat - min_lat), 90.0)
+        width_km = (max_lng - min_lng) * KM_PER_DEGREE * math.cos(math.radians(edge))
+        if min(height_km, width_km) >= radius_km:
+            return precision
+    return 1
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def parse_point(value):
+    """(lat, lng) from {'lat', 'lng'} / {'latitude', 'longitude'} or a [lat, lng] pair; None if unusable."""
+    if isinstance(value, dict):
+        lat, lng = value.get('lat', value.get('latitude')), value.get('lng', value.get('longitude'))
+    elif isinstance(value, (list, tuple)) and len(value) == 2:
+        lat, lng = value
+    else:
+        return None
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def nearest_stops(queryset, lat, lng, radius_km=5.0, limit=20):
+    """
+    The stops of a Shipment queryset within radius_km of (lat, lng), nearest
+    first, in one query: the geohash prefixes of the surrounding 3x3 cells
+    narrow it down on the index, and only those rows get a distance
+    (equirectangular, accurate to well under 1% at delivery distances).
+    Each result carries distance_km. Stops without coordinates never match.
+    """
+    from django.db.models import F, FloatField, Q
+    from django.db.models.fields.json import KeyTextTransform
+    from django.db.models.functions import Cast, Coalesce, Sqrt
+
+    cells = neighbours(encode(lat, lng, precision_for_radius(radius_km, lat)))
+    in_cells = Q()
+    for cell in cells:
+        in_cells |= Q(geohash__startswith=cell)
+    scale = math.cos(math.radians(lat))
+    stop_lat = Coalesce('destination_lat', Cast(KeyTextTransform('lat', 'geo_location'), FloatField()))
+    stop_lng = Coalesce('destination_lng', Cast(KeyTextTransform('lng', 'geo_location'), FloatField()))
+    distance = Sqrt((stop_lat - lat) * (stop_lat - lat) + (stop_lng - lng) * scale * (stop_lng - lng) * scale) * KM_PER_DEGREE
+    return list(
+        queryset.filter(in_cells)
+        .annotate(distance_km=distance)
+        .filter(distance_km__lte=radius_km)
+        .order_by(F('distance_km').asc(), 'id')[:limit]
+    )
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:47
+
+from django.db import migrations, models
+
+
+def fill_geohash(apps, schema_editor):
+    from apps.shipping.geo import encode, parse_point
+
+    Shipment = apps.get_model('shipping', 'Shipment')
+    for shipment in Shipment.objects.exclude(geo_location=None).only('id', 'geo_location').iterator():
+        point = parse_point(shipment.geo_location)
+        if point:
+            Shipment.objects.filter(id=shipment.id).update(geohash=encode(*point))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0003_deliveryroute_branch_id_deliveryroute_company_uuid_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shipment',
+            name='destination_lat',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='destination_lng',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
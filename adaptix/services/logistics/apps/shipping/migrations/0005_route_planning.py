@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0004_shipment_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryroute',
+            name='planned_distance_km',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='deliveryroute',
+            name='planned_load',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='stop_sequence',
+            field=models.PositiveIntegerField(blank=True, help_text='Position of the stop on its route', null=True),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='weight',
+            field=models.FloatField(default=1.0, help_text='Load counted against Vehicle.capacity'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+# Furthest along first; a shipment that is delivered, on a route or touched
+# last is the one riders and customers have been looking at
+STATUS_RANK = {
+    'PENDING': 0, 'PACKED': 1, 'SHIPPED': 2, 'OUT_FOR_DELIVERY': 3, 'FAILED': 4, 'RETURNED': 4, 'DELIVERED': 5,
+}
+
+
+def drop_duplicate_shipments(apps, schema_editor):
+    """The old consumer could race and create two shipments for an order; keep the most advanced one."""
+    from django.db.models import Count
+
+    Shipment = apps.get_model('shipping', 'Shipment')
+    orders = (Shipment.objects.values('order_uuid').annotate(n=Count('id')).filter(n__gt=1)
+              .values_list('order_uuid', flat=True))
+    duplicates = []
+    for order_uuid in orders:
+        shipments = Shipment.objects.filter(order_uuid=order_uuid)
+        keep = max(shipments, key=lambda s: (
+            STATUS_RANK.get(s.status, 0), s.route_id is not None, s.delivered_at is not None, s.updated_at, s.created_at
+        ))
+        duplicates += [s.id for s in shipments if s.id != keep.id]
+        print(f"\n  Order {order_uuid}: keeping shipment {keep.tracking_number} ({keep.status}), "
+              f"dropping {len(shipments) - 1} duplicate(s)", end="")
+    Shipment.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0005_route_planning'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_shipments, migrations.RunPython.noop),
+    ]
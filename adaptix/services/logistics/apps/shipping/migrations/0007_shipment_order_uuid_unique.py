@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Separate from the cleanup in 0006, so Postgres has no pending trigger events when the constraint is added
+    dependencies = [
+        ('shipping', '0006_drop_duplicate_shipments'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shipment',
+            name='order_uuid',
+            field=models.UUIDField(unique=True),
+        ),
+    ]
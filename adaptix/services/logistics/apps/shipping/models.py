@@ -38,6 +38,9 @@ class DeliveryRoute(models.Model):
     start_time = models.DateTimeField(null=True, blank=True)
     end_time = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PLANNED')
+    # Set by the route planner: depot -> stops -> depot, and the load it carries
+    planned_distance_km = models.FloatField(null=True, blank=True)
+    planned_load = models.FloatField(null=True, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -54,20 +57,28 @@ class Shipment(models.Model):
         ('RETURNED', 'Returned'),
         ('FAILED', 'Delivery Failed'),
     ]
+    # Still to be delivered
+    OPEN_STATUSES = ['PENDING', 'PACKED', 'SHIPPED', 'OUT_FOR_DELIVERY']
 
     company_uuid = models.UUIDField(db_index=True, null=True)
     branch_id = models.UUIDField(db_index=True, null=True)
     
     tracking_number = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
-    # Link to POS Order
-    order_uuid = models.UUIDField(db_index=True)
+    # Link to POS Order; one shipment per order
+    order_uuid = models.UUIDField(unique=True)
     
     destination_address = models.TextField()
     customer_name = models.CharField(max_length=255)
     customer_phone = models.CharField(max_length=50)
+    destination_lat = models.FloatField(null=True, blank=True)
+    destination_lng = models.FloatField(null=True, blank=True)
+    # Geohash of the destination (or of geo_location when it is unknown), for nearest-stop lookups
+    geohash = models.CharField(max_length=12, null=True, blank=True, db_index=True, editable=False)
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     route = models.ForeignKey(DeliveryRoute, on_delete=models.SET_NULL, null=True, blank=True, related_name='shipments')
+    stop_sequence = models.PositiveIntegerField(null=True, blank=True, help_text="Position of the stop on its route")
+    weight = models.FloatField(default=1.0, help_text="Load counted against Vehicle.capacity")
     
     # Last Mile Delivery Fields
     proof_of_delivery = models.ImageField(upload_to='pod/', null=True, blank=True)
@@ -81,3 +92,17 @@ class Shipment(models.Model):
 
     def __str__(self):
         return f"{self.tracking_number} - {self.status}"
+
+    def locate(self):
+        """Sets geohash from the destination coordinates, else from geo_location."""
+        from .geo import encode, parse_point
+
+        point = parse_point([self.destination_lat, self.destination_lng]) or parse_point(self.geo_location)
+        self.geohash = encode(*point) if point else None
+
+    def save(self, *args, **kwargs):
+        self.locate()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'geohash' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['geohash']
+        super().save(*args, **kwargs)
@@ -0,0 +1,271 @@
+"""
+Route planning: pending shipments -> delivery routes for the available vehicles.
+
+1. cluster the stops geographically (k-means on a local km projection), so no
+   cluster has more than max_cluster_size stops
+2. per cluster, Clarke-Wright savings builds capacity-feasible routes out of
+   a NumPy distance matrix (depot + stops), and 2-opt straightens each route
+   using the whole matrix of exchange gains at once
+3. routes are matched to vehicles best-fit by load (heaviest route first)
+4. routes and stop assignments are written in bulk: one INSERT for the routes
+   and one UPDATE for every shipment
+
+The solver (plan_routes) works on plain coordinates and has no database
+access; plan_delivery_routes() is the Django side.
+
+    plan = plan_delivery_routes(company_uuid, depot=(23.81, 90.41))
+"""
+import math
+import numpy as np
+from django.db import connection, transaction
+from .geo import EARTH_RADIUS_KM, parse_point
+
+MAX_CLUSTER_SIZE = 1000
+KMEANS_ITERATIONS = 25
+
+
+def distance_matrix(lat, lng):
+    """Haversine distances (km) between every pair of points, as an (n, n) array."""
+    lat, lng = np.radians(lat), np.radians(lng)
+    d_lat = lat[:, None] - lat[None, :]
+    d_lng = lng[:, None] - lng[None, :]
+    a = np.sin(d_lat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(d_lng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def cluster_stops(lat, lng, max_cluster_size=MAX_CLUSTER_SIZE, seed=0):
+    """Cluster label per stop; k-means with k = ceil(n / max_cluster_size), oversized clusters split again."""
+    n = len(lat)
+    k = max(1, math.ceil(n / max_cluster_size))
+    if k == 1:
+        return np.zeros(n, dtype=int)
+    points = np.column_stack([lat, lng * math.cos(math.radians(float(np.mean(lat))))])
+    rng = np.random.default_rng(seed)
+    # k-means++ seeding
+    centres = [points[rng.integers(n)]]
+    for _ in range(1, k):
+        d2 = np.min(((points[:, None, :] - np.array(centres)[None, :, :]) ** 2).sum(axis=2), axis=1)
+        centres.append(points[rng.choice(n, p=d2 / d2.sum()) if d2.sum() > 0 else rng.integers(n)])
+    centres = np.array(centres)
+    for _ in range(KMEANS_ITERATIONS):
+        labels = np.argmin(((points[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2), axis=1)
+        moved = np.array([points[labels == c].mean(axis=0) if np.any(labels == c) else centres[c] for c in range(k)])
+        if np.allclose(moved, centres):
+            break
+        centres = moved
+
+    # k-means does not bound cluster sizes: split the big ones in two along their longer side
+    labels = labels.copy()
+    next_label = k
+    while True:
+        sizes = np.bincount(labels)
+        big = int(np.argmax(sizes))
+        if sizes[big] <= max_cluster_size:
+            return labels
+        members = np.flatnonzero(labels == big)
+        spread = points[members].max(axis=0) - points[members].min(axis=0)
+        order = members[np.argsort(points[members, int(np.argmax(spread))], kind='stable')]
+        labels[order[len(order) // 2:]] = next_label
+        next_label += 1
+
+
+def savings_routes(dist, demand, capacity):
+    """
+    Clarke-Wright savings. dist is (n + 1, n + 1) with the depot at index 0;
+    demand has one entry per stop. Returns routes as lists of stop indices
+    (0-based, depot excluded), each carrying at most `capacity`.
+    """
+    n = len(demand)
+    if n == 0:
+        return []
+    route_of = list(range(n))
+    routes = {i: [i] for i in range(n)}
+    load = {i: float(demand[i]) for i in range(n)}
+
+    from_depot = dist[0, 1:]
+    savings = from_depot[:, None] + from_depot[None, :] - dist[1:, 1:]
+    first, second = np.triu_indices(n, 1)
+    values = savings[first, second]
+    keep = values > 0
+    order = np.argsort(-values[keep], kind='stable')
+    for i, j in zip(first[keep][order].tolist(), second[keep][order].tolist()):
+        ri, rj = route_of[i], route_of[j]
+        if ri == rj or load[ri] + load[rj] > capacity:
+            continue
+        a, b = routes[ri], routes[rj]
+        # Only routes that end in i and j can be joined through the edge (i, j)
+        if a[-1] == i and b[0] == j:
+            merged = a + b
+        elif a[0] == i and b[-1] == j:
+            merged = b + a
+        elif a[0] == i and b[0] == j:
+            merged = a[::-1] + b
+        elif a[-1] == i and b[-1] == j:
+            merged = a + b[::-1]
+        else:
+            continue
+        routes[ri] = merged
+        load[ri] += load.pop(rj)
+        del routes[rj]
+        for stop in b:
+            route_of[stop] = ri
+    return list(routes.values())
+
+
+def two_opt(route, dist):
+    """
+    Improves a route (stop indices into dist, depot 0 implied at both ends) by
+    applying the best 2-opt exchange until none shortens it. Each pass scores
+    every exchange at once from the distance matrix.
+    """
+    path = np.array([0] + [stop + 1 for stop in route] + [0])
+    while len(path) >= 5:
+        a, b = path[:-1], path[1:]
+        current = dist[a, b]
+        # Replacing edges (a_i, b_i) and (a_j, b_j) by (a_i, a_j) and (b_i, b_j), for j >= i + 2
+        gain = dist[a[:, None], a[None, :]] + dist[b[:, None], b[None, :]] - current[:, None] - current[None, :]
+        gain = np.triu(gain, 2)
+        i, j = np.unravel_index(np.argmin(gain), gain.shape)
+        if gain[i, j] >= -1e-9:
+            break
+        path[i + 1:j + 1] = path[i + 1:j + 1][::-1].copy()
+    return [int(stop) - 1 for stop in path[1:-1]]
+
+
+def route_length(route, dist):
+    path = [0] + [stop + 1 for stop in route] + [0]
+    return float(dist[path[:-1], path[1:]].sum())
+
+
+def match_vehicles(loads, capacities):
+    """Best fit, heaviest route first: {route index: vehicle index}; routes that fit no free vehicle are left out."""
+    free = sorted(range(len(capacities)), key=lambda v: capacities[v])
+    matched = {}
+    for r in sorted(range(len(loads)), key=lambda r: -loads[r]):
+        for position, v in enumerate(free):
+            if capacities[v] >= loads[r]:
+                matched[r] = v
+                del free[position]
+                break
+    return matched
+
+
+def plan_routes(depot, stops, capacities, max_cluster_size=MAX_CLUSTER_SIZE):
+    """
+    depot: (lat, lng); stops: [(lat, lng, weight)]; capacities: [capacity per vehicle].
+    Returns {"routes": [{"vehicle": index, "stops": [stop indices in visiting order],
+    "load", "distance_km"}], "unplanned": {stop index: reason}}.
+    """
+    unplanned = {}
+    if not stops or not capacities:
+        reason = "No vehicle available" if stops else None
+        return {"routes": [], "unplanned": {i: reason for i in range(len(stops))}}
+
+    lat = np.array([s[0] for s in stops], dtype=float)
+    lng = np.array([s[1] for s in stops], dtype=float)
+    weight = np.array([s[2] for s in stops], dtype=float)
+    capacity = max(capacities)
+    for i in np.flatnonzero(weight > capacity).tolist():
+        unplanned[i] = "Heavier than any vehicle"
+    plannable = np.flatnonzero(weight <= capacity)
+
+    candidates = []
+    labels = cluster_stops(lat[plannable], lng[plannable], max_cluster_size)
+    for label in np.unique(labels):
+        members = plannable[labels == label]
+        dist = distance_matrix(np.append(depot[0], lat[members]), np.append(depot[1], lng[members]))
+        for route in savings_routes(dist, weight[members], capacity):
+            route = two_opt(route, dist)
+            candidates.append({
+                "stops": members[route].tolist(),
+                "load": float(weight[members[route]].sum()),
+                "distance_km": route_length(route, dist),
+            })
+
+    matched = match_vehicles([c["load"] for c in candidates], capacities)
+    routes = []
+    for index, candidate in enumerate(candidates):
+        if index in matched:
+            routes.append(dict(candidate, vehicle=matched[index]))
+        else:
+            unplanned.update({stop: "No vehicle available" for stop in candidate["stops"]})
+    return {"routes": routes, "unplanned": unplanned}
+
+
+def plan_delivery_routes(company_uuid, depot, shipment_ids=None, vehicle_ids=None, branch_id=None,
+                         dry_run=False, max_cluster_size=MAX_CLUSTER_SIZE):
+    """
+    Plans the company's unassigned PENDING/PACKED shipments (or the given ones)
+    onto its AVAILABLE vehicles without an open route (or the given ones).
+    Unless dry_run, creates one PLANNED DeliveryRoute per used vehicle and
+    moves the shipments onto it as SHIPPED with their stop_sequence.
+    Returns {"routes": [{"route_id", "vehicle_id", "driver_uuid", "shipment_ids",
+    "load", "distance_km"}], "unplanned": [{"shipment_id", "reason"}]}.
+    """
+    from .models import DeliveryRoute, Shipment, Vehicle
+
+    with transaction.atomic():
+        shipments = Shipment.objects.select_for_update().filter(
+            company_uuid=company_uuid, route__isnull=True, status__in=['PENDING', 'PACKED']
+        )
+        if shipment_ids is not None:
+            shipments = shipments.filter(id__in=shipment_ids)
+        vehicles = Vehicle.objects.select_for_update().filter(company_uuid=company_uuid, status='AVAILABLE')
+        if vehicle_ids is not None:
+            vehicles = vehicles.filter(id__in=vehicle_ids)
+        # Locked before the open routes are read, so a concurrent plan that took
+        # one of them has committed by then and the vehicle shows up as busy
+        locked = list(vehicles.order_by('id').values_list('id', flat=True))
+        busy = DeliveryRoute.objects.filter(status__in=['PLANNED', 'STARTED'], vehicle__isnull=False).values('vehicle_id')
+        vehicles = list(Vehicle.objects.filter(id__in=locked).exclude(id__in=busy)
+                        .order_by('id').values_list('id', 'capacity', 'driver_uuid'))
+
+        ids, stops, unplanned = [], [], []
+        for pk, d_lat, d_lng, geo_location, weight in shipments.order_by('id').values_list(
+            'id', 'destination_lat', 'destination_lng', 'geo_location', 'weight'
+        ):
+            point = parse_point([d_lat, d_lng]) or parse_point(geo_location)
+            if point is None:
+                unplanned.append({"shipment_id": pk, "reason": "No destination coordinates"})
+                continue
+            ids.append(pk)
+            stops.append((point[0], point[1], weight or 0.0))
+
+        plan = plan_routes(depot, stops, [v[1] for v in vehicles], max_cluster_size)
+        unplanned += [{"shipment_id": ids[i], "reason": reason} for i, reason in sorted(plan["unplanned"].items())]
+        routes = [{
+            "route_id": None,
+            "vehicle_id": vehicles[r["vehicle"]][0],
+            "driver_uuid": vehicles[r["vehicle"]][2],
+            "shipment_ids": [ids[i] for i in r["stops"]],
+            "load": r["load"],
+            "distance_km": round(r["distance_km"], 3),
+        } for r in plan["routes"]]
+        if dry_run or not routes:
+            return {"routes": routes, "unplanned": unplanned}
+
+        created = DeliveryRoute.objects.bulk_create([
+            DeliveryRoute(
+                company_uuid=company_uuid, branch_id=branch_id, vehicle_id=r["vehicle_id"], driver_uuid=r["driver_uuid"],
+                status='PLANNED', planned_distance_km=r["distance_km"], planned_load=r["load"]
+            ) for r in routes
+        ])
+        for route, row in zip(routes, created):
+            route["route_id"] = row.id
+        assign_stops(routes)
+    return {"routes": routes, "unplanned": unplanned}
+
+
+def assign_stops(routes):
+    """One UPDATE for every planned shipment: route, stop_sequence and SHIPPED."""
+    from django.utils import timezone
+    from .models import Shipment
+
+    rows = [(pk, r["route_id"], seq) for r in routes for seq, pk in enumerate(r["shipment_ids"], start=1)]
+    table = connection.ops.quote_name(Shipment._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} AS s SET route_id = v.route_id, stop_sequence = v.seq, status = 'SHIPPED', updated_at = %s "
+            f"FROM unnest(%s::bigint[], %s::bigint[], %s::integer[]) AS v (id, route_id, seq) WHERE s.id = v.id",
+            [timezone.now(), [r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows]]
+        )
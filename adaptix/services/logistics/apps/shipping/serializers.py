@@ -13,7 +13,11 @@ class ShipmentSerializer(serializers.ModelSerializer):
         read_only_fields = ['tracking_number', 'created_at', 'updated_at']
 
 class DeliveryRouteSerializer(serializers.ModelSerializer):
-    shipments = ShipmentSerializer(many=True, read_only=True)
+    shipments = serializers.SerializerMethodField()
+
+    def get_shipments(self, route):
+        # Stops in visiting order once the route has been planned
+        return ShipmentSerializer(route.shipments.order_by('stop_sequence', 'id'), many=True).data
     
     class Meta:
         model = DeliveryRoute
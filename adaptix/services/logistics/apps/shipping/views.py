@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Vehicle, Shipment, DeliveryRoute
 from .serializers import VehicleSerializer, ShipmentSerializer, DeliveryRouteSerializer
+from .geo import nearest_stops, parse_point
 
 from adaptix_core.permissions import HasPermission
 
@@ -42,8 +43,11 @@ class ShipmentViewSet(BaseLogisticsViewSet):
         return "logistics.shipment"
 
     @action(detail=False, methods=['get'], url_path='my-tasks')
-    def my_tasks(self):
-        """Assigned tasks for the logged-in rider."""
+    def my_tasks(self, request):
+        """
+        Assigned tasks for the logged-in rider. With ?lat=&lng= the tasks are
+        ordered nearest first (within radius_km, default 5).
+        """
         claims = getattr(self.request, 'user_claims', {})
         user_uuid = claims.get("sub")
         
@@ -52,8 +56,20 @@ class ShipmentViewSet(BaseLogisticsViewSet):
             
         # Shipments assigned to a route where this user is the driver
         qs = self.get_queryset().filter(route__driver_uuid=user_uuid).exclude(status__in=['DELIVERED', 'RETURNED'])
-        serializer = self.get_serializer(qs, many=True)
-        return Response(serializer.data)
+
+        point = parse_point([request.query_params.get('lat'), request.query_params.get('lng')])
+        if point is None:
+            serializer = self.get_serializer(qs, many=True)
+            return Response(serializer.data)
+        try:
+            radius_km = min(float(request.query_params.get('radius_km', 5)), 100.0)
+        except ValueError:
+            return Response({"error": "Invalid radius_km"}, status=status.HTTP_400_BAD_REQUEST)
+        stops = nearest_stops(qs, *point, radius_km=radius_km, limit=100)
+        data = self.get_serializer(stops, many=True).data
+        for row, stop in zip(data, stops):
+            row['distance_km'] = round(stop.distance_km, 3)
+        return Response(data)
 
     @action(detail=True, methods=['patch'], url_path='complete-delivery')
     def complete_delivery(self, request, pk=None):
@@ -78,6 +94,41 @@ class DeliveryRouteViewSet(BaseLogisticsViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['status', 'driver_uuid']
     
+    @action(detail=False, methods=['post'])
+    def plan(self, request):
+        """
+        Plan routes for pending shipments onto available vehicles.
+        Payload: { "depot": {"lat", "lng"}, "shipment_ids"?: [...], "vehicle_ids"?: [...],
+                   "dry_run"?: false, "max_cluster_size"?: 1000 }
+        """
+        from .planning import plan_delivery_routes, MAX_CLUSTER_SIZE
+
+        company_uuid = getattr(request, "company_uuid", None)
+        if not company_uuid:
+            return Response({'error': 'Company context missing'}, status=status.HTTP_400_BAD_REQUEST)
+        depot = parse_point(request.data.get('depot'))
+        if depot is None:
+            return Response({'error': 'depot {"lat", "lng"} required'}, status=status.HTTP_400_BAD_REQUEST)
+        shipment_ids, vehicle_ids = request.data.get('shipment_ids'), request.data.get('vehicle_ids')
+        if any(ids is not None and not isinstance(ids, list) for ids in (shipment_ids, vehicle_ids)):
+            return Response({'error': 'shipment_ids and vehicle_ids must be lists'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            max_cluster_size = max(int(request.data.get('max_cluster_size', MAX_CLUSTER_SIZE)), 10)
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid max_cluster_size'}, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+
+        plan = plan_delivery_routes(
+            company_uuid, depot,
+            shipment_ids=shipment_ids,
+            vehicle_ids=vehicle_ids,
+            branch_id=getattr(request, "branch_id", None),
+            dry_run=dry_run,
+            max_cluster_size=max_cluster_size
+        )
+        return Response(plan, status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['post'])
     def assign_shipment(self, request, pk=None):
         route = self.get_object()
@@ -10,5 +10,6 @@ def api_client():
 def mock_permissions(mocker):
     try:
         mocker.patch('rest_framework.permissions.IsAuthenticated.has_permission', return_value=True)
+        mocker.patch('adaptix_core.permissions.HasPermission.has_permission', return_value=True)
     except ImportError:
         pass
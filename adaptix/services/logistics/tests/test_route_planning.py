@@ -0,0 +1,132 @@
+import threading
+import time
+import uuid
+import numpy as np
+import pytest
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory
+from apps.shipping.models import DeliveryRoute, Shipment, Vehicle
+from apps.shipping.planning import distance_matrix, plan_delivery_routes, savings_routes, two_opt
+from apps.shipping.views import DeliveryRouteViewSet
+
+DEPOT = (23.85, 90.45)
+
+
+@pytest.fixture
+def company_uuid():
+    return uuid.uuid4()
+
+
+@pytest.fixture
+def benchmark_fleet(company_uuid):
+    """2,000 pending stops around Dhaka (weights 1-5) and 50 vehicles of capacity 200."""
+    rng = np.random.default_rng(7)
+    Shipment.objects.bulk_create([
+        Shipment(
+            company_uuid=company_uuid, order_uuid=uuid.uuid4(), destination_address=f"Stop {i}",
+            customer_name="Benchmark", customer_phone="", status='PENDING',
+            destination_lat=23.6 + rng.random() * 0.5, destination_lng=90.2 + rng.random() * 0.5,
+            weight=float(rng.integers(1, 6))
+        ) for i in range(2000)
+    ])
+    Vehicle.objects.bulk_create([
+        Vehicle(company_uuid=company_uuid, license_plate=f"BM-{i:03d}", capacity=200.0, model="Van", driver_uuid=uuid.uuid4())
+        for i in range(50)
+    ])
+
+
+def test_savings_respects_capacity_and_two_opt_uncrosses():
+    lat = np.array([0.0, 0.0, 0.0, 0.01, 0.01])
+    lng = np.array([0.0, 0.01, 0.02, 0.02, 0.01])
+    dist = distance_matrix(lat, lng)
+    routes = savings_routes(dist, np.array([1.0, 1.0, 1.0, 1.0]), capacity=2)
+    assert sorted(len(r) for r in routes) == [2, 2]
+
+    crossed = [0, 2, 1, 3]  # stops 1..4 of the square, visited across the diagonal
+    improved = two_opt(crossed, dist)
+    length = lambda r: dist[[0] + [s + 1 for s in r], [s + 1 for s in r] + [0]].sum()
+    assert length(improved) < length(crossed)
+
+
+@pytest.mark.django_db
+def test_plans_2000_stops_on_50_vehicles_in_under_10_seconds(company_uuid, benchmark_fleet):
+    started = time.perf_counter()
+    plan = plan_delivery_routes(company_uuid, DEPOT)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 10
+    assert plan["unplanned"] == []
+    assert len(plan["routes"]) <= 50
+    assert Shipment.objects.filter(company_uuid=company_uuid, route__isnull=True).count() == 0
+    for route in DeliveryRoute.objects.filter(company_uuid=company_uuid):
+        stops = list(route.shipments.order_by('stop_sequence').values_list('stop_sequence', 'weight'))
+        assert [seq for seq, _ in stops] == list(range(1, len(stops) + 1))
+        assert sum(w for _, w in stops) <= route.vehicle.capacity
+        assert route.driver_uuid == route.vehicle.driver_uuid
+
+    # Vehicles with a planned route are no longer available
+    assert plan_delivery_routes(company_uuid, DEPOT)["routes"] == []
+
+
+@pytest.mark.django_db
+def test_plan_endpoint_dry_run(company_uuid):
+    vehicle = Vehicle.objects.create(company_uuid=company_uuid, license_plate="DRY-1", capacity=10, model="Bike")
+    near = Shipment.objects.create(company_uuid=company_uuid, order_uuid=uuid.uuid4(), destination_address="A",
+                                   customer_name="A", customer_phone="", destination_lat=23.86, destination_lng=90.45)
+    far = Shipment.objects.create(company_uuid=company_uuid, order_uuid=uuid.uuid4(), destination_address="B",
+                                  customer_name="B", customer_phone="", destination_lat=23.9, destination_lng=90.45)
+    unknown = Shipment.objects.create(company_uuid=company_uuid, order_uuid=uuid.uuid4(), destination_address="C",
+                                      customer_name="C", customer_phone="")
+
+    request = APIRequestFactory().post("/", {"depot": {"lat": DEPOT[0], "lng": DEPOT[1]}, "dry_run": True}, format="json")
+    request.company_uuid = company_uuid
+    response = DeliveryRouteViewSet.as_view({"post": "plan"})(request)
+
+    assert response.status_code == 200
+    assert [(r["vehicle_id"], r["shipment_ids"]) for r in response.data["routes"]] == [(vehicle.id, [near.id, far.id])]
+    assert response.data["unplanned"] == [{"shipment_id": unknown.id, "reason": "No destination coordinates"}]
+    assert not DeliveryRoute.objects.exists()
+
+
+@pytest.mark.django_db
+def test_plan_endpoint_reads_dry_run_false_as_false(company_uuid):
+    Vehicle.objects.create(company_uuid=company_uuid, license_plate="WET-1", capacity=10, model="Bike")
+    shipment = Shipment.objects.create(company_uuid=company_uuid, order_uuid=uuid.uuid4(), destination_address="A",
+                                       customer_name="A", customer_phone="", destination_lat=23.86, destination_lng=90.45)
+
+    request = APIRequestFactory().post("/", {"depot": {"lat": DEPOT[0], "lng": DEPOT[1]}, "dry_run": "false"}, format="json")
+    request.company_uuid = company_uuid
+    response = DeliveryRouteViewSet.as_view({"post": "plan"})(request)
+
+    assert response.status_code == 201
+    shipment.refresh_from_db()
+    assert shipment.route_id == response.data["routes"][0]["route_id"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_plans_do_not_share_a_vehicle(company_uuid):
+    vehicle = Vehicle.objects.create(company_uuid=company_uuid, license_plate="LOCK-1", capacity=10, model="Bike")
+    Shipment.objects.create(company_uuid=company_uuid, order_uuid=uuid.uuid4(), destination_address="A",
+                            customer_name="A", customer_phone="", destination_lat=23.86, destination_lng=90.45)
+    locked = threading.Event()
+
+    def other_plan():
+        # Another planner holding the vehicle while it books a route for it
+        try:
+            with transaction.atomic():
+                Vehicle.objects.select_for_update().get(pk=vehicle.pk)
+                locked.set()
+                time.sleep(0.5)
+                DeliveryRoute.objects.create(company_uuid=company_uuid, vehicle=vehicle, status='PLANNED')
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=other_plan)
+    thread.start()
+    locked.wait(5)
+    plan = plan_delivery_routes(company_uuid, DEPOT)
+    thread.join()
+
+    assert plan["routes"] == []
+    assert [u["reason"] for u in plan["unplanned"]] == ["No vehicle available"]
+    assert DeliveryRoute.objects.filter(vehicle=vehicle).count() == 1
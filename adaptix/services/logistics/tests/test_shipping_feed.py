@@ -0,0 +1,67 @@
+import pytest
+import uuid
+from apps.shipping.geo import encode, neighbours, nearest_stops
+from apps.shipping.management.commands.run_shipping_consumer import Command
+from apps.shipping.models import DeliveryRoute, Shipment
+
+
+def make_shipment(lat, lng, **kwargs):
+    return Shipment.objects.create(
+        order_uuid=uuid.uuid4(), destination_address="Somewhere", customer_name="Rider Test",
+        customer_phone="555", destination_lat=lat, destination_lng=lng, **kwargs
+    )
+
+
+def test_geohash_matches_reference_and_neighbours_surround_the_cell():
+    assert encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    cells = neighbours("u4pruy")
+    assert len(cells) == 9 and "u4pruy" in cells
+
+
+@pytest.mark.django_db
+class TestShipmentBatching:
+    def test_batch_creates_one_shipment_per_order(self):
+        order, other = str(uuid.uuid4()), str(uuid.uuid4())
+        command = Command()
+        events = [
+            command.parse(f'{{"event": "pos.sale.closed", "order_id": "{order}", "destination": {{"lat": 23.78, "lng": 90.4}}}}'),
+            command.parse(f'{{"event": "pos.sale.closed", "order_id": "{order}"}}'),
+            command.parse(f'{{"event": "production.output_created", "source_order_uuid": "{other}"}}'),
+        ]
+        command.create_shipments(events)
+        command.create_shipments(events)
+
+        assert Shipment.objects.count() == 2
+        shipment = Shipment.objects.get(order_uuid=order)
+        assert shipment.geohash == encode(23.78, 90.4)
+        assert command.parse('{"event": "pos.sale.closed", "order_id": "not-a-uuid"}') is None
+
+
+@pytest.mark.django_db
+class TestRiderFeed:
+    def test_nearest_stops_are_ordered_and_bounded(self):
+        near = make_shipment(23.8103, 90.4125)
+        nearer = make_shipment(23.8100, 90.4120)
+        make_shipment(23.9000, 90.5000)  # ~13 km away
+        make_shipment(None, None)
+
+        stops = nearest_stops(Shipment.objects.all(), 23.8099, 90.4119, radius_km=2)
+        assert [s.id for s in stops] == [nearer.id, near.id]
+        assert stops[0].distance_km < stops[1].distance_km < 2
+
+    def test_rider_feed_returns_own_open_stops(self, api_client):
+        driver = uuid.uuid4()
+        route = DeliveryRoute.objects.create(driver_uuid=driver)
+        mine = make_shipment(23.8101, 90.4121, route=route, status='SHIPPED')
+        make_shipment(23.8101, 90.4121, route=route, status='DELIVERED')
+        make_shipment(23.8101, 90.4121, route=DeliveryRoute.objects.create(driver_uuid=uuid.uuid4()), status='SHIPPED')
+
+        response = api_client.get("/api/logistics/rider/shipments/nearby/", {
+            "driver_uuid": str(driver), "lat": 23.81, "lng": 90.412,
+        })
+        assert response.status_code == 200
+        assert [row["id"] for row in response.data] == [mine.id]
+        assert response.data[0]["distance_km"] < 0.1
+
+        response = api_client.get("/api/logistics/rider/shipments/nearby/", {"driver_uuid": str(driver)})
+        assert response.status_code == 400
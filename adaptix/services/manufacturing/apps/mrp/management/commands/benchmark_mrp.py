@@ -0,0 +1,75 @@
+import datetime
+import random
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from apps.mrp.planning import BOMGraph, run_mrp
+
+class Command(BaseCommand):
+    help = 'Runs the MRP engine against a synthetic plant (no database needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bom-lines', type=int, default=50000)
+        parser.add_argument('--orders', type=int, default=5000)
+        parser.add_argument('--finished-goods', type=int, default=2000)
+        parser.add_argument('--sub-assemblies', type=int, default=3000)
+        parser.add_argument('--raw-materials', type=int, default=10000)
+        parser.add_argument('--levels', type=int, default=4, help='Sub-assembly tiers below finished goods')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        fg = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(options['finished_goods'])]
+        sa = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(options['sub_assemblies'])]
+        rm = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(options['raw_materials'])]
+
+        # Sub-assemblies are split into tiers; a BOM only pulls from the next
+        # tier down (or raw materials), which keeps the graph acyclic and
+        # `levels + 1` deep like a real plant.
+        levels = max(options['levels'], 1)
+        tiers = [sa[i::levels] for i in range(levels)]
+        parents = [(product, 0) for product in fg] + [
+            (product, tier + 1) for tier, members in enumerate(tiers) for product in members
+        ]
+        lines_per_bom = max(options['bom_lines'] // len(parents), 1)
+
+        started = time.perf_counter()
+        graph = BOMGraph()
+        total_lines = 0
+        for bom_id, (product, tier) in enumerate(parents, start=1):
+            lower = tiers[tier] if tier < levels else []
+            items = []
+            for _ in range(lines_per_bom):
+                if lower and rng.random() < 0.2:
+                    component = rng.choice(lower)
+                else:
+                    component = rng.choice(rm)
+                items.append((component, rng.randint(1, 5), rng.choice([0, 0, 2, 5])))
+            graph.add_bom(bom_id, product, 1, items)
+            total_lines += len(items)
+        graph.topological_order()
+        build_time = time.perf_counter() - started
+
+        today = datetime.date.today()
+        demands = [{
+            "order_id": order_id,
+            "bom_id": rng.randint(1, len(fg)),
+            "quantity": float(rng.randint(1, 200)),
+            "due_date": today + datetime.timedelta(days=rng.randint(0, 60)),
+        } for order_id in range(1, options['orders'] + 1)]
+        supply = {
+            item: {"on_hand": float(rng.randint(0, 20000)), "in_transit": float(rng.randint(0, 2000))}
+            for item in rm + rng.sample(sa, len(sa) // 2)
+        }
+
+        started = time.perf_counter()
+        result = run_mrp(graph, demands, supply)
+        run_time = time.perf_counter() - started
+
+        self.stdout.write(f"BOM lines:           {total_lines}")
+        self.stdout.write(f"Orders:              {len(demands)}")
+        self.stdout.write(f"Graph build:         {build_time:.3f}s")
+        self.stdout.write(f"MRP run:             {run_time:.3f}s")
+        self.stdout.write(f"Orders short:        {result['summary']['orders_short']}")
+        self.stdout.write(f"Shortage lines:      {result['summary']['shortage_lines']}")
+        self.stdout.write(f"Planned sub-assy:    {len(result['planned_subassemblies'])}")
@@ -1,42 +1,36 @@
 from django.core.management.base import BaseCommand
-from apps.mrp.models import ProductionOrder, ProductUnit
-from apps.mrp.utils.serial_generator import generate_serial_number
-import json
+from django.db.models import Count, F
+from apps.mrp.models import ProductionOrder
+from apps.mrp.utils.unit_generator import generate_units, UNIT_CHUNK_SIZE
 
 class Command(BaseCommand):
     help = 'Generate individual ProductUnit records for existing confirmed/in-progress orders'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=UNIT_CHUNK_SIZE, help='Units per bulk INSERT')
+
     def handle(self, *args, **options):
-        # Targeting orders that should have units but might not
+        chunk_size = options['chunk_size']
+        # Targeting orders that should have units but are missing some
         orders = ProductionOrder.objects.filter(
             status__in=['CONFIRMED', 'IN_PROGRESS', 'QUALITY_CHECK', 'COMPLETED']
-        )
-        
+        ).annotate(unit_count=Count('units')).filter(unit_count__lt=F('quantity_planned'))
+
         total_created = 0
-        self.stdout.write(f"Checking {orders.count()} orders for missing units...")
+        self.stdout.write(f"Found {orders.count()} orders with missing units...")
 
         for order in orders:
-            if order.units.exists():
-                self.stdout.write(self.style.WARNING(f"Order PO-{order.id} already has units. Skipping."))
-                continue
-
-            count = int(order.quantity_planned)
+            count = int(order.quantity_planned) - order.unit_count
             self.stdout.write(f"Generating {count} units for Order PO-{order.id}...")
-            
-            for _ in range(count):
-                serial = generate_serial_number()
-                ProductUnit.objects.create(
-                    serial_number=serial,
-                    production_order=order,
-                    product_uuid=order.product_uuid,
-                    company_uuid=order.company_uuid,
-                    status='PRODUCTION' if order.status != 'COMPLETED' else 'INVENTORY',
-                    qr_code_data=json.dumps({
-                        "serial": serial,
-                        "product": str(order.product_uuid),
-                        "order": f"PO-{order.id}"
-                    })
-                )
-                total_created += 1
+
+            def report(done, missing, order=order):
+                self.stdout.write(f"  PO-{order.id}: {done}/{missing}")
+
+            total_created += generate_units(
+                order,
+                status='PRODUCTION' if order.status != 'COMPLETED' else 'INVENTORY',
+                chunk_size=chunk_size,
+                on_progress=report
+            )
 
         self.stdout.write(self.style.SUCCESS(f"Successfully generated {total_created} individual units."))
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mrp', '0011_productionorder_product_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerialSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=20)),
+                ('period', models.CharField(help_text='YYYYMM', max_length=6)),
+                ('last_value', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('prefix', 'period')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mrp', '0012_serialsequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productionorderoperation',
+            name='scheduled_start',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='productionorderoperation',
+            name='scheduled_end',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -150,6 +150,10 @@ class ProductionOrderOperation(models.Model):
     completed_at = models.DateTimeField(null=True, blank=True)
     actual_time_minutes = models.PositiveIntegerField(null=True, blank=True)
     
+    # Filled by the finite-capacity scheduler (apps/mrp/scheduling.py)
+    scheduled_start = models.DateField(null=True, blank=True, db_index=True)
+    scheduled_end = models.DateField(null=True, blank=True)
+    
     operator_id = models.CharField(max_length=255, null=True, blank=True)
     assigned_worker_uuids = models.JSONField(default=list, blank=True, help_text="List of worker UUIDs assigned (HRMS)")
     notes = models.TextField(blank=True)
@@ -203,3 +207,20 @@ class ProductUnit(models.Model):
 
     def __str__(self):
         return self.serial_number
+
+class SerialSequence(models.Model):
+    """
+    Per prefix/month counter for unit serial numbers.
+    Units reserve contiguous blocks from here instead of guessing random suffixes.
+    """
+    prefix = models.CharField(max_length=20)
+    period = models.CharField(max_length=6, help_text="YYYYMM")
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('prefix', 'period')
+
+    def __str__(self):
+        return f"{self.prefix}-{self.period} @ {self.last_value}"
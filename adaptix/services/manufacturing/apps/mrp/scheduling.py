@@ -0,0 +1,383 @@
+"""
+Finite-capacity scheduler for production order operations.
+
+Capacity is kept in a bucketed calendar: one bucket per work center per
+day holding the units it can still process (WorkCenter.capacity_per_day).
+An operation on a work center consumes the order quantity from those
+buckets, spilling into later (forward) or earlier (backward) days when a
+day is full. Operations whose operation has no work center, or whose work
+center has no capacity set, are not capacity bound and simply take
+BOMOperation.estimated_time_minutes (scaled to the order) of working time.
+
+Full days are skipped with a union-find "next free day" pointer, so a
+placement costs roughly the number of days it actually occupies.
+
+    scheduler = FiniteScheduler(CapacityCalendar(capacities, today))
+    result = scheduler.schedule(jobs, direction="forward")
+    scheduler.reschedule(changed_job)   # only that order moves
+"""
+import datetime
+import math
+
+EPSILON = 1e-9
+WORKDAY_MINUTES = 480
+SCHEDULABLE_STATUSES = ('DRAFT', 'CONFIRMED', 'IN_PROGRESS')
+
+
+class CapacityCalendar:
+    def __init__(self, capacities, start_date, horizon_days=180):
+        """capacities: {work_center_id: units per day}; falsy capacity means unconstrained."""
+        self.start_date = start_date
+        self.capacities = {wc: float(cap) for wc, cap in capacities.items() if cap and float(cap) > 0}
+        self.horizon = horizon_days
+        self.remaining = {wc: [cap] * horizon_days for wc, cap in self.capacities.items()}
+        self._next = {wc: list(range(horizon_days + 1)) for wc in self.capacities}
+        self._prev = {wc: list(range(-1, horizon_days)) for wc in self.capacities}
+
+    def is_constrained(self, work_center_id):
+        return work_center_id in self.capacities
+
+    def day_index(self, day):
+        return (day - self.start_date).days
+
+    def date_of(self, index):
+        return self.start_date + datetime.timedelta(days=index)
+
+    def _extend(self, days):
+        """Grows every calendar so that index `days - 1` exists."""
+        if days <= self.horizon:
+            return
+        extra = days - self.horizon
+        for wc, cap in self.capacities.items():
+            self.remaining[wc].extend([cap] * extra)
+            nxt = self._next[wc]
+            nxt.pop()  # old sentinel becomes a real day
+            nxt.extend(range(self.horizon, days + 1))
+            self._prev[wc].extend(range(self.horizon, days))
+        self.horizon = days
+
+    def _find_next(self, wc, index):
+        """First day >= index with free capacity."""
+        nxt = self._next[wc]
+        if index >= self.horizon:
+            self._extend(index + 1 + self.horizon // 2)
+            nxt = self._next[wc]
+        root = index
+        while nxt[root] != root:
+            root = nxt[root]
+        while nxt[index] != root:
+            nxt[index], index = root, nxt[index]
+        if root >= self.horizon:
+            self._extend(root + 1 + self.horizon // 2)
+            return self._find_next(wc, root)
+        return root
+
+    def _find_prev(self, wc, index):
+        """Last day <= index with free capacity, or -1."""
+        if index >= self.horizon:
+            self._extend(index + 1)
+        prv = self._prev[wc]
+        if index < 0:
+            return -1
+        root = index
+        while root >= 0 and prv[root + 1] != root:
+            root = prv[root + 1]
+        while index >= 0 and prv[index + 1] != root:
+            prv[index + 1], index = root, prv[index + 1]
+        return root
+
+    def _take(self, wc, day, load):
+        bucket = self.remaining[wc]
+        used = min(bucket[day], load)
+        bucket[day] -= used
+        if bucket[day] <= EPSILON:
+            self._next[wc][day] = day + 1
+            self._prev[wc][day + 1] = day - 1
+        return used
+
+    def consume_forward(self, wc, earliest, load):
+        """Fills from `earliest` onwards. Returns [(day, units)]."""
+        allocations = []
+        day = max(earliest, 0)
+        while load > EPSILON:
+            day = self._find_next(wc, day)
+            used = self._take(wc, day, load)
+            allocations.append((day, used))
+            load -= used
+        if not allocations:
+            # Nothing to place, but the day is still returned, so it must exist for release()
+            self._extend(day + 1)
+            allocations.append((day, 0.0))
+        return allocations
+
+    def consume_backward(self, wc, latest, load):
+        """Fills from `latest` backwards. Returns [(day, units)] or None if it runs past day 0."""
+        allocations = []
+        day = latest
+        while load > EPSILON:
+            day = self._find_prev(wc, day)
+            if day < 0:
+                self.release(wc, allocations)
+                return None
+            used = self._take(wc, day, load)
+            allocations.append((day, used))
+            load -= used
+        if not allocations:
+            if latest < 0:
+                return None
+            self._extend(latest + 1)
+            allocations.append((latest, 0.0))
+        allocations.reverse()
+        return allocations
+
+    def reserve(self, wc, first_day, last_day, load):
+        """
+        Replays a stored placement (e.g. from the DB) without searching.
+        Anything that no longer fits inside the stored days is dropped rather
+        than pushed elsewhere, since that order is not the one being moved.
+        Days before the calendar start are past: a placement that started
+        earlier only books the share of its load that falls on today or later,
+        and one that has ended books nothing.
+        """
+        allocations = []
+        last_day = max(last_day, first_day)
+        if last_day < 0:
+            return allocations
+        if first_day < 0:
+            load *= (last_day + 1) / (last_day - first_day + 1)
+            first_day = 0
+        self._extend(last_day + 1)
+        for day in range(first_day, last_day + 1):
+            if load <= EPSILON:
+                break
+            used = self._take(wc, day, load)
+            if used > EPSILON:
+                allocations.append((day, used))
+                load -= used
+        return allocations
+
+    def release(self, wc, allocations):
+        """Gives capacity back and resets the skip pointers so freed days are found again."""
+        if not allocations:
+            return
+        cap = self.capacities[wc]
+        for day, used in allocations:
+            self.remaining[wc][day] = min(cap, self.remaining[wc][day] + used)
+        # Path compression may jump over the freed days from anywhere; rebuild.
+        nxt, prv, bucket = self._next[wc], self._prev[wc], self.remaining[wc]
+        for day in range(self.horizon):
+            full = bucket[day] <= EPSILON
+            nxt[day] = day + 1 if full else day
+            prv[day + 1] = day - 1 if full else day
+        nxt[self.horizon] = self.horizon
+
+    def utilization(self):
+        return {
+            wc: round(sum(cap - left for left in self.remaining[wc]), 3)
+            for wc, cap in self.capacities.items()
+        }
+
+
+class FiniteScheduler:
+    """
+    jobs: [{
+        "order_id", "quantity", "due_date", "release_date",
+        "operations": [{"tracker_id", "sequence", "work_center_id", "minutes"}]
+    }]
+    """
+
+    def __init__(self, calendar, workday_minutes=WORKDAY_MINUTES):
+        self.calendar = calendar
+        self.workday_minutes = workday_minutes
+        self.placements = {}  # order_id -> result dict
+        self._allocations = {}  # order_id -> [(wc, [(day, units)])]
+
+    def _operation_days(self, minutes):
+        return max(int(math.ceil(float(minutes or 0) / self.workday_minutes)), 1)
+
+    def _place_forward(self, job, earliest):
+        allocations, ops = [], []
+        cursor = earliest
+        for op in job["operations"]:
+            wc = op["work_center_id"]
+            if self.calendar.is_constrained(wc):
+                used = self.calendar.consume_forward(wc, cursor, float(job["quantity"]))
+                allocations.append((wc, used))
+                first, last = used[0][0], used[-1][0]
+            else:
+                first = cursor
+                last = cursor + self._operation_days(op["minutes"]) - 1
+            ops.append((op, first, last))
+            # The next operation may start the day this one finishes
+            cursor = last
+        return allocations, ops
+
+    def _place_backward(self, job, latest):
+        allocations, ops = [], []
+        cursor = latest
+        for op in reversed(job["operations"]):
+            wc = op["work_center_id"]
+            if self.calendar.is_constrained(wc):
+                used = self.calendar.consume_backward(wc, cursor, float(job["quantity"]))
+                if used is None:
+                    for placed_wc, placed in allocations:
+                        self.calendar.release(placed_wc, placed)
+                    return None, None
+                allocations.append((wc, used))
+                first, last = used[0][0], used[-1][0]
+            else:
+                last = cursor
+                first = cursor - self._operation_days(op["minutes"]) + 1
+                if first < 0:
+                    for placed_wc, placed in allocations:
+                        self.calendar.release(placed_wc, placed)
+                    return None, None
+            ops.append((op, first, last))
+            cursor = first
+        ops.reverse()
+        return allocations, ops
+
+    def schedule_order(self, job, direction="forward"):
+        calendar = self.calendar
+        release = calendar.day_index(job["release_date"]) if job.get("release_date") else 0
+        release = max(release, 0)
+        due = calendar.day_index(job["due_date"]) if job.get("due_date") else None
+
+        allocations = ops = None
+        if direction == "backward" and due is not None:
+            allocations, ops = self._place_backward(job, due)
+            if ops is not None and ops and ops[0][1] < release:
+                for wc, used in allocations:
+                    calendar.release(wc, used)
+                allocations = ops = None
+        if ops is None:
+            # Forward is also the fallback when a backward plan cannot fit
+            allocations, ops = self._place_forward(job, release)
+
+        self._allocations[job["order_id"]] = allocations
+        end = ops[-1][2] if ops else release
+        result = {
+            "order_id": job["order_id"],
+            "start_date": calendar.date_of(ops[0][1]) if ops else None,
+            "end_date": calendar.date_of(end) if ops else None,
+            "due_date": job.get("due_date"),
+            "late_days": max(end - due, 0) if (due is not None and ops) else 0,
+            "operations": [{
+                "tracker_id": op["tracker_id"],
+                "sequence": op["sequence"],
+                "work_center_id": op["work_center_id"],
+                "scheduled_start": calendar.date_of(first),
+                "scheduled_end": calendar.date_of(last),
+            } for op, first, last in ops],
+        }
+        self.placements[job["order_id"]] = result
+        return result
+
+    def unschedule(self, order_id):
+        for wc, used in self._allocations.pop(order_id, None) or []:
+            self.calendar.release(wc, used)
+        self.placements.pop(order_id, None)
+
+    def reserve_existing(self, job):
+        """Books an order exactly where a previous run put it (used for incremental reschedules)."""
+        allocations = []
+        for op in job["operations"]:
+            wc = op["work_center_id"]
+            if op.get("scheduled_start") is None or not self.calendar.is_constrained(wc):
+                continue
+            allocations.append((wc, self.calendar.reserve(
+                wc,
+                self.calendar.day_index(op["scheduled_start"]),
+                self.calendar.day_index(op.get("scheduled_end") or op["scheduled_start"]),
+                float(job["quantity"]),
+            )))
+        self._allocations[job["order_id"]] = allocations
+
+    def reschedule(self, job, direction="forward"):
+        """Moves a single order; everybody else keeps their slots."""
+        self.unschedule(job["order_id"])
+        return self.schedule_order(job, direction)
+
+    def schedule(self, jobs, direction="forward"):
+        # Earliest due date gets first claim on capacity
+        ordered = sorted(jobs, key=lambda j: (j.get("due_date") or datetime.date.max, str(j["order_id"])))
+        orders = [self.schedule_order(job, direction) for job in ordered]
+        return {
+            "direction": direction,
+            "orders": orders,
+            "late_orders": sum(1 for o in orders if o["late_days"] > 0),
+            "work_center_load": self.calendar.utilization(),
+        }
+
+
+def load_jobs(orders):
+    """
+    Builds scheduler jobs for ProductionOrders with two queries: the orders'
+    open operation trackers and the matching BOM operation times.
+    """
+    from .models import BOMOperation, ProductionOrderOperation
+
+    orders = list(orders)
+    trackers = {}
+    for tracker in ProductionOrderOperation.objects.filter(
+        production_order__in=orders
+    ).exclude(status='COMPLETED').select_related('operation').order_by('production_order_id', 'sequence'):
+        trackers.setdefault(tracker.production_order_id, []).append(tracker)
+
+    minutes = {
+        (bom_id, operation_id, sequence): estimated
+        for bom_id, operation_id, sequence, estimated in BOMOperation.objects.filter(
+            bom_id__in={o.bom_id for o in orders if o.bom_id}
+        ).values_list('bom_id', 'operation_id', 'sequence', 'estimated_time_minutes')
+    }
+
+    jobs = []
+    for order in orders:
+        bom_quantity = float(order.bom.quantity) if order.bom_id and order.bom.quantity else 1.0
+        remaining = max(float(order.quantity_planned) - float(order.quantity_produced or 0), 0.0)
+        jobs.append({
+            "order_id": order.id,
+            "quantity": remaining,
+            "due_date": order.due_date,
+            "release_date": order.start_date,
+            "operations": [{
+                "tracker_id": t.id,
+                "sequence": t.sequence,
+                "work_center_id": t.operation.work_center_id,
+                "minutes": minutes.get((order.bom_id, t.operation_id, t.sequence), 60) * remaining / bom_quantity,
+                "scheduled_start": t.scheduled_start,
+                "scheduled_end": t.scheduled_end,
+            } for t in trackers.get(order.id, [])],
+        })
+    return jobs
+
+
+def save_schedule(result):
+    """Writes scheduled dates back to the trackers with one bulk UPDATE."""
+    from .models import ProductionOrderOperation
+
+    trackers = [
+        ProductionOrderOperation(id=op["tracker_id"], scheduled_start=op["scheduled_start"], scheduled_end=op["scheduled_end"])
+        for order in result["orders"] for op in order["operations"]
+    ]
+    ProductionOrderOperation.objects.bulk_update(trackers, ['scheduled_start', 'scheduled_end'], batch_size=1000)
+    return len(trackers)
+
+
+def create_operation_trackers(orders):
+    """Creates the BOM's operation trackers for many orders with one read and one bulk INSERT."""
+    from .models import BOMOperation, ProductionOrderOperation
+
+    orders = [o for o in orders if o.bom_id]
+    if not orders:
+        return []
+
+    bom_ops = {}
+    for bom_op in BOMOperation.objects.filter(bom_id__in={o.bom_id for o in orders}).order_by('sequence'):
+        bom_ops.setdefault(bom_op.bom_id, []).append(bom_op)
+
+    trackers = [
+        ProductionOrderOperation(production_order=order, operation_id=bom_op.operation_id, sequence=bom_op.sequence)
+        for order in orders for bom_op in bom_ops.get(order.bom_id, [])
+    ]
+    return ProductionOrderOperation.objects.bulk_create(trackers, batch_size=1000)
@@ -1,13 +1,47 @@
-import uuid
 import datetime
+from django.db import transaction
+from django.db.models import F
+
+SERIAL_DIGITS = 6
+
+
+def current_period():
+    return datetime.datetime.now().strftime("%Y%m")
+
+
+def reserve_serial_block(count, product_prefix="FRZ", period=None):
+    """
+    Reserves `count` consecutive sequence numbers for a prefix/month.
+    Returns (period, first_value). Only the sequence row is locked, and only
+    for the single UPDATE, so concurrent orders never hand out the same serial.
+    """
+    from apps.mrp.models import SerialSequence
+
+    if count < 1:
+        raise ValueError("count must be at least 1")
+
+    period = period or current_period()
+    with transaction.atomic():
+        SerialSequence.objects.get_or_create(prefix=product_prefix, period=period)
+        sequence = SerialSequence.objects.select_for_update().get(prefix=product_prefix, period=period)
+        SerialSequence.objects.filter(pk=sequence.pk).update(last_value=F('last_value') + count)
+    return period, sequence.last_value + 1
+
+
+def format_serial_number(product_prefix, period, value):
+    return f"{product_prefix}-{period}-{value:0{SERIAL_DIGITS}d}"
+
+
+def allocate_serial_numbers(count, product_prefix="FRZ"):
+    """Returns `count` unique serials, e.g. FRZ-202601-000001 ... FRZ-202601-010000."""
+    period, first = reserve_serial_block(count, product_prefix)
+    return [format_serial_number(product_prefix, period, value) for value in range(first, first + count)]
+
 
 def generate_serial_number(product_prefix="FRZ"):
     """
     Generates a unique serial number for a product unit.
-    Format: [PREFIX]-[YEAR][MONTH]-[RANDOM_HEX]
-    Example: FRZ-202601-A4B2
+    Format: [PREFIX]-[YEAR][MONTH]-[SEQUENCE]
+    Example: FRZ-202601-000042
     """
-    now = datetime.datetime.now()
-    year_month = now.strftime("%Y%m")
-    unique_suffix = uuid.uuid4().hex[:4].upper()
-    return f"{product_prefix}-{year_month}-{unique_suffix}"
+    return allocate_serial_numbers(1, product_prefix)[0]
@@ -0,0 +1,113 @@
+import json
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connection, transaction
+from .serial_generator import allocate_serial_numbers
+from .events import publish_event
+
+UNIT_CHUNK_SIZE = getattr(settings, "MRP_UNIT_CHUNK_SIZE", 2000)
+# Orders above this size are generated off the request thread
+ASYNC_UNIT_THRESHOLD = getattr(settings, "MRP_ASYNC_UNIT_THRESHOLD", 2000)
+
+
+def build_unit(order, serial, status):
+    from apps.mrp.models import ProductUnit
+
+    return ProductUnit(
+        serial_number=serial,
+        production_order=order,
+        product_uuid=order.product_uuid,
+        company_uuid=order.company_uuid,
+        status=status,
+        qr_code_data=json.dumps({
+            "serial": serial,
+            "product": str(order.product_uuid),
+            "order": f"PO-{order.id}"
+        })
+    )
+
+
+@contextmanager
+def order_lock(order):
+    """
+    Session-level advisory lock on the order, held across the chunk
+    transactions so only one run tops up an order at a time.
+    """
+    key = f"mrp.units:{order.id}"
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(hashtextextended(%s, 0))", [key])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(hashtextextended(%s, 0))", [key])
+
+
+def generate_units(order, status='PRODUCTION', chunk_size=UNIT_CHUNK_SIZE, on_progress=None):
+    """
+    Tops the order up to `quantity_planned` units.
+    Serials come from one reserved block; rows are written with bulk_create in
+    chunks, each chunk in its own transaction so a crash leaves a resumable order.
+    Concurrent runs for the same order wait for each other, so a retry racing
+    a background worker cannot over-generate. Returns the number of units created.
+    """
+    with order_lock(order):
+        # Counted under the lock, after any earlier run has committed its chunks
+        missing = int(order.quantity_planned) - order.units.count()
+        if missing <= 0:
+            return 0
+
+        serials = allocate_serial_numbers(missing)
+        created = 0
+        for start in range(0, missing, chunk_size):
+            batch = [build_unit(order, serial, status) for serial in serials[start:start + chunk_size]]
+            with transaction.atomic():
+                order.units.model.objects.bulk_create(batch)
+            created += len(batch)
+            if on_progress:
+                on_progress(created, missing)
+        return created
+
+
+def publish_unit_progress(order, created, total, state):
+    publish_event("production.units_progress", {
+        "type": "production.units_progress",
+        "order_id": str(order.id),
+        "order_uuid": str(order.uuid),
+        "company_uuid": str(order.company_uuid),
+        "created": created,
+        "total": total,
+        "state": state,
+    })
+
+
+def _generate_units_worker(order_id, status, chunk_size):
+    from apps.mrp.models import ProductionOrder
+
+    order = None
+    created = 0
+    try:
+        order = ProductionOrder.objects.get(pk=order_id)
+        total = max(int(order.quantity_planned) - order.units.count(), 0)
+        publish_unit_progress(order, 0, total, "RUNNING")
+
+        def report(done, missing):
+            publish_unit_progress(order, done, missing, "RUNNING")
+
+        created = generate_units(order, status=status, chunk_size=chunk_size, on_progress=report)
+        publish_unit_progress(order, created, total, "COMPLETED")
+    except Exception as e:
+        print(f"Unit generation failed for PO-{order_id}: {e}")
+        if order is not None:
+            publish_unit_progress(order, created, int(order.quantity_planned), "FAILED")
+    finally:
+        connection.close()
+
+
+def generate_units_background(order, status='PRODUCTION', chunk_size=UNIT_CHUNK_SIZE):
+    """Fire and forget unit generation; progress goes out as production.units_progress"""
+    t = threading.Thread(target=_generate_units_worker, args=(order.id, status, chunk_size), daemon=True)
+    # Wait for the order row to be committed before the worker looks it up
+    transaction.on_commit(t.start)
+    return t
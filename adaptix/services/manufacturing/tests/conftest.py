@@ -0,0 +1,11 @@
+import pytest
+from rest_framework.test import APIClient
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture(autouse=True)
+def no_broker(mocker):
+    # Unit tests never talk to RabbitMQ
+    mocker.patch('apps.mrp.utils.events.publish_events')
@@ -0,0 +1,339 @@
+import datetime
+import pytest
+import uuid
+from decimal import Decimal
+from apps.mrp.models import (
+    ProductionOrder, ProductUnit, SerialSequence, BillOfMaterial, BOMItem,
+    BOMOperation, Operation, ProductionOrderOperation, WorkCenter
+)
+from apps.mrp.planning import BOMGraph, MRPError, run_mrp
+from apps.mrp.scheduling import CapacityCalendar, FiniteScheduler, create_operation_trackers, load_jobs, save_schedule
+from apps.mrp.utils.serial_generator import allocate_serial_numbers, generate_serial_number
+from apps.mrp.utils.unit_generator import generate_units
+
+@pytest.mark.django_db
+class TestUnitGeneration:
+    def make_order(self, quantity):
+        return ProductionOrder.objects.create(
+            product_uuid=uuid.uuid4(),
+            company_uuid=uuid.uuid4(),
+            quantity_planned=Decimal(quantity),
+            status='CONFIRMED'
+        )
+
+    def test_serial_blocks_do_not_overlap(self):
+        first = allocate_serial_numbers(3, "FRZ")
+        second = allocate_serial_numbers(2, "FRZ")
+        single = generate_serial_number("FRZ")
+
+        serials = first + second + [single]
+        assert len(set(serials)) == 6
+        assert first[0].endswith("-000001")
+        assert single.endswith("-000006")
+        assert SerialSequence.objects.get(prefix="FRZ").last_value == 6
+
+    def test_prefixes_have_independent_sequences(self):
+        allocate_serial_numbers(5, "FRZ")
+        assert allocate_serial_numbers(1, "AC")[0].endswith("-000001")
+
+    def test_generate_units_in_chunks(self):
+        order = self.make_order(25)
+        progress = []
+
+        created = generate_units(order, chunk_size=10, on_progress=lambda done, total: progress.append(done))
+
+        assert created == 25
+        assert progress == [10, 20, 25]
+        assert ProductUnit.objects.filter(production_order=order).count() == 25
+        assert ProductUnit.objects.values('serial_number').distinct().count() == 25
+
+    def test_generate_units_tops_up_partial_orders(self):
+        order = self.make_order(4)
+        generate_units(order)
+        order.quantity_planned = Decimal(6)
+        order.save()
+
+        assert generate_units(order) == 2
+        assert generate_units(order) == 0
+        assert order.units.count() == 6
+
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrent_generation_does_not_over_generate(self):
+        import threading
+        from django.db import connection
+
+        order = self.make_order(500)
+        results = []
+
+        def run():
+            try:
+                results.append(generate_units(ProductionOrder.objects.get(pk=order.pk), chunk_size=50))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sorted(results) == [0, 0, 500]
+        assert order.units.count() == 500
+
+
+class TestMRPEngine:
+    def make_graph(self):
+        # FRIDGE needs 1 COMPRESSOR + 2 STEEL; COMPRESSOR needs 3 COPPER + 1 STEEL
+        graph = BOMGraph()
+        graph.add_bom(1, "FRIDGE", 1, [("COMPRESSOR", 1, 0), ("STEEL", 2, 0)])
+        graph.add_bom(2, "COMPRESSOR", 1, [("COPPER", 3, 0), ("STEEL", 1, 0)])
+        return graph
+
+    def test_without_stock_sub_assemblies_explode_to_leaves(self):
+        graph = self.make_graph()
+        demands = [{"order_id": 1, "bom_id": 1, "quantity": 1, "due_date": datetime.date(2026, 1, 10)}]
+        result = run_mrp(graph, demands, {})
+        assert {s["component_uuid"]: s["shortage"] for s in result["shortages"]} == {"COPPER": 3.0, "STEEL": 3.0}
+        assert graph.reachable_items([1]) == {"COMPRESSOR", "STEEL", "COPPER"}
+
+    def test_cycle_is_rejected(self):
+        graph = BOMGraph()
+        graph.add_bom(1, "A", 1, [("B", 1, 0)])
+        graph.add_bom(2, "B", 1, [("A", 1, 0)])
+        with pytest.raises(MRPError):
+            graph.topological_order()
+
+    def test_sub_assembly_stock_is_netted_before_exploding(self):
+        graph = self.make_graph()
+        demands = [{"order_id": 1, "bom_id": 1, "quantity": 10, "due_date": datetime.date(2026, 1, 10)}]
+        supply = {"COMPRESSOR": {"on_hand": 6, "in_transit": 0}, "STEEL": 100, "COPPER": 6}
+
+        result = run_mrp(graph, demands, supply)
+
+        # 4 compressors must be built -> 12 copper needed, 6 available
+        assert result["planned_subassemblies"] == [{"product_uuid": "COMPRESSOR", "date": datetime.date(2026, 1, 10), "quantity": 4.0}]
+        assert len(result["shortages"]) == 1
+        shortage = result["shortages"][0]
+        assert shortage["component_uuid"] == "COPPER"
+        assert shortage["shortage"] == 6.0
+        assert result["orders"][0]["can_produce"] is False
+
+    def test_scarce_stock_goes_to_earliest_due_date(self):
+        graph = self.make_graph()
+        demands = [
+            {"order_id": "late", "bom_id": 1, "quantity": 5, "due_date": datetime.date(2026, 2, 1)},
+            {"order_id": "early", "bom_id": 1, "quantity": 5, "due_date": datetime.date(2026, 1, 1)},
+        ]
+        supply = {"COMPRESSOR": 10, "STEEL": {"on_hand": 10, "in_transit": 5}}
+
+        result = run_mrp(graph, demands, supply)
+
+        verdict = {o["order_id"]: o["can_produce"] for o in result["orders"]}
+        assert verdict == {"early": True, "late": False}
+        assert result["shortages"][0]["date"] == datetime.date(2026, 2, 1)
+        assert result["shortages"][0]["shortage"] == 5.0
+
+    @pytest.mark.django_db
+    def test_graph_loads_from_database(self):
+        company = uuid.uuid4()
+        fridge, compressor, copper = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        top = BillOfMaterial.objects.create(product_uuid=fridge, name="Fridge", company_uuid=company)
+        sub = BillOfMaterial.objects.create(product_uuid=compressor, name="Compressor", quantity=2, company_uuid=company)
+        BOMItem.objects.create(bom=top, component_uuid=compressor, quantity=1)
+        BOMItem.objects.create(bom=sub, component_uuid=copper, quantity=3, waste_percentage=10)
+
+        graph = BOMGraph.load(company)
+
+        result = run_mrp(graph, [{"order_id": 1, "bom_id": top.id, "quantity": 1, "due_date": None}], {})
+        assert [(s["component_uuid"], s["shortage"]) for s in result["shortages"]] == [(str(copper), pytest.approx(1.65))]
+
+
+    @pytest.mark.django_db
+    def test_check_availability_counts_only_stock_on_hand(self, mocker):
+        from rest_framework.test import APIRequestFactory
+        from apps.mrp.views import ProductionOrderViewSet
+
+        company, fridge, steel = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        bom = BillOfMaterial.objects.create(product_uuid=fridge, name="Fridge", company_uuid=company)
+        BOMItem.objects.create(bom=bom, component_uuid=steel, quantity=2)
+        mocker.patch('adaptix_core.permissions.HasPermission.has_permission', return_value=True)
+        mocker.patch.object(ProductionOrderViewSet, 'fetch_component_supply',
+                            return_value={str(steel): {"on_hand": 10, "in_transit": 30}})
+
+        request = APIRequestFactory().post("/", {"bom_id": bom.id, "quantity": 10}, format="json")
+        response = ProductionOrderViewSet.as_view({"post": "check_availability"})(request)
+
+        assert response.data["can_produce"] is False
+        assert response.data["shortages"] == [{
+            "component_uuid": str(steel), "needed": 20.0, "available": 10.0, "in_transit": 30.0, "shortage": 10.0
+        }]
+
+@pytest.mark.django_db(transaction=True)
+class TestEventBatching:
+    def test_batched_events_flush_once(self):
+        from apps.mrp.utils import events
+
+        with events.batched_events():
+            events.publish_event("production.qc_requested", {"order_id": "1"})
+            with events.batched_events():
+                events.publish_event("production.output_created", {"order_id": "1"})
+            assert events.publish_events.call_count == 0
+
+        events.publish_events.assert_called_once_with([
+            ("production.qc_requested", {"order_id": "1"}),
+            ("production.output_created", {"order_id": "1"}),
+        ])
+
+    def test_batched_events_are_dropped_when_the_block_fails(self):
+        from apps.mrp.utils import events
+
+        with pytest.raises(ValueError):
+            with events.batched_events():
+                events.publish_event("production.qc_requested", {"order_id": "1"})
+                raise ValueError("rolled back")
+
+        events.publish_events.assert_not_called()
+        events.publish_event("production.output_created", {"order_id": "2"})
+        events.publish_events.assert_called_once_with([("production.output_created", {"order_id": "2"})])
+
+    def test_batched_events_wait_for_commit(self):
+        from django.db import transaction
+        from apps.mrp.utils import events
+
+        with transaction.atomic():
+            with events.batched_events():
+                events.publish_event("production.qc_requested", {"order_id": "1"})
+            events.publish_events.assert_not_called()
+        events.publish_events.assert_called_once_with([("production.qc_requested", {"order_id": "1"})])
+
+    def test_consumer_acks_batch_once(self, mocker):
+        from apps.mrp.management.commands.run_mrp_consumer import Command
+        from apps.mrp.utils import events
+
+        cmd = Command()
+        handled = mocker.patch.object(cmd, 'handle_sales_production_request')
+        channel = mocker.Mock()
+        batch = [
+            (mocker.Mock(delivery_tag=tag), b'{"event": "sales.production_requested"}')
+            for tag in (1, 2, 3)
+        ]
+        batch.append((mocker.Mock(delivery_tag=4), b'not json'))
+
+        cmd.process_batch(channel, batch)
+
+        assert handled.call_count == 3
+        channel.basic_ack.assert_called_once_with(delivery_tag=4, multiple=True)
+        events.publish_events.assert_called_once_with([])
+
+
+class TestFiniteScheduler:
+    start = datetime.date(2026, 1, 5)
+
+    def job(self, order_id, quantity, due_in=None, work_centers=(1, 2)):
+        return {
+            "order_id": order_id,
+            "quantity": quantity,
+            "due_date": self.start + datetime.timedelta(days=due_in) if due_in is not None else None,
+            "release_date": None,
+            "operations": [
+                {"tracker_id": order_id * 10 + seq, "sequence": seq, "work_center_id": wc, "minutes": 60}
+                for seq, wc in enumerate(work_centers, start=1)
+            ],
+        }
+
+    def test_forward_spills_into_following_days(self):
+        scheduler = FiniteScheduler(CapacityCalendar({1: 100, 2: 100}, self.start))
+        result = scheduler.schedule([self.job(1, 150, due_in=2), self.job(2, 100, due_in=5)])
+
+        first, second = result["orders"]
+        assert first["order_id"] == 1
+        assert first["operations"][0]["scheduled_end"] == self.start + datetime.timedelta(days=1)
+        # Order 2 only gets what order 1 left on day 2
+        assert second["operations"][0]["scheduled_start"] == self.start + datetime.timedelta(days=1)
+        assert second["operations"][0]["scheduled_end"] == self.start + datetime.timedelta(days=2)
+        assert result["late_orders"] == 0
+
+    def test_backward_finishes_on_due_date(self):
+        scheduler = FiniteScheduler(CapacityCalendar({1: 100, 2: 100}, self.start))
+        result = scheduler.schedule([self.job(1, 100, due_in=10)], direction="backward")
+
+        ops = result["orders"][0]["operations"]
+        assert ops[-1]["scheduled_end"] == self.start + datetime.timedelta(days=10)
+        assert ops[0]["scheduled_start"] <= ops[-1]["scheduled_start"]
+
+    def test_backward_falls_back_to_forward_when_due_date_is_too_close(self):
+        scheduler = FiniteScheduler(CapacityCalendar({1: 100}, self.start))
+        result = scheduler.schedule([self.job(1, 500, due_in=1, work_centers=(1,))], direction="backward")
+
+        order = result["orders"][0]
+        assert order["start_date"] == self.start
+        assert order["late_days"] == 3
+
+    def test_reschedule_moves_only_one_order(self):
+        calendar = CapacityCalendar({1: 100}, self.start)
+        scheduler = FiniteScheduler(calendar)
+        scheduler.schedule([self.job(1, 100, due_in=0, work_centers=(1,)), self.job(2, 100, due_in=1, work_centers=(1,))])
+
+        moved = scheduler.reschedule(self.job(1, 50, due_in=0, work_centers=(1,)))
+
+        assert moved["end_date"] == self.start
+        assert scheduler.placements[2]["start_date"] == self.start + datetime.timedelta(days=1)
+        assert calendar.remaining[1][0] == 50
+
+
+    def test_empty_operation_past_the_horizon_can_be_released(self):
+        calendar = CapacityCalendar({1: 100}, self.start, horizon_days=10)
+        scheduler = FiniteScheduler(calendar)
+        job = dict(self.job(1, 0, work_centers=(1,)), release_date=self.start + datetime.timedelta(days=30))
+
+        placed = scheduler.schedule_order(job)
+        scheduler.unschedule(1)
+
+        assert placed["start_date"] == self.start + datetime.timedelta(days=30)
+        assert calendar.horizon > 30
+
+    def test_past_placements_do_not_overload_today(self):
+        calendar = CapacityCalendar({1: 100}, self.start)
+        scheduler = FiniteScheduler(calendar)
+        day = lambda offset: self.start + datetime.timedelta(days=offset)
+        operation = lambda start, end: [{"tracker_id": 1, "sequence": 1, "work_center_id": 1, "minutes": 60,
+                                         "scheduled_start": day(start), "scheduled_end": day(end)}]
+
+        # Finished last week: books nothing
+        scheduler.reserve_existing({"order_id": 1, "quantity": 100, "operations": operation(-7, -6)})
+        # Four days of work, two of them already past: half of the load remains
+        scheduler.reserve_existing({"order_id": 2, "quantity": 160, "operations": operation(-2, 1)})
+
+        assert calendar.remaining[1][:3] == [20, 100, 100]
+
+
+@pytest.mark.django_db
+class TestSchedulingPersistence:
+    def test_trackers_are_created_and_scheduled_in_bulk(self, django_assert_max_num_queries):
+        company = uuid.uuid4()
+        press = WorkCenter.objects.create(name="Press", capacity_per_day=Decimal("40"), company_uuid=company)
+        op = Operation.objects.create(name="Stamp", work_center=press, company_uuid=company)
+        bom = BillOfMaterial.objects.create(name="Panel", product_uuid=uuid.uuid4(), company_uuid=company)
+        BOMOperation.objects.create(bom=bom, operation=op, sequence=1)
+        orders = [
+            ProductionOrder.objects.create(
+                product_uuid=bom.product_uuid, company_uuid=company, bom=bom,
+                quantity_planned=Decimal("60"), status='CONFIRMED',
+                due_date=datetime.date(2026, 1, 10) + datetime.timedelta(days=i)
+            )
+            for i in range(3)
+        ]
+
+        with django_assert_max_num_queries(2):
+            create_operation_trackers(orders)
+        assert ProductionOrderOperation.objects.filter(production_order__in=orders).count() == 3
+
+        start = datetime.date(2026, 1, 5)
+        scheduler = FiniteScheduler(CapacityCalendar({press.id: 40}, start))
+        result = scheduler.schedule(load_jobs(ProductionOrder.objects.filter(id__in=[o.id for o in orders]).select_related('bom')))
+        assert save_schedule(result) == 3
+
+        last = ProductionOrderOperation.objects.get(production_order=orders[2])
+        # 180 units at 40/day: the third order runs on days 4 and 5
+        assert last.scheduled_start == start + datetime.timedelta(days=3)
+        assert last.scheduled_end == start + datetime.timedelta(days=4)
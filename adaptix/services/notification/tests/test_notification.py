@@ -57,3 +57,43 @@ class TestNotificationLogic:
         log.status = "sent"
         log.save()
         assert log.status == "sent"
+
+
+class FakeMessage:
+    def __init__(self, routing_key):
+        self.delivery_info = {"routing_key": routing_key}
+        self.acked = False
+
+    def ack(self):
+        self.acked = True
+
+
+class TestNotificationConsumerRouting:
+    def test_bindings_follow_handlers(self):
+        """Queue binds exactly the event types that have a handler, never '#'"""
+        from apps.emails.management.commands.run_notification_consumer import Command
+
+        keys = Command.routing_keys()
+        assert "#" not in keys
+        assert set(keys) == set(Command.HANDLERS)
+        for name in Command.HANDLERS.values():
+            assert callable(getattr(Command, name))
+
+    def test_dispatch_counts_handled_and_ignored(self):
+        from apps.emails.management.commands.run_notification_consumer import Command
+
+        cmd = Command()
+        handled = FakeMessage("production.qc_requested")
+        cmd.process_message({"type": "production.qc_requested", "order_id": 1, "quantity": 5}, handled)
+        ignored = FakeMessage("stock.update")
+        cmd.process_message({"type": "stock.update"}, ignored)
+
+        assert handled.acked and ignored.acked
+        assert cmd.stats == {"handled": 1, "ignored": 1, "failed": 0}
+
+    def test_dispatch_falls_back_to_routing_key(self):
+        from apps.emails.management.commands.run_notification_consumer import Command
+
+        cmd = Command()
+        cmd.process_message({"order_number": "ORD-1"}, FakeMessage("pos.order.delivered"))
+        assert cmd.stats["handled"] == 1
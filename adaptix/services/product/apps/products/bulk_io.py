@@ -0,0 +1,420 @@
+"""
+Bulk catalog import / export.
+
+Import streams CSV or JSON Lines rows and handles them IMPORT_CHUNK_SIZE at
+a time: a chunk is validated, matched to existing variants by SKU and
+written with bulk_create / bulk_update in one transaction that shares one
+catalog version. One "product.catalog_changed" event goes out per chunk.
+
+Export walks a server-side cursor, so neither direction holds the whole
+catalog in memory. Exported files can be imported back unchanged.
+
+Columns (all optional except name for new products):
+    sku, parent_sku, name, variant_name, barcode, category, brand, unit,
+    product_type, tax_method, tax_type, description, is_active,
+    price, cost, quantity, alert_quantity
+
+A row whose parent_sku names another variant (earlier in the file or
+already stored) becomes an extra variant of that variant's product.
+"""
+import csv
+import io
+import json
+import uuid
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+IMPORT_CHUNK_SIZE = getattr(settings, 'PRODUCT_IMPORT_CHUNK_SIZE', 2000)
+EXPORT_CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 500
+
+EXPORT_COLUMNS = (
+    'sku', 'parent_sku', 'name', 'variant_name', 'barcode', 'category', 'brand', 'unit',
+    'product_type', 'tax_method', 'tax_type', 'description', 'is_active',
+    'price', 'cost', 'quantity', 'alert_quantity',
+)
+DECIMAL_COLUMNS = ('price', 'cost', 'quantity', 'alert_quantity')
+PRODUCT_TEXT_COLUMNS = ('name', 'barcode', 'tax_type', 'description')
+LOOKUP_COLUMNS = ('category', 'brand', 'unit')
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+
+
+class RowError(ValueError):
+    pass
+
+
+def iter_csv(stream):
+    """Yields (line_no, row, None) from a binary or text CSV stream."""
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row, None
+
+
+def iter_jsonl(stream):
+    """Yields (line_no, row, error) from a JSON Lines stream; blank lines are skipped."""
+    for line_no, line in enumerate(stream, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8-sig')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, "Each line must be a JSON object"
+            continue
+        yield line_no, row, None
+
+
+def iter_rows(stream, file_format):
+    if file_format == 'csv':
+        return iter_csv(stream)
+    if file_format == 'jsonl':
+        return iter_jsonl(stream)
+    raise ValueError("file_format must be csv or jsonl")
+
+
+def clean_row(row):
+    """Normalizes one input row. Only columns present in the row are returned, so updates stay partial."""
+    from .models import Product
+
+    cleaned = {}
+    for key, value in row.items():
+        if key not in EXPORT_COLUMNS or value is None:
+            continue
+        cleaned[key] = value.strip() if isinstance(value, str) else value
+
+    for key in DECIMAL_COLUMNS:
+        if cleaned.get(key) in (None, ''):
+            cleaned.pop(key, None)
+            continue
+        try:
+            cleaned[key] = Decimal(str(cleaned[key]))
+        except InvalidOperation:
+            raise RowError(f"{key} must be a number")
+        if key in ('price', 'cost') and cleaned[key] < 0:
+            raise RowError(f"{key} cannot be negative")
+
+    if 'is_active' in cleaned:
+        value = cleaned['is_active']
+        cleaned['is_active'] = value if isinstance(value, bool) else str(value).lower() in TRUE_VALUES
+    if cleaned.get('product_type') and cleaned['product_type'] not in dict(Product.TYPE_CHOICES):
+        raise RowError(f"Unknown product_type '{cleaned['product_type']}'")
+    if cleaned.get('tax_method') and cleaned['tax_method'] not in dict(Product.TAX_METHOD_CHOICES):
+        raise RowError(f"Unknown tax_method '{cleaned['tax_method']}'")
+    for key in ('sku', 'parent_sku') + PRODUCT_TEXT_COLUMNS + LOOKUP_COLUMNS + ('variant_name', 'product_type', 'tax_method'):
+        if cleaned.get(key) == '':
+            del cleaned[key]
+    return cleaned
+
+
+class ProductImporter:
+    def __init__(self, company_uuid, chunk_size=IMPORT_CHUNK_SIZE, create_missing=True, dry_run=False):
+        self.company_uuid = company_uuid
+        self.chunk_size = chunk_size
+        self.create_missing = create_missing
+        self.dry_run = dry_run
+        self.stats = {"rows": 0, "created": 0, "updated": 0, "failed": 0, "batches": 0}
+        self.errors = []
+        self.lookups = None
+        self.product_of_sku = {}  # SKUs written by this import -> product id
+
+    def error(self, line_no, message):
+        self.stats["failed"] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_no, "error": message})
+
+    def load_lookups(self):
+        """Category / Brand / Unit by lower-cased name, one query each."""
+        from .models import Brand, Category, Unit
+
+        self.lookups = {
+            kind: {name.lower(): pk for pk, name in model.objects.filter(company_uuid=self.company_uuid).values_list('id', 'name')}
+            for kind, model in (('category', Category), ('brand', Brand), ('unit', Unit))
+        }
+
+    def resolve(self, kind, name):
+        from .models import Brand, Category, Unit
+
+        found = self.lookups[kind].get(name.lower())
+        if found is not None:
+            return found
+        if not self.create_missing:
+            raise RowError(f"Unknown {kind} '{name}'")
+        if self.dry_run:
+            return None
+        model = {'category': Category, 'brand': Brand, 'unit': Unit}[kind]
+        extra = {'short_name': name[:20]} if kind == 'unit' else {}
+        obj, _ = model.all_objects.get_or_create(company_uuid=self.company_uuid, name=name, defaults=extra)
+        if obj.is_deleted:
+            obj.restore()
+        self.lookups[kind][name.lower()] = obj.id
+        return obj.id
+
+    def run(self, rows):
+        """Consumes (line_no, row, error) tuples; returns the stats dict."""
+        if self.lookups is None:
+            self.load_lookups()
+        chunk = []
+        for line_no, row, error in rows:
+            self.stats["rows"] += 1
+            if error:
+                self.error(line_no, error)
+                continue
+            chunk.append((line_no, row))
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+        return self.stats
+
+    def import_chunk(self, chunk):
+        cleaned = []
+        seen = set()
+        for line_no, row in chunk:
+            try:
+                data = clean_row(row)
+                sku = data.get('sku')
+                if sku and sku in seen:
+                    raise RowError(f"Duplicate sku '{sku}' in the same batch")
+                if sku:
+                    seen.add(sku)
+                for kind in LOOKUP_COLUMNS:
+                    if kind in data:
+                        data[kind] = self.resolve(kind, data[kind])
+                cleaned.append((line_no, data))
+            except RowError as e:
+                self.error(line_no, str(e))
+        if not cleaned:
+            return
+
+        # A concurrent writer can claim one of our new SKUs between the
+        # lookup and the INSERT; the retry then sees it as an update.
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    result = self.write_chunk(cleaned)
+                    if self.dry_run:
+                        transaction.set_rollback(True)
+                break
+            except IntegrityError:
+                if attempt:
+                    raise
+        self.finish_chunk(*result)
+
+    def write_chunk(self, cleaned):
+        from .models import CatalogVersion, Product, ProductVariant
+
+        skus = {d['sku'] for _, d in cleaned if 'sku' in d} | {d['parent_sku'] for _, d in cleaned if 'parent_sku' in d}
+        existing = {
+            v.sku: v for v in ProductVariant.all_objects.filter(
+                company_uuid=self.company_uuid, sku__in=skus
+            ).select_related('product')
+        }
+        version = CatalogVersion.bump(self.company_uuid)
+
+        new_products, new_variants = [], []
+        changed_products, changed_variants = {}, []
+        product_fields, variant_fields = set(), set()
+        product_of_sku = {}
+        failed = []
+
+        for line_no, data in cleaned:
+            variant = existing.get(data.get('sku'))
+            if variant is not None:
+                # select_related gives every variant its own Product instance;
+                # edits from rows of sibling variants must land on the same one
+                product = changed_products.setdefault(variant.product_id, variant.product)
+                product_fields |= apply_product_fields(product, data)
+                variant_fields |= apply_variant_fields(variant, data)
+                product.catalog_version = variant.catalog_version = version
+                variant.is_deleted = product.is_deleted = False
+                changed_variants.append(variant)
+                product_of_sku[variant.sku] = product.id
+                continue
+
+            parent = data.get('parent_sku')
+            if parent:
+                product_id = product_of_sku.get(parent) or self.product_of_sku.get(parent)
+                if product_id is None and parent in existing:
+                    product_id = existing[parent].product_id
+                if product_id is None:
+                    failed.append((line_no, f"Unknown parent_sku '{parent}'"))
+                    continue
+            else:
+                if not data.get('name'):
+                    failed.append((line_no, "name is required for new products"))
+                    continue
+                product = Product(id=uuid.uuid4(), company_uuid=self.company_uuid, catalog_version=version)
+                apply_product_fields(product, data)
+                if not product.barcode:
+                    product.barcode = Product.generate_barcode(product.name)
+                new_products.append(product)
+                product_id = product.id
+
+            variant = ProductVariant(
+                id=uuid.uuid4(), company_uuid=self.company_uuid, product_id=product_id,
+                name='Default', catalog_version=version
+            )
+            apply_variant_fields(variant, data)
+            if not variant.sku:
+                variant.sku = ProductVariant.generate_sku()
+            new_variants.append(variant)
+            product_of_sku[variant.sku] = product_id
+
+        Product.objects.bulk_create(new_products, batch_size=1000)
+        ProductVariant.objects.bulk_create(new_variants, batch_size=1000)
+        bulk_update_rows(Product, list(changed_products.values()), product_fields | {'catalog_version', 'is_deleted'})
+        bulk_update_rows(ProductVariant, changed_variants, variant_fields | {'catalog_version', 'is_deleted'})
+        return version, new_variants, changed_variants, product_of_sku, failed
+
+    def finish_chunk(self, version, new_variants, changed_variants, product_of_sku, failed):
+        for line_no, message in failed:
+            self.error(line_no, message)
+        self.stats["created"] += len(new_variants)
+        self.stats["updated"] += len(changed_variants)
+        self.stats["batches"] += 1
+        self.product_of_sku.update(product_of_sku)
+        if self.dry_run:
+            return
+        variant_ids = [v.id for v in new_variants] + [v.id for v in changed_variants]
+        publish_catalog_changed(self.company_uuid, version, len(new_variants), len(changed_variants))
+
+        from .catalog import apply_saved_variants
+        apply_saved_variants(self.company_uuid, variant_ids)
+
+
+def bulk_update_rows(model, objs, fields, batch_size=1000):
+    """
+    bulk_update() builds a CASE WHEN per field and row, which dominates
+    re-imports. On PostgreSQL a batch becomes one UPDATE ... FROM (VALUES ...).
+    """
+    if not objs:
+        return
+    fields = sorted(fields)
+    if connection.vendor != 'postgresql':
+        model._base_manager.bulk_update(objs, fields, batch_size=batch_size)
+        return
+
+    quote = connection.ops.quote_name
+    pk = model._meta.pk
+    columns = [pk] + [model._meta.get_field(name) for name in fields]
+    placeholder = "(" + ", ".join(f"%s::{field.db_type(connection)}" for field in columns) + ")"
+    assignments = ", ".join(f"{quote(f.column)} = v.{quote(f.column)}" for f in columns[1:])
+    column_list = ", ".join(quote(f.column) for f in columns)
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(objs), batch_size):
+            batch = objs[start:start + batch_size]
+            params = [
+                field.get_db_prep_save(getattr(obj, field.attname), connection)
+                for obj in batch for field in columns
+            ]
+            cursor.execute(
+                f"UPDATE {quote(model._meta.db_table)} AS t SET {assignments} "
+                f"FROM (VALUES {', '.join([placeholder] * len(batch))}) AS v ({column_list}) "
+                f"WHERE t.{quote(pk.column)} = v.{quote(pk.column)}",
+                params
+            )
+
+
+def apply_product_fields(product, data):
+    touched = set()
+    for key in PRODUCT_TEXT_COLUMNS + ('product_type', 'tax_method', 'is_active'):
+        if key in data:
+            setattr(product, key, data[key])
+            touched.add(key)
+    for kind in LOOKUP_COLUMNS:
+        if kind in data:
+            setattr(product, f"{kind}_id", data[kind])
+            touched.add(kind)
+    return touched
+
+
+def apply_variant_fields(variant, data):
+    touched = set()
+    if 'variant_name' in data:
+        variant.name = data['variant_name']
+        touched.add('name')
+    if 'sku' in data:
+        variant.sku = data['sku']
+    for key in DECIMAL_COLUMNS:
+        if key in data:
+            setattr(variant, key, data[key])
+            touched.add(key)
+    return touched
+
+
+def publish_catalog_changed(company_uuid, version, created, updated):
+    from apps.utils.dispatcher import submit
+
+    submit("events", "product.catalog_changed", {
+        "event": "product.catalog_changed",
+        "company_uuid": str(company_uuid),
+        "catalog_version": version,
+        "created": created,
+        "updated": updated,
+    })
+
+
+def export_rows(company_uuid):
+    """Yields one dict per live variant, streamed through a server-side cursor."""
+    from .models import ProductVariant
+
+    rows = ProductVariant.objects.filter(
+        company_uuid=company_uuid, product__is_deleted=False
+    ).order_by('product_id', 'created_at', 'id').values_list(
+        'product_id', 'sku', 'name', 'price', 'cost', 'quantity', 'alert_quantity',
+        'product__name', 'product__barcode', 'product__category__name', 'product__brand__name',
+        'product__unit__name', 'product__product_type', 'product__tax_method', 'product__tax_type',
+        'product__description', 'product__is_active',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    current_product, first_sku = None, None
+    for (product_id, sku, variant_name, price, cost, quantity, alert_quantity, name, barcode, category,
+         brand, unit, product_type, tax_method, tax_type, description, is_active) in rows:
+        if product_id != current_product:
+            current_product, first_sku = product_id, sku
+        yield {
+            'sku': sku,
+            'parent_sku': first_sku if sku != first_sku else '',
+            'name': name,
+            'variant_name': variant_name,
+            'barcode': barcode or '',
+            'category': category or '',
+            'brand': brand or '',
+            'unit': unit or '',
+            'product_type': product_type,
+            'tax_method': tax_method,
+            'tax_type': tax_type or '',
+            'description': description or '',
+            'is_active': is_active,
+            'price': str(price),
+            'cost': str(cost),
+            'quantity': str(quantity),
+            'alert_quantity': str(alert_quantity),
+        }
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def export_csv(company_uuid):
+    writer = csv.DictWriter(_Echo(), fieldnames=EXPORT_COLUMNS)
+    yield writer.writeheader()
+    for row in export_rows(company_uuid):
+        yield writer.writerow(row)
+
+
+def export_jsonl(company_uuid):
+    for row in export_rows(company_uuid):
+        yield json.dumps(row) + "\n"
@@ -0,0 +1,248 @@
+"""
+POS catalog: barcode/SKU lookup and name search served from memory.
+
+Every worker keeps one CatalogIndex per company. The first request loads
+the company's sellable variants once; afterwards the index is only topped
+up with rows whose catalog_version moved (at most every
+CATALOG_REFRESH_SECONDS), and writes made in this worker are applied as
+soon as they commit. A scan therefore never waits on the database.
+
+Terminals use the same versioned rows to keep an offline copy:
+
+    GET catalog/sync/?since=<version they hold>
+"""
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.db.models.functions import Greatest
+
+REFRESH_SECONDS = getattr(settings, 'CATALOG_REFRESH_SECONDS', 2.0)
+SYNC_PAGE_SIZE = getattr(settings, 'CATALOG_SYNC_PAGE_SIZE', 5000)
+
+ROW_FIELDS = (
+    'id', 'product_id', 'name', 'sku', 'price', 'is_deleted', 'catalog_version',
+    'product__name', 'product__barcode', 'product__is_active', 'product__is_deleted',
+    'product__catalog_version', 'product__tax_method', 'product__tax_type',
+    'product__is_tax_exempt', 'product__product_type',
+)
+
+
+def build_row(values):
+    """Flattens one variant (+ its product) into the row terminals and the index share."""
+    return {
+        "variant_id": str(values['id']),
+        "product_id": str(values['product_id']),
+        "product_name": values['product__name'],
+        "variant_name": values['name'],
+        "sku": values['sku'],
+        "barcode": values['product__barcode'],
+        "price": str(values['price']),
+        "tax_method": values['product__tax_method'],
+        "tax_type": values['product__tax_type'],
+        "is_tax_exempt": values['product__is_tax_exempt'],
+        "product_type": values['product__product_type'],
+        "version": max(values['catalog_version'], values['product__catalog_version']),
+        "removed": bool(
+            values['is_deleted'] or values['product__is_deleted'] or not values['product__is_active']
+        ),
+    }
+
+
+def fetch_rows(company_uuid, since=0, limit=None):
+    """
+    Catalog rows changed after `since`, oldest first. A full load (since=0)
+    skips removed rows; a delta includes them so clients can drop them.
+
+    Returns (rows, has_more). A page never ends in the middle of a version,
+    so resuming from the last row's version cannot skip anything.
+    """
+    from .models import ProductVariant
+
+    queryset = ProductVariant.all_objects.filter(company_uuid=company_uuid).annotate(
+        row_version=Greatest('catalog_version', 'product__catalog_version')
+    )
+    if since:
+        queryset = queryset.filter(row_version__gt=since)
+    else:
+        queryset = queryset.filter(is_deleted=False, product__is_deleted=False, product__is_active=True)
+    queryset = queryset.order_by('row_version', 'id').values(*ROW_FIELDS)
+
+    if limit is None:
+        return [build_row(v) for v in queryset.iterator(chunk_size=2000)], False
+
+    page = list(queryset[:limit + 1])
+    has_more = len(page) > limit
+    if has_more:
+        page = page[:limit]
+        boundary = _row_version(page[-1])
+        if _row_version(queryset[limit]) == boundary:
+            # Keep the whole last version together
+            page = [v for v in page if _row_version(v) < boundary]
+            if not page:
+                page = list(queryset.filter(row_version=boundary))
+                has_more = queryset.filter(row_version__gt=boundary).exists()
+    return [build_row(v) for v in page], has_more
+
+
+def _row_version(values):
+    return max(values['catalog_version'], values['product__catalog_version'])
+
+
+def normalize_code(code):
+    return (code or "").strip().upper()
+
+
+def _trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class CatalogIndex:
+    """
+    In-memory lookup structures for one company:
+    codes:    barcode / SKU -> variant ids (a product barcode maps to all its variants)
+    grams:    name trigram -> variant ids
+    prefixes: 1-2 letter token prefix -> variant ids (too short for trigrams)
+    """
+
+    def __init__(self, company_uuid):
+        self.company_uuid = company_uuid
+        self.rows = {}
+        self.codes = defaultdict(set)
+        self.grams = defaultdict(set)
+        self.prefixes = defaultdict(set)
+        self.version = 0
+        self.checked_at = 0.0
+        self.lock = threading.RLock()
+
+    def _keys(self, row):
+        text = " ".join(filter(None, (row["product_name"], row["variant_name"], row["sku"]))).lower()
+        codes = {normalize_code(row["sku"]), normalize_code(row["barcode"])} - {""}
+        grams, prefixes = set(), set()
+        for token in text.split():
+            grams |= _trigrams(token)
+            prefixes.update((token[:1], token[:2]))
+        return text, codes, grams, prefixes
+
+    def _discard(self, variant_id):
+        row = self.rows.pop(variant_id, None)
+        if row is None:
+            return
+        _, codes, grams, prefixes = self._keys(row)
+        for table, keys in ((self.codes, codes), (self.grams, grams), (self.prefixes, prefixes)):
+            for key in keys:
+                ids = table.get(key)
+                if ids is not None:
+                    ids.discard(variant_id)
+                    if not ids:
+                        del table[key]
+
+    def apply(self, rows, synced=False):
+        """
+        Upserts rows (removed ones are dropped). Only rows read by a sync move
+        `version` forward: a row applied straight from a local save may be
+        newer than writes other workers have not shown us yet.
+        """
+        with self.lock:
+            for row in rows:
+                self._discard(row["variant_id"])
+                if synced:
+                    self.version = max(self.version, row["version"])
+                if row["removed"]:
+                    continue
+                text, codes, grams, prefixes = self._keys(row)
+                row = dict(row, _text=text)
+                self.rows[row["variant_id"]] = row
+                for key in codes:
+                    self.codes[key].add(row["variant_id"])
+                for key in grams:
+                    self.grams[key].add(row["variant_id"])
+                for key in prefixes:
+                    self.prefixes[key].add(row["variant_id"])
+
+    def refresh(self):
+        rows, _ = fetch_rows(self.company_uuid, since=self.version)
+        self.apply(rows, synced=True)
+        self.checked_at = time.monotonic()
+        return len(rows)
+
+    def lookup(self, code):
+        with self.lock:
+            ids = self.codes.get(normalize_code(code), ())
+            return [_public(self.rows[i]) for i in sorted(ids)]
+
+    def search(self, query, limit=20):
+        tokens = (query or "").lower().split()
+        if not tokens:
+            return []
+        with self.lock:
+            candidates = None
+            for token in tokens:
+                if len(token) >= 3:
+                    ids = None
+                    for gram in _trigrams(token):
+                        ids = set(self.grams.get(gram, ())) if ids is None else ids & self.grams.get(gram, set())
+                        if not ids:
+                            break
+                else:
+                    ids = self.prefixes.get(token, set())
+                candidates = set(ids) if candidates is None else candidates & ids
+                if not candidates:
+                    return []
+            # Trigrams only narrow the set; confirm the tokens really occur
+            hits = [
+                self.rows[i] for i in candidates
+                if all(token in self.rows[i]["_text"] for token in tokens)
+            ]
+        first = tokens[0]
+        hits.sort(key=lambda r: (not r["_text"].startswith(first), r["product_name"].lower(), r["variant_name"]))
+        return [_public(row) for row in hits[:limit]]
+
+
+def _public(row):
+    return {k: v for k, v in row.items() if not k.startswith("_") and k != "removed"}
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(company_uuid):
+    """The company's index, loaded on first use and topped up with deltas when stale."""
+    key = str(company_uuid)
+    index = _indexes.get(key)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(key)
+            if index is None:
+                index = CatalogIndex(key)
+                index.refresh()
+                _indexes[key] = index
+    elif time.monotonic() - index.checked_at > REFRESH_SECONDS:
+        with index.lock:
+            if time.monotonic() - index.checked_at > REFRESH_SECONDS:
+                index.refresh()
+    return index
+
+
+def apply_saved_variants(company_uuid, variant_ids):
+    """Pushes just-committed variant changes into this worker's index, if it is loaded."""
+    index = _indexes.get(str(company_uuid))
+    if index is None or not variant_ids:
+        return
+    from .models import ProductVariant
+
+    rows = ProductVariant.all_objects.filter(id__in=variant_ids).values(*ROW_FIELDS)
+    index.apply([build_row(v) for v in rows])
+
+
+def reset_indexes():
+    with _indexes_lock:
+        _indexes.clear()
+
+
+def parse_version(value):
+    try:
+        return max(int(value or 0), 0)
+    except (TypeError, ValueError):
+        return None
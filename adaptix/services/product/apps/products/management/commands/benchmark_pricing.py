@@ -0,0 +1,45 @@
+import random
+import time
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from apps.products.pricing import resolve_prices
+
+class Command(BaseCommand):
+    help = 'Benchmarks basket price resolution against layered price lists (no database needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--variants', type=int, default=10000)
+        parser.add_argument('--baskets', type=int, default=10000)
+        parser.add_argument('--basket-size', type=int, default=60)
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        variants = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(options['variants'])]
+        base_prices = {v: Decimal(rng.randint(100, 100000)) / 100 for v in variants}
+
+        # Branch list overrides a few items, customer group a slice, default most of the catalog
+        coverage = {'branch': 0.05, 'customer_group': 0.3, 'default': 0.9}
+        started = time.perf_counter()
+        layers = []
+        for scope, share in coverage.items():
+            rows = [(v, base_prices[v] * Decimal('0.9')) for v in variants if rng.random() < share]
+            layers.append((scope, {variant: price for variant, price in rows}))
+        build_time = time.perf_counter() - started
+
+        baskets = [rng.sample(variants, options['basket_size']) for _ in range(options['baskets'])]
+        started = time.perf_counter()
+        layered = 0
+        for basket in baskets:
+            resolved = resolve_prices(basket, layers, base_prices)
+            layered += sum(1 for line in resolved.values() if line["price_list_id"])
+        run_time = time.perf_counter() - started
+
+        lines = options['baskets'] * options['basket_size']
+        self.stdout.write(f"Variants:            {len(variants)}")
+        self.stdout.write(f"Matrix rows:         {sum(len(m) for _, m in layers)}")
+        self.stdout.write(f"Matrix build:        {build_time:.3f}s")
+        self.stdout.write(f"Baskets:             {options['baskets']} x {options['basket_size']} lines")
+        self.stdout.write(f"Resolution:          {run_time:.3f}s ({run_time / options['baskets'] * 1e6:.1f}us per basket)")
+        self.stdout.write(f"Lines from a list:   {layered}/{lines}")
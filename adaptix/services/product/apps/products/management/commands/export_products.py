@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from apps.products.bulk_io import export_csv, export_jsonl
+
+class Command(BaseCommand):
+    help = 'Streams the catalog of one company as CSV or JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--company', required=True, help='Company UUID')
+        parser.add_argument('--file-format', choices=['csv', 'jsonl'], default='csv')
+
+    def handle(self, *args, **options):
+        chunks = export_jsonl if options['file_format'] == 'jsonl' else export_csv
+        rows = 0
+        with open(options['path'], 'w', newline='') as out:
+            for chunk in chunks(options['company']):
+                out.write(chunk)
+                rows += 1
+        if options['file_format'] == 'csv':
+            rows -= 1  # header
+        self.stdout.write(self.style.SUCCESS(f"Exported {rows} variants to {options['path']}"))
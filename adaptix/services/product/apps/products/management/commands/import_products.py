@@ -0,0 +1,36 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from apps.products.bulk_io import IMPORT_CHUNK_SIZE, ProductImporter, iter_rows
+
+class Command(BaseCommand):
+    help = 'Streams a CSV or JSON Lines file into the catalog of one company (upsert on SKU)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--company', required=True, help='Company UUID')
+        parser.add_argument('--file-format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--no-create-missing', action='store_true', help='Reject unknown category/brand/unit names')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['file_format'] or path.rsplit('.', 1)[-1].lower()
+        if file_format not in ('csv', 'jsonl'):
+            raise CommandError("Pass --file-format csv or jsonl")
+
+        importer = ProductImporter(
+            options['company'],
+            chunk_size=options['chunk_size'],
+            create_missing=not options['no_create_missing'],
+            dry_run=options['dry_run']
+        )
+        with open(path, 'rb') as stream:
+            stats = importer.run(iter_rows(stream, file_format))
+
+        for error in importer.errors:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(json.dumps(stats))
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Validated' if options['dry_run'] else 'Imported'} {stats['created']} new and {stats['updated']} updated variants"
+        ))
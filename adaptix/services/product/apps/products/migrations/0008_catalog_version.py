@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:13
+
+from django.db import migrations, models
+
+
+def stamp_existing_catalog(apps, schema_editor):
+    # Existing rows become version 1 so a terminal syncing from 0 gets them
+    # and the next write of every company starts at 2.
+    Product = apps.get_model('products', 'Product')
+    ProductVariant = apps.get_model('products', 'ProductVariant')
+    CatalogVersion = apps.get_model('products', 'CatalogVersion')
+
+    Product.objects.update(catalog_version=1)
+    ProductVariant.objects.update(catalog_version=1)
+    companies = set(Product.objects.values_list('company_uuid', flat=True).distinct())
+    companies |= set(ProductVariant.objects.values_list('company_uuid', flat=True).distinct())
+    CatalogVersion.objects.bulk_create([CatalogVersion(company_uuid=c, version=1) for c in companies])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_barcode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('company_uuid', models.UUIDField(primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='catalog_version',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='productvariant',
+            name='catalog_version',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(stamp_existing_catalog, migrations.RunPython.noop),
+    ]
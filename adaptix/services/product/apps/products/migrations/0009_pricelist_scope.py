@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_catalog_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricelist',
+            name='items_version',
+            field=models.BigIntegerField(default=0, editable=False, help_text='Bumped on every item change; invalidates cached price matrices'),
+        ),
+        migrations.AddField(
+            model_name='pricelist',
+            name='scope',
+            field=models.CharField(choices=[('manual', 'Manual'), ('default', 'Company Default'), ('customer_group', 'Customer Group'), ('branch', 'Branch')], default='manual', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='pricelist',
+            name='scope_ref',
+            field=models.CharField(blank=True, default='', help_text='Branch UUID or customer group for scoped lists', max_length=100),
+        ),
+    ]
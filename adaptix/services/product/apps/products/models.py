@@ -1,5 +1,5 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 class SoftDeleteManager(models.Manager):
@@ -141,17 +141,24 @@ class Product(SoftDeleteModel):
     
     barcode = models.CharField(max_length=100, blank=True, null=True, db_index=True)
     is_active = models.BooleanField(default=True)
+    catalog_version = models.BigIntegerField(default=0, db_index=True, editable=False)
 
     def __str__(self):
         return self.name
 
+    @staticmethod
+    def generate_barcode(name):
+        # Format: BC-[3 letters of name]-[8 chars of UUID]
+        name_prefix = "".join(filter(str.isalnum, name or ""))[:3].upper() or "PRD"
+        return f"BC-{name_prefix}-{uuid.uuid4().hex[:8].upper()}"
+
     def save(self, *args, **kwargs):
         if not self.barcode:
             # Generate a barcode if not provided
-            # Format: BC-[3 letters of name]-[8 chars of UUID]
-            name_prefix = "".join(filter(str.isalnum, self.name))[:3].upper() or "PRD"
-            self.barcode = f"BC-{name_prefix}-{uuid.uuid4().hex[:8].upper()}"
-        super().save(*args, **kwargs)
+            self.barcode = self.generate_barcode(self.name)
+        with transaction.atomic():
+            self.catalog_version = CatalogVersion.bump(self.company_uuid)
+            super().save(*args, **kwargs)
 
 class ApprovalRequest(SoftDeleteModel):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='approval_requests')
@@ -179,6 +186,7 @@ class ProductVariant(SoftDeleteModel):
     
     quantity = models.DecimalField(max_digits=20, decimal_places=2, default=0) 
     alert_quantity = models.DecimalField(max_digits=20, decimal_places=2, default=10)
+    catalog_version = models.BigIntegerField(default=0, db_index=True, editable=False)
 
     class Meta:
         unique_together = ('company_uuid', 'sku')
@@ -186,18 +194,35 @@ class ProductVariant(SoftDeleteModel):
     def __str__(self):
         return f"{self.product.name} - {self.name}"
 
+    @staticmethod
+    def generate_sku():
+        return f"SKU-{str(uuid.uuid4())[:8].upper()}"
+
     def save(self, *args, **kwargs):
         if not self.sku:
-            self.sku = f"SKU-{str(uuid.uuid4())[:8].upper()}"
-        super().save(*args, **kwargs)
+            self.sku = self.generate_sku()
+        with transaction.atomic():
+            self.catalog_version = CatalogVersion.bump(self.company_uuid)
+            super().save(*args, **kwargs)
 
 class PriceList(SoftDeleteModel):
     """
     Groups prices: 'Wholesale', 'Retail', 'Corporate'.
+    Scoped lists are layered when resolving a basket: branch over customer group over default.
     """
+    SCOPE_CHOICES = (
+        ('manual', 'Manual'),                  # Only when asked for by id
+        ('default', 'Company Default'),
+        ('customer_group', 'Customer Group'),
+        ('branch', 'Branch'),
+    )
+
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES, default='manual')
+    scope_ref = models.CharField(max_length=100, blank=True, default='', help_text="Branch UUID or customer group for scoped lists")
+    items_version = models.BigIntegerField(default=0, editable=False, help_text="Bumped on every item change; invalidates cached price matrices")
 
     class Meta:
         unique_together = ('company_uuid', 'name')
@@ -218,3 +243,28 @@ class PriceListItem(models.Model):
 
     def __str__(self):
         return f"{self.price_list.name} - {self.variant_uuid}: {self.price}"
+
+class CatalogVersion(models.Model):
+    """
+    Per-company counter stamped on every product/variant write.
+    POS terminals sync everything with a catalog_version above the last one they saw.
+    """
+    company_uuid = models.UUIDField(primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.company_uuid}: v{self.version}"
+
+    @classmethod
+    def bump(cls, company_uuid):
+        """
+        Returns the next version for the company. The row stays locked until
+        the caller's transaction commits, so versions become visible in order
+        and a terminal syncing "since N" can never skip a slower writer.
+        """
+        cls.objects.get_or_create(company_uuid=company_uuid)
+        row = cls.objects.select_for_update().get(company_uuid=company_uuid)
+        row.version += 1
+        row.save(update_fields=['version', 'updated_at'])
+        return row.version
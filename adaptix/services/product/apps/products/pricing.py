@@ -0,0 +1,138 @@
+"""
+Basket pricing: resolves many variants against layered price lists in one go.
+
+Each price list is precomputed into a {variant_uuid: price} matrix and kept
+in process memory, tagged with the list's items_version. A request does one
+query to find the applicable lists (and their versions), rebuilds only the
+matrices whose version moved, and one query for base prices:
+
+    resolver = PriceResolver.for_context(company_uuid, branch_uuid=..., customer_group=...)
+    prices = resolver.resolve(variant_ids)
+
+Layer order: explicit list > branch > customer group > company default > variant price.
+"""
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.db.models import F, Q
+
+MATRIX_CACHE_SIZE = getattr(settings, 'PRICE_MATRIX_CACHE_SIZE', 256)
+SCOPE_RANK = {'branch': 0, 'customer_group': 1, 'default': 2}
+
+
+class PriceMatrixCache:
+    """LRU of price_list_id -> (items_version, {variant_uuid: Decimal})."""
+
+    def __init__(self, max_size=MATRIX_CACHE_SIZE):
+        self.max_size = max_size
+        self._matrices = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, price_list_id, items_version):
+        key = str(price_list_id)
+        with self._lock:
+            cached = self._matrices.get(key)
+            if cached is not None and cached[0] == items_version:
+                self._matrices.move_to_end(key)
+                return cached[1]
+        matrix = load_matrix(price_list_id)
+        with self._lock:
+            self._matrices[key] = (items_version, matrix)
+            self._matrices.move_to_end(key)
+            while len(self._matrices) > self.max_size:
+                self._matrices.popitem(last=False)
+        return matrix
+
+    def clear(self):
+        with self._lock:
+            self._matrices.clear()
+
+
+matrix_cache = PriceMatrixCache()
+
+
+def load_matrix(price_list_id):
+    from .models import PriceListItem
+
+    return {
+        str(variant_uuid): price
+        for variant_uuid, price in PriceListItem.objects.filter(
+            price_list_id=price_list_id
+        ).values_list('variant_uuid', 'price').iterator(chunk_size=5000)
+    }
+
+
+def bump_items_version(price_list_ids):
+    """Marks lists as changed; call after bulk writes that bypass PriceListItem.save()."""
+    from .models import PriceList
+
+    PriceList.all_objects.filter(id__in=list(price_list_ids)).update(items_version=F('items_version') + 1)
+
+
+def resolve_prices(variant_ids, layers, base_prices):
+    """
+    Pure resolution step.
+    layers:      [(price_list_id, matrix)] highest priority first
+    base_prices: {variant_uuid: Decimal} fallback when no list has the variant
+    Returns {variant_uuid: {"price", "base_price", "price_list_id"}}; unknown variants are left out.
+    """
+    resolved = {}
+    for variant_id in variant_ids:
+        base = base_prices.get(variant_id)
+        if base is None:
+            continue
+        price, source = base, None
+        for price_list_id, matrix in layers:
+            layered = matrix.get(variant_id)
+            if layered is not None:
+                price, source = layered, price_list_id
+                break
+        resolved[variant_id] = {"price": price, "base_price": base, "price_list_id": source}
+    return resolved
+
+
+class PriceResolver:
+    def __init__(self, company_uuid, lists, cache=matrix_cache):
+        """lists: [(price_list_id, items_version)] highest priority first."""
+        self.company_uuid = company_uuid
+        self.lists = lists
+        self.cache = cache
+
+    @classmethod
+    def for_context(cls, company_uuid, branch_uuid=None, customer_group=None, price_list_id=None, cache=matrix_cache):
+        """Picks the active lists that apply to this branch/customer with one query."""
+        from .models import PriceList
+
+        scoped = Q(scope='default')
+        if branch_uuid:
+            scoped |= Q(scope='branch', scope_ref=str(branch_uuid))
+        if customer_group:
+            scoped |= Q(scope='customer_group', scope_ref=str(customer_group))
+        if price_list_id:
+            scoped |= Q(id=price_list_id)
+
+        rows = PriceList.objects.filter(scoped, company_uuid=company_uuid, is_active=True).values_list(
+            'id', 'scope', 'items_version', 'created_at'
+        )
+        explicit = str(price_list_id) if price_list_id else None
+        ordered = sorted(rows, key=lambda r: (
+            str(r[0]) != explicit,
+            SCOPE_RANK.get(r[1], len(SCOPE_RANK)),
+            r[3],  # oldest list of a scope wins a tie
+        ))
+        return cls(company_uuid, [(str(r[0]), r[2]) for r in ordered], cache=cache)
+
+    def layers(self):
+        return [(list_id, self.cache.get(list_id, version)) for list_id, version in self.lists]
+
+    def resolve(self, variant_ids):
+        from .models import ProductVariant
+
+        variant_ids = list(dict.fromkeys(str(v) for v in variant_ids))
+        base_prices = {
+            str(variant_id): price
+            for variant_id, price in ProductVariant.objects.filter(
+                company_uuid=self.company_uuid, id__in=variant_ids
+            ).values_list('id', 'price')
+        }
+        return resolve_prices(variant_ids, self.layers(), base_prices)
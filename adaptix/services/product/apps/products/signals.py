@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .catalog import apply_saved_variants
+from .models import PriceListItem, Product, ProductVariant
+from .pricing import bump_items_version
+
+
+@receiver(post_save, sender=ProductVariant)
+def refresh_catalog_variant(sender, instance, **kwargs):
+    """Keep this worker's POS catalog index in step with variant edits"""
+    company_uuid, variant_ids = instance.company_uuid, [instance.id]
+    transaction.on_commit(lambda: apply_saved_variants(company_uuid, variant_ids))
+
+
+@receiver(post_save, sender=Product)
+def refresh_catalog_product(sender, instance, **kwargs):
+    """Name, barcode and tax changes show up on every variant of the product"""
+    company_uuid, product_id = instance.company_uuid, instance.id
+
+    def apply():
+        variant_ids = list(ProductVariant.all_objects.filter(product_id=product_id).values_list('id', flat=True))
+        apply_saved_variants(company_uuid, variant_ids)
+
+    transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=PriceListItem)
+@receiver(post_delete, sender=PriceListItem)
+def invalidate_price_matrix(sender, instance, **kwargs):
+    """Cached price matrices are keyed by items_version; bumping it makes every worker rebuild"""
+    bump_items_version([instance.price_list_id])
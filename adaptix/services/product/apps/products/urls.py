@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     CategoryViewSet, BrandViewSet, UnitViewSet,
     ProductViewSet, ProductVariantViewSet, ApprovalRequestViewSet,
-    AttributeViewSet, AttributeSetViewSet, PriceListViewSet, PriceListItemViewSet
+    AttributeViewSet, AttributeSetViewSet, PriceListViewSet, PriceListItemViewSet,
+    CatalogViewSet
 )
 
 router = DefaultRouter()
@@ -17,6 +18,7 @@ router.register(r'attributes', AttributeViewSet)
 router.register(r'attribute-sets', AttributeSetViewSet)
 router.register(r'price-lists', PriceListViewSet)
 router.register(r'price-list-items', PriceListItemViewSet)
+router.register(r'catalog', CatalogViewSet, basename='catalog')
 
 urlpatterns = [
     path('', include(router.urls)),
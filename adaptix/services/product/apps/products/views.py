@@ -4,6 +4,7 @@ import uuid
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
+from django.http import StreamingHttpResponse
 
 from .models import Category, Brand, Unit, Product, ProductVariant, Attribute, AttributeSet
 from .serializers import (
@@ -12,6 +13,7 @@ from .serializers import (
     AttributeSerializer, AttributeSetSerializer
 )
 from adaptix_core.permissions import HasPermission
+from .bulk_io import TRUE_VALUES, ProductImporter, export_csv, export_jsonl, iter_rows
 
 def get_company_uuid(request):
     """Helper to get company UUID from request."""
@@ -70,23 +72,61 @@ class ProductViewSet(BaseCompanyViewSet):
         
         product = serializer.save(company_uuid=cid)
         
-        # Check if we should create a default variant
-        # Frontend might send 'price', 'cost', 'sku', 'quantity' in the root payload for simple products
+        # Variants are read-only on the serializer, so a new product never has
+        # one yet: always add the default variant. Frontend might send 'price',
+        # 'cost', 'sku', 'quantity' in the root payload for simple products.
         data = self.request.data
-        should_create_variant = any(k in data for k in ['price', 'cost', 'sku', 'quantity'])
-        
-        # Or if no variants provided at all, create a default one
-        if should_create_variant or not product.variants.exists():
-            ProductVariant.objects.create(
-                company_uuid=cid,
-                product=product,
-                name="Default",
-                sku=data.get('sku') or f"SKU-{product.name[:3].upper()}-{uuid.uuid4().hex[:6].upper()}",
-                price=data.get('price', 0),
-                cost=data.get('cost', 0),
-                quantity=data.get('quantity', 0),
-                alert_quantity=data.get('alert_quantity', 10)
-            )
+        ProductVariant.objects.create(
+            company_uuid=cid,
+            product=product,
+            name="Default",
+            sku=data.get('sku') or f"SKU-{product.name[:3].upper()}-{uuid.uuid4().hex[:6].upper()}",
+            price=data.get('price', 0),
+            cost=data.get('cost', 0),
+            quantity=data.get('quantity', 0),
+            alert_quantity=data.get('alert_quantity', 10)
+        )
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request):
+        """
+        Bulk upsert from an uploaded CSV or JSON Lines file, matched on SKU.
+        Form fields: file, file_format (csv|jsonl, else taken from the file name), dry_run, create_missing
+        """
+        cid = get_company_uuid(request)
+        if not cid:
+            raise ValidationError({"detail": "Company context missing."})
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({"detail": "file is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        file_format = request.data.get('file_format') or upload.name.rsplit('.', 1)[-1].lower()
+        if file_format == 'ndjson':
+            file_format = 'jsonl'
+        if file_format not in ('csv', 'jsonl'):
+            return Response({"detail": "file_format must be csv or jsonl."}, status=status.HTTP_400_BAD_REQUEST)
+
+        importer = ProductImporter(
+            cid,
+            dry_run=str(request.data.get('dry_run', '')).lower() in TRUE_VALUES,
+            create_missing=str(request.data.get('create_missing', 'true')).lower() in TRUE_VALUES
+        )
+        stats = importer.run(iter_rows(upload.file, file_format))
+        return Response({"dry_run": importer.dry_run, **stats, "errors": importer.errors})
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def bulk_export(self, request):
+        """Streams the catalog as CSV (default) or JSON Lines: ?file_format=jsonl"""
+        cid = get_company_uuid(request)
+        if not cid:
+            raise ValidationError({"detail": "Company context missing."})
+        if request.query_params.get('file_format') == 'jsonl':
+            response = StreamingHttpResponse(export_jsonl(cid), content_type='application/x-ndjson')
+            response['Content-Disposition'] = 'attachment; filename="products.jsonl"'
+        else:
+            response = StreamingHttpResponse(export_csv(cid), content_type='text/csv')
+            response['Content-Disposition'] = 'attachment; filename="products.csv"'
+        return response
 
 
 from rest_framework.permissions import AllowAny
@@ -98,11 +138,11 @@ class ProductVariantViewSet(BaseCompanyViewSet):
     required_permission = "view_product"
 
     def get_queryset(self):
-        ctx = super().get_queryset()
-        if ctx.exists():
-            return ctx
+        cid = get_company_uuid(self.request)
+        if cid:
+            return self.queryset.filter(company_uuid=cid).select_related('product')
         # Fallback for internal lookups without company context
-        return self.queryset
+        return self.queryset.select_related('product')
 
     search_fields = ['name', 'sku', 'product__name']
     ordering_fields = ['price', 'quantity']
@@ -213,6 +253,7 @@ class AttributeViewSet(BaseCompanyViewSet):
 
 from .models import PriceList, PriceListItem
 from .serializers import PriceListSerializer, PriceListItemSerializer
+from .pricing import PriceResolver
 
 class PriceListViewSet(BaseCompanyViewSet):
     queryset = PriceList.objects.all()
@@ -220,6 +261,39 @@ class PriceListViewSet(BaseCompanyViewSet):
     required_permission = "view_product" # Adjust permissions as needed
     search_fields = ['name']
 
+    @action(detail=False, methods=['post'])
+    def resolve(self, request):
+        """
+        Prices a whole basket in one call.
+        Payload: {"variant_ids": [...], "branch_uuid": "...", "customer_group": "...", "price_list_id": "..."}
+        Lists are layered explicit > branch > customer group > default, then the variant's own price.
+        """
+        cid = get_company_uuid(request)
+        if not cid:
+            return Response({"detail": "Company context missing."}, status=status.HTTP_400_BAD_REQUEST)
+
+        variant_ids = request.data.get('variant_ids') or []
+        price_list_id = request.data.get('price_list_id')
+        try:
+            variant_ids = [str(uuid.UUID(str(v))) for v in variant_ids]
+            if price_list_id:
+                price_list_id = str(uuid.UUID(str(price_list_id)))
+        except ValueError:
+            return Response({"detail": "variant_ids and price_list_id must be UUIDs."}, status=status.HTTP_400_BAD_REQUEST)
+
+        resolver = PriceResolver.for_context(
+            cid,
+            branch_uuid=request.data.get('branch_uuid'),
+            customer_group=request.data.get('customer_group'),
+            price_list_id=price_list_id
+        )
+        resolved = resolver.resolve(variant_ids)
+        return Response({
+            "price_lists": [list_id for list_id, _ in resolver.lists],
+            "prices": [dict(variant_id=v, **resolved[v]) for v in variant_ids if v in resolved],
+            "missing": [v for v in variant_ids if v not in resolved],
+        })
+
 class PriceListItemViewSet(viewsets.ModelViewSet):
     """
     Direct management of prices for specific variants in a list.
@@ -250,3 +324,65 @@ class PriceListItemViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(item)
         status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
         return Response(serializer.data, status=status_code)
+
+
+from .catalog import SYNC_PAGE_SIZE, fetch_rows, get_index, parse_version
+
+class CatalogViewSet(viewsets.ViewSet):
+    """
+    POS catalog served from the in-memory index (see catalog.py).
+    GET catalog/lookup/?code=<barcode or sku>
+    GET catalog/search/?q=<name prefix or fragment>&limit=20
+    GET catalog/sync/?since=<catalog version>&limit=5000
+    """
+    permission_classes = [HasPermission]
+    required_permission = "view_product"
+
+    def get_company(self, request):
+        cid = get_company_uuid(request)
+        if not cid:
+            raise ValidationError({"detail": "Company context missing."})
+        return cid
+
+    @action(detail=False, methods=['get'])
+    def lookup(self, request):
+        code = request.query_params.get('code')
+        if not code:
+            return Response({"detail": "code is required."}, status=status.HTTP_400_BAD_REQUEST)
+        index = get_index(self.get_company(request))
+        matches = index.lookup(code)
+        if not matches:
+            return Response({"detail": "Not found.", "code": code}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"code": code, "catalog_version": index.version, "matches": matches})
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            return Response({"detail": "limit must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+        index = get_index(self.get_company(request))
+        return Response({
+            "catalog_version": index.version,
+            "results": index.search(request.query_params.get('q', ''), limit=limit),
+        })
+
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """
+        Rows changed since the terminal's version, oldest first. Keep calling with
+        the returned version while has_more is true; rows with removed=true are gone.
+        """
+        since = parse_version(request.query_params.get('since'))
+        limit = parse_version(request.query_params.get('limit', SYNC_PAGE_SIZE))
+        if since is None or not limit:
+            return Response({"detail": "since and limit must be positive numbers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows, has_more = fetch_rows(self.get_company(request), since=since, limit=min(limit, SYNC_PAGE_SIZE))
+        return Response({
+            "since": since,
+            "version": rows[-1]["version"] if rows else since,
+            "full": since == 0,
+            "has_more": has_more,
+            "rows": rows,
+        })
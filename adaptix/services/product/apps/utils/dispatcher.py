@@ -0,0 +1,142 @@
+"""
+Fire-and-forget publishing for audit logs, notifications and catalog events.
+
+Callers only put a message on a bounded in-process queue. A few daemon
+workers drain it in batches over kombu's pooled producers, so a burst of
+approvals costs neither a thread nor a broker connection per message.
+When the queue is full a caller waits at most EVENT_QUEUE_PUT_TIMEOUT and
+the message is then dropped and counted. Whatever is still queued at
+interpreter exit is flushed before the process goes away.
+"""
+import atexit
+import os
+import queue
+import threading
+from django.conf import settings
+from kombu import Connection, Exchange
+from kombu.pools import producers
+
+QUEUE_SIZE = getattr(settings, 'EVENT_QUEUE_SIZE', 1000)
+WORKERS = getattr(settings, 'EVENT_WORKERS', 2)
+BATCH_SIZE = getattr(settings, 'EVENT_BATCH_SIZE', 50)
+PUT_TIMEOUT = getattr(settings, 'EVENT_QUEUE_PUT_TIMEOUT', 0.05)
+SHUTDOWN_TIMEOUT = getattr(settings, 'EVENT_SHUTDOWN_TIMEOUT', 5.0)
+RETRY_POLICY = {"max_retries": 3, "interval_start": 0, "interval_step": 0.5}
+
+EXCHANGES = {
+    "audit_logs": Exchange("audit_logs", type="fanout", durable=True),
+    "notifications": Exchange("notifications", type="fanout", durable=True),
+    "events": Exchange("events", type="topic", durable=True),
+}
+
+_STOP = object()
+
+
+class EventDispatcher:
+    def __init__(self, queue_size=QUEUE_SIZE, workers=WORKERS, batch_size=BATCH_SIZE, put_timeout=PUT_TIMEOUT):
+        self.queue_size = queue_size
+        self.worker_count = workers
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.stats = {"queued": 0, "published": 0, "dropped": 0, "failed": 0}
+        self._stats_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._workers = []
+        self._connection = None
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _ensure_started(self):
+        # Workers are started lazily, and again in a forked child (gunicorn
+        # preload): threads do not survive fork().
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._connection = Connection(settings.CELERY_BROKER_URL)
+            self._workers = [
+                threading.Thread(target=self._run, name=f"event-dispatcher-{i}", daemon=True)
+                for i in range(self.worker_count)
+            ]
+            for worker in self._workers:
+                worker.start()
+            self._pid = os.getpid()
+
+    def submit(self, exchange, routing_key, payload):
+        """Queues one message. Returns False if it was dropped because the queue stayed full."""
+        self._ensure_started()
+        try:
+            self._queue.put((exchange, routing_key, payload), timeout=self.put_timeout)
+        except queue.Full:
+            self._count("dropped")
+            print(f"Event queue full, dropped {routing_key} ({self.stats['dropped']} dropped so far)")
+            return False
+        self._count("queued")
+        return True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            stop = item is _STOP
+            batch = [] if stop else [item]
+            # Take whatever else is already waiting, up to one batch
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                self._publish(batch)
+            if stop:
+                return
+
+    def _publish(self, batch):
+        try:
+            with producers[self._connection].acquire(block=True, timeout=10) as producer:
+                for exchange_name, routing_key, payload in batch:
+                    exchange = EXCHANGES[exchange_name]
+                    producer.publish(
+                        payload,
+                        exchange=exchange,
+                        routing_key=routing_key,
+                        declare=[exchange],
+                        retry=True,
+                        retry_policy=RETRY_POLICY,
+                        serializer="json"
+                    )
+            self._count("published", len(batch))
+        except Exception as e:
+            self._count("failed", len(batch))
+            print(f"Failed to publish {len(batch)} event(s): {e}")
+
+    def shutdown(self, timeout=SHUTDOWN_TIMEOUT):
+        """Lets the workers finish everything already queued, then stops them."""
+        if self._pid != os.getpid():
+            return
+        for _ in self._workers:
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                break
+        for worker in self._workers:
+            worker.join(timeout)
+        self._pid = None
+        self._workers = []
+
+
+dispatcher = EventDispatcher()
+atexit.register(dispatcher.shutdown)
+
+
+def submit(exchange, routing_key, payload):
+    return dispatcher.submit(exchange, routing_key, payload)
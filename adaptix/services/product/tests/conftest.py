@@ -35,5 +35,5 @@ def mock_permissions(mocker):
     try:
         mocker.patch('apps.products.permissions.HasPermission.has_permission', return_value=True)
         mocker.patch('rest_framework.permissions.IsAuthenticated.has_permission', return_value=True)
-    except ImportError:
+    except (ImportError, AttributeError):
         pass
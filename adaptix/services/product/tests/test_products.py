@@ -1,4 +1,5 @@
 import pytest
+import threading
 import uuid
 from decimal import Decimal
 from apps.products.models import Product, Category, Brand
@@ -47,3 +48,231 @@ class TestProductLogic:
         assert product.company_uuid == company_uuid
         assert str(product.name) == "Test Product"
         assert variant.price == Decimal("20.00")
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCatalog:
+    @pytest.fixture(autouse=True)
+    def fresh_index(self):
+        from apps.products.catalog import reset_indexes
+        reset_indexes()
+        yield
+        reset_indexes()
+
+    def make_variant(self, company_uuid, name, sku, price="10.00", barcode=None):
+        product = Product.objects.create(company_uuid=company_uuid, name=name, barcode=barcode)
+        from apps.products.models import ProductVariant
+        return ProductVariant.objects.create(
+            company_uuid=company_uuid, product=product, name="Default", sku=sku, price=Decimal(price)
+        )
+
+    def test_lookup_and_search_are_served_from_memory(self, company_uuid, django_assert_num_queries):
+        from apps.products.catalog import get_index
+        self.make_variant(company_uuid, "Coca Cola 500ml", "CC-500", barcode="5449000000996")
+        self.make_variant(company_uuid, "Cold Coffee", "CF-1")
+        index = get_index(company_uuid)
+
+        with django_assert_num_queries(0):
+            assert get_index(company_uuid).lookup("5449000000996")[0]["sku"] == "CC-500"
+            assert index.lookup(" cc-500 ")[0]["price"] == "10.00"
+            assert [r["sku"] for r in index.search("co")] == ["CC-500", "CF-1"]
+            assert [r["sku"] for r in index.search("cola")] == ["CC-500"]
+            assert [r["sku"] for r in index.search("cof col")] == ["CF-1"]
+            assert index.search("tea") == []
+
+    def test_saves_update_the_loaded_index(self, company_uuid):
+        from apps.products.catalog import get_index
+        variant = self.make_variant(company_uuid, "Green Tea", "GT-1")
+        index = get_index(company_uuid)
+
+        variant.price = Decimal("12.50")
+        variant.save()
+        variant.product.name = "Jasmine Tea"
+        variant.product.save()
+
+        assert index.lookup("GT-1")[0]["price"] == "12.50"
+        assert index.search("jasmine")[0]["sku"] == "GT-1"
+        assert index.search("green") == []
+
+        variant.delete()
+        assert index.lookup("GT-1") == []
+
+    def test_delta_sync_returns_only_changes(self, company_uuid):
+        from apps.products.catalog import fetch_rows
+        first = self.make_variant(company_uuid, "Milk", "MLK")
+        self.make_variant(company_uuid, "Bread", "BRD")
+
+        rows, has_more = fetch_rows(company_uuid)
+        assert {r["sku"] for r in rows} == {"MLK", "BRD"} and not has_more
+        version = max(r["version"] for r in rows)
+
+        first.delete()
+        rows, _ = fetch_rows(company_uuid, since=version)
+        assert [(r["sku"], r["removed"]) for r in rows] == [("MLK", True)]
+        assert fetch_rows(company_uuid, since=rows[0]["version"]) == ([], False)
+
+    def test_sync_pages_do_not_split_a_version(self, company_uuid):
+        from apps.products.catalog import fetch_rows
+        from apps.products.models import ProductVariant
+        variant = self.make_variant(company_uuid, "Shirt", "SH-S")
+        for size in ("M", "L"):
+            ProductVariant.objects.create(company_uuid=company_uuid, product=variant.product, name=size, sku=f"SH-{size}")
+        self.make_variant(company_uuid, "Socks", "SK-1")
+        variant.product.save()  # all three shirt rows now share one version
+
+        rows, has_more = fetch_rows(company_uuid, since=1, limit=2)
+        assert [r["sku"] for r in rows] == ["SK-1"] and has_more
+        rows, has_more = fetch_rows(company_uuid, since=rows[-1]["version"], limit=2)
+        assert sorted(r["sku"] for r in rows) == ["SH-L", "SH-M", "SH-S"] and not has_more
+
+
+@pytest.mark.django_db
+class TestPriceResolution:
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self):
+        from apps.products.pricing import matrix_cache
+        matrix_cache.clear()
+
+    def test_layers_and_invalidation(self, company_uuid, django_assert_num_queries):
+        from apps.products.models import PriceList, PriceListItem, ProductVariant
+        from apps.products.pricing import PriceResolver
+
+        product = Product.objects.create(company_uuid=company_uuid, name="Rice")
+        bag, sack, box = [
+            ProductVariant.objects.create(company_uuid=company_uuid, product=product, name=n, sku=n, price=Decimal("10"))
+            for n in ("BAG", "SACK", "BOX")
+        ]
+        default = PriceList.objects.create(company_uuid=company_uuid, name="Retail", scope='default')
+        wholesale = PriceList.objects.create(company_uuid=company_uuid, name="Wholesale", scope='customer_group', scope_ref='wholesale')
+        branch = PriceList.objects.create(company_uuid=company_uuid, name="Dhaka", scope='branch', scope_ref='b-1')
+        PriceList.objects.create(company_uuid=company_uuid, name="Promo", scope='manual')
+        PriceListItem.objects.create(price_list=default, variant_uuid=bag.id, price=Decimal("9"))
+        PriceListItem.objects.create(price_list=default, variant_uuid=sack.id, price=Decimal("9"))
+        PriceListItem.objects.create(price_list=wholesale, variant_uuid=sack.id, price=Decimal("8"))
+        PriceListItem.objects.create(price_list=branch, variant_uuid=sack.id, price=Decimal("7"))
+
+        ids = [bag.id, sack.id, box.id, uuid.uuid4()]
+        resolver = PriceResolver.for_context(company_uuid, branch_uuid='b-1', customer_group='wholesale')
+        prices = resolver.resolve(ids)
+        assert resolver.lists == [(str(branch.id), 1), (str(wholesale.id), 1), (str(default.id), 2)]
+        assert prices[str(bag.id)]["price"] == Decimal("9")
+        assert prices[str(sack.id)] == {"price": Decimal("7"), "base_price": Decimal("10"), "price_list_id": str(branch.id)}
+        assert prices[str(box.id)]["price_list_id"] is None
+        assert len(prices) == 3
+
+        # Warm matrices: one query for the lists, one for base prices
+        with django_assert_num_queries(2):
+            PriceResolver.for_context(company_uuid, customer_group='wholesale').resolve(ids)
+
+        PriceListItem.objects.filter(price_list=wholesale).get().delete()
+        prices = PriceResolver.for_context(company_uuid, customer_group='wholesale').resolve(ids)
+        assert prices[str(sack.id)]["price_list_id"] == str(default.id)
+
+
+@pytest.mark.django_db
+class TestBulkImportExport:
+    @pytest.fixture(autouse=True)
+    def no_broker(self, mocker):
+        self.published = mocker.patch('apps.utils.dispatcher.submit')
+
+    CSV = (
+        "sku,parent_sku,name,variant_name,category,brand,price,quantity\n"
+        "TS-S,,T-Shirt,Small,Apparel,Acme,10.00,5\n"
+        "TS-L,TS-S,,Large,,,12.00,3\n"
+        "MUG-1,,Mug,,Kitchen,,4.50,\n"
+        "BAD-1,,Broken,,,,abc,\n"
+        "ORPHAN,NOPE,,,,,1,\n"
+    )
+
+    def run_import(self, company_uuid, text, **kwargs):
+        import io
+        from apps.products.bulk_io import ProductImporter, iter_rows
+        importer = ProductImporter(company_uuid, chunk_size=2, **kwargs)
+        importer.run(iter_rows(io.BytesIO(text.encode()), 'csv'))
+        return importer
+
+    def test_import_creates_products_variants_and_lookups(self, company_uuid):
+        from apps.products.models import ProductVariant
+        importer = self.run_import(company_uuid, self.CSV)
+
+        assert importer.stats == {"rows": 5, "created": 3, "updated": 0, "failed": 2, "batches": 3}
+        assert [e["line"] for e in importer.errors] == [5, 6]
+        small, large = ProductVariant.objects.filter(sku__in=["TS-S", "TS-L"]).order_by('sku').reverse()
+        assert small.product_id == large.product_id
+        assert small.product.category.name == "Apparel" and small.product.brand.name == "Acme"
+        assert small.product.barcode and small.catalog_version > 0
+        assert Category.objects.filter(company_uuid=company_uuid).count() == 2
+        assert self.published.call_count == 3
+
+    def test_reimport_updates_on_sku_and_dry_run_writes_nothing(self, company_uuid):
+        from apps.products.models import ProductVariant
+        self.run_import(company_uuid, self.CSV)
+
+        dry = self.run_import(company_uuid, "sku,price,category\nMUG-1,6.00,Outdoor\nNEW-1,1,\n", dry_run=True)
+        assert dry.stats["updated"] == 1 and dry.errors == [{"line": 3, "error": "name is required for new products"}]
+        assert ProductVariant.objects.get(sku="MUG-1").price == Decimal("4.50")
+        assert not Category.objects.filter(name="Outdoor").exists()
+
+        importer = self.run_import(company_uuid, "sku,price\nMUG-1,6.00\n")
+        mug = ProductVariant.objects.get(sku="MUG-1")
+        assert importer.stats["updated"] == 1
+        assert mug.price == Decimal("6.00") and mug.quantity == Decimal("0") and mug.product.name == "Mug"
+
+    def test_sibling_variants_update_one_product(self, company_uuid):
+        from apps.products.bulk_io import ProductImporter
+        from apps.products.models import Product
+        self.run_import(company_uuid, self.CSV)
+
+        importer = ProductImporter(company_uuid)
+        importer.run([
+            (2, {"sku": "TS-S", "description": "Cotton tee"}, None),
+            (3, {"sku": "TS-L", "category": "Summer"}, None),
+        ])
+
+        assert importer.stats["updated"] == 2 and importer.stats["batches"] == 1
+        shirt = Product.objects.get(company_uuid=company_uuid, name="T-Shirt")
+        assert shirt.description == "Cotton tee" and shirt.category.name == "Summer"
+
+    def test_export_round_trips(self, company_uuid):
+        from apps.products.bulk_io import export_csv
+        self.run_import(company_uuid, self.CSV)
+
+        exported = "".join(export_csv(company_uuid))
+        lines = exported.strip().splitlines()
+        assert len(lines) == 4
+        assert any(line.startswith("TS-L,TS-S,T-Shirt,Large,") for line in lines)
+
+        other_company = str(uuid.uuid4())
+        importer = self.run_import(other_company, exported)
+        assert importer.stats["created"] == 3 and importer.stats["failed"] == 0
+
+
+class TestEventDispatcher:
+    def test_batches_over_one_producer_and_flushes_on_shutdown(self, mocker):
+        from apps.utils.dispatcher import EventDispatcher
+        dispatcher = EventDispatcher(queue_size=100, workers=1, batch_size=10)
+        published = mocker.patch.object(dispatcher, '_publish')
+        dispatcher._ensure_started()
+        worker = dispatcher._workers[0]
+
+        # Hold the worker so everything queues up behind it
+        release = threading.Event()
+        published.side_effect = lambda batch: release.wait(1)
+        for i in range(25):
+            assert dispatcher.submit("audit_logs", "audit.log", {"n": i})
+        release.set()
+        dispatcher.shutdown()
+
+        assert not worker.is_alive()
+        sizes = [len(call.args[0]) for call in published.call_args_list]
+        assert sum(sizes) == 25 and max(sizes) <= 10
+        assert dispatcher.stats["queued"] == 25 and dispatcher.stats["dropped"] == 0
+
+    def test_full_queue_drops_and_counts(self, mocker):
+        from apps.utils.dispatcher import EventDispatcher
+        dispatcher = EventDispatcher(queue_size=2, workers=0, put_timeout=0.01)
+
+        results = [dispatcher.submit("notifications", "notify.user", {}) for _ in range(4)]
+
+        assert results == [True, True, False, False]
+        assert dispatcher.stats["dropped"] == 2
@@ -1,8 +1,14 @@
 from django.contrib import admin
-from .models import Coupon
+from .models import Coupon, CouponRedemption
 
 @admin.register(Coupon)
 class CouponAdmin(admin.ModelAdmin):
     list_display = ('code', 'discount_type', 'value', 'active', 'times_used', 'valid_to')
     list_filter = ('active', 'discount_type', 'valid_to')
     search_fields = ('code',)
+
+@admin.register(CouponRedemption)
+class CouponRedemptionAdmin(admin.ModelAdmin):
+    list_display = ('coupon', 'reference', 'amount', 'discount', 'created_at')
+    search_fields = ('reference', 'coupon__code')
+    raw_id_fields = ('coupon',)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class CouponsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.coupons'
+
+    def ready(self):
+        import apps.coupons.signals
@@ -0,0 +1,264 @@
+"""
+Promotion engine: basket evaluation and atomic coupon redemption.
+
+- Coupon definitions are served from an in-process cache (COUPON_CACHE_SECONDS),
+  so validating or pricing a basket does not touch the database. Saving or
+  deleting a coupon drops it from the cache of the process that made the change;
+  other processes pick the change up when the entry expires.
+- Redemption never trusts the cache: the coupons of a batch are locked with
+  SELECT ... FOR UPDATE (in id order, so concurrent batches cannot deadlock),
+  re-checked, and their times_used raised with one UPDATE. A usage_limit
+  therefore holds under any concurrency.
+- A basket with a reference redeems each coupon once; replaying it is reported
+  as a duplicate instead of using the coupon again.
+
+    results = redeem_baskets([{"reference": "ORD-1", "amount": Decimal("80"), "codes": ["FLASH10"]}])
+"""
+import threading
+import time
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+COUPON_CACHE_SECONDS = getattr(settings, 'COUPON_CACHE_SECONDS', 30)
+CENT = Decimal('0.01')
+
+CouponDefinition = namedtuple('CouponDefinition', [
+    'id', 'code', 'discount_type', 'value', 'min_purchase_amount',
+    'valid_from', 'valid_to', 'active', 'usage_limit', 'times_used',
+])
+DEFINITION_FIELDS = CouponDefinition._fields
+
+
+def check_coupon(coupon, amount, now=None):
+    """Returns None if the coupon applies to a basket of this amount, else the reason it does not."""
+    now = now or timezone.now()
+    if coupon is None:
+        return "Coupon not found"
+    if not coupon.active or now < coupon.valid_from or (coupon.valid_to and now > coupon.valid_to):
+        return "Coupon is not active"
+    if coupon.usage_limit > 0 and coupon.times_used >= coupon.usage_limit:
+        return "Coupon usage limit reached"
+    if amount < coupon.min_purchase_amount:
+        return "Minimum purchase not met"
+    return None
+
+
+def discount_for(coupon, amount):
+    if coupon.discount_type == 'percent':
+        discount = amount * coupon.value / 100
+    else:
+        discount = coupon.value
+    return min(discount, amount).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class CouponCache:
+    """code -> (expires_at, CouponDefinition or None). Unknown codes are cached too."""
+
+    def __init__(self, ttl=COUPON_CACHE_SECONDS):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, codes):
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            for code in codes:
+                entry = self._entries.get(code)
+                if entry is not None and entry[0] > now:
+                    found[code] = entry[1]
+                else:
+                    missing.append(code)
+        if missing:
+            loaded = load_definitions(missing)
+            expires_at = now + self.ttl
+            with self._lock:
+                for code in missing:
+                    found[code] = loaded.get(code)
+                    self._entries[code] = (expires_at, found[code])
+        return found
+
+    def get(self, code):
+        return self.get_many([code])[code]
+
+    def note_usage(self, code, times_used):
+        """Keeps the cached counter close to the database after this process redeemed the coupon."""
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is not None and entry[1] is not None:
+                self._entries[code] = (entry[0], entry[1]._replace(times_used=times_used))
+
+    def invalidate(self, code, coupon_id=None):
+        """Drops a code; with coupon_id also whatever code that coupon was cached under before a rename."""
+        with self._lock:
+            self._entries.pop(code, None)
+            if coupon_id is not None:
+                for cached_code, (_, coupon) in list(self._entries.items()):
+                    if coupon is not None and coupon.id == coupon_id:
+                        del self._entries[cached_code]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def load_definitions(codes):
+    from .models import Coupon
+
+    return {
+        row[1]: CouponDefinition(*row)
+        for row in Coupon.objects.filter(code__in=list(codes)).values_list(*DEFINITION_FIELDS)
+    }
+
+
+coupon_cache = CouponCache()
+
+
+def normalize_codes(codes):
+    return list(dict.fromkeys(code.strip() for code in codes if code and code.strip()))
+
+
+def evaluate_basket(amount, codes, definitions, now=None):
+    """
+    Pure evaluation of every coupon of a basket.
+    definitions: {code: CouponDefinition or None}
+    Returns {"valid", "discount", "total", "coupons": [{"code", "valid", "discount", "message"}]};
+    the basket is valid only if all of its coupons apply. The total discount never exceeds the amount.
+    """
+    now = now or timezone.now()
+    lines, total_discount = [], Decimal('0')
+    for code in codes:
+        coupon = definitions.get(code)
+        reason = check_coupon(coupon, amount, now)
+        discount = Decimal('0') if reason else min(discount_for(coupon, amount), amount - total_discount)
+        total_discount += discount
+        lines.append({
+            "code": code,
+            "valid": reason is None,
+            "discount": discount,
+            "message": reason or "Coupon applied successfully",
+        })
+    valid = bool(lines) and all(line["valid"] for line in lines)
+    return {
+        "valid": valid,
+        "discount": total_discount if valid else Decimal('0'),
+        "total": amount - total_discount if valid else amount,
+        "coupons": lines,
+    }
+
+
+def evaluate(amount, codes, cache=coupon_cache):
+    codes = normalize_codes(codes)
+    return evaluate_basket(amount, codes, cache.get_many(codes))
+
+
+def redeem_baskets(baskets, cache=coupon_cache):
+    """
+    Redeems the coupons of many baskets in one transaction: one locking read of
+    the coupons, one lookup of already redeemed references, one multi-row INSERT and
+    one counter UPDATE, however many baskets there are.
+
+    baskets: [{"amount": Decimal, "codes": [...], "reference": optional str}]
+    Returns one result per basket, in order: the evaluate_basket() result plus
+    "redeemed" (coupons were used by this call) and "duplicate" (the reference
+    had already redeemed them). A basket is all-or-nothing: if one of its coupons
+    is rejected, none is used.
+    """
+    from .models import Coupon, CouponRedemption
+
+    baskets = [dict(b, codes=normalize_codes(b.get("codes") or []), reference=b.get("reference") or None) for b in baskets]
+    codes = sorted({code for b in baskets for code in b["codes"]})
+    results = []
+
+    with transaction.atomic():
+        # Redemption decides on fresh, locked rows, never on cached definitions
+        locked = {
+            row[1]: CouponDefinition(*row)
+            for row in Coupon.objects.select_for_update().filter(code__in=codes).order_by('id').values_list(*DEFINITION_FIELDS)
+        }
+        references = {b["reference"] for b in baskets if b["reference"]}
+        redeemed = {
+            (code, reference): discount
+            for code, reference, discount in CouponRedemption.objects.filter(
+                coupon_id__in=[c.id for c in locked.values()], reference__in=references
+            ).values_list('coupon__code', 'reference', 'discount')
+        } if references else {}
+
+        now = timezone.now()
+        used = {code: coupon.times_used for code, coupon in locked.items()}
+        rows = []
+        for basket in baskets:
+            reference = basket["reference"]
+            keys = [(code, reference) for code in basket["codes"]] if reference else []
+            if keys and all(key in redeemed for key in keys):
+                results.append(_replayed(basket, keys, redeemed))
+                continue
+            current = {code: locked[code]._replace(times_used=used[code]) for code in basket["codes"] if code in locked}
+            result = evaluate_basket(basket["amount"], basket["codes"], current, now)
+            for line in result["coupons"]:
+                if (line["code"], reference) in redeemed:
+                    line.update(valid=False, discount=Decimal('0'), message="Coupon already redeemed for this reference")
+                    result.update(valid=False, discount=Decimal('0'), total=basket["amount"])
+            result.update(redeemed=result["valid"], duplicate=False)
+            if result["valid"]:
+                for line in result["coupons"]:
+                    used[line["code"]] += 1
+                    if reference:
+                        redeemed[(line["code"], reference)] = line["discount"]
+                    rows.append((locked[line["code"]].id, reference, basket["amount"], line["discount"]))
+            results.append(result)
+
+        if rows:
+            _insert_redemptions(rows)
+            changed = {code: count for code, count in used.items() if count != locked[code].times_used}
+            _set_times_used({locked[code].id: count for code, count in changed.items()})
+            transaction.on_commit(lambda: [cache.note_usage(code, count) for code, count in changed.items()])
+    return results
+
+
+def _replayed(basket, keys, redeemed):
+    discount = sum((redeemed[key] for key in keys), Decimal('0'))
+    return {
+        "valid": True,
+        "discount": discount,
+        "total": basket["amount"] - discount,
+        "coupons": [
+            {"code": code, "valid": True, "discount": redeemed[(code, reference)], "message": "Coupon already redeemed"}
+            for code, reference in keys
+        ],
+        "redeemed": False,
+        "duplicate": True,
+    }
+
+
+def _insert_redemptions(rows):
+    """rows: [(coupon_id, reference, amount, discount)]"""
+    from .models import CouponRedemption
+
+    table = connection.ops.quote_name(CouponRedemption._meta.db_table)
+    now = timezone.now()
+    values = ", ".join(["(%s, %s, %s, %s, %s)"] * len(rows))
+    params = [p for row in rows for p in (*row, now)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (coupon_id, reference, amount, discount, created_at) VALUES {values}",
+            params
+        )
+
+
+def _set_times_used(counts):
+    """One UPDATE for every coupon; the rows are locked, so absolute values are safe."""
+    from .models import Coupon
+
+    table = connection.ops.quote_name(Coupon._meta.db_table)
+    values = ", ".join(["(%s::uuid, %s::integer)"] * len(counts))
+    params = [p for coupon_id, count in counts.items() for p in (coupon_id, count)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} AS c SET times_used = v.times_used, updated_at = %s "
+            f"FROM (VALUES {values}) AS v (id, times_used) WHERE c.id = v.id",
+            [timezone.now()] + params
+        )
@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from apps.coupons.engine import redeem_baskets
+from apps.coupons.models import Coupon, CouponRedemption
+
+class Command(BaseCommand):
+    help = 'Hammers one flash-sale coupon from many threads and checks it is never over-redeemed (uses the database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=20000, help='Redemptions attempted in total')
+        parser.add_argument('--usage-limit', type=int, default=15000)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--batch-size', type=int, default=100, help='Baskets per redeem call')
+        parser.add_argument('--engine', action='store_true',
+                            help='Call the engine directly instead of POST /api/promotion/coupons/redeem/')
+
+    def handle(self, *args, **options):
+        attempts, threads, batch_size = options['attempts'], options['threads'], options['batch_size']
+        coupon = Coupon.objects.create(
+            code=f"LOAD-{uuid.uuid4().hex[:10].upper()}", discount_type='percent', value=Decimal('10'),
+            usage_limit=options['usage_limit']
+        )
+        redeem = self.redeem_engine if options['engine'] else self.redeem_api
+        redeemed, errors = [0] * threads, []
+
+        def worker(index):
+            client = Client()
+            try:
+                # Each thread posts its own slice; every basket has a unique reference
+                for start in range(index * batch_size, attempts, threads * batch_size):
+                    baskets = [
+                        {"reference": f"{coupon.code}-{n}", "amount": "50.00", "codes": [coupon.code]}
+                        for n in range(start, min(start + batch_size, attempts))
+                    ]
+                    redeemed[index] += redeem(client, baskets)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        started = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - started
+
+        coupon.refresh_from_db()
+        rows = CouponRedemption.objects.filter(coupon=coupon).count()
+        expected = min(attempts, coupon.usage_limit)
+        self.stdout.write(f"Mode:                {'engine' if options['engine'] else 'api'} ({threads} threads, {batch_size} baskets per call)")
+        self.stdout.write(f"Attempts:            {attempts} against a limit of {coupon.usage_limit}")
+        self.stdout.write(f"Redeemed:            {sum(redeemed)} (times_used {coupon.times_used}, {rows} redemption rows)")
+        self.stdout.write(f"Elapsed:             {elapsed:.3f}s ({attempts / elapsed:.0f} attempts/s, {sum(redeemed) / elapsed:.0f} redemptions/s)")
+        coupon.delete()
+
+        if errors:
+            raise CommandError(f"{len(errors)} worker(s) failed: {errors[0]}")
+        if not sum(redeemed) == coupon.times_used == rows == expected:
+            raise CommandError(f"Expected exactly {expected} redemptions")
+        self.stdout.write(self.style.SUCCESS("No over-redemption"))
+
+    def redeem_engine(self, client, baskets):
+        for basket in baskets:
+            basket["amount"] = Decimal(basket["amount"])
+        return sum(1 for result in redeem_baskets(baskets) if result["redeemed"])
+
+    def redeem_api(self, client, baskets):
+        response = client.post(
+            '/api/promotion/coupons/redeem/', data=json.dumps({"baskets": baskets}), content_type='application/json'
+        )
+        if response.status_code != 200:
+            raise CommandError(f"redeem answered {response.status_code}: {response.content[:200]}")
+        return response.json()["redeemed"]
@@ -37,3 +37,24 @@ class Coupon(models.Model):
 
     def __str__(self):
         return f"{self.code} ({self.get_discount_type_display()}: {self.value})"
+
+
+class CouponRedemption(models.Model):
+    """One use of a coupon. A reference (order / checkout id) can redeem a coupon only once."""
+    coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE, related_name='redemptions')
+    reference = models.CharField(max_length=100, blank=True, null=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    discount = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['coupon', 'reference'],
+                condition=models.Q(reference__isnull=False),
+                name='uniq_coupon_redemption_reference'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.coupon_id} / {self.reference or '-'}"
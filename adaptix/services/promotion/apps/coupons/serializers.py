@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Coupon
 
@@ -10,3 +11,17 @@ class CouponSerializer(serializers.ModelSerializer):
 class ValidateCouponSerializer(serializers.Serializer):
     code = serializers.CharField()
     amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+class BasketSerializer(serializers.Serializer):
+    reference = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0)
+    codes = serializers.ListField(child=serializers.CharField(max_length=50), allow_empty=False)
+
+class RedeemSerializer(serializers.Serializer):
+    baskets = BasketSerializer(many=True, allow_empty=False)
+
+    def validate_baskets(self, value):
+        limit = settings.COUPON_REDEEM_MAX_BASKETS
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} baskets per request")
+        return value
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .engine import coupon_cache
+from .models import Coupon
+
+
+@receiver(post_save, sender=Coupon)
+@receiver(post_delete, sender=Coupon)
+def drop_cached_coupon(sender, instance, **kwargs):
+    """Edits made through this process apply to the next basket"""
+    coupon_cache.invalidate(instance.code, instance.id)
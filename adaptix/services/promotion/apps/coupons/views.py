@@ -1,10 +1,10 @@
-from decimal import Decimal
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema
 from .models import Coupon
-from .serializers import CouponSerializer, ValidateCouponSerializer
+from .engine import check_coupon, coupon_cache, discount_for, evaluate as evaluate_coupons, redeem_baskets
+from .serializers import BasketSerializer, CouponSerializer, RedeemSerializer, ValidateCouponSerializer
 
 class CouponViewSet(viewsets.ModelViewSet):
     queryset = Coupon.objects.all()
@@ -19,32 +19,52 @@ class CouponViewSet(viewsets.ModelViewSet):
             code = serializer.validated_data['code']
             amount = serializer.validated_data['amount']
             
-            try:
-                coupon = Coupon.objects.get(code=code)
-                if coupon.is_valid() and amount >= coupon.min_purchase_amount:
-                    discount = 0
-                    if coupon.discount_type == 'percent':
-                         discount = (amount * coupon.value) / 100
-                    else:
-                         discount = coupon.value
-                    
-                    return Response({
-                        "valid": True,
-                        "discount": discount,
-                        "message": "Coupon applied successfully"
-                    })
-                else:
-                    return Response({
-                        "valid": False,
-                        "discount": 0,
-                        "message": "Coupon is invalid or minimum purchase not met"
-                    }, status=status.HTTP_400_BAD_REQUEST)
-
-            except Coupon.DoesNotExist:
+            coupon = coupon_cache.get(code)
+            if coupon is None:
                 return Response({
                     "valid": False,
                     "discount": 0,
                     "message": "Coupon not found"
                 }, status=status.HTTP_404_NOT_FOUND)
-        
+
+            if check_coupon(coupon, amount) is None:
+                return Response({
+                    "valid": True,
+                    "discount": discount_for(coupon, amount),
+                    "message": "Coupon applied successfully"
+                })
+            return Response({
+                "valid": False,
+                "discount": 0,
+                "message": "Coupon is invalid or minimum purchase not met"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @extend_schema(request=BasketSerializer)
+    @action(detail=False, methods=['post'])
+    def evaluate(self, request):
+        """Prices every coupon of a basket from cached definitions, without using any."""
+        serializer = BasketSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        return Response(evaluate_coupons(data['amount'], data['codes']))
+
+    @extend_schema(request=RedeemSerializer)
+    @action(detail=False, methods=['post'])
+    def redeem(self, request):
+        """
+        Atomically uses the coupons of one basket, or of {"baskets": [...]} in one
+        transaction. A single rejected basket answers 409.
+        """
+        single = 'baskets' not in request.data
+        serializer = RedeemSerializer(data={'baskets': [request.data]} if single else request.data)
+        serializer.is_valid(raise_exception=True)
+        results = redeem_baskets(serializer.validated_data['baskets'])
+        if single:
+            result = results[0]
+            return Response(result, status=status.HTTP_200_OK if result['valid'] else status.HTTP_409_CONFLICT)
+        return Response({
+            "redeemed": sum(1 for r in results if r['redeemed']),
+            "results": results,
+        })
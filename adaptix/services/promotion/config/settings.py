@@ -96,6 +96,10 @@ SPECTACULAR_SETTINGS = {
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Promotion engine
+COUPON_CACHE_SECONDS = int(os.environ.get("COUPON_CACHE_SECONDS", 30))
+COUPON_REDEEM_MAX_BASKETS = int(os.environ.get("COUPON_REDEEM_MAX_BASKETS", 500))
+
 # Tracing
 try:
     from config.tracing import setup_tracing
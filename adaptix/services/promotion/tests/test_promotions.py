@@ -52,3 +52,123 @@ class TestCouponLogic:
         # But failing that, we stick to model logic for now to ensure migration of "verification" 
         # which was mostly model/db check.
         pass
+
+
+@pytest.fixture(autouse=True)
+def fresh_coupon_cache():
+    from apps.coupons.engine import coupon_cache
+    coupon_cache.clear()
+    yield
+    coupon_cache.clear()
+
+
+def basket(reference, amount, *codes):
+    return {"reference": reference, "amount": Decimal(amount), "codes": list(codes)}
+
+
+@pytest.mark.django_db
+class TestPromotionEngine:
+    def test_evaluate_all_coupons_of_a_basket(self):
+        from apps.coupons.engine import evaluate
+        Coupon.objects.create(code="TEN", discount_type="percent", value=10)
+        Coupon.objects.create(code="FIVE", discount_type="fixed", value=5, min_purchase_amount=20)
+
+        result = evaluate(Decimal("50.00"), ["TEN", "FIVE"])
+        assert result["valid"] is True
+        assert result["discount"] == Decimal("10.00")
+        assert result["total"] == Decimal("40.00")
+
+        result = evaluate(Decimal("10.00"), ["TEN", "FIVE", "NOPE"])
+        assert result["valid"] is False
+        assert [line["valid"] for line in result["coupons"]] == [True, False, False]
+        assert result["coupons"][2]["message"] == "Coupon not found"
+
+    def test_cache_is_invalidated_on_save(self):
+        from apps.coupons.engine import coupon_cache
+        coupon = Coupon.objects.create(code="FLASH", discount_type="fixed", value=5)
+        assert coupon_cache.get("FLASH").active is True
+
+        coupon.active = False
+        coupon.save()
+        assert coupon_cache.get("FLASH").active is False
+
+        coupon.code = "FLASH2"
+        coupon.save()
+        assert coupon_cache.get("FLASH") is None
+
+    def test_redeem_stops_at_usage_limit(self):
+        from apps.coupons.engine import redeem_baskets
+        coupon = Coupon.objects.create(code="LIMIT3", discount_type="fixed", value=5, usage_limit=3)
+
+        results = redeem_baskets([basket(f"ORD-{i}", "30", "LIMIT3") for i in range(5)])
+        assert [r["redeemed"] for r in results] == [True, True, True, False, False]
+        assert results[3]["coupons"][0]["message"] == "Coupon usage limit reached"
+
+        coupon.refresh_from_db()
+        assert coupon.times_used == 3
+        assert coupon.redemptions.count() == 3
+
+    def test_replayed_reference_is_not_counted_twice(self):
+        from apps.coupons.engine import redeem_baskets
+        coupon = Coupon.objects.create(code="ONCE", discount_type="percent", value=10)
+
+        first = redeem_baskets([basket("ORD-1", "80", "ONCE")])[0]
+        again = redeem_baskets([basket("ORD-1", "80", "ONCE"), basket("ORD-1", "80", "ONCE")])
+        assert first["redeemed"] is True
+        assert [(r["redeemed"], r["duplicate"], r["discount"]) for r in again] == [(False, True, Decimal("8.00"))] * 2
+
+        coupon.refresh_from_db()
+        assert coupon.times_used == 1
+
+    def test_basket_is_all_or_nothing(self):
+        from apps.coupons.engine import redeem_baskets
+        Coupon.objects.create(code="OPEN", discount_type="fixed", value=5)
+        Coupon.objects.create(code="USED", discount_type="fixed", value=5, usage_limit=1, times_used=1)
+
+        result = redeem_baskets([basket("ORD-9", "50", "OPEN", "USED")])[0]
+        assert result["redeemed"] is False
+        assert Coupon.objects.get(code="OPEN").times_used == 0
+
+    def test_redeem_api(self, api_client):
+        Coupon.objects.create(code="API1", discount_type="fixed", value=5, usage_limit=1)
+        url = "/api/promotion/coupons/redeem/"
+
+        response = api_client.post(url, {"reference": "A", "amount": "20.00", "codes": ["API1"]}, format="json")
+        assert response.status_code == 200
+        assert response.data["discount"] == Decimal("5.00")
+
+        response = api_client.post(url, {"reference": "B", "amount": "20.00", "codes": ["API1"]}, format="json")
+        assert response.status_code == 409
+
+        response = api_client.post(url, {"baskets": [
+            {"reference": "A", "amount": "20.00", "codes": ["API1"]},
+            {"reference": "C", "amount": "20.00", "codes": ["API1"]},
+        ]}, format="json")
+        assert response.status_code == 200
+        assert response.data["redeemed"] == 0
+        assert [r["duplicate"] for r in response.data["results"]] == [True, False]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_redemptions_never_exceed_limit():
+    import threading
+    from django.db import connection
+    from apps.coupons.engine import redeem_baskets
+    coupon = Coupon.objects.create(code="RUSH", discount_type="percent", value=10, usage_limit=30)
+
+    def worker(offset):
+        try:
+            for i in range(offset, offset + 20, 5):
+                redeem_baskets([basket(f"R-{n}", "40", "RUSH") for n in range(i, i + 5)])
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(k * 20,)) for k in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    coupon.refresh_from_db()
+    assert coupon.times_used == 30
+    assert coupon.redemptions.count() == 30
@@ -43,7 +43,13 @@ class Command(BaseCommand):
                 message.ack()
                 return
 
-            # 2. Handle Saga Updates
+            # 2. Handle Goods Receipt Results (one message per receipt)
+            if routing_key == "stock.receipt.processed":
+                self.handle_receipt_processed(data)
+                message.ack()
+                return
+
+            # 3. Handle Saga Updates
             if routing_key in ["stock.update.success", "stock.update.failed"]:
                 self.handle_saga_update(data, routing_key)
                 message.ack()
@@ -76,6 +82,17 @@ class Command(BaseCommand):
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Failed to save AI suggestion: {e}"))
 
+    def handle_receipt_processed(self, data):
+        from apps.procurement.services import GoodsReceiptService
+        try:
+            receipt = GoodsReceiptService.apply_results(data)
+            if receipt is None:
+                self.stdout.write(self.style.ERROR(f"Goods receipt {data.get('receipt_id')} not found"))
+                return
+            self.stdout.write(self.style.SUCCESS(f"Goods receipt {receipt.id} -> {receipt.status.upper()}"))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Failed to apply goods receipt results: {e}"))
+
     def handle_saga_update(self, data, routing_key):
         order_reference = data.get("order_reference")
         if not order_reference:
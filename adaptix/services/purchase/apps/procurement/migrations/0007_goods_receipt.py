@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('procurement', '0006_aiprocurementsuggestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoodsReceipt',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company_uuid', models.UUIDField(db_index=True)),
+                ('warehouse_id', models.UUIDField()),
+                ('status', models.CharField(choices=[('pending', 'Pending (Inventory)'), ('completed', 'Completed'), ('partial', 'Partially Applied'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('created_by', models.CharField(blank=True, max_length=100, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipts', to='procurement.purchaseorder')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='GoodsReceiptLine',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company_uuid', models.UUIDField(db_index=True)),
+                ('product_uuid', models.UUIDField()),
+                ('variant_uuid', models.UUIDField(blank=True, null=True)),
+                ('quantity', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('unit_cost', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('applied', 'Applied'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('balance_after', models.DecimalField(blank=True, decimal_places=3, max_digits=20, null=True)),
+                ('order_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipt_lines', to='procurement.purchaseorderitem')),
+                ('receipt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='procurement.goodsreceipt')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -98,6 +98,52 @@ class PurchaseOrderItem(SoftDeleteModel):
 
     def __str__(self):
         return f"{self.product_uuid} x {self.quantity}"
+
+class GoodsReceipt(SoftDeleteModel):
+    """
+    One goods receipt of a PO. All of its lines go to inventory in a single
+    purchase.receipt.requested message keyed by the receipt id; inventory reports
+    the outcome of every line back with stock.receipt.processed.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending (Inventory)'),
+        ('completed', 'Completed'),
+        ('partial', 'Partially Applied'),
+        ('failed', 'Failed'),
+    )
+
+    order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='receipts')
+    warehouse_id = models.UUIDField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    created_by = models.CharField(max_length=100, blank=True, null=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Receipt {self.id} for {self.order.reference_number} ({self.status})"
+
+class GoodsReceiptLine(SoftDeleteModel):
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('applied', 'Applied'),
+        ('failed', 'Failed'),
+    )
+
+    receipt = models.ForeignKey(GoodsReceipt, on_delete=models.CASCADE, related_name='lines')
+    order_item = models.ForeignKey(PurchaseOrderItem, on_delete=models.CASCADE, related_name='receipt_lines')
+    product_uuid = models.UUIDField()
+    variant_uuid = models.UUIDField(blank=True, null=True)
+    quantity = models.DecimalField(max_digits=12, decimal_places=4)
+    unit_cost = models.DecimalField(max_digits=12, decimal_places=2)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True, null=True)
+    balance_after = models.DecimalField(max_digits=20, decimal_places=3, null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.product_uuid} x {self.quantity} ({self.status})"
+
 class AIProcurementSuggestion(SoftDeleteModel):
     STATUS_CHOICES = (
         ('pending', 'Pending Approval'),
@@ -1,5 +1,8 @@
 from rest_framework import serializers
-from .models import PurchaseOrder, PurchaseOrderItem, RFQ, VendorQuote, AIProcurementSuggestion
+from .models import (
+    PurchaseOrder, PurchaseOrderItem, RFQ, VendorQuote, AIProcurementSuggestion,
+    GoodsReceipt, GoodsReceiptLine
+)
 
 class AIProcurementSuggestionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -89,3 +92,16 @@ class RFQSerializer(serializers.ModelSerializer):
         model = RFQ
         fields = '__all__'
         read_only_fields = ('company_uuid', 'status', 'selected_quote')
+
+class GoodsReceiptLineSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GoodsReceiptLine
+        fields = ('id', 'order_item', 'product_uuid', 'variant_uuid', 'quantity', 'unit_cost', 'status', 'error', 'balance_after')
+
+class GoodsReceiptSerializer(serializers.ModelSerializer):
+    lines = GoodsReceiptLineSerializer(many=True, read_only=True)
+    reference = serializers.CharField(source='order.reference_number', read_only=True)
+
+    class Meta:
+        model = GoodsReceipt
+        fields = ('id', 'order', 'reference', 'warehouse_id', 'status', 'created_by', 'created_at', 'completed_at', 'lines')
@@ -1,40 +1,199 @@
-import requests
 from django.conf import settings
 
+class ReceiptConflict(ValueError):
+    """The receipt cannot be retried in the order's current state."""
+
 class InventoryService:
     @staticmethod
-    def increase_stock(order_item, company_uuid, warehouse_id, token):
+    def request_receipt(receipt, lines=None):
         """
-        Call Inventory Service Synchronously to adjust stock.
+        Send a goods receipt to Inventory as one purchase.receipt.requested
+        message covering all of its lines. Inventory applies each line id at
+        most once, so the message can be resent safely; the outcome comes back
+        per line with stock.receipt.processed.
         """
-        import requests
-        
-        from adaptix_core.service_registry import ServiceRegistry
-        # Internal URL for Inventory Service (Docker Service Name)
-        url = f"{ServiceRegistry.get_api_url('inventory')}/stocks/adjust/"
-        
-        payload = {
-            "warehouse_id": warehouse_id,
-            "product_uuid": str(order_item.product_uuid),
-            "quantity": float(order_item.quantity),
-            "type": "add",
-            "notes": f"PO #{order_item.order.reference_number}"
-        }
-        
-        headers = {
-            "Authorization": token, # Pass through the JWT
-            "Content-Type": "application/json"
-        }
-        
+        from adaptix_core.messaging import publish_event
+
+        order = receipt.order
+        lines = receipt.lines.all() if lines is None else lines
+        publish_event("events", "purchase.receipt.requested", {
+            "event": "purchase.receipt.requested",
+            "receipt_id": str(receipt.id),
+            "order_id": str(order.id),
+            "reference": order.reference_number,
+            "company_uuid": str(order.company_uuid),
+            "warehouse_id": str(receipt.warehouse_id),
+            "lines": [
+                {
+                    "line_id": str(line.id),
+                    "product_uuid": str(line.product_uuid),
+                    "variant_uuid": str(line.variant_uuid) if line.variant_uuid else None,
+                    "quantity": str(line.quantity),
+                    "unit_cost": str(line.unit_cost)
+                } for line in lines
+            ]
+        })
+
+class GoodsReceiptService:
+    @staticmethod
+    def start_receipt(order, warehouse_id, created_by=None):
+        """
+        Create the receipt of an 'ordered' PO and queue it for Inventory once
+        the transaction commits. Returns (receipt, created): while a receipt
+        is pending, receiving the order again returns that receipt.
+        Raises ValueError if the order cannot be received.
+        """
+        from .models import PurchaseOrder, GoodsReceipt, GoodsReceiptLine
+        from django.db import transaction
+
+        with transaction.atomic():
+            order = PurchaseOrder.objects.select_for_update().get(pk=order.pk)
+            pending = order.receipts.filter(status='pending').first()
+            if pending:
+                return pending, False
+            if order.status == 'received':
+                raise ValueError("Order already received")
+            if order.status != 'ordered':
+                raise ValueError("Order must be in 'ordered' state to receive")
+            items = list(order.items.all())
+            if not items:
+                raise ValueError("Order has no items to receive")
+
+            receipt = GoodsReceipt.objects.create(
+                company_uuid=order.company_uuid,
+                order=order,
+                warehouse_id=warehouse_id,
+                created_by=created_by
+            )
+            lines = GoodsReceiptLine.objects.bulk_create([
+                GoodsReceiptLine(
+                    company_uuid=order.company_uuid,
+                    receipt=receipt,
+                    order_item=item,
+                    product_uuid=item.product_uuid,
+                    variant_uuid=item.variant_uuid,
+                    quantity=item.quantity,
+                    unit_cost=item.unit_cost
+                ) for item in items
+            ])
+            order.status = 'processing'
+            order.save(update_fields=['status', 'updated_at'])
+            transaction.on_commit(lambda: InventoryService.request_receipt(receipt, lines))
+        return receipt, True
+
+    @staticmethod
+    def retry_receipt(receipt):
+        """
+        Resend the lines of a receipt that failed or were never answered.
+        Raises ReceiptConflict unless the order is still waiting for this
+        receipt: it must be 'ordered' or 'processing' with no other receipt
+        pending, partially applied or completed.
+        """
+        from .models import PurchaseOrder, GoodsReceipt
+        from django.db import transaction
+
+        with transaction.atomic():
+            order = PurchaseOrder.objects.select_for_update().get(pk=receipt.order_id)
+            receipt = GoodsReceipt.objects.select_for_update().select_related('order').get(pk=receipt.pk)
+            if receipt.status == 'completed':
+                raise ReceiptConflict("Receipt already completed")
+            if order.status not in ('ordered', 'processing'):
+                raise ReceiptConflict(f"Order is {order.status}; the receipt can no longer be retried")
+            if order.receipts.exclude(pk=receipt.pk).filter(status__in=('pending', 'partial', 'completed')).exists():
+                raise ReceiptConflict("Order has another receipt in progress or completed")
+            lines = list(receipt.lines.exclude(status='applied'))
+            for line in lines:
+                line.status, line.error = 'pending', None
+            receipt.lines.filter(id__in=[line.id for line in lines]).update(status='pending', error=None)
+            receipt.status = 'pending'
+            receipt.save(update_fields=['status', 'updated_at'])
+            receipt.order.status = 'processing'
+            receipt.order.save(update_fields=['status', 'updated_at'])
+            transaction.on_commit(lambda: InventoryService.request_receipt(receipt, lines))
+        return receipt
+
+    @staticmethod
+    def apply_results(data):
+        """
+        Record Inventory's per-line outcome (stock.receipt.processed). Once no
+        line is pending the receipt is settled: completed receipts mark the order
+        received and publish purchase.order.received for Accounting; a receipt
+        where nothing was applied puts the order back to 'ordered'.
+        Returns the receipt, or None if it is unknown.
+        """
+        from .models import GoodsReceipt, GoodsReceiptLine
+        from django.db import transaction
+        from django.utils import timezone
+
+        results = {str(r.get('line_id')): r for r in data.get('lines') or [] if isinstance(r, dict)}
+        with transaction.atomic():
+            receipt = GoodsReceipt.objects.select_for_update().select_related('order', 'order__vendor').filter(
+                id=data.get('receipt_id')
+            ).first()
+            if receipt is None or receipt.status == 'completed':
+                return receipt
+
+            now = timezone.now()
+            lines = list(receipt.lines.all())
+            changed = []
+            for line in lines:
+                result = results.get(str(line.id))
+                if result is None or line.status == 'applied':
+                    continue
+                if result.get('status') in ('applied', 'duplicate'):
+                    line.status, line.error = 'applied', None
+                    line.balance_after = result.get('balance_after')
+                else:
+                    line.status = 'failed'
+                    line.error = result.get('error') or "Rejected by inventory"
+                line.updated_at = now
+                changed.append(line)
+            if changed:
+                GoodsReceiptLine.objects.bulk_update(changed, ['status', 'error', 'balance_after', 'updated_at'])
+
+            statuses = {line.status for line in lines}
+            if 'pending' in statuses:
+                return receipt
+            order = receipt.order
+            if statuses == {'applied'}:
+                receipt.status, receipt.completed_at = 'completed', now
+                order.status = 'received'
+                transaction.on_commit(lambda: GoodsReceiptService.publish_received(receipt, lines))
+            elif 'applied' in statuses:
+                receipt.status = 'partial'
+            else:
+                receipt.status = 'failed'
+                order.status = 'ordered'
+            receipt.save(update_fields=['status', 'completed_at', 'updated_at'])
+            order.save(update_fields=['status', 'updated_at'])
+        return receipt
+
+    @staticmethod
+    def publish_received(receipt, lines):
+        """The purchase.order.received event for Accounting, sent once per completed receipt."""
+        from adaptix_core.messaging import publish_event
+
+        order = receipt.order
         try:
-            response = requests.post(url, json=payload, headers=headers)
-            if response.status_code >= 400:
-                print(f"Inventory Error: {response.text}")
-                return False
-            return True
+            publish_event("events", "purchase.order.received", {
+                "event": "purchase.order.received",
+                "order_id": str(order.id),
+                "receipt_id": str(receipt.id),
+                "reference": order.reference_number,
+                "company_uuid": str(order.company_uuid),
+                "wing_uuid": str(order.branch_id) if order.branch_id else None,
+                "vendor_uuid": str(order.vendor_id),
+                "total_amount": str(order.total_amount),
+                "items": [
+                    {
+                        "product_uuid": str(line.product_uuid),
+                        "quantity": str(line.quantity),
+                        "unit_cost": str(line.unit_cost)
+                    } for line in lines
+                ]
+            })
         except Exception as e:
-            print(f"Failed to call inventory service: {e}")
-            return False
+            print(f"Failed to publish purchase receipt event: {e}")
 
 class RFQService:
     @staticmethod
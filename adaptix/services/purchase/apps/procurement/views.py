@@ -1,14 +1,15 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import PurchaseOrder, RFQ, VendorQuote, AIProcurementSuggestion
+from .models import PurchaseOrder, RFQ, VendorQuote, AIProcurementSuggestion, GoodsReceipt
 from .serializers import (
     PurchaseOrderSerializer, RFQSerializer, VendorQuoteSerializer,
-    AIProcurementSuggestionSerializer
+    AIProcurementSuggestionSerializer, GoodsReceiptSerializer
 )
 from adaptix_core.permissions import HasPermission
 from adaptix_core.messaging import publish_event
 import json
+import uuid as uuid_lib
 
 class PurchaseOrderViewSet(viewsets.ModelViewSet):
     queryset = PurchaseOrder.objects.all()
@@ -50,61 +51,32 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'], url_path='receive')
     def receive_order(self, request, pk=None):
+        """
+        Queue the goods receipt of the whole order for Inventory and return at
+        once. Stock is updated asynchronously; follow it on receipts/<receipt_id>/.
+        """
         order = self.get_object()
-        if order.status == 'received':
-            return Response({"detail": "Order already received"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        order.status = 'received'
-        order.save()
-        
-        if order.status != 'ordered': 
-             return Response({"detail": "Order must be in 'ordered' state to receive"}, status=status.HTTP_400_BAD_REQUEST)
-        
         warehouse_id = request.data.get('warehouse_id')
         if not warehouse_id:
              return Response({"detail": "Warehouse ID is required to receive stock"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            uuid_lib.UUID(str(warehouse_id))
+        except ValueError:
+             return Response({"detail": "Invalid warehouse ID"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Trigger Inventory Update (Sync)
-        # We process all items. If one fails, we should technically rollback, but for V1 we log errors.
-        from .services import InventoryService
-        
-        errors = []
-        token = request.headers.get('Authorization')
-        
-        for item in order.items.all():
-            success = InventoryService.increase_stock(item, order.company_uuid, warehouse_id, token)
-            if not success:
-                errors.append(f"Failed to update stock for {item.product_uuid}")
-        
-        if errors:
-             return Response({"detail": "Partial failure", "errors": errors}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        order.status = 'received'
-        order.save()
-        
-        # Publish Event for Accounting
+        from .services import GoodsReceiptService
+        created_by = getattr(request, 'user_claims', {}).get('user_id')
         try:
-            event_payload = {
-                "event": "purchase.order.received",
-                "order_id": str(order.id),
-                "reference": order.reference_number,
-                "company_uuid": str(order.company_uuid),
-                "wing_uuid": str(order.branch_id) if order.branch_id else None,
-                "vendor_uuid": str(order.vendor.id),
-                "total_amount": str(order.total_amount),
-                "items": [
-                    {
-                        "product_uuid": str(item.product_uuid),
-                        "quantity": str(item.quantity),
-                        "unit_cost": str(item.unit_cost)
-                    } for item in order.items.all()
-                ]
-            }
-            publish_event("events", "purchase.order.received", event_payload)
-        except Exception as e:
-            print(f"Failed to publish purchase receipt event: {e}")
-        
-        return Response({"status": "received", "id": order.id, "detail": "Stock updated successfully"})
+            receipt, created = GoodsReceiptService.start_receipt(order, warehouse_id, created_by)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "status": receipt.status,
+            "id": order.id,
+            "receipt_id": receipt.id,
+            "detail": "Goods receipt queued for inventory" if created else "Goods receipt already in progress"
+        }, status=status.HTTP_202_ACCEPTED)
 
     @action(detail=True, methods=['post'], url_path='approve')
     def approve_order(self, request, pk=None):
@@ -196,6 +168,32 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
             "payment_status": order.payment_status
         })
 
+class GoodsReceiptViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = GoodsReceipt.objects.select_related('order').prefetch_related('lines')
+    serializer_class = GoodsReceiptSerializer
+    permission_classes = [HasPermission]
+    required_permission = "purchase.order"
+
+    def get_queryset(self):
+        uuid = getattr(self.request, "company_uuid", None)
+        if uuid:
+            qs = self.queryset.filter(company_uuid=uuid)
+            order = self.request.query_params.get('order')
+            return qs.filter(order_id=order) if order else qs
+        return self.queryset.none()
+
+    @action(detail=True, methods=['post'], url_path='retry')
+    def retry(self, request, pk=None):
+        """Resend the lines Inventory rejected or never answered."""
+        from .services import GoodsReceiptService, ReceiptConflict
+        try:
+            receipt = GoodsReceiptService.retry_receipt(self.get_object())
+        except ReceiptConflict as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"status": receipt.status, "receipt_id": receipt.id}, status=status.HTTP_202_ACCEPTED)
+
 class RFQViewSet(viewsets.ModelViewSet):
     queryset = RFQ.objects.all()
     serializer_class = RFQSerializer
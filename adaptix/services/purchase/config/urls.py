@@ -5,7 +5,7 @@ from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from apps.vendors.views import VendorViewSet
 from apps.procurement.views import (
     PurchaseOrderViewSet, RFQViewSet, VendorQuoteViewSet, 
-    AIProcurementSuggestionViewSet
+    AIProcurementSuggestionViewSet, GoodsReceiptViewSet
 )
 
 router = DefaultRouter()
@@ -14,6 +14,7 @@ router.register(r'orders', PurchaseOrderViewSet, basename='order')
 router.register(r'rfqs', RFQViewSet, basename='rfq')
 router.register(r'quotes', VendorQuoteViewSet, basename='quote')
 router.register(r'ai-suggestions', AIProcurementSuggestionViewSet, basename='ai-suggestion')
+router.register(r'receipts', GoodsReceiptViewSet, basename='receipt')
 from django.http import JsonResponse
 from django_prometheus.exports import ExportToDjangoView
 
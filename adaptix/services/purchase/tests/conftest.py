@@ -10,7 +10,7 @@ def api_client():
 def mock_permissions(mocker):
     try:
         mocker.patch('rest_framework.permissions.IsAuthenticated.has_permission', return_value=True)
-        mocker.patch('apps.utils.permissions.HasPermission.has_permission', return_value=True)
+        mocker.patch('adaptix_core.permissions.HasPermission.has_permission', return_value=True)
         # Mock Notification Service
         mocker.patch('apps.utils.notifications.NotificationService.send_notification')
     except ImportError:
@@ -0,0 +1,149 @@
+import pytest
+import uuid
+from decimal import Decimal
+from rest_framework.test import APIRequestFactory
+from apps.vendors.models import Vendor
+from apps.procurement.models import PurchaseOrder, PurchaseOrderItem, GoodsReceipt
+from apps.procurement.services import GoodsReceiptService
+from apps.procurement.views import PurchaseOrderViewSet, GoodsReceiptViewSet
+
+
+@pytest.fixture
+def publish(mocker):
+    return mocker.patch('adaptix_core.messaging.publish_event')
+
+
+@pytest.fixture
+def order(company_uuid):
+    vendor = Vendor.objects.create(company_uuid=company_uuid, name="Receipt Vendor", email="receipt@example.com")
+    order = PurchaseOrder.objects.create(
+        company_uuid=company_uuid, vendor=vendor, reference_number="PO-GRN-1",
+        status="ordered", total_amount=Decimal("350.00")
+    )
+    for quantity in (10, 20, 30):
+        PurchaseOrderItem.objects.create(
+            company_uuid=company_uuid, order=order, product_uuid=uuid.uuid4(),
+            quantity=quantity, unit_cost=Decimal("5.00")
+        )
+    return order
+
+
+def call(view, action, pk, company_uuid, data=None):
+    request = APIRequestFactory().post("/", data or {}, format="json")
+    request.company_uuid = company_uuid
+    request.user_claims = {"user_id": "tester"}
+    return view.as_view({"post": action})(request, pk=pk)
+
+
+def results_for(receipt, status_of):
+    return {
+        "receipt_id": str(receipt.id),
+        "lines": [
+            {"line_id": str(line.id), "status": status_of(line), "balance_after": str(line.quantity), "error": None}
+            for line in receipt.lines.all()
+        ]
+    }
+
+
+@pytest.mark.django_db
+class TestGoodsReceipt:
+    def test_receive_queues_one_message_for_all_lines(self, order, company_uuid, publish, django_capture_on_commit_callbacks):
+        warehouse_id = str(uuid.uuid4())
+        with django_capture_on_commit_callbacks(execute=True):
+            response = call(PurchaseOrderViewSet, "receive_order", order.id, company_uuid, {"warehouse_id": warehouse_id})
+
+        assert response.status_code == 202
+        receipt = GoodsReceipt.objects.get(id=response.data["receipt_id"])
+        assert receipt.status == "pending"
+        assert receipt.lines.count() == 3
+        order.refresh_from_db()
+        assert order.status == "processing"
+
+        publish.assert_called_once()
+        _, routing_key, payload = publish.call_args.args
+        assert routing_key == "purchase.receipt.requested"
+        assert payload["receipt_id"] == str(receipt.id)
+        assert payload["warehouse_id"] == warehouse_id
+        assert {line["line_id"] for line in payload["lines"]} == {str(line.id) for line in receipt.lines.all()}
+
+        # Receiving again while pending hands back the same receipt
+        with django_capture_on_commit_callbacks(execute=True):
+            again = call(PurchaseOrderViewSet, "receive_order", order.id, company_uuid, {"warehouse_id": warehouse_id})
+        assert again.status_code == 202
+        assert again.data["receipt_id"] == receipt.id
+        assert publish.call_count == 1
+
+    def test_receive_requires_ordered_state(self, order, company_uuid, publish):
+        order.status = "draft"
+        order.save()
+        response = call(PurchaseOrderViewSet, "receive_order", order.id, company_uuid, {"warehouse_id": str(uuid.uuid4())})
+        assert response.status_code == 400
+        assert not GoodsReceipt.objects.exists()
+
+    def test_completed_receipt_receives_order_once(self, order, publish, django_capture_on_commit_callbacks):
+        receipt, _ = GoodsReceiptService.start_receipt(order, uuid.uuid4())
+        results = results_for(receipt, lambda line: "applied")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            GoodsReceiptService.apply_results(results)
+            GoodsReceiptService.apply_results(results)
+
+        receipt.refresh_from_db()
+        order.refresh_from_db()
+        assert receipt.status == "completed"
+        assert order.status == "received"
+        assert set(receipt.lines.values_list("status", flat=True)) == {"applied"}
+        received = [c for c in publish.call_args_list if c.args[1] == "purchase.order.received"]
+        assert len(received) == 1
+        assert received[0].args[2]["receipt_id"] == str(receipt.id)
+        assert len(received[0].args[2]["items"]) == 3
+
+    def test_partial_receipt_retries_only_failed_lines(self, order, company_uuid, publish, django_capture_on_commit_callbacks):
+        receipt, _ = GoodsReceiptService.start_receipt(order, uuid.uuid4())
+        failed = receipt.lines.order_by("quantity").first()
+        GoodsReceiptService.apply_results(results_for(receipt, lambda line: "failed" if line.id == failed.id else "applied"))
+
+        receipt.refresh_from_db()
+        order.refresh_from_db()
+        assert receipt.status == "partial"
+        assert order.status == "processing"
+
+        publish.reset_mock()
+        with django_capture_on_commit_callbacks(execute=True):
+            response = call(GoodsReceiptViewSet, "retry", receipt.id, company_uuid)
+        assert response.status_code == 202
+        payload = publish.call_args.args[2]
+        assert [line["line_id"] for line in payload["lines"]] == [str(failed.id)]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            GoodsReceiptService.apply_results(results_for(receipt, lambda line: "duplicate"))
+        receipt.refresh_from_db()
+        assert receipt.status == "completed"
+
+    def test_rejected_receipt_returns_order_to_ordered(self, order, publish):
+        receipt, _ = GoodsReceiptService.start_receipt(order, uuid.uuid4())
+        GoodsReceiptService.apply_results(results_for(receipt, lambda line: "failed"))
+
+        receipt.refresh_from_db()
+        order.refresh_from_db()
+        assert receipt.status == "failed"
+        assert order.status == "ordered"
+
+    def test_failed_receipt_cannot_be_retried_after_another_completes(self, order, company_uuid, publish, django_capture_on_commit_callbacks):
+        first, _ = GoodsReceiptService.start_receipt(order, uuid.uuid4())
+        GoodsReceiptService.apply_results(results_for(first, lambda line: "failed"))
+        second, created = GoodsReceiptService.start_receipt(order, uuid.uuid4())
+        assert created
+        with django_capture_on_commit_callbacks(execute=True):
+            GoodsReceiptService.apply_results(results_for(second, lambda line: "applied"))
+
+        publish.reset_mock()
+        with django_capture_on_commit_callbacks(execute=True):
+            response = call(GoodsReceiptViewSet, "retry", first.id, company_uuid)
+
+        assert response.status_code == 409
+        publish.assert_not_called()
+        first.refresh_from_db()
+        order.refresh_from_db()
+        assert first.status == "failed"
+        assert order.status == "received"
@@ -0,0 +1,118 @@
+"""
+Load generation for the ingestion paths (asset telemetry, inventory IoT).
+
+    report = run_load(send, make_batch, rate=10000, batch_size=500, duration=30, concurrency=8)
+    print(report)
+
+make_batch(n) builds n readings and send(batch) writes them (HTTP, COPY,
+bulk insert...), raising on failure. Batches are released on a fixed
+schedule that holds `rate` readings/sec (0: as fast as the workers go) and
+sent by `concurrency` threads. A batch's latency runs from its scheduled
+release, not from when a worker got to it, so a pipeline that falls behind
+shows it in p99 instead of silently lowering the offered load.
+"""
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+
+class LoadReport:
+    def __init__(self, sent, failed, elapsed, latencies, errors):
+        self.sent = sent
+        self.failed = failed
+        self.elapsed = elapsed
+        self.latencies = sorted(latencies)
+        self.errors = errors
+
+    @property
+    def throughput(self):
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, p):
+        """Nearest-rank percentile of the batch latencies, in seconds."""
+        if not self.latencies:
+            return 0.0
+        return self.latencies[max(0, math.ceil(p / 100 * len(self.latencies)) - 1)]
+
+    def __str__(self):
+        lines = [
+            f"Sent {self.sent} readings in {self.elapsed:.2f}s ({self.throughput:,.0f} readings/sec), "
+            f"{self.failed} failed",
+            f"Batch latency: p50 {self.percentile(50) * 1000:.1f}ms, p99 {self.percentile(99) * 1000:.1f}ms, "
+            f"max {self.percentile(100) * 1000:.1f}ms over {len(self.latencies)} batches",
+        ]
+        if self.errors:
+            lines.append(f"{len(self.errors)} batch error(s), first: {self.errors[0]}")
+        return "\n".join(lines)
+
+
+def run_load(send, make_batch, rate=0, batch_size=500, duration=10.0, total=None, concurrency=4, on_worker_exit=None):
+    """
+    Sends batches for `duration` seconds (or until `total` readings) and
+    returns a LoadReport. on_worker_exit runs once in every worker thread at
+    the end, e.g. django.db.connections.close_all for senders using the ORM.
+    """
+    interval = batch_size / rate if rate else 0.0
+    lock = threading.Lock()
+    # Bounds the batches built ahead of the workers
+    slots = threading.BoundedSemaphore(concurrency * 2)
+    state = {"sent": 0, "failed": 0, "latencies": [], "errors": []}
+
+    def work(batch, size, release):
+        try:
+            send(batch)
+        except Exception as e:
+            with lock:
+                state["failed"] += size
+                state["errors"].append(repr(e))
+        else:
+            latency = time.perf_counter() - release
+            with lock:
+                state["sent"] += size
+                state["latencies"].append(latency)
+        finally:
+            slots.release()
+
+    start = time.perf_counter()
+    queued = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while total is None or queued < total:
+            release = start + (queued / batch_size) * interval
+            now = time.perf_counter()
+            if now - start >= duration:
+                break
+            if release > now:
+                time.sleep(release - now)
+            else:
+                release = release if interval else now
+            size = batch_size if total is None else min(batch_size, total - queued)
+            slots.acquire()
+            pool.submit(work, make_batch(size), size, release)
+            queued += size
+        if on_worker_exit:
+            # Each worker blocks on the barrier after its call, so every thread takes exactly one
+            barrier = threading.Barrier(concurrency)
+            for _ in range(concurrency):
+                pool.submit(lambda: (on_worker_exit(), barrier.wait()))
+    elapsed = time.perf_counter() - start
+    return LoadReport(state["sent"], state["failed"], elapsed, state["latencies"], state["errors"])
+
+
+class JSONPoster:
+    """POSTs JSON to one URL with a keep-alive session per thread; raises on HTTP errors."""
+
+    def __init__(self, url, token=None, timeout=30):
+        self.url = url
+        self.timeout = timeout
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.local = threading.local()
+
+    def __call__(self, payload):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        response = session.post(self.url, json=payload, headers=self.headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response
@@ -0,0 +1,363 @@
+"""
+Time-partitioned telemetry storage on PostgreSQL.
+
+Raw telemetry tables are range-partitioned by day on their timestamp column
+(`<table>_pYYYYMMDD`, plus `<table>_default` for rows no daily partition
+covers) and summarised into 1-minute and 1-hour rollup tables holding
+count/min/max/mean/stddev per metric. Dashboards and analytics read the
+rollups, so their cost follows the time window, not the size of the history.
+
+    store = TelemetryStore(AssetTelemetry, 'asset', ['temperature', 'vibration'],
+                           minute_model=AssetTelemetryMinute, hour_model=AssetTelemetryHour)
+    store.maintain()  # partitions ahead, refresh rollups, apply retention
+
+A rollup model has the key as a ForeignKey, `bucket` (unique together with
+the key) and `<metric>_count/_min/_max/_mean/_stddev` for every metric.
+partition_by_day() converts an existing table, from a migration, and
+track_changes() (run after it) makes every INSERT or COPY record the time
+range it wrote, so refresh() also recomputes backfilled readings, however old.
+
+Settings: TELEMETRY_PARTITIONS_AHEAD (days, 3), TELEMETRY_LATE_SECONDS (300),
+TELEMETRY_RAW_RETENTION_DAYS (30), TELEMETRY_MINUTE_RETENTION_DAYS (14),
+TELEMETRY_HOUR_RETENTION_DAYS (730); a retention of None keeps everything.
+"""
+import re
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+STATS = ('count', 'min', 'max', 'mean', 'stddev')
+RESOLUTIONS = ('minute', 'hour')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def quote(name):
+    return connection.ops.quote_name(name)
+
+
+def day_start(day):
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def ceil_hour(moment):
+    hour = moment.replace(minute=0, second=0, microsecond=0)
+    return hour if hour == moment else hour + timedelta(hours=1)
+
+
+def partition_name(table, day):
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def is_partitioned(cursor, table):
+    cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [table])
+    return cursor.fetchone() is not None
+
+
+def list_partitions(cursor, table):
+    """{day: partition name} of the daily partitions of `table`."""
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(%s)", [table]
+    )
+    pattern = re.compile(rf"^{re.escape(table)}_p(\d{{8}})$")
+    days = {}
+    for (name,) in cursor.fetchall():
+        match = pattern.match(name)
+        if match:
+            days[datetime.strptime(match.group(1), "%Y%m%d").date()] = name
+    return days
+
+
+def create_partition(cursor, table, column, day):
+    """
+    Adds the partition for `day`. Rows already sitting in the default
+    partition for that day are moved into it first, as ATTACH requires.
+    """
+    name, default = partition_name(table, day), f"{table}_default"
+    lower, upper = day_start(day), day_start(day + timedelta(days=1))
+    cursor.execute(f"CREATE TABLE {quote(name)} (LIKE {quote(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {quote(default)} WHERE {quote(column)} >= %s AND {quote(column)} < %s RETURNING *) "
+        f"INSERT INTO {quote(name)} SELECT * FROM moved",
+        [lower, upper]
+    )
+    cursor.execute(f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} FOR VALUES FROM (%s) TO (%s)",
+                   [lower, upper])
+    return name
+
+
+def ensure_partitions(cursor, table, column, first_day, last_day):
+    """Creates the missing daily partitions from first_day to last_day; returns their names."""
+    existing = list_partitions(cursor, table)
+    created = []
+    day = first_day
+    while day <= last_day:
+        if day not in existing:
+            created.append(create_partition(cursor, table, column, day))
+        day += timedelta(days=1)
+    return created
+
+
+def drop_partitions(cursor, table, column, before_day):
+    """Drops the daily partitions older than before_day (and such rows in the default partition)."""
+    dropped = []
+    for day, name in sorted(list_partitions(cursor, table).items()):
+        if day < before_day:
+            cursor.execute(f"DROP TABLE {quote(name)}")
+            dropped.append(name)
+    cursor.execute(f"DELETE FROM {quote(table + '_default')} WHERE {quote(column)} < %s", [day_start(before_day)])
+    return dropped
+
+
+def partition_by_day(cursor, table, column, primary_key='id', days_ahead=None):
+    """
+    Rebuilds `table` as a table range-partitioned by day on `column`, keeping
+    its rows, foreign keys and indexes. The primary key becomes
+    (primary_key, column), as PostgreSQL requires the partition key in it;
+    an identity primary key becomes a plain sequence default. Does nothing if
+    the table is already partitioned.
+    """
+    if is_partitioned(cursor, table):
+        return
+    days_ahead = _setting('TELEMETRY_PARTITIONS_AHEAD', 3) if days_ahead is None else days_ahead
+    old = f"{table}_unpartitioned"
+    # Deferred foreign key checks pending on the old table would block dropping it
+    cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+    cursor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(old)}")
+    cursor.execute("SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                   "WHERE conrelid = to_regclass(%s) AND contype = 'f'", [old])
+    foreign_keys = cursor.fetchall()
+    cursor.execute("SELECT pg_get_indexdef(indexrelid) FROM pg_index "
+                   "WHERE indrelid = to_regclass(%s) AND NOT indisprimary", [old])
+    indexes = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT attidentity FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attname = %s",
+                   [old, primary_key])
+    identity = (cursor.fetchone() or [''])[0] != ''
+
+    cursor.execute(f"CREATE TABLE {quote(table)} (LIKE {quote(old)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+                   f"PARTITION BY RANGE ({quote(column)})")
+    cursor.execute(f"CREATE TABLE {quote(table + '_default')} PARTITION OF {quote(table)} DEFAULT")
+
+    cursor.execute(f"SELECT min({quote(column)}), max({quote(column)}) FROM {quote(old)}")
+    oldest, newest = cursor.fetchone()
+    today = timezone.now().date()
+    first_day = min(oldest.astimezone(dt_timezone.utc).date(), today) if oldest else today
+    last_day = max(newest.astimezone(dt_timezone.utc).date(), today) if newest else today
+    ensure_partitions(cursor, table, column, first_day, last_day + timedelta(days=days_ahead))
+
+    cursor.execute(f"INSERT INTO {quote(table)} SELECT * FROM {quote(old)}")
+    cursor.execute(f"DROP TABLE {quote(old)}")
+    cursor.execute(f"ALTER TABLE {quote(table)} ADD PRIMARY KEY ({quote(primary_key)}, {quote(column)})")
+    for name, definition in foreign_keys:
+        cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}")
+    for definition in indexes:
+        cursor.execute(re.sub(rf' ON (\S+\.)?"?{re.escape(old)}"? ', f' ON {quote(table)} ', definition))
+    if identity:
+        sequence = f"{table}_{primary_key}_seq"
+        cursor.execute(f"CREATE SEQUENCE {quote(sequence)} OWNED BY {quote(table)}.{quote(primary_key)}")
+        cursor.execute(f"SELECT setval(%s, coalesce(max({quote(primary_key)}), 0) + 1, false) FROM {quote(table)}",
+                       [sequence])
+        cursor.execute(f"ALTER TABLE {quote(table)} ALTER COLUMN {quote(primary_key)} "
+                       f"SET DEFAULT nextval(%s::regclass)", [sequence])
+
+
+def changes_table(table):
+    return f"{table}_changes"
+
+
+def track_changes(cursor, table, column):
+    """
+    Adds `<table>_changes` and a statement-level trigger that records the
+    min/max `column` of every INSERT (or COPY) into `table`. The row commits
+    with the readings, so refresh() never misses a batch still in flight.
+    Re-run it after partition_by_day(), which does not carry triggers over.
+    """
+    changes, function = changes_table(table), f"{table}_track_changes"
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {quote(changes)} "
+                   f"(first timestamptz NOT NULL, last timestamptz NOT NULL)")
+    cursor.execute(
+        f"CREATE OR REPLACE FUNCTION {quote(function)}() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN "
+        f"INSERT INTO {quote(changes)} SELECT min({quote(column)}), max({quote(column)}) FROM new_rows "
+        f"HAVING count(*) > 0; RETURN NULL; END $$"
+    )
+    cursor.execute(f"DROP TRIGGER IF EXISTS {quote(function)} ON {quote(table)}")
+    cursor.execute(f"CREATE TRIGGER {quote(function)} AFTER INSERT ON {quote(table)} "
+                   f"REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {quote(function)}()")
+
+
+def merge_ranges(ranges):
+    """Sorted, non-overlapping [start, end) ranges covering all of `ranges`."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(r) for r in merged]
+
+
+def rollup_columns(metrics):
+    return [f"{metric}_{stat}" for metric in metrics for stat in STATS]
+
+
+def refresh_minutes(cursor, source, time_column, key_column, metrics, target, start, end):
+    """Recomputes the 1-minute buckets of [start, end) from the raw rows; returns the rows written."""
+    aggregates = ", ".join(
+        f"count({m}), min({m})::float8, max({m})::float8, avg({m})::float8, coalesce(stddev_samp({m}), 0)::float8"
+        for m in map(quote, metrics)
+    )
+    return _upsert(cursor, target, key_column, metrics, (
+        f"SELECT {quote(key_column)}, date_trunc('minute', {quote(time_column)}), {aggregates} "
+        f"FROM {quote(source)} WHERE {quote(time_column)} >= %s AND {quote(time_column)} < %s GROUP BY 1, 2"
+    ), [start, end])
+
+
+def refresh_hours(cursor, source, key_column, metrics, target, start, end):
+    """
+    Recomputes the 1-hour buckets of [start, end) from the 1-minute rollup,
+    pooling the per-minute means and variances.
+    """
+    aggregates = []
+    for metric in metrics:
+        n, mean, sd = (quote(f"{metric}_{stat}") for stat in ('count', 'mean', 'stddev'))
+        total, weighted = f"nullif(sum({n}), 0)", f"sum({n} * {mean})"
+        aggregates.append(
+            f"coalesce(sum({n}), 0), min({quote(metric + '_min')}), max({quote(metric + '_max')}), "
+            f"{weighted} / {total}, "
+            f"coalesce(sqrt(greatest((sum(({n} - 1) * {sd} * {sd} + {n} * {mean} * {mean}) "
+            f"- {weighted} * {weighted} / {total}) / nullif(sum({n}) - 1, 0), 0)), 0)"
+        )
+    return _upsert(cursor, target, key_column, metrics, (
+        f"SELECT {quote(key_column)}, date_trunc('hour', bucket), {', '.join(aggregates)} "
+        f"FROM {quote(source)} WHERE bucket >= %s AND bucket < %s GROUP BY 1, 2"
+    ), [start, end])
+
+
+def _upsert(cursor, target, key_column, metrics, select, params):
+    columns = rollup_columns(metrics)
+    cursor.execute(
+        f"INSERT INTO {quote(target)} ({quote(key_column)}, bucket, {', '.join(map(quote, columns))}) {select} "
+        f"ON CONFLICT ({quote(key_column)}, bucket) DO UPDATE SET "
+        + ", ".join(f"{quote(c)} = EXCLUDED.{quote(c)}" for c in columns),
+        params
+    )
+    return cursor.rowcount
+
+
+class TelemetryStore:
+    """Partitions, rollups and retention for one raw telemetry model."""
+
+    def __init__(self, model, key, metrics, minute_model, hour_model, time_field='timestamp'):
+        self.model = model
+        self.key = key
+        self.metrics = list(metrics)
+        self.minute_model = minute_model
+        self.hour_model = hour_model
+        self.time_field = time_field
+
+    @property
+    def table(self):
+        return self.model._meta.db_table
+
+    @property
+    def time_column(self):
+        return self.model._meta.get_field(self.time_field).column
+
+    @property
+    def key_column(self):
+        return self.model._meta.get_field(self.key).column
+
+    def rollup_model(self, resolution):
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+        return self.minute_model if resolution == 'minute' else self.hour_model
+
+    def series(self, resolution, start, end=None, **filters):
+        """Rollup rows of the window, newest first."""
+        rows = self.rollup_model(resolution).objects.filter(bucket__gte=start, **filters)
+        if end is not None:
+            rows = rows.filter(bucket__lt=end)
+        return rows.order_by('-bucket')
+
+    def ensure_partitions(self, now=None):
+        today = (now or timezone.now()).astimezone(dt_timezone.utc).date()
+        ahead = _setting('TELEMETRY_PARTITIONS_AHEAD', 3)
+        with transaction.atomic(), connection.cursor() as cursor:
+            if not is_partitioned(cursor, self.table):
+                return []
+            return ensure_partitions(cursor, self.table, self.time_column, today, today + timedelta(days=ahead))
+
+    def refresh(self, until=None):
+        """
+        Brings both rollups up to `until` (now). Starts TELEMETRY_LATE_SECONDS
+        before the newest minute bucket, so late rows within that margin are
+        still counted; an empty rollup is backfilled from the oldest raw row.
+        With track_changes() installed, the time ranges of rows inserted since
+        the last refresh are recomputed too, so older backfill is not missed.
+        Returns {"minute": rows, "hour": rows}.
+        """
+        until = until or timezone.now()
+        minute_table, hour_table = self.minute_model._meta.db_table, self.hour_model._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            ranges = []
+            changes = changes_table(self.table)
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [changes])
+            if cursor.fetchone()[0]:
+                # Taken before the raw rows are read; batches committing later stay for the next refresh
+                cursor.execute(f"DELETE FROM {quote(changes)} RETURNING first, last")
+                ranges = [(first, last + timedelta(minutes=1)) for first, last in cursor.fetchall() if first < until]
+
+            cursor.execute(f"SELECT max(bucket) FROM {quote(minute_table)}")
+            newest = cursor.fetchone()[0]
+            if newest is not None:
+                ranges.append((newest - timedelta(seconds=_setting('TELEMETRY_LATE_SECONDS', 300)), until))
+            else:
+                cursor.execute(f"SELECT min({quote(self.time_column)}) FROM {quote(self.table)}")
+                oldest = cursor.fetchone()[0]
+                if oldest is not None:
+                    ranges.append((oldest, until))
+
+            minutes = hours = 0
+            minute_ranges = merge_ranges(
+                (start.replace(second=0, microsecond=0), min(end, until)) for start, end in ranges
+            )
+            for start, end in minute_ranges:
+                minutes += refresh_minutes(cursor, self.table, self.time_column, self.key_column, self.metrics,
+                                           minute_table, start, end)
+            # Whole hours, as an hour is pooled from all of its minutes
+            hour_ranges = merge_ranges((start.replace(minute=0), ceil_hour(end)) for start, end in minute_ranges)
+            for start, end in hour_ranges:
+                hours += refresh_hours(cursor, minute_table, self.key_column, self.metrics, hour_table, start, end)
+        return {"minute": minutes, "hour": hours}
+
+    def expire(self, now=None):
+        """Applies the retention settings; returns {"partitions": dropped names, "minute": rows, "hour": rows}."""
+        now = now or timezone.now()
+        result = {"partitions": [], "minute": 0, "hour": 0}
+        with transaction.atomic(), connection.cursor() as cursor:
+            raw_days = _setting('TELEMETRY_RAW_RETENTION_DAYS', 30)
+            if raw_days is not None:
+                cutoff = (now - timedelta(days=raw_days)).astimezone(dt_timezone.utc).date()
+                if is_partitioned(cursor, self.table):
+                    result["partitions"] = drop_partitions(cursor, self.table, self.time_column, cutoff)
+                else:
+                    cursor.execute(f"DELETE FROM {quote(self.table)} WHERE {quote(self.time_column)} < %s",
+                                   [day_start(cutoff)])
+            for resolution, name in (('minute', 'TELEMETRY_MINUTE_RETENTION_DAYS'), ('hour', 'TELEMETRY_HOUR_RETENTION_DAYS')):
+                days = _setting(name, 14 if resolution == 'minute' else 730)
+                if days is not None:
+                    result[resolution] = self.rollup_model(resolution).objects.filter(
+                        bucket__lt=now - timedelta(days=days)
+                    ).delete()[0]
+        return result
+
+    def maintain(self, now=None):
+        return {
+            "created": self.ensure_partitions(now),
+            "refreshed": self.refresh(now),
+            "expired": self.expire(now),
+        }